@@ -0,0 +1,53 @@
+"""
+Benchmark da geração de planos em paralelo (fan-out).
+
+Compara a requisição única com a geração em macroestrutura + blocos paralelos
+contra o servidor Claude simulado, que atrasa cada resposta proporcionalmente
+aos tokens de saída (simulando a velocidade de geração do modelo).
+
+Uso:
+    python -m backend.admin_tools.dev_tools.benchmarks.bench_fanout --tokens-por-segundo 5000
+"""
+
+import argparse
+import time
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+DADOS_USUARIO = {"id": "bench", "nome": "Benchmark", "nivel": "intermediário", "dias_disponiveis": ["segunda", "quarta", "sexta"]}
+
+
+def executar(tokens_por_segundo: float, semanas_por_bloco: int, max_workers: int, repeticoes: int) -> None:
+    plano = gerar_plano(semanas=12, semanas_por_ciclo=4, sessoes=3, exercicios=6)
+    with MockClaudeServer(responder=ResponderPlano(plano, tokens_por_segundo)) as servidor:
+        print(f"Servidor simulado em {servidor.url} — {tokens_por_segundo:.0f} tokens/s, {repeticoes} repetição(ões)\n")
+        transporte = HttpTransport(pool_size=max_workers + 1)
+        tempos = {}
+        for modo in ("completo", "fanout"):
+            treinador = TreinadorEspecialista("bench", api_url=servidor.url, transport=transporte,
+                                              usar_cache=False, modo_geracao=modo)
+            treinador.config_geracao = dict(treinador.config_geracao, fanout_max_workers=max_workers,
+                                            fanout_semanas_por_bloco=semanas_por_bloco)
+            requisicoes_antes = servidor.requisicoes
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                resultado = treinador.criar_plano_treinamento(DADOS_USUARIO)
+            tempos[modo] = (time.perf_counter() - inicio) / repeticoes
+            semanas = sum(len(c["microciclos"]) for c in resultado["plano_principal"]["ciclos"])
+            print(f"{modo:<10} {tempos[modo] * 1000:9.1f} ms/plano  "
+                  f"requisições={(servidor.requisicoes - requisicoes_antes) // repeticoes:3d}  semanas={semanas}")
+
+        print(f"\nGanho do fan-out: {tempos['completo'] / tempos['fanout']:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da geração de planos em paralelo")
+    parser.add_argument("--tokens-por-segundo", type=float, default=5000)
+    parser.add_argument("--semanas-por-bloco", type=int, default=0, help="0 = um bloco por ciclo")
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--repeticoes", type=int, default=1)
+    args = parser.parse_args()
+    executar(args.tokens_por_segundo, args.semanas_por_bloco, args.max_workers, args.repeticoes)
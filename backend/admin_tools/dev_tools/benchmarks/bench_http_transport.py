@@ -0,0 +1,114 @@
+"""
+Benchmark do transporte HTTP com pool de conexões.
+
+Compara requests.post sem sessão (uma conexão TCP/TLS por chamada) com o
+HttpTransport compartilhado (conexões keep-alive) contra o servidor Claude
+simulado, em modo sequencial e com várias threads.
+
+Uso:
+    python -m backend.admin_tools.dev_tools.benchmarks.bench_http_transport --requisicoes 200 --tls
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer
+from backend.utils.http_transport import HttpTransport
+
+HEADERS = {"anthropic-version": "2023-06-01", "x-api-key": "bench", "content-type": "application/json"}
+PAYLOAD = {"model": "claude-3-opus-20240229", "max_tokens": 16, "messages": [{"role": "user", "content": "ping"}]}
+
+
+def _gerar_certificado(diretorio: str) -> Optional[Tuple[str, str]]:
+    """Gera um certificado autoassinado com o openssl, se disponível."""
+    if not shutil.which("openssl"):
+        return None
+    cert = os.path.join(diretorio, "cert.pem")
+    chave = os.path.join(diretorio, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", chave,
+         "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1"],
+        check=True, capture_output=True
+    )
+    return cert, chave
+
+
+def _medir(enviar: Callable[[], None], requisicoes: int, threads: int) -> List[float]:
+    """Executa as requisições e retorna a latência de cada uma em milissegundos."""
+    def uma() -> float:
+        inicio = time.perf_counter()
+        enviar()
+        return (time.perf_counter() - inicio) * 1000
+
+    if threads <= 1:
+        return [uma() for _ in range(requisicoes)]
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(lambda _: uma(), range(requisicoes)))
+
+
+def _resumo(nome: str, latencias: List[float], conexoes: int, total_s: float) -> Dict[str, float]:
+    ordenadas = sorted(latencias)
+    resumo = {
+        "media_ms": statistics.mean(latencias),
+        "p50_ms": ordenadas[len(ordenadas) // 2],
+        "p95_ms": ordenadas[int(len(ordenadas) * 0.95) - 1],
+        "conexoes": conexoes,
+        "req_por_s": len(latencias) / total_s
+    }
+    print(f"{nome:<28} média={resumo['media_ms']:7.2f}ms  p50={resumo['p50_ms']:7.2f}ms  "
+          f"p95={resumo['p95_ms']:7.2f}ms  conexões={conexoes:4d}  vazão={resumo['req_por_s']:8.1f} req/s")
+    return resumo
+
+
+def executar(requisicoes: int, threads: int, tls: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        certificado = _gerar_certificado(tmp) if tls else None
+        if tls and not certificado:
+            print("openssl não encontrado; executando sem TLS")
+        certfile, keyfile = certificado or (None, None)
+
+        with MockClaudeServer(certfile=certfile, keyfile=keyfile) as servidor:
+            verify = not servidor.tls
+            url = servidor.url
+            print(f"Servidor simulado em {url} — {requisicoes} requisições, {threads} thread(s)\n")
+            warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+
+            resultados = {}
+            for nome, enviar in (
+                ("requests.post (sem pool)",
+                 lambda: requests.post(url, headers=HEADERS, json=PAYLOAD, verify=verify, timeout=(5, 30))),
+                ("HttpTransport (keep-alive)", None),
+            ):
+                if enviar is None:
+                    transporte = HttpTransport(pool_size=max(threads, 1), verify=verify)
+                    enviar = lambda: transporte.post(url, HEADERS, PAYLOAD)
+                conexoes_antes = servidor.conexoes
+                inicio = time.perf_counter()
+                latencias = _medir(enviar, requisicoes, threads)
+                total = time.perf_counter() - inicio
+                resultados[nome] = _resumo(nome, latencias, servidor.conexoes - conexoes_antes, total)
+
+            base, pool = resultados.values()
+            economia = base["media_ms"] - pool["media_ms"]
+            print(f"\nEconomia média por requisição: {economia:.2f} ms "
+                  f"({economia / base['media_ms'] * 100:.1f}%), "
+                  f"conexões evitadas: {base['conexoes'] - pool['conexoes']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do transporte HTTP com pool")
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--tls", action="store_true", help="Servir o mock via TLS (requer openssl)")
+    args = parser.parse_args()
+    executar(args.requisicoes, args.threads, args.tls)
@@ -0,0 +1,86 @@
+"""
+Benchmark do extrator de JSON com entradas adversariais.
+
+Compara a extração anterior (re.findall de blocos ```json e, como fallback,
+o regex de chaves aninhadas com max(matches, key=len)) com a varredura linear
+de backend.utils.json_extractor, medindo o tempo e o que cada uma devolve.
+
+Casos:
+- plano: plano válido dentro de um bloco ```json
+- truncado: plano cortado a 70% (resposta interrompida por max_tokens)
+- cercas_abertas: muitas aberturas ```json sem fechamento antes do plano
+- chaves_abertas: muitas chaves abertas sem fechamento em texto livre
+- chaves_em_strings: plano cujas strings contêm chaves e crases
+
+Uso:
+    python -m backend.admin_tools.dev_tools.benchmarks.bench_json_extractor --semanas 52
+"""
+
+import argparse
+import json
+import re
+import time
+
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.json_extractor import extrair_json
+
+
+def extrair_legado(texto):
+    """Lógica anterior de TreinadorEspecialista._extrair_json_da_resposta."""
+    blocos = re.findall(r'```json(.*?)```', texto, re.DOTALL)
+    if blocos:
+        return json.loads(blocos[0].strip())
+    matches = re.compile(r'\{(?:[^{}]|(?:\{[^{}]*\}))*\}').findall(texto)
+    if not matches:
+        raise ValueError("Nenhum JSON encontrado na resposta")
+    return json.loads(max(matches, key=len))
+
+
+def descrever(resultado):
+    if isinstance(resultado, Exception):
+        return type(resultado).__name__
+    if isinstance(resultado, dict) and "plano_principal" in resultado:
+        return "plano completo"
+    return f"fragmento {sorted(resultado)[:3]}" if isinstance(resultado, dict) else type(resultado).__name__
+
+
+def casos(semanas: int, repeticoes_adversariais: int):
+    plano = gerar_plano(semanas=semanas, semanas_por_ciclo=4, sessoes=4, exercicios=8)
+    texto_plano = json.dumps(plano, ensure_ascii=False)
+    bloco = "```json\n" + texto_plano + "\n```"
+    yield "plano", bloco
+    yield "truncado", bloco[:int(len(bloco) * 0.7)]
+    yield "cercas_abertas", "```json exemplo " * repeticoes_adversariais + "\n" + texto_plano
+    yield "chaves_abertas", "{ {x " * repeticoes_adversariais
+    for ciclo in plano["plano_principal"]["ciclos"]:
+        ciclo["objetivo"] = "Use {carga} e ``` para {destacar} \\\"notas\\\" }"
+    yield "chaves_em_strings", "Plano:\n" + json.dumps(plano, ensure_ascii=False)
+
+
+def medir(funcao, texto, repeticoes):
+    resultado = None
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        try:
+            resultado = funcao(texto)
+        except Exception as e:
+            resultado = e
+    return (time.perf_counter() - inicio) / repeticoes, resultado
+
+
+def executar(semanas: int, repeticoes_adversariais: int, repeticoes: int) -> None:
+    print(f"{'caso':<18} {'tamanho':>9} {'legado (ms)':>12} {'linear (ms)':>12}  resultado legado / linear")
+    for nome, texto in casos(semanas, repeticoes_adversariais):
+        tempo_legado, resultado_legado = medir(extrair_legado, texto, repeticoes)
+        tempo_linear, resultado_linear = medir(extrair_json, texto, repeticoes)
+        print(f"{nome:<18} {len(texto):>9} {tempo_legado * 1000:>12.2f} {tempo_linear * 1000:>12.2f}  "
+              f"{descrever(resultado_legado)} / {descrever(resultado_linear)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do extrator de JSON")
+    parser.add_argument("--semanas", type=int, default=52)
+    parser.add_argument("--adversariais", type=int, default=20000, help="Repetições do padrão adversarial")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+    executar(args.semanas, args.adversariais, args.repeticoes)
@@ -0,0 +1,80 @@
+"""
+Benchmark do pipeline completo (run_training_pipeline) reproduzido a partir de cassetes.
+
+Grava as respostas do servidor Claude simulado (ou usa cassetes já gravadas, por
+exemplo da API real com CLAUDE_TRANSPORT_MODE=gravar) e executa o pipeline com
+CLAUDE_TRANSPORT_MODE=reproduzir, sem rede e com resultados reprodutíveis no CI.
+A latência do modelo pode ser simulada com --latencia e --fator-latencia-gravada.
+
+Uso:
+    python -m backend.admin_tools.dev_tools.benchmarks.bench_pipeline_replay --repeticoes 5
+    python -m backend.admin_tools.dev_tools.benchmarks.bench_pipeline_replay --cassetes tests/cassetes --sem-gravar
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.cassette_transport import TransporteCassete
+from backend.utils.http_transport import HttpTransport
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+DADOS_USUARIO = {"id": "bench", "nome": "Benchmark", "nivel": "intermediário", "disponibilidade_semanal": 3,
+                 "dias_disponiveis": ["segunda", "quarta", "sexta"], "data_inicio": "2024-01-01"}
+
+
+def gravar(diretorio: str, streaming: bool) -> None:
+    """Grava as respostas do servidor simulado para os dados do benchmark."""
+    plano = gerar_plano(semanas=12, semanas_por_ciclo=4, sessoes=3, exercicios=6)
+    with MockClaudeServer(responder=ResponderPlano(plano)) as servidor:
+        treinador = TreinadorEspecialista("bench", api_url=servidor.url, usar_cache=False,
+                                          transport=TransporteCassete(diretorio, "gravar", HttpTransport()))
+        if streaming:
+            list(treinador.criar_plano_treinamento_stream(DADOS_USUARIO))
+        else:
+            treinador.criar_plano_treinamento(DADOS_USUARIO)
+        print(f"{servidor.requisicoes} requisição(ões) gravada(s) em {diretorio}")
+
+
+def executar(diretorio: str, repeticoes: int, streaming: bool) -> None:
+    # O transporte do processo é criado na primeira chamada, a partir destas variáveis
+    os.environ["CLAUDE_TRANSPORT_MODE"] = "reproduzir"
+    os.environ["CLAUDE_CASSETTE_DIR"] = diretorio
+    os.environ["PLAN_CACHE_ENABLED"] = "False"
+    from backend.api.app import run_training_pipeline
+
+    etapas = {"total": [], "etapa1": [], "etapa2": [], "etapa3": []}
+    for _ in range(repeticoes):
+        resultado = run_training_pipeline("replay", DADOS_USUARIO, streaming=streaming)
+        if resultado["status"] != "success":
+            raise RuntimeError(f"Pipeline falhou: {resultado.get('message')}")
+        for etapa, tempo in resultado["tempo_execucao"].items():
+            etapas[etapa].append(tempo)
+
+    print(f"\nPipeline reproduzido {repeticoes}x (streaming={streaming})")
+    for etapa, tempos in etapas.items():
+        print(f"{etapa:<8} mediana {statistics.median(tempos) * 1000:9.1f} ms  "
+              f"min {min(tempos) * 1000:9.1f} ms  max {max(tempos) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline reproduzido a partir de cassetes")
+    parser.add_argument("--cassetes", help="Diretório das cassetes (padrão: diretório temporário)")
+    parser.add_argument("--sem-gravar", action="store_true", help="Usa as cassetes existentes sem gravar")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Atraso fixo por requisição (s)")
+    parser.add_argument("--fator-latencia-gravada", type=float, default=0.0,
+                        help="Fração da duração gravada reproduzida como atraso (1.0 = tempo real)")
+    args = parser.parse_args()
+
+    os.environ["CLAUDE_REPLAY_LATENCY"] = str(args.latencia)
+    os.environ["CLAUDE_REPLAY_RECORDED_LATENCY_FACTOR"] = str(args.fator_latencia_gravada)
+    with tempfile.TemporaryDirectory() as temporario:
+        diretorio = args.cassetes or temporario
+        if not args.sem_gravar:
+            gravar(diretorio, args.streaming)
+        executar(diretorio, args.repeticoes, args.streaming)
@@ -0,0 +1,138 @@
+"""
+Benchmark da validação de schema compilada.
+
+Compara a validação anterior (jsonschema.validate a cada rodada, que reconstrói
+o validador e verifica o metaschema, corrigindo um erro por rodada) com o
+validador compilado, que coleta todos os erros em uma passada, repara no local
+e revalida uma única vez. Usa planos sintéticos grandes e um schema detalhado
+que desce até os exercícios.
+
+Uso:
+    python -m backend.admin_tools.dev_tools.benchmarks.bench_schema_validation --erros 20
+"""
+
+import argparse
+import copy
+import random
+import time
+
+import jsonschema
+
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.schema_validation import reparar_erros, validar_e_reparar
+
+INTEIRO = {"type": "integer"}
+TEXTO = {"type": "string"}
+
+SCHEMA_DETALHADO = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "required": ["usuario", "plano_principal"],
+    "properties": {
+        "usuario": {"type": "object", "required": ["nome"], "properties": {"nome": TEXTO}},
+        "plano_principal": {
+            "type": "object",
+            "required": ["nome", "duracao_semanas", "frequencia_semanal", "ciclos"],
+            "properties": {
+                "nome": TEXTO,
+                "duracao_semanas": INTEIRO,
+                "frequencia_semanal": INTEIRO,
+                "ciclos": {"type": "array", "items": {
+                    "type": "object",
+                    "required": ["ciclo_id", "nome", "ordem", "microciclos"],
+                    "properties": {
+                        "ciclo_id": TEXTO, "nome": TEXTO, "ordem": INTEIRO, "duracao_semanas": INTEIRO,
+                        "microciclos": {"type": "array", "items": {
+                            "type": "object",
+                            "required": ["semana", "sessoes"],
+                            "properties": {
+                                "semana": INTEIRO,
+                                "sessoes": {"type": "array", "items": {
+                                    "type": "object",
+                                    "required": ["sessao_id", "nome", "duracao_minutos", "exercicios"],
+                                    "properties": {
+                                        "sessao_id": TEXTO, "nome": TEXTO,
+                                        "duracao_minutos": INTEIRO, "nivel_intensidade": INTEIRO,
+                                        "dia_semana": {"type": "integer", "minimum": 1, "maximum": 7},
+                                        "exercicios": {"type": "array", "items": {
+                                            "type": "object",
+                                            "required": ["exercicio_id", "nome", "ordem", "series", "repeticoes"],
+                                            "properties": {
+                                                "exercicio_id": TEXTO, "nome": TEXTO, "ordem": INTEIRO,
+                                                "series": INTEIRO, "repeticoes": TEXTO,
+                                                "percentual_rm": {"type": "number"},
+                                                "tempo_descanso": INTEIRO
+                                            }
+                                        }}
+                                    }
+                                }}
+                            }
+                        }}
+                    }
+                }}
+            }
+        }
+    }
+}
+
+
+def injetar_erros(plano, quantidade, semente=42):
+    """Substitui campos numéricos de exercícios por strings e remove campos obrigatórios."""
+    aleatorio = random.Random(semente)
+    exercicios = [
+        e for c in plano["plano_principal"]["ciclos"] for m in c["microciclos"]
+        for s in m["sessoes"] for e in s["exercicios"]
+    ]
+    for i, exercicio in enumerate(aleatorio.sample(exercicios, quantidade)):
+        if i % 3 == 0:
+            del exercicio["ordem"]
+        else:
+            exercicio["series"] = str(exercicio["series"])
+    return plano
+
+
+def validar_legado(plano, schema):
+    """Fluxo anterior: validate completo, corrige o primeiro erro e valida de novo."""
+    rodadas = 0
+    while True:
+        rodadas += 1
+        try:
+            jsonschema.validate(instance=plano, schema=schema)
+            return rodadas
+        except jsonschema.exceptions.ValidationError as erro:
+            if not reparar_erros(plano, [erro]):
+                return rodadas
+
+
+def validar_compilado(plano, schema):
+    erros, correcoes, restantes = validar_e_reparar(plano, schema)
+    return 1 if not erros else 2
+
+
+def medir(funcao, plano, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        rodadas = funcao(copy.deepcopy(plano), SCHEMA_DETALHADO)
+    return (time.perf_counter() - inicio) / repeticoes, rodadas
+
+
+def executar(quantidade_erros: int, repeticoes: int) -> None:
+    print(f"{'semanas':>7} {'erros':>5} {'legado (ms)':>12} {'rodadas':>7} {'compilado (ms)':>15} {'rodadas':>7} {'ganho':>7}")
+    for semanas in (12, 52, 104):
+        base = gerar_plano(semanas=semanas, semanas_por_ciclo=4, sessoes=4, exercicios=8)
+        for erros in (0, quantidade_erros):
+            plano = injetar_erros(copy.deepcopy(base), erros) if erros else base
+            # Aquecimento do cache de validadores
+            validar_compilado(copy.deepcopy(plano), SCHEMA_DETALHADO)
+            tempo_legado, rodadas_legado = medir(validar_legado, plano, repeticoes)
+            tempo_compilado, rodadas_compilado = medir(validar_compilado, plano, repeticoes)
+            print(f"{semanas:>7} {erros:>5} {tempo_legado * 1000:>12.1f} {rodadas_legado:>7} "
+                  f"{tempo_compilado * 1000:>15.1f} {rodadas_compilado:>7} {tempo_legado / tempo_compilado:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da validação de schema compilada")
+    parser.add_argument("--erros", type=int, default=20, help="Erros injetados nos planos inválidos")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+    executar(args.erros, args.repeticoes)
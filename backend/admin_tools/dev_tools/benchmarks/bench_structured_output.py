@@ -0,0 +1,78 @@
+"""
+Benchmark da saída estruturada (chamada de ferramenta) contra o bloco JSON em texto.
+
+Para cada modo, gera planos contra o servidor Claude simulado e mede, lado a lado:
+o tempo de extração do plano da resposta, o tempo de validação e reparo, a fração
+de planos que precisaram de reparo e os tokens de entrada e saída informados.
+
+O servidor simulado serializa números como strings em uma fração das respostas
+em texto (--taxa-erros); a entrada da ferramenta chega sempre tipada. A taxa de
+reparo do modo texto reflete, portanto, a taxa configurada; os tempos e os tokens
+vêm das respostas de fato trafegadas.
+
+Uso:
+    python -m backend.admin_tools.dev_tools.benchmarks.bench_structured_output --planos 20 --taxa-erros 0.3
+"""
+
+import argparse
+import time
+
+from backend.admin_tools.dev_tools.benchmarks.bench_schema_validation import SCHEMA_DETALHADO
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.schema_validation import validar_e_reparar
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+# Extração sem o decorador de log, que serializa o plano inteiro nos dois modos
+extrair_plano = TreinadorEspecialista._extrair_json_da_resposta.__wrapped__
+
+DADOS_USUARIO = {"id": "bench", "nome": "Benchmark", "nivel": "intermediário", "dias_disponiveis": ["segunda", "quarta", "sexta"]}
+
+
+def executar(planos: int, taxa_erros: float, sessoes: int, exercicios: int) -> None:
+    plano = gerar_plano(semanas=12, semanas_por_ciclo=4, sessoes=sessoes, exercicios=exercicios)
+    responder = ResponderPlano(plano, taxa_erros_texto=taxa_erros)
+    with MockClaudeServer(responder=responder) as servidor:
+        print(f"Servidor simulado em {servidor.url} — {planos} planos por modo, taxa de erros em texto {taxa_erros:.0%}\n")
+        print(f"{'modo':<11} {'extração (ms)':>13} {'validação (ms)':>14} {'reparados':>9} "
+              f"{'tokens entrada':>14} {'tokens saída':>12}")
+        transporte = HttpTransport()
+        for modo in ("texto", "ferramenta"):
+            estruturada = modo == "ferramenta"
+            treinador = TreinadorEspecialista("bench", api_url=servidor.url, transport=transporte,
+                                              usar_cache=False, saida_estruturada=estruturada)
+            # Schema detalhado até os exercícios, como o de produção deveria ser
+            treinador.schema = SCHEMA_DETALHADO
+            treinador.ferramenta_plano = treinador._definir_ferramenta_plano(SCHEMA_DETALHADO)
+            ferramenta = treinador.ferramenta_plano if estruturada else None
+
+            tempo_extracao = tempo_validacao = 0.0
+            reparados = tokens_entrada = tokens_saida = 0
+            for _ in range(planos):
+                prompt = treinador._preparar_prompt(DADOS_USUARIO, saida_estruturada=estruturada)
+                resposta = treinador._fazer_requisicao_claude(prompt, 8000, ferramenta=ferramenta)
+                tokens_entrada += resposta["usage"]["input_tokens"]
+                tokens_saida += resposta["usage"]["output_tokens"]
+
+                inicio = time.perf_counter()
+                resultado = extrair_plano(treinador, resposta)
+                tempo_extracao += time.perf_counter() - inicio
+
+                inicio = time.perf_counter()
+                _, correcoes, _ = validar_e_reparar(resultado, SCHEMA_DETALHADO)
+                tempo_validacao += time.perf_counter() - inicio
+                reparados += bool(correcoes)
+
+            print(f"{modo:<11} {tempo_extracao / planos * 1000:>13.3f} {tempo_validacao / planos * 1000:>14.3f} "
+                  f"{reparados / planos:>9.0%} {tokens_entrada // planos:>14} {tokens_saida // planos:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da saída estruturada contra JSON em texto")
+    parser.add_argument("--planos", type=int, default=20)
+    parser.add_argument("--taxa-erros", type=float, default=0.3, help="Fração das respostas em texto com erros de tipo")
+    parser.add_argument("--sessoes", type=int, default=3)
+    parser.add_argument("--exercicios", type=int, default=6)
+    args = parser.parse_args()
+    executar(args.planos, args.taxa_erros, args.sessoes, args.exercicios)
@@ -0,0 +1,464 @@
+"""
+Servidor local que simula a API Messages do Claude.
+
+Usado pelos benchmarks e testes para medir o pipeline sem depender da API real.
+O servidor mantém conexões HTTP/1.1 keep-alive e conta quantas conexões TCP
+foram abertas, o que permite medir o custo de handshake por requisição.
+"""
+
+import copy
+import json
+import random
+import re
+import ssl
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Iterator, List, Optional, Callable, Tuple
+
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_macroestrutura, gerar_plano_compacto
+
+# Prefixos menores que isso não são cacheados pela API (modelos Opus e Sonnet)
+MINIMO_TOKENS_CACHE = 1024
+
+TEXTO_PADRAO = "```json\n{\"usuario\": {\"nome\": \"Mock\"}, \"plano_principal\": {\"nome\": \"Plano Mock\", \"ciclos\": []}}\n```"
+
+
+def criar_resposta_mensagem(texto: str, modelo: str = "claude-3-opus-20240229",
+                            stop_reason: str = "end_turn", input_tokens: int = 1000) -> Dict[str, Any]:
+    """
+    Cria um corpo de resposta no formato da API Messages.
+
+    Args:
+        texto (str): Texto retornado pelo modelo
+        modelo (str): Nome do modelo
+        stop_reason (str): Motivo de parada
+        input_tokens (int): Tokens de entrada informados no uso
+
+    Returns:
+        Dict: Resposta no formato da API
+    """
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": modelo,
+        "content": [{"type": "text", "text": texto}],
+        "stop_reason": stop_reason,
+        "usage": {"input_tokens": input_tokens, "output_tokens": max(1, len(texto) // 4)}
+    }
+
+
+def criar_resposta_ferramenta(nome: str, entrada: Dict[str, Any], modelo: str = "claude-3-opus-20240229",
+                              input_tokens: int = 1000) -> Dict[str, Any]:
+    """
+    Cria uma resposta da API Messages com uma chamada de ferramenta (stop_reason "tool_use").
+
+    Args:
+        nome (str): Nome da ferramenta chamada
+        entrada (Dict): Entrada da chamada
+        modelo (str): Nome do modelo
+        input_tokens (int): Tokens de entrada informados no uso
+
+    Returns:
+        Dict: Resposta no formato da API
+    """
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": modelo,
+        "content": [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": nome, "input": entrada}],
+        "stop_reason": "tool_use",
+        "usage": {"input_tokens": input_tokens,
+                  "output_tokens": max(1, len(json.dumps(entrada, ensure_ascii=False)) // 4)}
+    }
+
+
+def estimar_tokens_entrada(payload: Dict[str, Any]) -> int:
+    """Estima os tokens de entrada (~4 caracteres por token) das mensagens, do sistema e das ferramentas."""
+    caracteres = len(json.dumps(payload.get("messages", []), ensure_ascii=False))
+    caracteres += len(json.dumps(payload.get("system", ""), ensure_ascii=False))
+    caracteres += len(json.dumps(payload.get("tools", []), ensure_ascii=False))
+    return max(1, caracteres // 4)
+
+
+def prefixo_cacheavel(payload: Dict[str, Any]) -> str:
+    """
+    Retorna o prefixo da requisição coberto por um marcador cache_control.
+
+    A API compõe o prefixo na ordem ferramentas, sistema e mensagens, até o último
+    bloco marcado; aqui só os marcadores nas ferramentas e no sistema são considerados.
+
+    Args:
+        payload (Dict): Corpo da requisição
+
+    Returns:
+        str: Prefixo serializado ou "" se a requisição não tiver marcadores
+    """
+    blocos = list(payload.get("tools") or [])
+    sistema = payload.get("system") or []
+    if isinstance(sistema, list):
+        blocos.extend(sistema)
+    marcados = [i for i, bloco in enumerate(blocos) if isinstance(bloco, dict) and bloco.get("cache_control")]
+    if not marcados:
+        return ""
+    return json.dumps(blocos[:marcados[-1] + 1], ensure_ascii=False, sort_keys=True)
+
+
+def serializar_numeros_como_texto(plano: Dict[str, Any], quantidade: int, semente: int = 0) -> Dict[str, Any]:
+    """
+    Retorna uma cópia do plano com campos numéricos de exercícios serializados como strings,
+    erro de tipo comum quando o modelo escreve o JSON como texto livre.
+
+    Args:
+        plano (Dict): Plano completo
+        quantidade (int): Número de campos alterados
+        semente (int): Semente da escolha dos exercícios
+
+    Returns:
+        Dict: Cópia do plano com os erros de tipo
+    """
+    plano = copy.deepcopy(plano)
+    exercicios = [
+        e for c in plano["plano_principal"]["ciclos"] for m in c["microciclos"]
+        for s in m["sessoes"] for e in s["exercicios"]
+    ]
+    for exercicio in random.Random(semente).sample(exercicios, min(quantidade, len(exercicios))):
+        exercicio["series"] = str(exercicio["series"])
+    return plano
+
+
+def _fatiar(texto: str, tamanho: int) -> List[str]:
+    return [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)] or [""]
+
+
+def eventos_sse_de_mensagem(mensagem: Dict[str, Any], tamanho_pedaco: int = 64) -> Iterator[Dict[str, Any]]:
+    """
+    Converte uma resposta completa da API Messages na sequência de eventos de streaming.
+
+    Args:
+        mensagem (Dict): Resposta no formato da API
+        tamanho_pedaco (int): Número de caracteres por delta
+
+    Returns:
+        Iterator[Dict]: Eventos message_start, content_block_*, message_delta e message_stop
+    """
+    inicio = dict(mensagem, content=[], stop_reason=None)
+    inicio["usage"] = dict(mensagem.get("usage", {}), output_tokens=1)
+    yield {"type": "message_start", "message": inicio}
+
+    for indice, bloco in enumerate(mensagem.get("content", [])):
+        if bloco.get("type") == "tool_use":
+            yield {"type": "content_block_start", "index": indice,
+                   "content_block": dict(bloco, input={})}
+            for pedaco in _fatiar(json.dumps(bloco.get("input", {}), ensure_ascii=False), tamanho_pedaco):
+                yield {"type": "content_block_delta", "index": indice,
+                       "delta": {"type": "input_json_delta", "partial_json": pedaco}}
+        else:
+            yield {"type": "content_block_start", "index": indice, "content_block": {"type": "text", "text": ""}}
+            for pedaco in _fatiar(bloco.get("text", ""), tamanho_pedaco):
+                yield {"type": "content_block_delta", "index": indice,
+                       "delta": {"type": "text_delta", "text": pedaco}}
+        yield {"type": "content_block_stop", "index": indice}
+
+    yield {"type": "message_delta",
+           "delta": {"stop_reason": mensagem.get("stop_reason", "end_turn"), "stop_sequence": None},
+           "usage": {"output_tokens": mensagem.get("usage", {}).get("output_tokens", 0)}}
+    yield {"type": "message_stop"}
+
+
+class ResponderPlano:
+    """
+    Responder que devolve um plano fixo conforme o tipo de prompt recebido.
+
+    Reconhece o prompt completo, o de macroestrutura e o de blocos de semanas da
+    geração em paralelo, o do formato compacto e o de regeneração de um ciclo ou
+    semana, e simula o tempo de geração proporcional aos tokens de saída.
+    Também pode cortar as respostas em um tamanho fixo (stop_reason "max_tokens") e
+    retomar do ponto de corte quando recebe o início da resposta do assistente.
+    Quando a requisição força uma ferramenta, o plano é devolvido como chamada dessa
+    ferramenta; só as respostas em texto recebem os erros de tipo simulados.
+    Prefixos marcados com cache_control são gravados no cache na primeira requisição
+    e lidos nas seguintes, com uso informado como na API e sem tempo de leitura.
+    """
+
+    def __init__(self, plano: Dict[str, Any], tokens_por_segundo: float = 0.0, caracteres_por_resposta: int = 0,
+                 taxa_erros_texto: float = 0.0, erros_por_resposta: int = 3,
+                 tokens_entrada_por_segundo: float = 0.0, minimo_tokens_cache: int = MINIMO_TOKENS_CACHE):
+        """
+        Args:
+            plano (Dict): Plano completo no formato do Wrapper 1
+            tokens_por_segundo (float): Velocidade simulada de geração (0 desativa o atraso)
+            caracteres_por_resposta (int): Tamanho máximo do texto de cada resposta (0 não corta)
+            taxa_erros_texto (float): Fração das respostas em texto com números serializados como strings
+            erros_por_resposta (int): Campos alterados em cada resposta com erros
+            tokens_entrada_por_segundo (float): Velocidade simulada de leitura dos tokens de entrada
+                fora do cache (0 desativa o atraso)
+            minimo_tokens_cache (int): Tamanho mínimo do prefixo marcado para ser cacheado
+        """
+        self.plano = plano
+        self.tokens_entrada_por_segundo = tokens_entrada_por_segundo
+        self.minimo_tokens_cache = minimo_tokens_cache
+        self._cache_prompts: set = set()
+        self._lock_cache = threading.Lock()
+        self.caracteres_por_resposta = caracteres_por_resposta
+        self.taxa_erros_texto = taxa_erros_texto
+        self.erros_por_resposta = erros_por_resposta
+        self._aleatorio = random.Random(42)
+        self.macro = gerar_macroestrutura(plano)
+        self.compacto = gerar_plano_compacto(plano)
+        self.tokens_por_segundo = tokens_por_segundo
+        self.microciclos = {
+            m["semana"]: m for ciclo in plano["plano_principal"]["ciclos"] for m in ciclo["microciclos"]
+        }
+
+    def conteudo(self, prompt: str) -> Any:
+        """Retorna o objeto que o modelo produziria para o prompt."""
+        if "APENAS a macroestrutura" in prompt:
+            return self.macro
+        if "FORMATO COMPACTO" in prompt:
+            return self.compacto
+        trecho = re.search(r"REGENERE SOMENTE (o ciclo de ordem|a semana) (\d+)", prompt)
+        if trecho:
+            numero = int(trecho.group(2))
+            if trecho.group(1) == "a semana":
+                return {"microciclo": self.microciclos[numero]}
+            return {"ciclo": self.plano["plano_principal"]["ciclos"][numero - 1]}
+        bloco = re.search(r"Gere SOMENTE as semanas \[([\d, ]+)\]", prompt)
+        if bloco:
+            semanas = [int(n) for n in bloco.group(1).split(",")]
+            return {"microciclos": [self.microciclos[n] for n in semanas]}
+        return self.plano
+
+    def __call__(self, payload: Dict[str, Any], path: str,
+                 headers: Dict[str, str]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        mensagens = payload.get("messages", [{}])
+        continuacao = ""
+        if len(mensagens) > 1 and mensagens[-1].get("role") == "assistant":
+            continuacao = mensagens[-1].get("content", "")
+            mensagens = mensagens[:-1]
+        prompt = mensagens[-1].get("content", "")
+        if isinstance(prompt, list):
+            prompt = "".join(bloco.get("text", "") for bloco in prompt if isinstance(bloco, dict))
+        modelo = payload.get("model", "claude-3-opus-20240229")
+        uso_cache = self._uso_cache(payload)
+        input_tokens = estimar_tokens_entrada(payload) - sum(uso_cache.values())
+
+        ferramenta = (payload.get("tool_choice") or {}).get("name")
+        if ferramenta:
+            resposta = criar_resposta_ferramenta(ferramenta, self.conteudo(prompt), modelo, input_tokens)
+            return self._responder(resposta, uso_cache)
+
+        conteudo = self.conteudo(prompt)
+        if conteudo is self.plano and not continuacao and self._aleatorio.random() < self.taxa_erros_texto:
+            conteudo = serializar_numeros_como_texto(conteudo, self.erros_por_resposta, self._aleatorio.randrange(1 << 30))
+        texto = "```json\n" + json.dumps(conteudo, ensure_ascii=False) + "\n```"
+
+        # O início enviado pelo cliente é sempre um prefixo do texto completo
+        texto = texto[len(continuacao):]
+        stop_reason = "end_turn"
+        if self.caracteres_por_resposta and len(texto) > self.caracteres_por_resposta:
+            texto = texto[:self.caracteres_por_resposta]
+            stop_reason = "max_tokens"
+        return self._responder(criar_resposta_mensagem(texto, modelo, stop_reason, input_tokens), uso_cache)
+
+    def _uso_cache(self, payload: Dict[str, Any]) -> Dict[str, int]:
+        """Tokens do prefixo marcado gravados no cache ou lidos dele, como no uso informado pela API."""
+        prefixo = prefixo_cacheavel(payload)
+        tokens = len(prefixo) // 4
+        if not prefixo or tokens < self.minimo_tokens_cache:
+            return {}
+        with self._lock_cache:
+            if prefixo in self._cache_prompts:
+                return {"cache_creation_input_tokens": 0, "cache_read_input_tokens": tokens}
+            self._cache_prompts.add(prefixo)
+        return {"cache_creation_input_tokens": tokens, "cache_read_input_tokens": 0}
+
+    def _responder(self, resposta: Dict[str, Any],
+                   uso_cache: Optional[Dict[str, int]] = None) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        resposta["usage"].update(uso_cache or {})
+        atraso = 0.0
+        if self.tokens_entrada_por_segundo:
+            # Tokens gravados no cache são processados como os demais; os lidos dele, não
+            lidos = resposta["usage"]["input_tokens"] + resposta["usage"].get("cache_creation_input_tokens", 0)
+            atraso += lidos / self.tokens_entrada_por_segundo
+        if self.tokens_por_segundo:
+            atraso += resposta["usage"]["output_tokens"] / self.tokens_por_segundo
+        if atraso:
+            time.sleep(atraso)
+        return 200, resposta, {}
+
+
+class _MockClaudeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Evita o atraso de ~40ms do Nagle + delayed ACK em conexões keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # Uma instância do handler é criada por conexão TCP
+        with self.server.mock.lock:
+            self.server.mock.conexoes += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        mock = self.server.mock
+        tamanho = int(self.headers.get("Content-Length", 0))
+        corpo = self.rfile.read(tamanho) if tamanho else b"{}"
+        try:
+            payload = json.loads(corpo)
+        except json.JSONDecodeError:
+            payload = {}
+
+        with mock.lock:
+            mock.requisicoes += 1
+            excedeu = bool(mock.limite_concorrencia) and mock.em_andamento >= mock.limite_concorrencia
+            if excedeu:
+                mock.rejeitadas += 1
+            else:
+                mock.em_andamento += 1
+                mock.pico_concorrencia = max(mock.pico_concorrencia, mock.em_andamento)
+
+        if excedeu:
+            self._enviar_json(429, {"type": "error", "error": {
+                "type": "rate_limit_error", "message": "Limite de requisições simultâneas excedido"}}, {})
+            return
+        try:
+            self._processar(payload)
+        finally:
+            with mock.lock:
+                mock.em_andamento -= 1
+
+    def _processar(self, payload: Dict[str, Any]) -> None:
+        mock = self.server.mock
+        if mock.latencia:
+            time.sleep(mock.latencia)
+
+        status, resposta, headers = mock.responder(payload, self.path, dict(self.headers))
+        if payload.get("stream") and status == 200:
+            self._enviar_stream(resposta, headers)
+            return
+        self._enviar_json(status, resposta, headers)
+
+    def _enviar_json(self, status: int, resposta: Dict[str, Any], headers: Dict[str, str]) -> None:
+        dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _enviar_stream(self, mensagem: Dict[str, Any], headers: Dict[str, str]) -> None:
+        mock = self.server.mock
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        try:
+            for evento in eventos_sse_de_mensagem(mensagem, mock.tamanho_pedaco):
+                linha = f"event: {evento['type']}\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(linha):X}\r\n".encode("ascii") + linha + b"\r\n")
+                self.wfile.flush()
+                with mock.lock:
+                    mock.eventos_enviados += 1
+                if mock.atraso_pedaco:
+                    time.sleep(mock.atraso_pedaco)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente cancelou o stream
+            with mock.lock:
+                mock.streams_cancelados += 1
+            self.close_connection = True
+
+
+class MockClaudeServer:
+    """Servidor HTTP local com comportamento configurável da API Claude."""
+
+    def __init__(self,
+                 texto_resposta: str = TEXTO_PADRAO,
+                 latencia: float = 0.0,
+                 responder: Optional[Callable[[Dict[str, Any], str, Dict[str, str]], Tuple[int, Dict[str, Any], Dict[str, str]]]] = None,
+                 tamanho_pedaco: int = 64,
+                 atraso_pedaco: float = 0.0,
+                 limite_concorrencia: int = 0,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 certfile: Optional[str] = None,
+                 keyfile: Optional[str] = None):
+        """
+        Inicializa o servidor simulado.
+
+        Args:
+            texto_resposta (str): Texto retornado em cada resposta
+            latencia (float): Atraso artificial por requisição em segundos
+            responder (Callable, optional): Função (payload, path, headers) -> (status, corpo, headers)
+            tamanho_pedaco (int): Caracteres por evento nas respostas em streaming
+            atraso_pedaco (float): Atraso entre eventos de streaming em segundos
+            limite_concorrencia (int): Requisições simultâneas aceitas; as excedentes recebem
+                429 rate_limit_error (0 = sem limite)
+            host (str): Endereço de escuta
+            port (int): Porta (0 escolhe uma porta livre)
+            certfile (str, optional): Certificado para servir via TLS
+            keyfile (str, optional): Chave privada do certificado
+        """
+        self.texto_resposta = texto_resposta
+        self.latencia = latencia
+        self.responder = responder or self._responder_padrao
+        self.tamanho_pedaco = tamanho_pedaco
+        self.atraso_pedaco = atraso_pedaco
+        self.limite_concorrencia = limite_concorrencia
+        self.lock = threading.Lock()
+        self.conexoes = 0
+        self.requisicoes = 0
+        self.eventos_enviados = 0
+        self.streams_cancelados = 0
+        self.em_andamento = 0
+        self.pico_concorrencia = 0
+        self.rejeitadas = 0
+
+        self._server = ThreadingHTTPServer((host, port), _MockClaudeHandler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self.tls = bool(certfile)
+        if certfile:
+            contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            contexto.load_cert_chain(certfile, keyfile)
+            self._server.socket = contexto.wrap_socket(self._server.socket, server_side=True)
+        self._thread: Optional[threading.Thread] = None
+
+    def _responder_padrao(self, payload: Dict[str, Any], path: str,
+                          headers: Dict[str, str]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        return 200, criar_resposta_mensagem(self.texto_resposta, payload.get("model", "claude-3-opus-20240229")), {}
+
+    @property
+    def url(self) -> str:
+        """URL do endpoint /v1/messages simulado."""
+        host, port = self._server.server_address[:2]
+        esquema = "https" if self.tls else "http"
+        return f"{esquema}://{host}:{port}/v1/messages"
+
+    def start(self) -> "MockClaudeServer":
+        """Inicia o servidor em uma thread de background."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Encerra o servidor."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockClaudeServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
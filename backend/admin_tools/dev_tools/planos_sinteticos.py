@@ -0,0 +1,164 @@
+"""
+Geração de planos de treinamento sintéticos.
+
+Usado pelos benchmarks e testes para produzir planos no formato do Wrapper 1
+com tamanho controlado, sem depender da API Claude.
+"""
+
+import uuid
+from typing import Dict, Any, List
+
+GRUPOS = ["Peito", "Costas", "Pernas", "Ombros", "Bíceps", "Tríceps", "Core"]
+EXERCICIOS = ["Supino reto", "Remada curvada", "Agachamento", "Desenvolvimento", "Rosca direta",
+              "Tríceps pulley", "Prancha", "Levantamento terra", "Leg press", "Puxada frontal"]
+
+
+def gerar_microciclo(semana: int, sessoes: int = 3, exercicios: int = 6) -> Dict[str, Any]:
+    """
+    Gera um microciclo (semana) sintético.
+
+    Args:
+        semana (int): Número da semana
+        sessoes (int): Sessões por semana
+        exercicios (int): Exercícios por sessão
+
+    Returns:
+        Dict: Microciclo no formato do Wrapper 1
+    """
+    return {
+        "semana": semana,
+        "volume": "moderado",
+        "intensidade": "média",
+        "foco": f"Semana {semana}",
+        "sessoes": [
+            {
+                "sessao_id": str(uuid.uuid4()),
+                "nome": f"Treino {chr(65 + s)}",
+                "tipo": "resistência",
+                "duracao_minutos": 60,
+                "nivel_intensidade": 7,
+                "dia_semana": s + 1,
+                "grupos_musculares": [{"grupo_id": str(uuid.uuid4()), "nome": GRUPOS[s % len(GRUPOS)], "prioridade": 1}],
+                "exercicios": [
+                    {
+                        "exercicio_id": str(uuid.uuid4()),
+                        "nome": EXERCICIOS[(s + e) % len(EXERCICIOS)],
+                        "ordem": e + 1,
+                        "equipamento": "Barra",
+                        "series": 3,
+                        "repeticoes": "8-12",
+                        "percentual_rm": 70,
+                        "tempo_descanso": 90,
+                        "cadencia": "2-0-2",
+                        "metodo": "tradicional",
+                        "progressao": [{"semana": semana, "ajuste": "+2,5kg"}],
+                        "observacoes": ""
+                    }
+                    for e in range(exercicios)
+                ]
+            }
+            for s in range(sessoes)
+        ]
+    }
+
+
+def gerar_plano(semanas: int = 12, semanas_por_ciclo: int = 4, sessoes: int = 3,
+                exercicios: int = 6) -> Dict[str, Any]:
+    """
+    Gera um plano completo sintético.
+
+    Args:
+        semanas (int): Total de semanas
+        semanas_por_ciclo (int): Semanas em cada ciclo
+        sessoes (int): Sessões por semana
+        exercicios (int): Exercícios por sessão
+
+    Returns:
+        Dict: Plano no formato retornado pelo Claude (sem metadados)
+    """
+    ciclos: List[Dict[str, Any]] = []
+    for ordem, inicio in enumerate(range(1, semanas + 1, semanas_por_ciclo), start=1):
+        fim = min(inicio + semanas_por_ciclo, semanas + 1)
+        ciclos.append({
+            "ciclo_id": str(uuid.uuid4()),
+            "nome": f"Ciclo {ordem}",
+            "ordem": ordem,
+            "duracao_semanas": fim - inicio,
+            "objetivo": "Hipertrofia",
+            "microciclos": [gerar_microciclo(semana, sessoes, exercicios) for semana in range(inicio, fim)]
+        })
+    return {
+        "usuario": {
+            "id": "",
+            "nome": "Usuário Sintético",
+            "nivel": "intermediário",
+            "objetivos": [{"objetivo_id": str(uuid.uuid4()), "nome": "Hipertrofia", "prioridade": 1}],
+            "restricoes": []
+        },
+        "plano_principal": {
+            "nome": "Plano Sintético",
+            "descricao": "Plano gerado para benchmarks",
+            "periodizacao": {"tipo": "linear", "descricao": "Progressão linear"},
+            "duracao_semanas": semanas,
+            "frequencia_semanal": sessoes,
+            "ciclos": ciclos
+        }
+    }
+
+
+def gerar_macroestrutura(plano: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduz um plano à macroestrutura usada na geração em paralelo (sem sessões).
+
+    Args:
+        plano (Dict): Plano completo
+
+    Returns:
+        Dict: Macroestrutura com a lista "semanas" em cada ciclo
+    """
+    ciclos = []
+    for ciclo in plano["plano_principal"]["ciclos"]:
+        resumo = {chave: valor for chave, valor in ciclo.items() if chave != "microciclos"}
+        resumo["semanas"] = [
+            {chave: m[chave] for chave in ("semana", "volume", "intensidade", "foco")}
+            for m in ciclo["microciclos"]
+        ]
+        ciclos.append(resumo)
+    return {"usuario": plano["usuario"], "plano_principal": dict(plano["plano_principal"], ciclos=ciclos)}
+
+
+def gerar_plano_compacto(plano: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduz um plano ao formato compacto: a primeira semana de cada ciclo como modelo e
+    os ajustes de %1RM e séries das demais semanas em relação a ela.
+
+    Args:
+        plano (Dict): Plano completo
+
+    Returns:
+        Dict: Plano compacto, com "sessoes" e "semanas" em cada ciclo
+    """
+    ciclos = []
+    for ciclo in plano["plano_principal"]["ciclos"]:
+        modelo = ciclo["microciclos"][0]
+        primeiro = modelo["sessoes"][0]["exercicios"][0]
+        sessoes = [
+            dict({chave: valor for chave, valor in sessao.items() if chave != "sessao_id"},
+                 grupos_musculares=[grupo["nome"] for grupo in sessao["grupos_musculares"]],
+                 exercicios=[{chave: valor for chave, valor in exercicio.items()
+                              if chave not in ("exercicio_id", "ordem", "progressao")}
+                             for exercicio in sessao["exercicios"]])
+            for sessao in modelo["sessoes"]
+        ]
+        semanas = []
+        for microciclo in ciclo["microciclos"]:
+            exercicio = microciclo["sessoes"][0]["exercicios"][0]
+            semanas.append({
+                **{chave: microciclo[chave] for chave in ("volume", "intensidade", "foco")},
+                "ajuste_percentual_rm": exercicio["percentual_rm"] - primeiro["percentual_rm"],
+                "ajuste_series": exercicio["series"] - primeiro["series"]
+            })
+        resumo = {chave: valor for chave, valor in ciclo.items() if chave not in ("ciclo_id", "microciclos")}
+        ciclos.append(dict(resumo, sessoes=sessoes, semanas=semanas))
+    principal = {chave: valor for chave, valor in plano["plano_principal"].items() if chave != "duracao_semanas"}
+    return {"usuario": plano["usuario"], "plano_principal": dict(principal, ciclos=ciclos)}
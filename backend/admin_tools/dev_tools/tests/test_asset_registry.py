@@ -0,0 +1,98 @@
+"""
+Testes para o registro de prompts, templates e schemas.
+
+Este módulo testa:
+- Carga única por processo (sem I/O nas chamadas seguintes)
+- Invalidação por mtime/hash
+- Objetos compartilhados somente leitura e compatíveis com o jsonschema
+"""
+
+import copy
+import json
+import os
+import tempfile
+import unittest
+
+import jsonschema
+
+from backend.utils.asset_registry import AssetRegistry, get_asset_registry
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class TestAssetRegistry(unittest.TestCase):
+    """Testes para o AssetRegistry."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.schema_path = os.path.join(self.tmpdir.name, "schema.json")
+        self.prompt_path = os.path.join(self.tmpdir.name, "prompt.txt")
+        with open(self.schema_path, "w", encoding="utf-8") as f:
+            json.dump({"type": "object", "required": ["a"], "properties": {"a": {"type": "string"}}}, f)
+        with open(self.prompt_path, "w", encoding="utf-8") as f:
+            f.write("prompt v1")
+        self.registro = AssetRegistry(intervalo_verificacao=0, recursos={
+            "schema": ("schema", self.schema_path),
+            "prompt": ("prompt", self.prompt_path),
+        })
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_carga_unica_e_objeto_compartilhado(self):
+        """O mesmo objeto deve ser devolvido sem novas leituras de disco."""
+        primeiro = self.registro.obter_json("schema")
+        for _ in range(10):
+            self.assertIs(self.registro.obter_json("schema"), primeiro)
+        self.assertEqual(self.registro.estatisticas()["leituras_disco"], 1)
+
+    def test_objeto_somente_leitura_e_valido_para_jsonschema(self):
+        """Schemas compartilhados não podem ser alterados, mas validam normalmente."""
+        schema = self.registro.obter_json("schema")
+        with self.assertRaises(TypeError):
+            schema["type"] = "array"
+        with self.assertRaises(TypeError):
+            schema["required"].append("b")
+        jsonschema.validate({"a": "x"}, schema)
+        with self.assertRaises(jsonschema.ValidationError):
+            jsonschema.validate({}, schema)
+
+        copia = copy.deepcopy(schema)
+        copia["required"].append("b")
+        self.assertEqual(schema["required"], ["a"])
+
+    def test_invalidacao_por_mtime_e_hash(self):
+        """Alterações no arquivo geram nova versão; apenas tocar o arquivo mantém o objeto."""
+        self.assertEqual(self.registro.obter_texto("prompt"), "prompt v1")
+        versao = self.registro.versao("prompt")
+
+        stat = os.stat(self.prompt_path)
+        os.utime(self.prompt_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.registro.obter_texto("prompt"), "prompt v1")
+        self.assertEqual(self.registro.versao("prompt"), versao)
+
+        with open(self.prompt_path, "w", encoding="utf-8") as f:
+            f.write("prompt v2 (alterado)")
+        self.assertEqual(self.registro.obter_texto("prompt"), "prompt v2 (alterado)")
+        self.assertNotEqual(self.registro.versao("prompt"), versao)
+
+    def test_fallback_quando_arquivo_nao_existe(self):
+        """Recursos ausentes usam o fallback sem nova busca a cada chamada."""
+        registro = AssetRegistry(intervalo_verificacao=None, recursos={"x": ("prompt", "/nao/existe.txt")})
+        self.assertEqual(registro.obter_texto("x", fallback="padrão"), "padrão")
+        self.assertFalse(registro.obter_recurso("x").encontrado)
+        with self.assertRaises(FileNotFoundError):
+            AssetRegistry(recursos={"x": ("prompt", "/nao/existe.txt")}).obter_texto("x")
+
+    def test_wrappers_compartilham_recursos(self):
+        """Instâncias do treinador devem usar os mesmos objetos do registro do processo."""
+        t1 = TreinadorEspecialista("test-key", usar_cache=False)
+        leituras = get_asset_registry().estatisticas()["leituras_disco"]
+        t2 = TreinadorEspecialista("test-key", usar_cache=False)
+        t2._preparar_prompt({"nome": "Ana"})
+        self.assertIs(t1.schema, t2.schema)
+        self.assertIs(t1.prompt_template, t2.prompt_template)
+        self.assertEqual(get_asset_registry().estatisticas()["leituras_disco"], leituras)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Testes para a geração de planos em lote.
+
+Este módulo testa:
+- Submissão em lotes pelo canal local e encaminhamento dos planos às etapas 2 e 3
+- Retomada pelo arquivo de progresso sem gerar de novo os planos concluídos
+- Requisição que falha no lote refeita individualmente
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, criar_resposta_mensagem
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.batch_onboarding import GeradorLote, ProgressoLote, atribuir_ids, criar_canal, ler_usuarios
+from backend.utils.http_transport import HttpTransport
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class DistribuidorFalso:
+    """Etapa 3 que só guarda os planos recebidos."""
+
+    def __init__(self):
+        self.planos = []
+        self.lock = threading.Lock()
+
+    def processar_plano(self, plano_adaptado):
+        with self.lock:
+            self.planos.append(plano_adaptado)
+        return {"status": "success"}
+
+
+class AdaptadorFalso:
+    """Etapa 2 que marca o plano como adaptado."""
+
+    def processar_plano(self, plano_principal):
+        return dict(plano_principal, adaptacoes={})
+
+
+class TestGeracaoLote(unittest.TestCase):
+    """Geração em lote contra o servidor simulado."""
+
+    def setUp(self):
+        self.modelos = []
+        plano = gerar_plano(semanas=4, semanas_por_ciclo=4)
+        texto = "```json\n" + json.dumps(plano, ensure_ascii=False) + "\n```"
+
+        def responder(payload, path, headers):
+            prompt = payload["messages"][-1]["content"]
+            self.modelos.append(payload["model"])
+            if "Usuário Recusado" in prompt:
+                return 400, {"type": "error", "error": {"type": "invalid_request_error", "message": "Recusado"}}, {}
+            return 200, criar_resposta_mensagem(texto, payload["model"]), {}
+
+        self.servidor = MockClaudeServer(responder=responder).start()
+        self.treinador = TreinadorEspecialista("test-key", api_url=self.servidor.url, transport=HttpTransport(),
+                                               usar_cache=False, modo_geracao="completo", saida_estruturada=False)
+        self.treinador.config_geracao = dict(self.treinador.config_geracao, max_tokens_por_sessoes={7: 100000})
+        self.canal = criar_canal(self.treinador, "local")
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.arquivo = os.path.join(self.diretorio.name, "usuarios.jsonl")
+        with open(self.arquivo, "w", encoding="utf-8") as f:
+            for i in range(5):
+                f.write(json.dumps({"id": f"user {i}", "nome": f"Usuário {i}"}, ensure_ascii=False) + "\n")
+            f.write("\n")
+
+    def tearDown(self):
+        self.canal.fechar()
+        self.servidor.stop()
+        self.diretorio.cleanup()
+
+    def _gerador(self, distribuidor, progresso=None):
+        return GeradorLote(self.treinador, self.canal, adaptador=AdaptadorFalso(), distribuidor=distribuidor,
+                           progresso=progresso, tamanho_lote=2, intervalo_consulta_s=0.01)
+
+    def test_ids_estaveis(self):
+        ids = [custom_id for custom_id, _ in atribuir_ids([{"id": "a b"}, {}, {"id": "a b"}])]
+        self.assertEqual(ids, ["a_b", "usuario-2", "a_b-2"])
+
+    def test_gera_em_lotes_e_encaminha(self):
+        distribuidor = DistribuidorFalso()
+        relatorio = self._gerador(distribuidor).executar(ler_usuarios(self.arquivo))
+
+        self.assertEqual((relatorio["usuarios"], relatorio["concluidos"], relatorio["falhas"]), (5, 5, 0))
+        self.assertEqual(relatorio["lotes"], 3)
+        self.assertEqual(len(self.modelos), 5)
+        self.assertEqual(sorted(p["usuario"]["id"] for p in distribuidor.planos), [f"user {i}" for i in range(5)])
+        self.assertTrue(all("adaptacoes" in p for p in distribuidor.planos))
+        self.assertGreater(relatorio["planos_por_minuto"], 0)
+        self.assertEqual(relatorio["etapas_2_e_3_s"]["quantidade"], 5)
+
+    def test_retoma_pelo_progresso(self):
+        caminho = os.path.join(self.diretorio.name, "progresso.jsonl")
+        progresso = ProgressoLote(caminho)
+        progresso.registrar("user_0", "concluido", treinamento_id="x")
+        progresso.registrar("user_1", "submetido", lote_id="lote_de_outro_processo")
+
+        distribuidor = DistribuidorFalso()
+        relatorio = self._gerador(distribuidor, ProgressoLote(caminho)).executar(ler_usuarios(self.arquivo))
+        self.assertEqual((relatorio["pulados"], relatorio["concluidos"]), (1, 4))
+        self.assertEqual(len(self.modelos), 4)
+
+        # Nova execução: tudo já concluído, nenhuma requisição
+        relatorio = self._gerador(DistribuidorFalso(), ProgressoLote(caminho)).executar(ler_usuarios(self.arquivo))
+        self.assertEqual((relatorio["pulados"], relatorio["concluidos"], relatorio["lotes"]), (5, 0, 0))
+        self.assertEqual(len(self.modelos), 4)
+
+    def test_falha_no_lote_refeita_individualmente(self):
+        with open(self.arquivo, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "recusado", "nome": "Usuário Recusado"}, ensure_ascii=False) + "\n")
+        distribuidor = DistribuidorFalso()
+        relatorio = self._gerador(distribuidor).executar(ler_usuarios(self.arquivo))
+
+        self.assertEqual((relatorio["concluidos"], relatorio["individuais"], relatorio["falhas"]), (6, 1, 0))
+        recusado = next(p for p in distribuidor.planos if p["usuario"]["id"] == "recusado")
+        self.assertEqual(recusado["geracao"]["origem"], "regras_locais")
+
+
+if __name__ == '__main__':
+    unittest.main()
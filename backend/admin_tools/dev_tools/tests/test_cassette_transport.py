@@ -0,0 +1,106 @@
+"""
+Testes para o transporte de gravação e reprodução das chamadas ao Claude.
+
+Este módulo testa:
+- Gravação das respostas do servidor simulado e reprodução sem rede
+- Reprodução de streams com pedaços refatiados e de respostas de erro
+- Pipeline do Treinador Especialista reproduzido a partir das cassetes
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano, criar_resposta_mensagem
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.cassette_transport import CasseteAusenteError, TransporteCassete
+from backend.utils.http_transport import HttpTransport, StreamStatusError
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+CORPO = {"model": "claude-3-opus-20240229", "max_tokens": 10,
+         "messages": [{"role": "user", "content": "Plano com início em 2024-01-01"}]}
+
+
+class TestTransporteCassete(unittest.TestCase):
+    """Testes da gravação e reprodução contra o servidor simulado."""
+
+    def setUp(self):
+        self._diretorio = tempfile.TemporaryDirectory()
+        self.diretorio = self._diretorio.name
+
+    def tearDown(self):
+        self._diretorio.cleanup()
+
+    def test_reproduz_sem_rede(self):
+        """As respostas gravadas são reproduzidas na ordem, sem cabeçalhos da requisição nas cassetes."""
+        respostas = iter(["primeira", "segunda"])
+        with MockClaudeServer(responder=lambda p, c, h: (200, criar_resposta_mensagem(next(respostas)), {})) as servidor:
+            gravador = TransporteCassete(self.diretorio, "gravar", HttpTransport())
+            for _ in range(2):
+                gravador.post(servidor.url, {"x-api-key": "segredo"}, CORPO)
+            url = servidor.url
+
+        for nome in os.listdir(self.diretorio):
+            with open(os.path.join(self.diretorio, nome), encoding="utf-8") as f:
+                self.assertNotIn("segredo", f.read())
+
+        reprodutor = TransporteCassete(self.diretorio, "reproduzir", latencia=0.01)
+        textos = [reprodutor.post(url, {}, CORPO).json()["content"][0]["text"] for _ in range(3)]
+        self.assertEqual(textos, ["primeira", "segunda", "primeira"])
+        self.assertGreater(reprodutor.post(url, {}, CORPO).elapsed.total_seconds(), 0)
+
+        # Outra data na mesma requisição continua encontrando a cassete; outro conteúdo, não
+        outra_data = json.loads(json.dumps(CORPO).replace("2024-01-01", "2031-12-31"))
+        self.assertEqual(reprodutor.post(url, {}, outra_data).status_code, 200)
+        with self.assertRaises(CasseteAusenteError):
+            reprodutor.post(url, {}, dict(CORPO, max_tokens=11))
+
+    def test_stream_refatiado_e_erros(self):
+        """Streams são reproduzidos com o mesmo texto em pedaços menores; erros gravados são repetidos."""
+        with MockClaudeServer(texto_resposta="x" * 100, tamanho_pedaco=50) as servidor:
+            gravador = TransporteCassete(self.diretorio, "gravar", HttpTransport())
+            gravados = list(gravador.stream_eventos(servidor.url, {}, CORPO))
+            servidor.responder = lambda p, c, h: (429, {"error": {"message": "limite"}}, {})
+            with self.assertRaises(StreamStatusError):
+                list(gravador.stream_eventos(servidor.url, {}, dict(CORPO, max_tokens=5)))
+            url = servidor.url
+
+        reprodutor = TransporteCassete(self.diretorio, "reproduzir", tamanho_pedaco=10)
+        eventos = list(reprodutor.stream_eventos(url, {}, CORPO))
+        texto = lambda evs: "".join(e["delta"]["text"] for e in evs if e.get("type") == "content_block_delta")
+        self.assertEqual(texto(eventos), texto(gravados))
+        self.assertEqual(sum(e.get("type") == "content_block_delta" for e in eventos), 10)
+        with self.assertRaises(StreamStatusError) as contexto:
+            list(reprodutor.stream_eventos(url, {}, dict(CORPO, max_tokens=5)))
+        self.assertEqual(contexto.exception.status_code, 429)
+
+    def test_treinador_reproduzido(self):
+        """O plano gravado (com continuações e streaming) é reproduzido sem o servidor."""
+        plano = gerar_plano(semanas=4, semanas_por_ciclo=4)
+        dados = {"id": "user123", "nome": "Ana", "dias_disponiveis": ["segunda", "quarta"]}
+
+        def treinador(transporte, url):
+            instancia = TreinadorEspecialista("test-key", api_url=url, transport=transporte,
+                                              usar_cache=False, modo_geracao="completo")
+            instancia.config_geracao = dict(instancia.config_geracao, continuacao_max_requisicoes=20)
+            return instancia
+
+        with MockClaudeServer(responder=ResponderPlano(plano, caracteres_por_resposta=5000)) as servidor:
+            gravador = treinador(TransporteCassete(self.diretorio, "gravar", HttpTransport()), servidor.url)
+            gravado = gravador.criar_plano_treinamento(dados)
+            gravado_stream = list(gravador.criar_plano_treinamento_stream(dados))[-1]["dados"]
+            requisicoes = servidor.requisicoes
+            url = servidor.url
+        self.assertGreater(requisicoes, 2)
+
+        reprodutor = treinador(TransporteCassete(self.diretorio, "reproduzir"), url)
+        reproduzido = reprodutor.criar_plano_treinamento(dados)
+        reproduzido_stream = list(reprodutor.criar_plano_treinamento_stream(dados))[-1]["dados"]
+        self.assertEqual(reproduzido["plano_principal"]["nome"], "Plano Sintético")
+        self.assertEqual(reproduzido["plano_principal"]["ciclos"], gravado["plano_principal"]["ciclos"])
+        self.assertEqual(reproduzido_stream["plano_principal"]["ciclos"], gravado_stream["plano_principal"]["ciclos"])
+
+
+if __name__ == '__main__':
+    unittest.main()
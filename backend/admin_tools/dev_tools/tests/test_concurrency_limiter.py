@@ -0,0 +1,106 @@
+"""
+Testes para o limitador adaptativo de concorrência das chamadas ao Claude.
+
+Este módulo testa:
+- Aumento aditivo e redução multiplicativa do limite (uma redução por rajada)
+- Prazo da fila de espera por vagas
+- Treinadores concorrentes contra um servidor simulado que limita requisições simultâneas
+"""
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.concurrency_limiter import FilaEsgotadaError, LimitadorAIMD
+from backend.utils.http_transport import HttpTransport
+from backend.utils.llm_metrics import MetricasLLM
+from backend.utils.retry_policy import Disjuntor, PoliticaRetentativa
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class TestLimitadorAIMD(unittest.TestCase):
+    """Testes do ajuste do limite e da fila."""
+
+    def test_aumento_aditivo_e_reducao_multiplicativa(self):
+        metricas = MetricasLLM()
+        limitador = LimitadorAIMD(limite_inicial=4, limite_max=6, metricas=metricas)
+
+        # Uma janela de 4 sucessos aumenta o limite em cerca de 1
+        for _ in range(4):
+            limitador.liberar(limitador.adquirir(), sobrecarga=False)
+        self.assertAlmostEqual(limitador.limite, 4.95, places=1)
+
+        # Várias sobrecargas da mesma rajada reduzem o limite uma única vez
+        vagas = [limitador.adquirir() for _ in range(4)]
+        for vaga in vagas:
+            limitador.liberar(vaga, sobrecarga=True)
+        self.assertAlmostEqual(limitador.limite, 2.47, places=1)
+        limitador.liberar(limitador.adquirir(), sobrecarga=True)
+        self.assertAlmostEqual(limitador.limite, 1.24, places=1)
+        limitador.liberar(limitador.adquirir(), sobrecarga=True)
+        self.assertEqual(limitador.limite, 1)
+
+        # Resultados neutros não mexem no limite
+        limitador.liberar(limitador.adquirir(), sobrecarga=None)
+        self.assertEqual(limitador.limite, 1)
+        contadores = metricas.contadores()
+        self.assertEqual(contadores["contadores"]["concorrencia_claude_reducoes"], 3)
+        self.assertEqual(contadores["estados"]["concorrencia_claude"], {"limite": 1, "em_uso": 0})
+
+    def test_fila_com_prazo(self):
+        limitador = LimitadorAIMD(limite_inicial=1)
+        vaga = limitador.adquirir()
+        with self.assertRaises(FilaEsgotadaError):
+            limitador.adquirir(timeout=0.05)
+
+        # A vaga devolvida é entregue a quem está esperando
+        liberar = threading.Timer(0.05, limitador.liberar, args=(vaga,))
+        liberar.start()
+        segunda = limitador.adquirir(timeout=2)
+        self.assertGreater(segunda.espera_s, 0.01)
+        self.assertEqual(limitador.em_uso, 1)
+
+
+class TestLimitadorTreinador(unittest.TestCase):
+    """Treinadores concorrentes compartilhando o limitador."""
+
+    def test_adapta_ao_limite_do_servidor(self):
+        """Com o servidor aceitando 3 requisições simultâneas, o limite cai e todos recebem o plano real."""
+        metricas = MetricasLLM()
+        limitador = LimitadorAIMD(limite_inicial=12, metricas=metricas)
+        disjuntor = Disjuntor(limiar_falhas=1000)
+        responder = ResponderPlano(gerar_plano(semanas=4, semanas_por_ciclo=4))
+
+        def gerar(indice):
+            treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                              usar_cache=False, modo_geracao="completo")
+            treinador.metricas = metricas
+            treinador.disjuntor = disjuntor
+            treinador.limitador = limitador
+            # Os questionários só diferem no nome; sem isso as gerações seriam agrupadas em uma
+            treinador.grupo_planos = None
+            treinador.fila_timeout_s = 30
+            treinador.politica_retentativa = PoliticaRetentativa(max_tentativas=8, espera_base_s=0.02, espera_max_s=0.2)
+            return treinador.criar_plano_treinamento({"nome": f"Atleta {indice}"})
+
+        with MockClaudeServer(responder=responder, latencia=0.05, limite_concorrencia=3) as servidor:
+            inicio = time.monotonic()
+            with ThreadPoolExecutor(max_workers=12) as executor:
+                resultados = list(executor.map(gerar, range(24)))
+            duracao = time.monotonic() - inicio
+            rejeitadas = servidor.rejeitadas
+
+        self.assertTrue(all(r["plano_principal"]["nome"] == "Plano Sintético" for r in resultados))
+        self.assertLessEqual(limitador.limite, 6)
+        self.assertGreater(metricas.contadores()["contadores"]["concorrencia_claude_reducoes"], 0)
+        # Sem o limitador, cada rodada de 12 requisições teria 9 rejeitadas
+        self.assertLess(rejeitadas, 24)
+        self.assertLess(duracao, 20)
+        self.assertEqual(limitador.em_uso, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
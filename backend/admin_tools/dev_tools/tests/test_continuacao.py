@@ -0,0 +1,70 @@
+"""
+Testes para a continuação de respostas truncadas do Treinador Especialista.
+
+Este módulo testa:
+- Costura das partes de uma resposta cortada por max_tokens
+- Limite de requisições de continuação
+- Orçamento de tokens conforme o número de sessões semanais
+"""
+
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class TestContinuacao(unittest.TestCase):
+    """Testes da continuação de respostas contra o servidor simulado."""
+
+    def _treinador(self, servidor, max_requisicoes=3):
+        treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                          usar_cache=False, modo_geracao="completo")
+        treinador.config_geracao = dict(treinador.config_geracao, continuacao_max_requisicoes=max_requisicoes)
+        return treinador
+
+    def test_resposta_truncada_e_continuada(self):
+        """Um plano cortado em várias partes deve ser costurado e extraído sem fallback."""
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        responder = ResponderPlano(plano, caracteres_por_resposta=4000)
+        with MockClaudeServer(responder=responder) as servidor:
+            treinador = self._treinador(servidor, max_requisicoes=50)
+            resultado = treinador.criar_plano_treinamento({"id": "user123", "nome": "Ana"})
+            self.assertGreater(servidor.requisicoes, 2)
+
+        self.assertNotIn("geracao", resultado)
+        self.assertEqual(resultado["plano_principal"]["nome"], "Plano Sintético")
+        semanas = [m["semana"] for c in resultado["plano_principal"]["ciclos"] for m in c["microciclos"]]
+        self.assertEqual(semanas, list(range(1, 13)))
+
+    def test_limite_de_continuacoes(self):
+        """Esgotado o limite de continuações, o plano cai no fallback."""
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        with MockClaudeServer(responder=ResponderPlano(plano, caracteres_por_resposta=2000)) as servidor:
+            treinador = self._treinador(servidor, max_requisicoes=1)
+            resultado = treinador.criar_plano_treinamento({"nome": "Ana"})
+            self.assertEqual(servidor.requisicoes, 2)
+
+        self.assertEqual(resultado["geracao"], {"origem": "estrutura_basica"})
+        self.assertEqual(resultado["plano_principal"]["nome"], "Plano Básico (Fallback)")
+
+    def test_resposta_completa_sem_continuacao(self):
+        """Respostas que terminam com end_turn e JSON fechado usam uma única requisição."""
+        plano = gerar_plano(semanas=4, semanas_por_ciclo=4)
+        with MockClaudeServer(responder=ResponderPlano(plano)) as servidor:
+            self._treinador(servidor).criar_plano_treinamento({"nome": "Ana"})
+            self.assertEqual(servidor.requisicoes, 1)
+
+    def test_orcamento_por_sessoes(self):
+        """O max_tokens da primeira requisição cresce com as sessões semanais."""
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        treinador.config_geracao = dict(treinador.config_geracao,
+                                        max_tokens_por_sessoes={3: 4000, 5: 6000, 7: 8000})
+        self.assertEqual(treinador._orcamento_tokens({"disponibilidade_semanal": 2}), 4000)
+        self.assertEqual(treinador._orcamento_tokens({"dias_disponiveis": ["seg", "ter", "qua", "qui"]}), 6000)
+        self.assertEqual(treinador._orcamento_tokens({"disponibilidade_semanal": 10}), 8000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Testes para a geração de planos em paralelo (fan-out) do Treinador Especialista.
+
+Este módulo testa:
+- Divisão da macroestrutura em blocos de semanas
+- Montagem do plano completo a partir da macroestrutura e dos blocos
+- Volta para a requisição única quando a macroestrutura falha
+"""
+
+import json
+import re
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class TestFanout(unittest.TestCase):
+    """Testes da geração em paralelo contra o servidor simulado."""
+
+    def _treinador(self, servidor, semanas_por_bloco=0):
+        treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                          usar_cache=False, modo_geracao="fanout")
+        treinador.config_geracao = dict(treinador.config_geracao, fanout_semanas_por_bloco=semanas_por_bloco)
+        return treinador
+
+    def test_prompt_macro_tem_json_valido(self):
+        """O exemplo de JSON do prompt de macroestrutura deve ser um JSON válido."""
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        prompt = treinador._preparar_prompt_macro("Dados do Usuário:", "segunda", "2024-01-01")
+        exemplo = re.search(r"```json(.*?)```", prompt, re.DOTALL).group(1)
+        self.assertIn("semanas", json.loads(exemplo)["plano_principal"]["ciclos"][0])
+
+    def test_plano_montado_por_ciclo(self):
+        """Uma requisição de macroestrutura mais uma por ciclo, mantendo a ordem das semanas."""
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        with MockClaudeServer(responder=ResponderPlano(plano)) as servidor:
+            resultado = self._treinador(servidor).criar_plano_treinamento({"id": "user123", "nome": "Ana"})
+            self.assertEqual(servidor.requisicoes, 1 + 3)
+
+        ciclos = resultado["plano_principal"]["ciclos"]
+        self.assertEqual([c["nome"] for c in ciclos], ["Ciclo 1", "Ciclo 2", "Ciclo 3"])
+        semanas = [m["semana"] for c in ciclos for m in c["microciclos"]]
+        self.assertEqual(semanas, list(range(1, 13)))
+        self.assertNotIn("semanas", ciclos[0])
+        self.assertEqual(resultado["usuario"]["id"], "user123")
+
+    def test_blocos_de_semanas(self):
+        """Com blocos de 2 semanas, cada ciclo de 4 semanas gera duas sub-requisições."""
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        with MockClaudeServer(responder=ResponderPlano(plano)) as servidor:
+            resultado = self._treinador(servidor, semanas_por_bloco=2).criar_plano_treinamento({"nome": "Ana"})
+            self.assertEqual(servidor.requisicoes, 1 + 6)
+        self.assertEqual(len(resultado["plano_principal"]["ciclos"][1]["microciclos"]), 4)
+
+    def test_falha_na_macroestrutura_usa_requisicao_unica(self):
+        """Se a macroestrutura não vier em JSON, o plano é gerado em uma requisição única."""
+        plano = gerar_plano(semanas=4, semanas_por_ciclo=4)
+        responder = ResponderPlano(plano)
+        responder.macro = "sem json"
+        with MockClaudeServer(responder=responder) as servidor:
+            resultado = self._treinador(servidor).criar_plano_treinamento({"nome": "Ana"})
+            self.assertEqual(servidor.requisicoes, 2)
+        self.assertEqual(resultado["plano_principal"]["nome"], "Plano Sintético")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Testes para o extrator de JSON de respostas do Claude.
+
+Este módulo testa:
+- Preferência por blocos ```json e escolha do maior objeto de nível superior
+- Chaves, crases e escapes dentro de strings JSON
+- Detecção de respostas truncadas em vez de devolver um fragmento
+- Uso do extrator pelo TreinadorEspecialista
+"""
+
+import json
+import unittest
+
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.json_extractor import (
+    extrair_json, varrer_json, texto_da_resposta, JSONTruncadoError, JSONNaoEncontradoError
+)
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class TestExtratorJSON(unittest.TestCase):
+    """Testes para extrair_json e varrer_json."""
+
+    def test_bloco_json_tem_prioridade(self):
+        """O bloco ```json deve ser usado mesmo havendo objetos maiores fora dele."""
+        texto = 'Exemplo {"x": "' + "a" * 100 + '"}\n```json\n{"ok": true}\n```'
+        self.assertEqual(extrair_json(texto), {"ok": True})
+
+    def test_maior_objeto_sem_bloco(self):
+        """Sem blocos cercados, o maior objeto de nível superior deve ser escolhido."""
+        texto = 'Use {chave} no texto. Plano: {"a": {"b": [1, {"c": 2}]}} fim {"d": 1}'
+        self.assertEqual(extrair_json(texto), {"a": {"b": [1, {"c": 2}]}})
+
+    def test_strings_com_chaves_crases_e_escapes(self):
+        """Chaves, crases e aspas escapadas dentro de strings não alteram a varredura."""
+        objeto = {"nome": "Treino {A} ``` \"pesado\" \\", "lista": ["}", "{{"]}
+        texto = "```json\n" + json.dumps(objeto) + "\n```"
+        self.assertEqual(extrair_json(texto), objeto)
+
+    def test_resposta_truncada(self):
+        """Um plano cortado no meio deve ser reportado como truncado, não como fragmento."""
+        completo = "```json\n" + json.dumps(gerar_plano(semanas=4), ensure_ascii=False) + "\n```"
+        cortado = completo[:int(len(completo) * 0.8)]
+        with self.assertRaises(JSONTruncadoError) as contexto:
+            extrair_json(cortado)
+        self.assertTrue(contexto.exception.parcial.startswith('{"usuario"'))
+        self.assertTrue(varrer_json(cortado).truncado)
+
+    def test_sem_json(self):
+        """Texto sem objetos deve levantar JSONNaoEncontradoError."""
+        with self.assertRaises(JSONNaoEncontradoError):
+            extrair_json("Não foi possível gerar o plano.")
+
+    def test_texto_da_resposta(self):
+        """Blocos dict, string e objetos com atributo text devem ser concatenados."""
+        class Bloco:
+            text = "c"
+        self.assertEqual(texto_da_resposta([{"type": "text", "text": "a"}, "b", Bloco()]), "abc")
+
+
+class TestExtracaoTreinador(unittest.TestCase):
+    """Testes da extração no TreinadorEspecialista."""
+
+    def setUp(self):
+        self.treinador = TreinadorEspecialista("test-key", usar_cache=False)
+
+    def test_plano_extraido(self):
+        """Um plano completo deve ser extraído sem fallback."""
+        plano = gerar_plano(semanas=4)
+        resposta = {"content": [{"type": "text", "text": "Segue:\n```json\n" + json.dumps(plano) + "\n```"}]}
+        self.assertEqual(self.treinador._extrair_json_da_resposta(resposta), plano)
+
+    def test_plano_truncado_usa_fallback(self):
+        """Um plano truncado não deve virar um plano reconstruído a partir de um exercício."""
+        texto = "```json\n" + json.dumps(gerar_plano(semanas=4))
+        resposta = {"content": [{"type": "text", "text": texto[:len(texto) // 2]}], "stop_reason": "max_tokens"}
+        plano = self.treinador._extrair_json_da_resposta(resposta)
+        self.assertEqual(plano["geracao"], {"origem": "estrutura_basica"})
+        self.assertNotEqual(plano["plano_principal"]["nome"], "Plano Reconstruído")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Testes para a geração de planos em streaming.
+
+Este módulo testa:
+- Emissão incremental de ciclos e microciclos pelo parser JSON
+- Respeito a strings com chaves e escapes divididos entre pedaços
+- Streaming ponta a ponta contra o servidor Claude simulado
+"""
+
+import json
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer
+from backend.utils.http_transport import HttpTransport
+from backend.utils.json_stream import IncrementalJSONParser
+from backend.wrappers.sistema_adaptacao_treino import SistemaAdaptacao
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+def _microciclo(semana):
+    return {
+        "semana": semana,
+        "sessoes": [{
+            "sessao_id": f"SES-{semana}",
+            "nome": "Treino A {com chaves} e \"aspas\"",
+            "exercicios": [{"exercicio_id": f"EX-{semana}", "nome": "Supino", "series": 3, "repeticoes": 10}]
+        }]
+    }
+
+
+PLANO = {
+    "usuario": {"id": "", "nome": "João Silva", "nivel": "intermediário", "objetivos": [], "restricoes": []},
+    "plano_principal": {
+        "nome": "Plano Hipertrofia",
+        "descricao": "Plano de teste",
+        "duracao_semanas": 12,
+        "frequencia_semanal": 3,
+        "ciclos": [
+            {"ciclo_id": "CIC-01", "nome": "Base", "microciclos": [_microciclo(1), _microciclo(2)]},
+            {"ciclo_id": "CIC-02", "nome": "Choque", "microciclos": [_microciclo(3)]}
+        ]
+    }
+}
+
+
+class TestIncrementalJSONParser(unittest.TestCase):
+    """Testes para o IncrementalJSONParser."""
+
+    def test_emite_semanas_assim_que_completas(self):
+        """Cada microciclo deve ser emitido antes do fim do documento."""
+        texto = "```json\n" + json.dumps(PLANO, ensure_ascii=False) + "\n```"
+        parser = IncrementalJSONParser()
+        emitidos = []
+        primeira_emissao = None
+        for i in range(0, len(texto), 7):
+            novos = parser.alimentar(texto[i:i + 7])
+            if novos and primeira_emissao is None:
+                primeira_emissao = i
+            emitidos.extend(novos)
+
+        caminhos = [caminho for caminho, _ in emitidos]
+        self.assertEqual(caminhos, [
+            ("plano_principal", "ciclos", 0, "microciclos", 0),
+            ("plano_principal", "ciclos", 0, "microciclos", 1),
+            ("plano_principal", "ciclos", 0),
+            ("plano_principal", "ciclos", 1, "microciclos", 0),
+            ("plano_principal", "ciclos", 1),
+        ])
+        self.assertEqual(emitidos[0][1], _microciclo(1))
+        # A primeira semana sai antes de a segunda começar a ser recebida
+        self.assertLess(primeira_emissao, texto.index('"semana": 2'))
+        self.assertTrue(parser.completo)
+        self.assertTrue(texto.startswith(parser.texto()))
+
+
+class TestStreamingTreinador(unittest.TestCase):
+    """Testes do streaming ponta a ponta com o servidor simulado."""
+
+    def test_stream_alimenta_adaptacao(self):
+        """As semanas devem chegar à adaptação e o plano final deve ser validado."""
+        texto = "```json\n" + json.dumps(PLANO, ensure_ascii=False) + "\n```"
+        with MockClaudeServer(texto_resposta=texto, tamanho_pedaco=32) as servidor:
+            treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                              usar_cache=False)
+
+            eventos = list(treinador.criar_plano_treinamento_stream({"id": "user123", "nome": "João Silva"}))
+
+        tipos = [evento["tipo"] for evento in eventos]
+        self.assertEqual(tipos, ["microciclo", "microciclo", "ciclo", "microciclo", "ciclo", "plano"])
+        plano = eventos[-1]["dados"]
+        self.assertEqual(plano["usuario"]["id"], "user123")
+        self.assertIn("treinamento_id", plano)
+
+        plano_adaptado = SistemaAdaptacao().processar_plano_stream(iter(eventos))
+        adaptacoes_humor = plano_adaptado["adaptacoes"]["humor"]
+        self.assertEqual(len(adaptacoes_humor["cansado"]), 3)
+        self.assertEqual(
+            {a["sessao_original_id"] for a in adaptacoes_humor["cansado"]},
+            {"SES-1", "SES-2", "SES-3"}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Testes para a contabilidade de tokens, custo e latência das chamadas ao Claude.
+
+Este módulo testa:
+- Custo por modelo, percentis e histogramas da janela móvel
+- Exportação das métricas para arquivo
+- Registro das chamadas feitas pelo TreinadorEspecialista
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.llm_metrics import MetricasLLM, RegistroChamada, calcular_custo
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+def _registro(total_s, output_tokens=100, resultado="sucesso", operacao="plano"):
+    return RegistroChamada(origem="teste", operacao=operacao, modelo="claude-3-opus-20240229",
+                           resultado=resultado, total_s=total_s, ttfb_s=total_s / 2,
+                           input_tokens=1000, output_tokens=output_tokens, stop_reason="end_turn")
+
+
+class TestMetricasLLM(unittest.TestCase):
+    """Testes do registro de métricas."""
+
+    def test_custo_por_prefixo_do_modelo(self):
+        """O preço é escolhido pelo prefixo mais longo do nome do modelo."""
+        self.assertAlmostEqual(calcular_custo("claude-3-opus-20240229", 1_000_000, 0), 15.0)
+        self.assertAlmostEqual(calcular_custo("claude-3-5-sonnet-20241022", 0, 1_000_000), 15.0)
+        self.assertIsNone(calcular_custo("modelo-desconhecido", 10, 10))
+
+    def test_resumo_com_percentis_e_histograma(self):
+        """O resumo traz percentis, histograma e contagens por resultado."""
+        metricas = MetricasLLM()
+        for i in range(1, 101):
+            metricas.registrar(_registro(i / 10))
+        metricas.registrar(_registro(1.0, resultado="erro_api"))
+
+        resumo = metricas.resumo()
+        self.assertEqual(resumo["chamadas"], 101)
+        self.assertEqual(resumo["por_resultado"], {"sucesso": 100, "erro_api": 1})
+        self.assertAlmostEqual(resumo["total_s"]["p50"], 5.0)
+        self.assertAlmostEqual(resumo["total_s"]["max"], 10.0)
+        self.assertEqual(sum(resumo["total_s"]["histograma"].values()), 101)
+        self.assertEqual(resumo["total_s"]["histograma"]["<=5"], 30)
+        self.assertGreater(resumo["custo_usd"], 0)
+        self.assertEqual(metricas.resumo(operacao="continuacao")["chamadas"], 0)
+
+    def test_janela_movel_e_totais(self):
+        """A janela descarta registros antigos; os totais acumulados não."""
+        metricas = MetricasLLM(max_registros=3)
+        for _ in range(5):
+            metricas.registrar(_registro(1.0))
+        self.assertEqual(len(metricas.registros()), 3)
+        self.assertEqual(metricas.totais()[0]["chamadas"], 5)
+        self.assertEqual(metricas.totais()[0]["output_tokens"], 500)
+
+    def test_exportar(self):
+        """As métricas são gravadas em JSON com resumo, totais e registros."""
+        metricas = MetricasLLM()
+        metricas.registrar(_registro(2.0))
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = metricas.exportar(os.path.join(diretorio, "metricas", "llm.json"))
+            with open(caminho, encoding="utf-8") as f:
+                conteudo = json.load(f)
+        self.assertEqual(conteudo["resumo"]["chamadas"], 1)
+        self.assertEqual(conteudo["registros"][0]["output_tokens"], 100)
+
+    def test_chamadas_do_treinador(self):
+        """Cada requisição do treinador, incluindo continuações, vira um registro com tokens e latência."""
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        metricas = MetricasLLM()
+        with MockClaudeServer(responder=ResponderPlano(plano, caracteres_por_resposta=20000)) as servidor:
+            treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                              usar_cache=False, modo_geracao="completo")
+            treinador.config_geracao = dict(treinador.config_geracao, continuacao_max_requisicoes=20)
+            treinador.metricas = metricas
+            treinador.criar_plano_treinamento({"nome": "Ana"})
+            requisicoes = servidor.requisicoes
+
+        registros = metricas.registros()
+        self.assertEqual(len(registros), requisicoes)
+        self.assertEqual(registros[0].operacao, "plano")
+        self.assertEqual(registros[0].stop_reason, "max_tokens")
+        self.assertEqual({r.operacao for r in registros[1:]}, {"continuacao"})
+        self.assertEqual(registros[-1].stop_reason, "end_turn")
+        for registro in registros:
+            self.assertEqual(registro.resultado, "sucesso")
+            self.assertEqual(registro.versao_prompt, treinador.versao_prompt)
+            self.assertGreater(registro.output_tokens, 0)
+            self.assertLessEqual(registro.ttfb_s, registro.total_s)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Testes para o motor local de planos usado no modo degradado.
+
+Este módulo testa:
+- Plano completo de 12 semanas gerado por regras a partir do questionário
+- Exclusão de exercícios por lesão, objetivo, dias e tempo de treino
+- Treinador gerando o plano local sem chave, com o disjuntor aberto ou com a fila cheia
+"""
+
+import threading
+import time
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer
+from backend.utils.concurrency_limiter import FilaEsgotadaError, LimitadorAIMD
+from backend.utils.http_transport import HttpTransport
+from backend.utils.local_plan_engine import EXERCICIOS_POR_GRUPO, gerar_plano_local
+from backend.utils.retry_policy import Disjuntor
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+DADOS = {
+    "id": "user123", "nome": "Ana", "nivel": "intermediário", "tempo_treino": 60,
+    "dias_disponiveis": ["Segunda", "quarta", "Sexta", "sábado"],
+    "objetivos": [{"nome": "Emagrecimento", "prioridade": 2}, {"nome": "Ganho de força", "prioridade": 1}],
+    "lesoes": [{"regiao": "Joelho esquerdo", "gravidade": "moderada", "observacoes": "menisco"}],
+    "cardio": "sim", "alongamento": "não"
+}
+
+
+def _sessoes(plano):
+    for ciclo in plano["plano_principal"]["ciclos"]:
+        for microciclo in ciclo["microciclos"]:
+            yield microciclo, microciclo["sessoes"]
+
+
+class TestMotorLocal(unittest.TestCase):
+    """Testes das regras de montagem do plano."""
+
+    def test_plano_completo_pelas_regras(self):
+        inicio = time.perf_counter()
+        plano = gerar_plano_local(DADOS, "circuito_aberto")
+        self.assertLess(time.perf_counter() - inicio, 0.1)
+
+        principal = plano["plano_principal"]
+        self.assertEqual((principal["duracao_semanas"], principal["frequencia_semanal"]), (12, 4))
+        self.assertEqual([m["semana"] for m, _ in _sessoes(plano)], list(range(1, 13)))
+        self.assertEqual(plano["geracao"], {"origem": "regras_locais", "motivo": "circuito_aberto"})
+
+        exercicios_joelho = {nome for grupo in EXERCICIOS_POR_GRUPO.values()
+                             for nome, _, regioes in grupo if "joelho" in regioes}
+        for microciclo, sessoes in _sessoes(plano):
+            self.assertEqual([s["dia_semana"] for s in sessoes], [1, 3, 5, 6])
+            for sessao in sessoes:
+                nomes = [e["nome"] for e in sessao["exercicios"]]
+                self.assertFalse(exercicios_joelho & set(nomes))
+                # 5 exercícios de força (60 minutos, intermediário) mais o cardio
+                self.assertEqual(len(nomes), 6)
+                self.assertEqual(len(set(nomes)), 6)
+                # Core e cardio são prescritos por tempo
+                forca = [e for e in sessao["exercicios"] if not e["repeticoes"].endswith(("s", "min"))]
+                if microciclo["foco"] != "Recuperação":
+                    # Objetivo de maior prioridade: força
+                    self.assertTrue(all(e["repeticoes"] == "4-6" for e in forca))
+
+        # Progressão linear com recuperação na 4ª semana de cada ciclo
+        cargas = [sessoes[0]["exercicios"][0]["percentual_rm"] for _, sessoes in _sessoes(plano)]
+        self.assertEqual(cargas[:4], [78, 80, 83, 73])
+        self.assertTrue(cargas[4] > cargas[0] and cargas[8] > cargas[4])
+
+    def test_deterministico(self):
+        self.assertEqual(gerar_plano_local(DADOS), gerar_plano_local(dict(DADOS)))
+        outro = gerar_plano_local(dict(DADOS, tempo_treino=30, dias_disponiveis=[], disponibilidade_semanal=2))
+        self.assertEqual(outro["plano_principal"]["frequencia_semanal"], 2)
+        self.assertEqual(len(outro["plano_principal"]["ciclos"][0]["microciclos"][0]["sessoes"][0]["exercicios"]), 4)
+
+
+class TestModoDegradadoTreinador(unittest.TestCase):
+    """O treinador usa o motor local em vez de chamar ou esperar a API."""
+
+    def _treinador(self, api_key, url="http://127.0.0.1:9/v1/messages"):
+        treinador = TreinadorEspecialista(api_key, api_url=url, transport=HttpTransport(), usar_cache=False,
+                                          modo_geracao="completo")
+        treinador.grupo_planos = None
+        return treinador
+
+    def test_sem_chave(self):
+        plano = self._treinador("").criar_plano_treinamento(DADOS)
+        self.assertEqual(plano["geracao"]["motivo"], "sem_api_key")
+        self.assertEqual(plano["usuario"]["id"], "user123")
+        self.assertTrue(plano["treinamento_id"])
+
+    def test_disjuntor_aberto_e_fila_cheia_nao_acessam_a_rede(self):
+        with MockClaudeServer() as servidor:
+            treinador = self._treinador("test-key", servidor.url)
+            treinador.disjuntor = Disjuntor(limiar_falhas=1, abertura_s=60)
+            treinador.disjuntor.registrar_falha()
+            eventos = list(treinador.criar_plano_treinamento_stream(DADOS))
+            self.assertEqual(eventos[-1]["dados"]["geracao"]["motivo"], "circuito_aberto")
+
+            treinador.disjuntor = Disjuntor()
+            treinador.limitador = LimitadorAIMD(limite_inicial=1, max_fila=1)
+            vaga = treinador.limitador.adquirir()
+            esperando = threading.Thread(target=lambda: treinador.limitador.liberar(treinador.limitador.adquirir(5)))
+            esperando.start()
+            while treinador.limitador.aguardando < 1:
+                time.sleep(0.01)
+            self.assertTrue(treinador.limitador.fila_cheia())
+            with self.assertRaises(FilaEsgotadaError):
+                treinador.limitador.adquirir(5)
+            plano = treinador.criar_plano_treinamento(DADOS)
+            treinador.limitador.liberar(vaga)
+            esperando.join(5)
+            self.assertEqual(servidor.requisicoes, 0)
+
+        self.assertEqual(plano["geracao"]["motivo"], "fila_esgotada")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Testes para o roteamento de modelos pela complexidade do perfil.
+
+Este módulo testa:
+- Pontuação de complexidade e escolha da rota
+- Geração na rota simples e na complexa contra o servidor simulado
+- Escalonamento para o modelo mais capaz quando o plano da rota simples é inválido
+- Streaming roteado e gerações simultâneas de perfis diferentes na mesma instância
+"""
+
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, criar_resposta_mensagem
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.model_routing import ROTA_COMPLEXA, ROTA_SIMPLES, RoteadorModelos, pontuar_complexidade
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+SIMPLES = {"id": "user123", "nome": "Ana", "nivel": "iniciante", "idade": 30,
+           "objetivos": [{"nome": "Hipertrofia", "prioridade": 1}], "restricoes": [], "lesoes": []}
+COMPLEXO = dict(SIMPLES, lesoes=[{"regiao": "Joelho", "gravidade": "moderada", "observacoes": "Dor ao agachar"}])
+
+
+class TestPontuacao(unittest.TestCase):
+    """Testes da pontuação e da escolha da rota."""
+
+    def test_pontuacao(self):
+        self.assertEqual(pontuar_complexidade(SIMPLES), (0, []))
+        self.assertEqual(pontuar_complexidade(COMPLEXO)[0], 3)
+        varios = dict(SIMPLES, nivel="avançado", idade=65, restricoes=["Sem impacto"],
+                      objetivos=[{"nome": "Força"}, {"nome": "Emagrecimento"}, {"nome": "Mobilidade"}])
+        pontos, motivos = pontuar_complexidade(varios)
+        self.assertEqual(pontos, 5)
+        self.assertEqual(len(motivos), 4)
+        self.assertEqual(pontuar_complexidade(dict(SIMPLES, conversa_chat="x" * 1500))[0], 2)
+        self.assertEqual(pontuar_complexidade(dict(SIMPLES, restricoes="Nenhuma"))[0], 0)
+
+    def test_rotas(self):
+        roteador = RoteadorModelos("modelo-rapido", "modelo-forte", limiar=3)
+        self.assertEqual((roteador.rotear(SIMPLES).nome, roteador.rotear(SIMPLES).modelo), (ROTA_SIMPLES, "modelo-rapido"))
+        self.assertEqual(roteador.rotear(COMPLEXO).modelo, "modelo-forte")
+        self.assertEqual(roteador.rotear(dict(SIMPLES, conversa_chat="x" * 3000)).nome, ROTA_COMPLEXA)
+
+        escalonada = roteador.rota_escalonada(roteador.rotear(SIMPLES))
+        self.assertEqual((escalonada.modelo, escalonada.escalonada), ("modelo-forte", True))
+        self.assertIsNone(roteador.rota_escalonada(roteador.rotear(COMPLEXO)))
+        self.assertIsNone(RoteadorModelos("a", "b", escalonar=False).rota_escalonada(roteador.rotear(SIMPLES)))
+
+
+class TestRoteamentoTreinador(unittest.TestCase):
+    """Geração roteada contra o servidor simulado."""
+
+    def setUp(self):
+        self.modelos = []
+        self.invalido_no_rapido = False
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+
+        self.nomes_por_modelo = {}
+        self.lock = threading.Lock()
+
+        def responder(payload, path, headers):
+            with self.lock:
+                self.modelos.append(payload["model"])
+                nome = payload["messages"][0]["content"].split("Nome: ", 1)[-1].split("\n", 1)[0]
+                self.nomes_por_modelo.setdefault(payload["model"], set()).add(nome)
+            if self.invalido_no_rapido and payload["model"] == "modelo-rapido":
+                texto = "Não consegui montar o plano."
+            else:
+                texto = "```json\n" + json.dumps(plano, ensure_ascii=False) + "\n```"
+            return 200, criar_resposta_mensagem(texto, payload["model"]), {}
+
+        self.servidor = MockClaudeServer(responder=responder).start()
+        self.treinador = TreinadorEspecialista("test-key", api_url=self.servidor.url, transport=HttpTransport(),
+                                               usar_cache=False, modo_geracao="completo", saida_estruturada=False)
+        self.treinador.config_geracao = dict(self.treinador.config_geracao, max_tokens_por_sessoes={7: 100000})
+        self.treinador.roteador = RoteadorModelos("modelo-rapido", "modelo-forte", limiar=3)
+
+    def tearDown(self):
+        self.servidor.stop()
+
+    def test_modelo_por_perfil(self):
+        self.treinador.criar_plano_treinamento(SIMPLES)
+        self.treinador.criar_plano_treinamento(COMPLEXO)
+        self.assertEqual(self.modelos, ["modelo-rapido", "modelo-forte"])
+        self.assertEqual(self.treinador.modelo, TreinadorEspecialista("k", usar_cache=False).modelo)
+
+        estatisticas = self.treinador.roteador.estatisticas()
+        self.assertEqual(estatisticas[ROTA_SIMPLES]["planos"], 1)
+        self.assertEqual(estatisticas[ROTA_SIMPLES]["taxa_validos"], 1.0)
+        self.assertEqual(estatisticas[ROTA_COMPLEXA]["latencia_s"]["quantidade"], 1)
+
+    def test_escalonamento(self):
+        self.invalido_no_rapido = True
+        plano = self.treinador.criar_plano_treinamento(SIMPLES)
+
+        self.assertEqual(self.modelos, ["modelo-rapido", "modelo-forte"])
+        self.assertEqual(plano["plano_principal"]["nome"], "Plano Sintético")
+        estatisticas = self.treinador.roteador.estatisticas()
+        self.assertEqual((estatisticas[ROTA_SIMPLES]["planos"], estatisticas[ROTA_SIMPLES]["taxa_validos"]), (1, 0.0))
+        self.assertEqual(estatisticas[ROTA_COMPLEXA]["escalonados"], 1)
+
+    def test_sem_escalonamento(self):
+        self.invalido_no_rapido = True
+        self.treinador.roteador.escalonar = False
+        self.treinador.criar_plano_treinamento(SIMPLES)
+        self.assertEqual(self.modelos, ["modelo-rapido"])
+
+    def test_stream_roteado(self):
+        eventos = list(self.treinador.criar_plano_treinamento_stream(COMPLEXO))
+        self.assertEqual(self.modelos, ["modelo-forte"])
+        self.assertEqual(eventos[-1]["tipo"], "plano")
+        self.assertEqual(self.treinador.roteador.estatisticas()[ROTA_COMPLEXA]["planos"], 1)
+
+        # Plano inválido no modelo rápido: o escalonado chega inteiro, sem streaming
+        self.invalido_no_rapido = True
+        eventos = list(self.treinador.criar_plano_treinamento_stream(SIMPLES))
+        self.assertEqual(self.modelos[1:], ["modelo-rapido", "modelo-forte"])
+        self.assertEqual(eventos[-1]["dados"]["plano_principal"]["nome"], "Plano Sintético")
+        self.assertEqual(self.treinador.roteador.estatisticas()[ROTA_COMPLEXA]["escalonados"], 1)
+
+    def test_geracoes_simultaneas(self):
+        # Sem coalescer: cada perfil faz a sua requisição
+        self.treinador.grupo_planos = None
+        perfis = [dict(COMPLEXO if i % 2 else SIMPLES, id=f"user{i}", nome=f"Usuário {i}") for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(self.treinador.criar_plano_treinamento, perfis))
+
+        self.assertEqual(self.nomes_por_modelo["modelo-rapido"], {f"Usuário {i}" for i in range(0, 8, 2)})
+        self.assertEqual(self.nomes_por_modelo["modelo-forte"], {f"Usuário {i}" for i in range(1, 8, 2)})
+
+
+if __name__ == '__main__':
+    unittest.main()
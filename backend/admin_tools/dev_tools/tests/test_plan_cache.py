@@ -0,0 +1,115 @@
+"""
+Testes para o cache persistente de planos do Treinador Especialista.
+
+Este módulo testa:
+- Chave canônica independente de identidade e ordem das listas
+- TTL e remoção LRU
+- Reutilização do plano com nova identidade no TreinadorEspecialista
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.utils.plan_cache import PlanCache, gerar_chave_plano, reidentificar_plano
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+DADOS_USUARIO = {
+    "id": "user123",
+    "nome": "João Silva",
+    "nivel": "intermediário",
+    "tempo_treino": 60,
+    "dias_disponiveis": ["segunda", "quarta", "sexta"],
+    "objetivos": [{"nome": "Hipertrofia", "prioridade": 1}],
+    "restricoes": [],
+    "lesoes": []
+}
+
+PLANO_CLAUDE = {
+    "usuario": {"id": "", "nome": "João Silva", "nivel": "intermediário", "objetivos": [], "restricoes": []},
+    "plano_principal": {
+        "nome": "Plano Hipertrofia",
+        "descricao": "Plano de teste",
+        "duracao_semanas": 12,
+        "frequencia_semanal": 3,
+        "ciclos": [{"ciclo_id": "CIC-01", "nome": "Base", "microciclos": []}]
+    }
+}
+
+
+class TestPlanCache(unittest.TestCase):
+    """Testes para o PlanCache."""
+
+    def setUp(self):
+        """Cria um cache temporário para cada teste."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = PlanCache(os.path.join(self.tmpdir.name, "planos.sqlite3"), ttl_segundos=3600, max_entradas=2)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_chave_ignora_identidade_e_ordem(self):
+        """Usuários com o mesmo questionário devem gerar a mesma chave."""
+        outro = dict(DADOS_USUARIO, id="user456", nome="Maria", dias_disponiveis=["sexta", "Segunda ", "quarta"])
+        self.assertEqual(gerar_chave_plano(DADOS_USUARIO, "v1"), gerar_chave_plano(outro, "v1"))
+        self.assertNotEqual(gerar_chave_plano(DADOS_USUARIO, "v1"), gerar_chave_plano(DADOS_USUARIO, "v2"))
+        self.assertNotEqual(
+            gerar_chave_plano(DADOS_USUARIO, "v1"),
+            gerar_chave_plano(dict(DADOS_USUARIO, nivel="avançado"), "v1")
+        )
+
+    def test_ttl_e_lru(self):
+        """Entradas expiradas e menos usadas devem ser removidas."""
+        self.cache.armazenar("a", {"x": 1}, "v1")
+        self.cache.armazenar("b", {"x": 2}, "v1")
+        self.assertEqual(self.cache.obter("a"), {"x": 1})
+        self.cache.armazenar("c", {"x": 3}, "v1")
+
+        # "b" era a entrada menos recentemente usada
+        self.assertIsNone(self.cache.obter("b"))
+        self.assertIsNotNone(self.cache.obter("a"))
+
+        self.cache.ttl_segundos = 1
+        with patch("backend.utils.plan_cache.time.time", return_value=10 ** 12):
+            self.assertIsNone(self.cache.obter("a"))
+
+        estatisticas = self.cache.estatisticas()
+        self.assertEqual(estatisticas["remocoes_lru"], 1)
+        self.assertEqual(estatisticas["expirados"], 1)
+        self.assertGreater(estatisticas["hits"], 0)
+
+    def test_reidentificar_plano(self):
+        """A reutilização deve manter o corpo e renovar a identidade."""
+        plano = dict(PLANO_CLAUDE, treinamento_id="t1", data_criacao="2024-01-01")
+        novo = reidentificar_plano(plano, {"id": "user999", "nome": "Ana"})
+        self.assertNotEqual(novo["treinamento_id"], "t1")
+        self.assertEqual(novo["usuario"]["id"], "user999")
+        self.assertEqual(novo["usuario"]["nome"], "Ana")
+        self.assertNotEqual(novo["plano_principal"]["ciclos"][0]["ciclo_id"], "CIC-01")
+        self.assertEqual(novo["plano_principal"]["nome"], plano["plano_principal"]["nome"])
+
+    def test_treinador_reutiliza_plano_do_cache(self):
+        """A segunda chamada idêntica não deve chamar a API Claude."""
+        resposta = {
+            "type": "message",
+            "content": [{"type": "text", "text": "```json\n" + json.dumps(PLANO_CLAUDE) + "\n```"}]
+        }
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        treinador.plan_cache = self.cache
+
+        with patch.object(TreinadorEspecialista, "_fazer_requisicao_claude", return_value=resposta) as mock_req:
+            plano1 = treinador.criar_plano_treinamento(DADOS_USUARIO)
+            plano2 = treinador.criar_plano_treinamento(dict(DADOS_USUARIO, id="user456"))
+
+        self.assertEqual(mock_req.call_count, 1)
+        self.assertNotEqual(plano1["treinamento_id"], plano2["treinamento_id"])
+        self.assertEqual(plano2["usuario"]["id"], "user456")
+        self.assertEqual(plano1["plano_principal"]["nome"], plano2["plano_principal"]["nome"])
+        self.assertEqual(treinador.estatisticas_cache()["hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Testes para o formato compacto de planos do Treinador Especialista.
+
+Este módulo testa:
+- Expansão da semana-modelo de cada ciclo com os ajustes semanais
+- Geração no modo compacto contra o servidor simulado, com menos tokens de saída
+- Volta para a requisição única quando o plano compacto é inválido
+"""
+
+import json
+import re
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.plan_expansion import PlanoCompactoInvalidoError, expandir_plano_compacto
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+COMPACTO = {
+    "usuario": {"nome": "Ana", "nivel": "intermediário"},
+    "plano_principal": {
+        "nome": "Plano Força", "descricao": "Teste", "frequencia_semanal": 2,
+        "ciclos": [
+            {"nome": "Base", "objetivo": "Adaptação",
+             "sessoes": [{"nome": "Treino A", "dia_semana": 1, "grupos_musculares": ["Peito", "Tríceps"],
+                          "exercicios": [{"nome": "Supino reto", "series": 3, "repeticoes": "8-10", "percentual_rm": 70},
+                                         {"nome": "Prancha", "series": 3, "repeticoes": "30s"}]},
+                         {"nome": "Treino B", "dia_semana": 4, "grupos_musculares": ["Costas"],
+                          "exercicios": [{"nome": "Remada curvada", "series": 3, "repeticoes": "8-10", "percentual_rm": 68}]}],
+             "semanas": [{"foco": "Técnica"}, {"ajuste_percentual_rm": 3}, {"ajuste_percentual_rm": 5, "ajuste_series": 1},
+                         {"ajuste_percentual_rm": -10, "ajuste_series": -1, "repeticoes": "12"}]},
+            {"nome": "Pico", "objetivo": "Força",
+             "sessoes": [{"nome": "Treino A", "dia_semana": 1, "grupos_musculares": ["Peito"],
+                          "exercicios": [{"nome": "Supino reto", "series": 5, "repeticoes": "3-5", "percentual_rm": 88}]}],
+             "semanas": [{}, {"ajuste_percentual_rm": 15}]}
+        ]
+    }
+}
+
+
+class TestExpansao(unittest.TestCase):
+    """Testes do expansor local."""
+
+    def test_semanas_materializadas_com_ajustes(self):
+        plano = expandir_plano_compacto(COMPACTO)
+        principal = plano["plano_principal"]
+        self.assertEqual(principal["duracao_semanas"], 6)
+        self.assertEqual(plano["usuario"], {"nome": "Ana", "nivel": "intermediário"})
+
+        base, pico = principal["ciclos"]
+        self.assertEqual((base["ordem"], base["duracao_semanas"], pico["ordem"]), (1, 4, 2))
+        self.assertNotIn("sessoes", base)
+        self.assertEqual([m["semana"] for c in principal["ciclos"] for m in c["microciclos"]], list(range(1, 7)))
+
+        supinos = [m["sessoes"][0]["exercicios"][0] for m in base["microciclos"]]
+        self.assertEqual([e["percentual_rm"] for e in supinos], [70, 73, 75, 60])
+        self.assertEqual([e["series"] for e in supinos], [3, 3, 4, 2])
+        self.assertEqual([e["repeticoes"] for e in supinos], ["8-10", "8-10", "8-10", "12"])
+        self.assertEqual(supinos[2]["progressao"], [{"semana": 3, "ajuste": "+5% 1RM, +1 série(s)"}])
+        # Exercícios sem carga não recebem %1RM; o limite de 100% é respeitado
+        self.assertNotIn("percentual_rm", base["microciclos"][1]["sessoes"][0]["exercicios"][1])
+        self.assertEqual(pico["microciclos"][1]["sessoes"][0]["exercicios"][0]["percentual_rm"], 100)
+
+        sessao = base["microciclos"][0]["sessoes"][0]
+        self.assertEqual([g["nome"] for g in sessao["grupos_musculares"]], ["Peito", "Tríceps"])
+        self.assertEqual([e["ordem"] for e in sessao["exercicios"]], [1, 2])
+        ids = [s["sessao_id"] for m in base["microciclos"] for s in m["sessoes"]]
+        self.assertEqual(len(set(ids)), len(ids))
+        # O plano compacto de entrada não é alterado
+        self.assertNotIn("sessao_id", COMPACTO["plano_principal"]["ciclos"][0]["sessoes"][0])
+
+    def test_plano_compacto_invalido(self):
+        for invalido in ({}, {"plano_principal": {"ciclos": []}},
+                         {"plano_principal": {"ciclos": [{"nome": "Base", "semanas": [{}]}]}}):
+            with self.assertRaises(PlanoCompactoInvalidoError):
+                expandir_plano_compacto(invalido)
+
+
+class TestModoCompacto(unittest.TestCase):
+    """Geração no formato compacto contra o servidor simulado."""
+
+    def _gerar(self, modo, responder):
+        saidas = []
+
+        def registrar(payload, path, headers):
+            status, corpo, cabecalhos = responder(payload, path, headers)
+            saidas.append(corpo["usage"]["output_tokens"])
+            return status, corpo, cabecalhos
+
+        with MockClaudeServer(responder=registrar) as servidor:
+            treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                              usar_cache=False, modo_geracao=modo)
+            treinador.config_geracao = dict(treinador.config_geracao, max_tokens_por_sessoes={7: 100000},
+                                            compacto_max_tokens=100000)
+            return treinador.criar_plano_treinamento({"id": "user123", "nome": "Ana"}), saidas
+
+    def test_prompt_compacto_tem_json_valido(self):
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        prompt = treinador._preparar_prompt_compacto("Dados do Usuário:", "segunda", "2024-01-01")
+        exemplo = json.loads(re.search(r"```json(.*?)```", prompt, re.DOTALL).group(1))
+        self.assertIn("semanas", exemplo["plano_principal"]["ciclos"][0])
+
+    def test_plano_completo_com_menos_tokens(self):
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        completo, saidas_completo = self._gerar("completo", ResponderPlano(plano))
+        compacto, saidas_compacto = self._gerar("compacto", ResponderPlano(plano))
+
+        self.assertEqual(len(saidas_compacto), 1)
+        self.assertLess(sum(saidas_compacto) * 3, sum(saidas_completo))
+        ciclos = compacto["plano_principal"]["ciclos"]
+        self.assertEqual([m["semana"] for c in ciclos for m in c["microciclos"]], list(range(1, 13)))
+        self.assertEqual(compacto["usuario"]["id"], "user123")
+        nomes = lambda p: [[e["nome"] for e in s["exercicios"]] for c in p["plano_principal"]["ciclos"]
+                           for m in c["microciclos"] for s in m["sessoes"]]
+        self.assertEqual(nomes(compacto), nomes(completo))
+
+    def test_compacto_invalido_usa_requisicao_unica(self):
+        responder = ResponderPlano(gerar_plano(semanas=4, semanas_por_ciclo=4))
+        responder.compacto = {"plano_principal": {"ciclos": []}}
+        resultado, saidas = self._gerar("compacto", responder)
+        self.assertEqual(len(saidas), 2)
+        self.assertEqual(resultado["plano_principal"]["nome"], "Plano Sintético")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Testes para a regeneração parcial de planos do Treinador Especialista.
+
+Este módulo testa:
+- Interpretação do caminho e substituição do trecho com reaproveitamento das partes não alteradas
+- Contexto mínimo (macroestrutura e semanas vizinhas)
+- Regeneração de uma semana e de um ciclo contra o servidor simulado
+"""
+
+import copy
+import json
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.plan_regeneration import (
+    CaminhoTrecho, interpretar_caminho, resumir_contexto, substituir_trecho
+)
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class TestTrechos(unittest.TestCase):
+    """Testes das funções de caminho, contexto e substituição."""
+
+    def test_interpretar_caminho(self):
+        self.assertEqual(interpretar_caminho("plano_principal.ciclos[1]"), CaminhoTrecho(1))
+        self.assertEqual(interpretar_caminho("ciclos[2].microciclos[3]"), CaminhoTrecho(2, 3))
+        self.assertEqual(str(CaminhoTrecho(2, 3)), "plano_principal.ciclos[2].microciclos[3]")
+        for invalido in ("plano_principal", "ciclos[0].microciclos[1].sessoes[0]", "ciclos[a]"):
+            with self.assertRaises(ValueError):
+                interpretar_caminho(invalido)
+
+    def test_substituir_reaproveita_o_restante(self):
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        original = copy.deepcopy(plano)
+        novo = substituir_trecho(plano, CaminhoTrecho(1, 2), {"semana": 7, "sessoes": []})
+
+        self.assertEqual(plano, original)
+        ciclos, ciclos_originais = novo["plano_principal"]["ciclos"], plano["plano_principal"]["ciclos"]
+        self.assertIs(ciclos[0], ciclos_originais[0])
+        self.assertIs(ciclos[1]["microciclos"][1], ciclos_originais[1]["microciclos"][1])
+        self.assertEqual(ciclos[1]["microciclos"][2], {"semana": 7, "sessoes": []})
+        self.assertIs(novo["usuario"], plano["usuario"])
+        with self.assertRaises(ValueError):
+            substituir_trecho(plano, CaminhoTrecho(3), {})
+
+    def test_contexto_minimo(self):
+        plano = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        contexto = resumir_contexto(plano, CaminhoTrecho(1))
+        self.assertEqual([len(c["semanas"]) for c in contexto["ciclos"]], [4, 4, 4])
+        self.assertEqual([(v["posicao"], v["semana"]) for v in contexto["semanas_vizinhas"]],
+                         [("anterior", 4), ("seguinte", 9)])
+        self.assertNotIn("sessao_id", json.dumps(contexto))
+        primeira = resumir_contexto(plano, CaminhoTrecho(0, 0))
+        self.assertEqual([v["semana"] for v in primeira["semanas_vizinhas"]], [2])
+
+
+class TestRegeneracaoTreinador(unittest.TestCase):
+    """Regeneração de trechos contra o servidor simulado."""
+
+    def setUp(self):
+        self.plano_modelo = gerar_plano(semanas=12, semanas_por_ciclo=4)
+        self.responder = ResponderPlano(self.plano_modelo)
+        self.prompts, self.saidas = [], []
+
+        def registrar(payload, path, headers):
+            self.prompts.append(payload["messages"][-1]["content"])
+            status, corpo, cabecalhos = self.responder(payload, path, headers)
+            self.saidas.append(corpo["usage"]["output_tokens"])
+            return status, corpo, cabecalhos
+
+        self.servidor = MockClaudeServer(responder=registrar).start()
+        self.treinador = TreinadorEspecialista("test-key", api_url=self.servidor.url, transport=HttpTransport(),
+                                               usar_cache=False, modo_geracao="completo")
+        self.treinador.config_geracao = dict(self.treinador.config_geracao, max_tokens_por_sessoes={7: 100000})
+        self.plano = self.treinador.criar_plano_treinamento({"id": "user123", "nome": "Ana"})
+
+    def tearDown(self):
+        self.servidor.stop()
+
+    def test_regenera_uma_semana(self):
+        semana = copy.deepcopy(self.responder.microciclos[7])
+        semana["foco"] = "Semana sem agachamento"
+        for sessao in semana["sessoes"]:
+            sessao["sessao_id"] = ""
+            for exercicio in sessao["exercicios"]:
+                exercicio["exercicio_id"] = ""
+                exercicio["nome"] = "Leg press"
+        self.responder.microciclos[7] = semana
+        original = copy.deepcopy(self.plano)
+
+        novo = self.treinador.regenerar_trecho(self.plano, "plano_principal.ciclos[1].microciclos[2]",
+                                               {"nome": "Ana"}, "Trocar os exercícios por leg press")
+
+        self.assertEqual(self.plano, original)
+        # Só a semana é gerada; das demais semanas o prompt leva apenas o resumo, sem IDs
+        self.assertLess(self.saidas[-1] * 8, self.saidas[0])
+        sessao_fora = self.plano["plano_principal"]["ciclos"][0]["microciclos"][0]["sessoes"][0]["sessao_id"]
+        self.assertNotIn(sessao_fora, self.prompts[-1])
+        self.assertIn("Trocar os exercícios por leg press", self.prompts[-1])
+        ciclos = novo["plano_principal"]["ciclos"]
+        regenerada = ciclos[1]["microciclos"][2]
+        self.assertEqual((regenerada["semana"], regenerada["foco"]), (7, "Semana sem agachamento"))
+        self.assertTrue(all(s["sessao_id"] for s in regenerada["sessoes"]))
+        self.assertEqual({e["nome"] for s in regenerada["sessoes"] for e in s["exercicios"]}, {"Leg press"})
+        self.assertIs(ciclos[0], self.plano["plano_principal"]["ciclos"][0])
+        self.assertEqual(novo["treinamento_id"], self.plano["treinamento_id"])
+
+    def test_regenera_um_ciclo(self):
+        ciclo = copy.deepcopy(self.plano_modelo["plano_principal"]["ciclos"][2])
+        ciclo["nome"] = "Pico de força"
+        ciclo["ciclo_id"] = "outro"
+        self.plano_modelo["plano_principal"]["ciclos"][2] = ciclo
+
+        novo = self.treinador.regenerar_trecho(self.plano, "ciclos[2]", {"nome": "Ana"})
+        regenerado = novo["plano_principal"]["ciclos"][2]
+        original = self.plano["plano_principal"]["ciclos"][2]
+        self.assertEqual(regenerado["nome"], "Pico de força")
+        self.assertEqual((regenerado["ciclo_id"], regenerado["ordem"]), (original["ciclo_id"], original["ordem"]))
+        self.assertEqual([m["semana"] for m in regenerado["microciclos"]], [9, 10, 11, 12])
+
+        # Um ciclo com outra quantidade de semanas deslocaria o restante do plano
+        ciclo["microciclos"] = ciclo["microciclos"][:3]
+        with self.assertRaises(ValueError):
+            self.treinador.regenerar_trecho(self.plano, "ciclos[2]", {"nome": "Ana"})
+
+    def test_sem_api_nao_regenera(self):
+        self.treinador.api_key = ""
+        with self.assertRaises(ValueError):
+            self.treinador.regenerar_trecho(self.plano, "ciclos[0]", {"nome": "Ana"})
+
+
+if __name__ == '__main__':
+    unittest.main()
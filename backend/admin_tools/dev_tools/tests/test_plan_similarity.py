@@ -0,0 +1,122 @@
+"""
+Testes para o reaproveitamento de planos de perfis semelhantes.
+
+Este módulo testa:
+- Vetor e partição do perfil (campos rígidos x ajustáveis)
+- Busca do vizinho mais próximo dentro da distância máxima e remoção de perfis sem plano
+- Treinador reaproveitando o plano de um perfil semelhante sem chamar a API
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.utils.plan_cache import PlanCache, gerar_chave_plano
+from backend.utils.plan_similarity import IndicePerfis, assinatura_perfil, distancia, vetorizar_perfil
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+DADOS_USUARIO = {
+    "id": "user123", "nome": "João Silva", "nivel": "intermediário", "idade": 30, "tempo_treino": 60,
+    "dias_disponiveis": ["segunda", "quarta", "sexta"],
+    "objetivos": [{"nome": "Hipertrofia", "prioridade": 1}, {"nome": "Emagrecimento", "prioridade": 2}],
+    "restricoes": [], "lesoes": [], "cardio": "sim"
+}
+
+PLANO_CLAUDE = {
+    "usuario": {"id": "", "nome": "João Silva", "idade": 30, "genero": "masculino", "nivel": "intermediário"},
+    "plano_principal": {
+        "nome": "Plano Hipertrofia", "descricao": "Plano de teste", "duracao_semanas": 12, "frequencia_semanal": 3,
+        "ciclos": [{"ciclo_id": "CIC-01", "nome": "Base", "microciclos": [{
+            "microciclo_id": "MIC-01", "semana": 1,
+            "sessoes": [{"sessao_id": f"SES-0{d}", "dia_semana": d, "nome": f"Treino {d}"} for d in (1, 3, 5)]
+        }]}]
+    }
+}
+
+# Mesmo perfil com 5 minutos a mais de treino, outra idade e outros dias da semana
+SEMELHANTE = dict(DADOS_USUARIO, id="user456", nome="Maria", idade=32, tempo_treino=65,
+                  dias_disponiveis=["terça", "quinta", "sábado"])
+
+
+class TestIndicePerfis(unittest.TestCase):
+    """Testes do índice de perfis sobre o cache de planos."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = PlanCache(os.path.join(self.tmpdir.name, "planos.sqlite3"), max_entradas=10)
+        self.indice = IndicePerfis(self.cache, distancia_max=0.1)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _armazenar(self, dados):
+        chave = gerar_chave_plano(dados, "v1")
+        self.cache.armazenar(chave, PLANO_CLAUDE, "v1")
+        self.indice.registrar(chave, dados, "v1")
+        return chave
+
+    def test_campos_rigidos_e_ajustaveis(self):
+        self.assertEqual(assinatura_perfil(DADOS_USUARIO, "v1"), assinatura_perfil(SEMELHANTE, "v1"))
+        for diferente in ({"nivel": "avançado"}, {"dias_disponiveis": ["segunda", "quarta"]},
+                          {"objetivos": [{"nome": "Força", "prioridade": 1}]},
+                          {"lesoes": [{"regiao": "Joelho", "gravidade": "leve"}]}):
+            self.assertNotEqual(assinatura_perfil(DADOS_USUARIO, "v1"), assinatura_perfil(dict(DADOS_USUARIO, **diferente), "v1"))
+        self.assertNotEqual(assinatura_perfil(DADOS_USUARIO, "v1"), assinatura_perfil(DADOS_USUARIO, "v2"))
+
+        vetor = vetorizar_perfil(DADOS_USUARIO)
+        self.assertLess(distancia(vetor, vetorizar_perfil(SEMELHANTE)), 0.1)
+        # Objetivo secundário diferente ou sem cardio ficam fora do limite
+        self.assertGreater(distancia(vetor, vetorizar_perfil(dict(DADOS_USUARIO, cardio="não"))), 0.1)
+        self.assertGreater(distancia(vetor, vetorizar_perfil(dict(DADOS_USUARIO, objetivos=DADOS_USUARIO["objetivos"][:1]))), 0.1)
+
+    def test_busca_e_adapta_o_vizinho(self):
+        self._armazenar(DADOS_USUARIO)
+        plano = self.indice.buscar(SEMELHANTE, "v1")
+
+        self.assertEqual(plano["usuario"]["id"], "user456")
+        self.assertEqual(plano["usuario"]["nome"], "Maria")
+        # Idade do novo usuário; gênero não informado não é herdado do vizinho
+        self.assertEqual(plano["usuario"]["idade"], 32)
+        self.assertEqual(plano["usuario"]["nivel"], "intermediário")
+        self.assertNotIn("genero", plano["usuario"])
+        self.assertEqual(plano["geracao"]["origem"], "plano_vizinho")
+        microciclo = plano["plano_principal"]["ciclos"][0]["microciclos"][0]
+        self.assertEqual([s["dia_semana"] for s in microciclo["sessoes"]], [2, 4, 6])
+        self.assertNotEqual(microciclo["sessoes"][0]["sessao_id"], "SES-01")
+
+        self.assertIsNone(self.indice.buscar(dict(SEMELHANTE, tempo_treino=90), "v1"))
+        self.assertIsNone(self.indice.buscar(SEMELHANTE, "v2"))
+        estatisticas = self.indice.estatisticas()
+        self.assertEqual((estatisticas["consultas"], estatisticas["reaproveitados"], estatisticas["perfis"]), (3, 1, 1))
+        self.assertAlmostEqual(estatisticas["taxa_reaproveitamento"], 1 / 3)
+
+    def test_perfil_sem_plano_no_cache_e_removido(self):
+        self._armazenar(DADOS_USUARIO)
+        self.cache.limpar()
+        self.assertIsNone(self.indice.buscar(SEMELHANTE, "v1"))
+        self.assertEqual(self.indice.estatisticas()["perfis"], 0)
+
+    def test_treinador_reaproveita_plano_semelhante(self):
+        resposta = {
+            "type": "message",
+            "content": [{"type": "text", "text": "```json\n" + json.dumps(PLANO_CLAUDE) + "\n```"}]
+        }
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        treinador.plan_cache = self.cache
+        treinador.indice_perfis = self.indice
+
+        with patch.object(TreinadorEspecialista, "_fazer_requisicao_claude", return_value=resposta) as mock_req:
+            treinador.criar_plano_treinamento(DADOS_USUARIO)
+            plano = treinador.criar_plano_treinamento(SEMELHANTE)
+            treinador.criar_plano_treinamento(dict(SEMELHANTE, nivel="iniciante"))
+
+        self.assertEqual(mock_req.call_count, 2)
+        self.assertEqual(plano["geracao"]["origem"], "plano_vizinho")
+        self.assertEqual(plano["usuario"]["id"], "user456")
+        self.assertEqual(treinador.estatisticas_cache()["vizinhos"]["reaproveitados"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
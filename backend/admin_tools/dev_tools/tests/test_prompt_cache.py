@@ -0,0 +1,85 @@
+"""
+Testes para o prefixo cacheável do prompt do Treinador Especialista.
+
+Este módulo testa:
+- Prefixo estático idêntico para usuários diferentes, com os dados só no sufixo
+- Prefixo enviado como prompt de sistema com cache_control
+- Tokens gravados e lidos do cache registrados nas métricas e no custo
+"""
+
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.llm_metrics import MetricasLLM, calcular_custo
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+ANA = {"nome": "Ana", "idade": 28, "dias_disponiveis": ["segunda", "quarta"], "cardio": "sim"}
+BRUNO = {"nome": "Bruno", "idade": 41, "dias_disponiveis": ["terça", "quinta", "sábado"], "alongamento": "sim"}
+
+
+class TestPrefixoCacheavel(unittest.TestCase):
+    """Testes da divisão do prompt e do cache contra o servidor simulado."""
+
+    def test_prefixo_independe_do_usuario(self):
+        """Só o sufixo carrega os dados do usuário; o prompt completo é o prefixo seguido do sufixo."""
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        prefixo_ana, sufixo_ana = treinador._preparar_prompt_dividido(ANA)
+        prefixo_bruno, sufixo_bruno = treinador._preparar_prompt_dividido(BRUNO)
+
+        self.assertEqual(prefixo_ana, prefixo_bruno)
+        self.assertIn("```json", prefixo_ana)
+        self.assertNotIn("Ana", prefixo_ana)
+        self.assertIn("Nome: Ana", sufixo_ana)
+        self.assertIn("segunda, quarta", sufixo_ana)
+        self.assertNotEqual(sufixo_ana, sufixo_bruno)
+        self.assertEqual(treinador._preparar_prompt(ANA), f"{prefixo_ana}\n\n{sufixo_ana}")
+
+    def test_prefixo_lido_do_cache(self):
+        """A primeira requisição grava o prefixo no cache e as seguintes o leem."""
+        plano = gerar_plano(semanas=4, semanas_por_ciclo=4)
+        payloads = []
+        responder = ResponderPlano(plano, minimo_tokens_cache=100)
+
+        def registrar(payload, path, headers):
+            payloads.append(payload)
+            return responder(payload, path, headers)
+
+        metricas = MetricasLLM()
+        with MockClaudeServer(responder=registrar) as servidor:
+            treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                              usar_cache=False, modo_geracao="completo")
+            treinador.metricas = metricas
+            treinador.criar_plano_treinamento(ANA)
+            treinador.criar_plano_treinamento(BRUNO)
+
+        sistema = payloads[0]["system"]
+        self.assertEqual(sistema[0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(payloads[1]["system"], sistema)
+        self.assertIn("Nome: Bruno", payloads[1]["messages"][0]["content"])
+        self.assertNotIn("```json", payloads[1]["messages"][0]["content"])
+
+        primeira, segunda = metricas.registros()
+        self.assertGreater(primeira.cache_escrita_tokens, 0)
+        self.assertEqual(primeira.cache_leitura_tokens, 0)
+        self.assertEqual(segunda.cache_leitura_tokens, primeira.cache_escrita_tokens)
+        self.assertLess(segunda.custo_usd, calcular_custo(segunda.modelo,
+                                                          segunda.input_tokens + segunda.cache_leitura_tokens,
+                                                          segunda.output_tokens))
+        resumo = metricas.resumo()
+        self.assertEqual(resumo["cache_leitura_tokens"], segunda.cache_leitura_tokens)
+        self.assertGreater(resumo["fracao_entrada_do_cache"], 0)
+
+    def test_cache_desativado(self):
+        """Com PROMPT_CACHE_ENABLED desligado, o prompt completo vai na mensagem do usuário."""
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        treinador.config_geracao = dict(treinador.config_geracao, cache_prompt=False)
+        sistema, prompt = treinador._prompt_para_envio(ANA)
+        self.assertIsNone(sistema)
+        self.assertEqual(prompt, treinador._preparar_prompt(ANA))
+        self.assertNotIn("system", treinador._montar_requisicao(prompt)[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Testes para a compactação de prompts do Treinador Especialista.
+
+Este módulo testa:
+- Remoção de indentação, minificação do JSON embutido e de instruções repetidas
+- Estimativa local de tokens antes e depois
+- Regressão: o prompt compactado preserva dados do usuário, instruções e template
+"""
+
+import json
+import re
+import unittest
+
+from backend.utils.prompt_compaction import compactar_prompt, estimar_tokens, minificar_json_embutido
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+DADOS_USUARIO = {
+    "id": "user123",
+    "nome": "João Silva",
+    "idade": 35,
+    "peso": 82.5,
+    "altura": 178,
+    "genero": "masculino",
+    "nivel": "intermediário",
+    "historico_treino": "Musculação há 2 anos",
+    "tempo_treino": 60,
+    "disponibilidade_semanal": 4,
+    "dias_disponiveis": ["segunda", "terça", "quinta", "sexta"],
+    "cardio": "sim",
+    "alongamento": "não",
+    "conversa_chat": "Prefiro   treinos curtos.\n    Tenho halteres em casa.",
+    "objetivos": [{"nome": "Hipertrofia", "prioridade": 1}, {"nome": "Força", "prioridade": 2}],
+    "restricoes": [{"nome": "Sem impacto", "gravidade": "moderada"}],
+    "lesoes": [{"regiao": "joelho direito", "gravidade": "leve", "observacoes": "evitar agachamento profundo"}]
+}
+
+
+def _blocos_json(texto):
+    return [json.loads(b[b.index("{"):]) for b in re.findall(r"```json\n(.*?)```", texto, re.DOTALL)]
+
+
+def _linhas(texto):
+    return {" ".join(linha.split()) for linha in texto.splitlines() if linha.strip() and "```" not in linha}
+
+
+class TestCompactacaoPrompt(unittest.TestCase):
+    """Testes das funções de compactação."""
+
+    def test_remove_indentacao_e_linhas_em_branco(self):
+        texto = "Título\n\n\n        linha   indentada\n\t\toutra\n\n\n\nfim"
+        self.assertEqual(compactar_prompt(texto).texto, "Título\n\nlinha indentada\noutra\n\nfim")
+
+    def test_minifica_json_mantendo_titulo(self):
+        conteudo = 'Template do plano\n{\n  "a": [1, 2],\n  "b": {"c": ""}\n}\n'
+        self.assertEqual(minificar_json_embutido(conteudo), 'Template do plano\n{"a":[1,2],"b":{"c":""}}')
+        self.assertEqual(minificar_json_embutido("  não é json {\n  x"), "não é json {\nx")
+
+    def test_instrucoes_repetidas(self):
+        """Instruções longas repetidas são removidas; linhas curtas repetidas são mantidas."""
+        instrucao = "Retorne apenas o JSON válido, sem comentários adicionais."
+        texto = f"{instrucao}\nObjetivos:\n- A\n\n    {instrucao}\nObjetivos:\n- A"
+        resultado = compactar_prompt(texto)
+        self.assertEqual(resultado.texto.count(instrucao), 1)
+        self.assertEqual(resultado.texto.count("Objetivos:"), 2)
+        self.assertEqual(resultado.linhas_duplicadas, 1)
+
+    def test_dados_do_usuario_preservados(self):
+        """Linhas repetidas nos dados do usuário e na conversa do chat não são removidas."""
+        instrucao = "Retorne apenas o JSON válido, sem comentários adicionais."
+        fala = "Tenho dor no joelho direito ao agachar com carga, principalmente na descida."
+        texto = f"{instrucao}\n{instrucao}\nDados do Usuário:\nHistórico: {fala}\n{fala}\n{fala}\n{instrucao}"
+        resultado = compactar_prompt(texto)
+        self.assertEqual(resultado.texto.count(fala), 3)
+        self.assertEqual(resultado.texto.count(instrucao), 2)
+        self.assertEqual(resultado.linhas_duplicadas, 1)
+
+    def test_estimativa_de_tokens(self):
+        """Espaços de layout contam tokens; o espaço simples entre palavras não."""
+        self.assertEqual(estimar_tokens("uma frase curta"), 5)
+        self.assertGreater(estimar_tokens("        uma frase curta"), estimar_tokens("uma frase curta"))
+        self.assertEqual(estimar_tokens(""), 0)
+
+
+class TestRegressaoPromptTreinador(unittest.TestCase):
+    """O prompt compactado do treinador deve carregar exatamente a mesma informação."""
+
+    def _prompts(self, **kwargs):
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        treinador.config_geracao = dict(treinador.config_geracao, compactar_prompt=False)
+        original = treinador._preparar_prompt(DADOS_USUARIO, **kwargs)
+        treinador.config_geracao = dict(treinador.config_geracao, compactar_prompt=True)
+        compacto = treinador._preparar_prompt(DADOS_USUARIO, **kwargs)
+        return original, compacto
+
+    def test_campos_semanticos_preservados(self):
+        original, compacto = self._prompts()
+
+        # Template JSON idêntico depois de decodificado
+        self.assertEqual(_blocos_json(compacto), _blocos_json(original))
+        self.assertEqual(len(_blocos_json(compacto)), 1)
+
+        # Todas as linhas de texto (dados do usuário e instruções) preservadas, a menos do layout
+        linhas_json = {" ".join(l.split()) for b in re.findall(r"```json\n(.*?)```", original, re.DOTALL)
+                       for l in b.splitlines()}
+        self.assertLessEqual(_linhas(original) - linhas_json, _linhas(compacto))
+
+        for valor in ("João Silva", "35", "82.5 kg", "178 cm", "intermediário", "Musculação há 2 anos",
+                      "segunda, terça, quinta, sexta", "Hipertrofia (Prioridade: 1)", "Força (Prioridade: 2)",
+                      "Sem impacto, Gravidade: moderada", "joelho direito, Gravidade: leve",
+                      "evitar agachamento profundo", "Prefiro treinos curtos.", "Tenho halteres em casa.",
+                      "EXATAMENTE 12 semanas", "% de 1RM", "cardio (sim)"):
+            self.assertIn(valor, compacto)
+
+    def test_saida_estruturada_preservada(self):
+        original, compacto = self._prompts(saida_estruturada=True)
+        self.assertEqual(_linhas(original), _linhas(compacto))
+
+    def test_reduz_tokens(self):
+        original, compacto = self._prompts()
+        self.assertLess(estimar_tokens(compacto), estimar_tokens(original) * 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
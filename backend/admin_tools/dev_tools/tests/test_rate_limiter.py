@@ -0,0 +1,128 @@
+"""
+Testes para o limite de taxa da API Claude compartilhado entre processos.
+
+Este módulo testa:
+- Baldes de requisições e tokens por minuto divididos por instâncias no mesmo arquivo
+- Reconciliação da estimativa com o uso real e prazo de espera
+- Processos concorrentes respeitando o mesmo limite
+- Requisição do Treinador Especialista reconciliada com o uso informado pela API
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.rate_limiter import (
+    LimitadorTaxaCompartilhado, LimiteTaxaEsgotadoError, estimar_tokens_requisicao, tokens_consumidos
+)
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+    def dormir(self, segundos):
+        self.agora += segundos
+
+
+def _reservar_em_processo(path, rpm, quantidade):
+    limitador = LimitadorTaxaCompartilhado(path, rpm=rpm)
+    for _ in range(quantidade):
+        limitador.reservar(0)
+
+
+class TestLimitadorTaxaCompartilhado(unittest.TestCase):
+    """Testes dos baldes compartilhados pelo arquivo SQLite."""
+
+    def setUp(self):
+        self._diretorio = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._diretorio.name, "limite.sqlite3")
+
+    def tearDown(self):
+        self._diretorio.cleanup()
+
+    def test_instancias_dividem_o_limite(self):
+        relogio = RelogioFalso()
+        worker_a = LimitadorTaxaCompartilhado(self.path, rpm=60, tpm=6000, relogio=relogio, dormir=relogio.dormir)
+        worker_b = LimitadorTaxaCompartilhado(self.path, rpm=60, tpm=6000, relogio=relogio, dormir=relogio.dormir)
+
+        reserva = worker_a.reservar(5000)
+        self.assertEqual(reserva.espera_s, 0)
+        # O outro worker precisa de 2000 tokens e só há 1000: espera 10s a 100 tokens/s
+        self.assertEqual(worker_b.reservar(2000).espera_s, 10)
+
+        # A estimativa alta é devolvida ao balde depois da resposta
+        worker_a.reconciliar(reserva, 1000)
+        self.assertEqual(worker_b.saldos()["tpm"], 4000)
+        # Uma estimativa baixa deixa o saldo negativo
+        worker_b.reconciliar(worker_b.reservar(1000), 9000)
+        self.assertEqual(worker_a.saldos()["tpm"], -5000)
+
+        with self.assertRaises(LimiteTaxaEsgotadoError):
+            worker_a.reservar(100, timeout=5)
+
+    def test_limite_de_requisicoes(self):
+        relogio = RelogioFalso()
+        limitador = LimitadorTaxaCompartilhado(self.path, rpm=2, relogio=relogio, dormir=relogio.dormir)
+        esperas = [limitador.reservar(10 ** 6).espera_s for _ in range(4)]
+        self.assertEqual(esperas, [0, 0, 30, 30])
+
+    def test_processos_respeitam_o_mesmo_limite(self):
+        """Dois processos fazendo 305 requisições cada com limite de 600/min: as 10 excedentes esperam ~1s."""
+        contexto = multiprocessing.get_context("fork")
+        LimitadorTaxaCompartilhado(self.path, rpm=600)
+        inicio = time.monotonic()
+        processos = [contexto.Process(target=_reservar_em_processo, args=(self.path, 600, 305)) for _ in range(2)]
+        for processo in processos:
+            processo.start()
+        for processo in processos:
+            processo.join(30)
+            self.assertEqual(processo.exitcode, 0)
+        self.assertGreater(time.monotonic() - inicio, 0.8)
+
+    def test_estimativa_e_consumo(self):
+        corpo = {"system": [{"type": "text", "text": "instruções " * 50}], "max_tokens": 4000,
+                 "messages": [{"role": "user", "content": "dados " * 100}]}
+        self.assertGreater(estimar_tokens_requisicao(corpo), 4100)
+        uso = {"input_tokens": 10, "cache_creation_input_tokens": 5, "cache_read_input_tokens": 1000, "output_tokens": 20}
+        self.assertEqual(tokens_consumidos(uso), 35)
+
+
+class TestLimitadorTaxaTreinador(unittest.TestCase):
+    """Reconciliação das chamadas do treinador."""
+
+    def test_reconcilia_com_o_uso_da_resposta(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            limitador = LimitadorTaxaCompartilhado(os.path.join(diretorio, "limite.sqlite3"), rpm=50,
+                                                   tpm=100000, relogio=lambda: 1000.0)
+            responder = ResponderPlano(gerar_plano(semanas=4, semanas_por_ciclo=4))
+            usos = []
+
+            def registrar_uso(payload, path, headers):
+                status, corpo, cabecalhos = responder(payload, path, headers)
+                usos.append(corpo["usage"])
+                return status, corpo, cabecalhos
+
+            with MockClaudeServer(responder=registrar_uso) as servidor:
+                treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                                  usar_cache=False, modo_geracao="completo")
+                treinador.limitador_taxa = limitador
+                resultado = treinador.criar_plano_treinamento({"nome": "Ana"})
+
+            self.assertEqual(resultado["plano_principal"]["nome"], "Plano Sintético")
+            saldos = limitador.saldos()
+            self.assertEqual(saldos["rpm"], 50 - len(usos))
+            self.assertEqual(saldos["tpm"], 100000 - sum(tokens_consumidos(u) for u in usos))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Testes para o reparo pelo Claude dos trechos do plano que continuam inválidos.
+
+Este módulo testa:
+- Menor trecho de cada erro e subschema correspondente
+- Correção de um exercício e de uma sessão com uma requisição pequena por trecho
+- Rejeição do plano quando o trecho corrigido continua inválido
+"""
+
+import copy
+import json
+import re
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, criar_resposta_mensagem
+from backend.utils.http_transport import HttpTransport
+from backend.utils.schema_validation import obter_validador, subschema_do_caminho, trecho_do_erro
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+EXERCICIO = {
+    "type": "object",
+    "required": ["nome", "series"],
+    "properties": {"nome": {"type": "string"}, "series": {"type": "integer"}, "repeticoes": {"type": "string"}}
+}
+
+SCHEMA = {
+    "type": "object",
+    "required": ["plano_principal"],
+    "definitions": {"exercicio": EXERCICIO},
+    "properties": {
+        "plano_principal": {
+            "type": "object",
+            "properties": {
+                "nome": {"type": "string"},
+                "sessoes": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["nome", "tipo", "exercicios"],
+                        "properties": {
+                            "nome": {"type": "string"},
+                            "tipo": {"enum": ["força", "cardio"]},
+                            "exercicios": {"type": "array", "items": {"$ref": "#/definitions/exercicio"}}
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+def _plano():
+    exercicios = [{"nome": f"Exercício {i}", "series": 3, "repeticoes": "10"} for i in range(6)]
+    return {"plano_principal": {"nome": "Plano", "sessoes": [
+        {"nome": f"Treino {s}", "tipo": "força", "exercicios": copy.deepcopy(exercicios)} for s in range(4)
+    ]}}
+
+
+class TestTrechoDoErro(unittest.TestCase):
+    """Testes do menor trecho e do subschema."""
+
+    def test_menor_trecho_e_subschema(self):
+        plano = _plano()
+        plano["plano_principal"]["sessoes"][1]["exercicios"][2]["series"] = "três"
+        plano["plano_principal"]["sessoes"][3]["tipo"] = "mobilidade"
+        del plano["plano_principal"]["sessoes"][2]["nome"]
+        plano["plano_principal"]["nome"] = 5
+        erros = obter_validador(SCHEMA).erros(plano)
+
+        self.assertEqual(sorted(trecho_do_erro(e) for e in erros), [
+            ["plano_principal"],
+            ["plano_principal", "sessoes", 1, "exercicios", 2],
+            ["plano_principal", "sessoes", 2],
+            ["plano_principal", "sessoes", 3],
+        ])
+        self.assertEqual(subschema_do_caminho(SCHEMA, ["plano_principal", "sessoes", 1, "exercicios", 2]),
+                         dict(EXERCICIO, definitions=SCHEMA["definitions"]))
+        self.assertIsNone(subschema_do_caminho(SCHEMA, ["plano_principal", "outro"]))
+
+
+class TestReparoTreinador(unittest.TestCase):
+    """Reparo dos trechos inválidos contra o servidor simulado."""
+
+    def setUp(self):
+        self.prompts = []
+        self.correcoes = {}
+
+        def responder(payload, path, headers):
+            prompt = payload["messages"][-1]["content"]
+            self.prompts.append(prompt)
+            trecho = json.loads(re.search(r"Trecho:\s*(\{.*\})", prompt).group(1))
+            for campo, valor in self.correcoes.items():
+                if campo in trecho:
+                    trecho[campo] = valor
+            texto = "```json\n" + json.dumps(trecho, ensure_ascii=False) + "\n```"
+            return 200, criar_resposta_mensagem(texto), {}
+
+        self.servidor = MockClaudeServer(responder=responder).start()
+        self.treinador = TreinadorEspecialista("test-key", api_url=self.servidor.url, transport=HttpTransport(),
+                                               usar_cache=False)
+        self.treinador.schema = SCHEMA
+
+    def tearDown(self):
+        self.servidor.stop()
+
+    def test_repara_exercicio_e_sessao(self):
+        plano = _plano()
+        plano["plano_principal"]["sessoes"][1]["exercicios"][2]["series"] = "três"
+        plano["plano_principal"]["sessoes"][3]["tipo"] = "mobilidade"
+        self.correcoes = {"series": 3, "tipo": "força"}
+        esperado = _plano()
+
+        validado = self.treinador._validar_plano(plano)
+
+        self.assertEqual(validado, esperado)
+        self.assertEqual(len(self.prompts), 2)
+        # Cada requisição leva só o trecho com erro: a sessão vai sem a lista de exercícios
+        self.assertTrue(all(len(prompt) < 1000 for prompt in self.prompts))
+        self.assertNotIn("Exercício 5", self.prompts[1])
+        self.assertIn("tipo: 'mobilidade' is not one of", self.prompts[1])
+
+    def test_trecho_ainda_invalido_rejeita_o_plano(self):
+        plano = _plano()
+        plano["plano_principal"]["sessoes"][0]["tipo"] = "mobilidade"
+        with self.assertRaises(ValueError):
+            self.treinador._validar_plano(plano)
+        self.assertEqual(len(self.prompts), 1)
+        self.assertEqual(plano["plano_principal"]["sessoes"][0]["tipo"], "mobilidade")
+
+    def test_limite_de_trechos(self):
+        self.treinador.config_geracao = dict(self.treinador.config_geracao, reparo_max_trechos=1)
+        plano = _plano()
+        for sessao in plano["plano_principal"]["sessoes"]:
+            sessao["tipo"] = "mobilidade"
+        with self.assertRaises(ValueError):
+            self.treinador._validar_plano(plano)
+        self.assertEqual(self.prompts, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
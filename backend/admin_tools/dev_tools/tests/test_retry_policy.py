@@ -0,0 +1,130 @@
+"""
+Testes para as retentativas e o disjuntor das chamadas ao Claude.
+
+Este módulo testa:
+- Backoff exponencial limitado com jitter e leitura do retry-after
+- Transições do disjuntor (fechado, aberto, meio aberto) publicadas nas métricas
+- Requisição do Treinador Especialista repetida em 529 e recusada com o disjuntor aberto
+"""
+
+import email.utils
+import random
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.llm_metrics import MetricasLLM
+from backend.utils.retry_policy import Disjuntor, PoliticaRetentativa, ler_retry_after
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class TestPoliticaRetentativa(unittest.TestCase):
+    """Testes do cálculo das esperas."""
+
+    def test_backoff_limitado_com_jitter(self):
+        politica = PoliticaRetentativa(max_tentativas=6, espera_base_s=1, espera_max_s=5, aleatorio=random.Random(1))
+        for tentativa, limite in ((1, 1), (2, 2), (3, 4), (4, 5), (5, 5)):
+            esperas = [politica.espera(tentativa) for _ in range(50)]
+            self.assertTrue(all(0 <= e <= limite for e in esperas))
+            self.assertGreater(len(set(esperas)), 1)
+        self.assertIsNone(politica.espera(6))
+
+    def test_retry_after(self):
+        politica = PoliticaRetentativa(retry_after_max_s=30)
+        self.assertEqual(politica.espera(1, retry_after=12), 12)
+        self.assertIsNone(politica.espera(1, retry_after=120))
+        self.assertEqual(ler_retry_after({"Retry-After": "7"}), 7)
+        data = email.utils.formatdate(1_000_010, usegmt=True)
+        self.assertAlmostEqual(ler_retry_after({"retry-after": data}, agora=1_000_000), 10)
+        self.assertIsNone(ler_retry_after({"retry-after": "amanhã"}))
+        self.assertIsNone(ler_retry_after({}))
+
+
+class TestDisjuntor(unittest.TestCase):
+    """Testes das transições do disjuntor."""
+
+    def test_abre_testa_e_fecha(self):
+        relogio = RelogioFalso()
+        metricas = MetricasLLM()
+        disjuntor = Disjuntor("teste", limiar_falhas=2, abertura_s=10, metricas=metricas, relogio=relogio)
+        disjuntor.registrar_falha()
+        self.assertTrue(disjuntor.permitir())
+        disjuntor.registrar_falha()
+        self.assertEqual(disjuntor.estado, "aberto")
+        self.assertFalse(disjuntor.permitir())
+
+        # Passado o tempo de abertura, só uma chamada de teste é liberada; se falhar, reabre
+        relogio.agora = 10
+        self.assertTrue(disjuntor.permitir())
+        self.assertFalse(disjuntor.permitir())
+        disjuntor.registrar_falha()
+        self.assertFalse(disjuntor.permitir())
+
+        relogio.agora = 20
+        self.assertTrue(disjuntor.permitir())
+        disjuntor.registrar_sucesso()
+        self.assertEqual(disjuntor.estado, "fechado")
+        self.assertTrue(disjuntor.permitir())
+
+        contadores = metricas.contadores()
+        self.assertEqual(contadores["estados"]["disjuntor_teste"], "fechado")
+        self.assertEqual(contadores["contadores"]["disjuntor_teste_aberto"], 2)
+        self.assertEqual(contadores["contadores"]["disjuntor_teste_recusadas"], 3)
+
+
+class TestRetentativasTreinador(unittest.TestCase):
+    """Testes das retentativas do treinador contra o servidor simulado."""
+
+    def _treinador(self, servidor, disjuntor):
+        treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                          usar_cache=False, modo_geracao="completo")
+        treinador.metricas = MetricasLLM()
+        treinador.disjuntor = disjuntor
+        treinador.politica_retentativa = PoliticaRetentativa(max_tentativas=3, espera_base_s=0.01)
+        return treinador
+
+    def test_repete_529_e_recebe_o_plano(self):
+        """Um 529 transitório não troca o plano real pelo fallback."""
+        responder = ResponderPlano(gerar_plano(semanas=4, semanas_por_ciclo=4))
+        falhas = iter([(529, {"type": "error", "error": {"type": "overloaded_error"}}, {"retry-after": "0"}),
+                       (503, {"type": "error"}, {})])
+
+        def sobrecarregado(payload, path, headers):
+            return next(falhas, None) or responder(payload, path, headers)
+
+        with MockClaudeServer(responder=sobrecarregado) as servidor:
+            treinador = self._treinador(servidor, Disjuntor(limiar_falhas=5))
+            resultado = treinador.criar_plano_treinamento({"nome": "Ana"})
+            self.assertEqual(servidor.requisicoes, 3)
+
+        self.assertEqual(resultado["plano_principal"]["nome"], "Plano Sintético")
+        registro = treinador.metricas.registros()[-1]
+        self.assertEqual((registro.resultado, registro.tentativas), ("sucesso", 3))
+        self.assertEqual(treinador.metricas.contadores()["contadores"]["retentativas"], 2)
+
+    def test_disjuntor_aberto_usa_plano_local_sem_rede(self):
+        """Com o provedor fora do ar, o disjuntor abre e as chamadas seguintes não chegam ao servidor."""
+        with MockClaudeServer(responder=lambda p, c, h: (529, {"type": "error"}, {})) as servidor:
+            treinador = self._treinador(servidor, Disjuntor(limiar_falhas=3, abertura_s=60))
+            primeiro = treinador.criar_plano_treinamento({"nome": "Ana"})
+            self.assertEqual(servidor.requisicoes, 3)
+            segundo = treinador.criar_plano_treinamento({"nome": "Bruno"})
+            self.assertEqual(servidor.requisicoes, 3)
+
+        self.assertEqual(primeiro["geracao"], {"origem": "regras_locais", "motivo": "erro_api"})
+        self.assertEqual(segundo["geracao"], {"origem": "regras_locais", "motivo": "circuito_aberto"})
+        contadores = treinador.metricas.contadores()["contadores"]
+        self.assertEqual((contadores["planos_locais_erro_api"], contadores["planos_locais_circuito_aberto"]), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
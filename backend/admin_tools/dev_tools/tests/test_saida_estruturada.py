@@ -0,0 +1,81 @@
+"""
+Testes para a saída estruturada (chamada de ferramenta) do Treinador Especialista.
+
+Este módulo testa:
+- Definição da ferramenta a partir do schema do plano, sem os metadados locais
+- Plano recebido como entrada da ferramenta, sem extração de texto
+- Volta para a resposta em texto quando a chamada da ferramenta não é utilizável
+"""
+
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano, criar_resposta_mensagem
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.wrappers.treinador_especialista import TreinadorEspecialista, NOME_FERRAMENTA_PLANO
+
+
+class TestSaidaEstruturada(unittest.TestCase):
+    """Testes do modo de saída estruturada contra o servidor simulado."""
+
+    def _treinador(self, servidor):
+        return TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                     usar_cache=False, modo_geracao="completo", saida_estruturada=True)
+
+    def test_ferramenta_sem_metadados(self):
+        """O input_schema da ferramenta não pede os campos preenchidos localmente."""
+        treinador = TreinadorEspecialista("test-key", usar_cache=False)
+        schema = {
+            "type": "object",
+            "required": ["treinamento_id", "usuario", "plano_principal"],
+            "properties": {
+                "treinamento_id": {"type": "string"},
+                "usuario": {"type": "object", "required": ["id", "nome"], "properties": {"id": {}, "nome": {}}},
+                "plano_principal": {"type": "object"}
+            }
+        }
+        entrada = treinador._definir_ferramenta_plano(schema)["input_schema"]
+        self.assertEqual(entrada["required"], ["usuario", "plano_principal"])
+        self.assertNotIn("treinamento_id", entrada["properties"])
+        self.assertEqual(entrada["properties"]["usuario"]["required"], ["nome"])
+        self.assertIn("treinamento_id", schema["properties"])
+
+    def test_plano_recebido_pela_ferramenta(self):
+        """A requisição força a ferramenta e o plano é usado sem extração de texto."""
+        plano = gerar_plano(semanas=4, semanas_por_ciclo=4)
+        payloads = []
+        responder = ResponderPlano(plano)
+
+        def registrar(payload, path, headers):
+            payloads.append(payload)
+            return responder(payload, path, headers)
+
+        with MockClaudeServer(responder=registrar) as servidor:
+            treinador = self._treinador(servidor)
+            resultado = treinador.criar_plano_treinamento({"id": "user123", "nome": "Ana"})
+
+        self.assertEqual(len(payloads), 1)
+        self.assertEqual(payloads[0]["tool_choice"], {"type": "tool", "name": NOME_FERRAMENTA_PLANO})
+        self.assertNotIn("```json", payloads[0]["messages"][0]["content"])
+        self.assertNotIn("geracao", resultado)
+        self.assertEqual(resultado["plano_principal"]["nome"], "Plano Sintético")
+        self.assertEqual(resultado["usuario"]["id"], "user123")
+
+    def test_sem_ferramenta_usa_texto(self):
+        """Se a resposta não traz a chamada da ferramenta, o plano é pedido como JSON em texto."""
+        plano = gerar_plano(semanas=4, semanas_por_ciclo=4)
+        responder = ResponderPlano(plano)
+
+        def ignorar_ferramenta(payload, path, headers):
+            if payload.get("tools"):
+                return 200, criar_resposta_mensagem("Não consigo."), {}
+            return responder(payload, path, headers)
+
+        with MockClaudeServer(responder=ignorar_ferramenta) as servidor:
+            resultado = self._treinador(servidor).criar_plano_treinamento({"nome": "Ana"})
+            self.assertEqual(servidor.requisicoes, 2)
+        self.assertEqual(resultado["plano_principal"]["nome"], "Plano Sintético")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Testes para a validação de schema compilada.
+
+Este módulo testa:
+- Reutilização do validador compilado por schema
+- Coleta de todos os erros em uma única passada
+- Reparos direcionados (strings numéricas, nulos e campos obrigatórios)
+- Rejeição de planos com erros não reparáveis pelo TreinadorEspecialista
+"""
+
+import unittest
+
+from backend.utils.schema_validation import obter_validador, validar_e_reparar
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+SCHEMA = {
+    "type": "object",
+    "required": ["plano_principal"],
+    "properties": {
+        "plano_principal": {
+            "type": "object",
+            "required": ["nome", "duracao_semanas", "ciclos"],
+            "properties": {
+                "nome": {"type": "string"},
+                "duracao_semanas": {"type": "integer"},
+                "frequencia_semanal": {"type": "integer"},
+                "ciclos": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["ciclo_id", "ordem"],
+                        "properties": {"ciclo_id": {"type": "string"}, "ordem": {"type": "integer"}}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+def _plano():
+    return {
+        "plano_principal": {
+            "nome": "Plano",
+            "duracao_semanas": 12,
+            "frequencia_semanal": 3,
+            "ciclos": [{"ciclo_id": "C1", "ordem": 1}, {"ciclo_id": "C2", "ordem": 2}]
+        }
+    }
+
+
+class TestValidacaoCompilada(unittest.TestCase):
+    """Testes para o validador compilado e o reparo direcionado."""
+
+    def test_validador_reutilizado_por_schema(self):
+        """O mesmo objeto de schema deve reutilizar o validador já construído."""
+        self.assertIs(obter_validador(SCHEMA), obter_validador(SCHEMA))
+        self.assertIsNot(obter_validador(SCHEMA), obter_validador(dict(SCHEMA)))
+
+    def test_todos_os_erros_em_uma_passada(self):
+        """Todos os erros devem ser coletados de uma vez e reparados no local."""
+        plano = _plano()
+        plano["plano_principal"]["duracao_semanas"] = "16"
+        plano["plano_principal"]["frequencia_semanal"] = None
+        plano["plano_principal"]["ciclos"][1]["ordem"] = " 2"
+        del plano["plano_principal"]["ciclos"][0]["ciclo_id"]
+
+        erros, correcoes, restantes = validar_e_reparar(plano, SCHEMA)
+
+        self.assertEqual(len(erros), 4)
+        self.assertEqual(len(correcoes), 4)
+        self.assertEqual(restantes, [])
+        principal = plano["plano_principal"]
+        self.assertEqual(principal["duracao_semanas"], 16)
+        self.assertEqual(principal["frequencia_semanal"], 3)
+        self.assertEqual(principal["ciclos"][1]["ordem"], 2)
+        self.assertIsInstance(principal["ciclos"][0]["ciclo_id"], str)
+
+    def test_plano_valido_nao_e_alterado(self):
+        """Um plano válido não gera correções nem revalidação."""
+        plano = _plano()
+        self.assertEqual(validar_e_reparar(plano, SCHEMA), ([], [], []))
+        self.assertEqual(plano, _plano())
+
+    def test_erros_nao_reparaveis_sao_mantidos(self):
+        """Valores sem conversão segura devem permanecer como erro."""
+        plano = _plano()
+        plano["plano_principal"]["duracao_semanas"] = "doze"
+        plano["plano_principal"]["ciclos"][0]["ordem"] = "1"
+
+        erros, correcoes, restantes = validar_e_reparar(plano, SCHEMA)
+
+        self.assertEqual(len(erros), 2)
+        self.assertEqual(len(correcoes), 1)
+        self.assertEqual([list(e.absolute_path) for e in restantes], [["plano_principal", "duracao_semanas"]])
+
+    def test_treinador_rejeita_plano_invalido(self):
+        """O TreinadorEspecialista deve levantar ValueError quando restarem erros."""
+        # Sem chave de API o trecho não é enviado ao Claude para reparo
+        treinador = TreinadorEspecialista("", usar_cache=False)
+        treinador.schema = SCHEMA
+        plano = _plano()
+        plano["plano_principal"]["ciclos"] = "nenhum"
+
+        with self.assertRaises(ValueError):
+            treinador._validar_plano(plano)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Testes para o agrupamento de gerações idênticas simultâneas (single-flight).
+
+Este módulo testa:
+- Execução única por chave, com resultado e exceção entregues a todas as chamadas
+- Pedidos idênticos simultâneos ao Treinador Especialista pagando uma única geração
+"""
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, ResponderPlano
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.llm_metrics import MetricasLLM
+from backend.utils.single_flight import GrupoVoo
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+
+class TestGrupoVoo(unittest.TestCase):
+    """Testes da execução única por chave."""
+
+    def test_chamadas_simultaneas_executam_uma_vez(self):
+        grupo = GrupoVoo()
+        execucoes = []
+        liberar = threading.Event()
+
+        def lenta():
+            execucoes.append(1)
+            liberar.wait(2)
+            return "plano"
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futuros = [executor.submit(grupo.executar, "a", lenta) for _ in range(4)]
+            while grupo._voos.get("a") is None or grupo._voos["a"].seguidores < 3:
+                time.sleep(0.01)
+            liberar.set()
+            resultados = [futuro.result() for futuro in futuros]
+
+        self.assertEqual(len(execucoes), 1)
+        self.assertEqual(sorted(compartilhado for _, compartilhado in resultados), [False, True, True, True])
+        self.assertEqual({resultado for resultado, _ in resultados}, {"plano"})
+        self.assertEqual(grupo.em_andamento(), 0)
+
+        # Terminada a execução, a mesma chave executa de novo
+        self.assertEqual(grupo.executar("a", lambda: "novo"), ("novo", False))
+
+    def test_erro_do_lider_chega_aos_seguidores(self):
+        grupo = GrupoVoo()
+        iniciou = threading.Event()
+        liberar = threading.Event()
+
+        def falha():
+            iniciou.set()
+            liberar.wait(2)
+            raise ValueError("API indisponível")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            lider = executor.submit(grupo.executar, "a", falha)
+            iniciou.wait(2)
+            seguidor = executor.submit(grupo.executar, "a", lambda: "nunca")
+            while grupo._voos["a"].seguidores < 1:
+                time.sleep(0.01)
+            liberar.set()
+            for futuro in (lider, seguidor):
+                with self.assertRaises(ValueError):
+                    futuro.result()
+
+
+class TestAgrupamentoTreinador(unittest.TestCase):
+    """Pedidos idênticos simultâneos ao treinador."""
+
+    def test_pedidos_duplicados_pagam_uma_geracao(self):
+        """Duplo envio do questionário: uma requisição à API e planos com identidades distintas."""
+        dados = {"nivel": "iniciante", "dias_disponiveis": ["segunda", "quarta"], "objetivo": "força"}
+        metricas = MetricasLLM()
+
+        def gerar(indice):
+            treinador = TreinadorEspecialista("test-key", api_url=servidor.url, transport=HttpTransport(),
+                                              usar_cache=False, modo_geracao="completo")
+            treinador.metricas = metricas
+            # Mesmo questionário com outra ordem dos dias e outro usuário
+            dias = list(reversed(dados["dias_disponiveis"])) if indice % 2 else dados["dias_disponiveis"]
+            return treinador.criar_plano_treinamento(dict(dados, dias_disponiveis=dias, id=f"user{indice}",
+                                                          nome=f"Atleta {indice}"))
+
+        responder = ResponderPlano(gerar_plano(semanas=4, semanas_por_ciclo=4))
+        with MockClaudeServer(responder=responder, latencia=0.3) as servidor:
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                planos = list(executor.map(gerar, range(5)))
+            requisicoes = servidor.requisicoes
+
+        self.assertEqual(requisicoes, 1)
+        self.assertEqual(len({p["treinamento_id"] for p in planos}), 5)
+        self.assertEqual([p["usuario"]["id"] for p in planos], [f"user{i}" for i in range(5)])
+        ids_sessoes = [
+            {s["sessao_id"] for c in p["plano_principal"]["ciclos"] for m in c["microciclos"] for s in m["sessoes"]}
+            for p in planos
+        ]
+        self.assertTrue(all(ids.isdisjoint(outros) for i, ids in enumerate(ids_sessoes) for outros in ids_sessoes[i + 1:]))
+        self.assertEqual(metricas.contadores()["contadores"]["planos_coalescidos"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Testes para a guarda estrutural da saída em streaming.
+
+Este módulo testa:
+- Prefixos válidos aceitos e prosa, chaves e aninhamentos errados recusados
+- Cancelamento do stream logo no início, nova tentativa e plano pelas regras locais
+- Requisição única em streaming passando pela guarda
+"""
+
+import json
+import time
+import unittest
+
+from backend.admin_tools.dev_tools.mock_claude_server import MockClaudeServer, criar_resposta_mensagem
+from backend.admin_tools.dev_tools.planos_sinteticos import gerar_plano
+from backend.utils.http_transport import HttpTransport
+from backend.utils.stream_guard import GuardaEstrutural, SaidaIrrecuperavelError
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "treinamento_id": {"type": "string"},
+        "usuario": {"type": "object", "properties": {"nome": {"type": "string"}, "idade": {"type": "integer"},
+                                                     "objetivos": {"type": "array"}}},
+        "plano_principal": {"type": "object", "properties": {
+            "nome": {"type": "string"},
+            "ciclos": {"type": "array", "items": {"type": "object", "properties": {
+                "microciclos": {"type": "array", "items": {"type": "object"}}}}}}}
+    }
+}
+
+PLANO = gerar_plano(semanas=4, semanas_por_ciclo=4)
+
+
+def _alimentar(texto, tamanho=7):
+    guarda = GuardaEstrutural(SCHEMA, max_preambulo=50)
+    parser = guarda.criar_parser()
+    for inicio in range(0, len(texto), tamanho):
+        parser.alimentar(texto[inicio:inicio + tamanho])
+        guarda.verificar(parser)
+    return parser
+
+
+class TestGuarda(unittest.TestCase):
+    """Testes da guarda sobre prefixos da saída."""
+
+    def test_prefixos_validos(self):
+        texto = "Aqui está o plano:\n```json\n" + json.dumps(PLANO, ensure_ascii=False, indent=2) + "\n```"
+        self.assertTrue(_alimentar(texto).completo)
+        # Tipos primitivos trocados são corrigidos depois, pela validação com reparo
+        _alimentar('{"usuario": {"idade": "30", "objetivos": [')
+
+    def test_prefixos_irrecuperaveis(self):
+        invalidos = {
+            "prosa": "Desculpe, mas antes de montar o plano preciso de mais informações sobre " * 2,
+            "chave da raiz": '{"plano": {"nome": "Plano"',
+            "aninhamento": '{"plano_principal": {"usuario": {',
+            "objeto esperado": '{"treinamento_id": "", "plano_principal": [',
+            "lista esperada": '{"plano_principal": {"ciclos": {"nome": ',
+            "semana": '{"plano_principal": {"ciclos": [{"microciclos": ["semana 1"',
+            "fechamento": '{"usuario": {"objetivos": [}',
+        }
+        for caso, texto in invalidos.items():
+            with self.subTest(caso):
+                with self.assertRaises(SaidaIrrecuperavelError):
+                    _alimentar(texto)
+
+
+class TestGuardaTreinador(unittest.TestCase):
+    """Cancelamento do stream contra o servidor simulado."""
+
+    def setUp(self):
+        self.textos = []
+        self.requisicoes = []
+
+        def responder(payload, path, headers):
+            self.requisicoes.append(bool(payload.get("stream")))
+            return 200, criar_resposta_mensagem(self.textos[min(len(self.requisicoes), len(self.textos)) - 1]), {}
+
+        self.servidor = MockClaudeServer(responder=responder, tamanho_pedaco=32, atraso_pedaco=0.002).start()
+        self.treinador = TreinadorEspecialista("test-key", api_url=self.servidor.url, transport=HttpTransport(),
+                                               usar_cache=False, modo_geracao="completo", saida_estruturada=False)
+        self.treinador.config_geracao = dict(self.treinador.config_geracao, max_tokens_por_sessoes={7: 100000},
+                                             guarda_retentativas=1)
+
+    def tearDown(self):
+        self.servidor.stop()
+
+    def test_cancela_e_usa_regras_locais(self):
+        # Sem a guarda, cada resposta levaria mais de 1 segundo para chegar inteira
+        errado = json.dumps({"plano": PLANO["plano_principal"]}, ensure_ascii=False, indent=2)
+        self.assertGreater(len(errado) / 32 * 0.002, 1.0)
+        self.textos = [errado]
+
+        inicio = time.perf_counter()
+        eventos = list(self.treinador.criar_plano_treinamento_stream({"id": "user123", "nome": "Ana"}))
+        duracao = time.perf_counter() - inicio
+
+        self.assertEqual(self.requisicoes, [True, True])
+        self.assertLess(duracao, 1.0)
+        self.assertEqual(eventos[-1]["tipo"], "plano")
+        self.assertEqual(eventos[-1]["dados"]["geracao"], {"origem": "regras_locais", "motivo": "saida_abortada"})
+        self.assertLess(self.servidor.eventos_enviados, len(errado) / 32 / 2)
+
+    def test_nova_tentativa_aproveitada(self):
+        valido = "```json\n" + json.dumps(PLANO, ensure_ascii=False) + "\n```"
+        self.textos = ["Não posso ajudar com isso. " * 20, valido]
+        self.treinador.config_geracao = dict(self.treinador.config_geracao, stream_requisicao_unica=True)
+
+        plano = self.treinador.criar_plano_treinamento({"id": "user123", "nome": "Ana"})
+
+        self.assertEqual(self.requisicoes, [True, True])
+        self.assertEqual(plano["plano_principal"]["nome"], PLANO["plano_principal"]["nome"])
+        self.assertNotIn("geracao", plano)
+
+
+if __name__ == '__main__':
+    unittest.main()
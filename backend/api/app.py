@@ -123,7 +123,8 @@ def criar_plano_teste():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 # Função para executar o pipeline completo de treinamento
-def run_training_pipeline(api_key: str, user_data: Dict[str, Any], db_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def run_training_pipeline(api_key: str, user_data: Dict[str, Any], db_config: Optional[Dict[str, Any]] = None,
+                          streaming: bool = False) -> Dict[str, Any]:
     """
     Execute the complete training pipeline using all three wrappers.
     
@@ -131,6 +132,7 @@ def run_training_pipeline(api_key: str, user_data: Dict[str, Any], db_config: Op
         api_key (str): Claude API key
         user_data (dict): User data for generating the training plan
         db_config (dict, optional): Database configuration
+        streaming (bool): Adapt each week as soon as it is streamed (steps 1 and 2 overlap)
         
     Returns:
         dict: Result of the pipeline execution
@@ -168,7 +170,14 @@ def run_training_pipeline(api_key: str, user_data: Dict[str, Any], db_config: Op
         logger.info("ETAPA 1: Gerando plano de treinamento principal")
         inicio_etapa1 = time.time()
         
-        plano_principal = treinador.criar_plano_treinamento(user_data)
+        plano_adaptado = None
+        if streaming:
+            # As semanas são adaptadas enquanto o restante do plano ainda é gerado
+            logger.info("Modo streaming: etapas 1 e 2 executadas em paralelo")
+            plano_adaptado = adaptador.processar_plano_stream(treinador.criar_plano_treinamento_stream(user_data))
+            plano_principal = {chave: valor for chave, valor in plano_adaptado.items() if chave != "adaptacoes"}
+        else:
+            plano_principal = treinador.criar_plano_treinamento(user_data)
         
         tempo_etapa1 = time.time() - inicio_etapa1
         logger.info(f"Plano principal gerado com sucesso em {tempo_etapa1:.2f} segundos")
@@ -186,7 +195,8 @@ def run_training_pipeline(api_key: str, user_data: Dict[str, Any], db_config: Op
         logger.info("ETAPA 2: Criando adaptações do treinamento")
         inicio_etapa2 = time.time()
         
-        plano_adaptado = adaptador.processar_plano(plano_principal)
+        if plano_adaptado is None:
+            plano_adaptado = adaptador.processar_plano(plano_principal)
         
         tempo_etapa2 = time.time() - inicio_etapa2
         logger.info(f"Adaptações criadas com sucesso em {tempo_etapa2:.2f} segundos")
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# Geração de Planos em Lote para Cadastro em Massa #
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.wrappers.treinador_especialista import TreinadorEspecialista
+from backend.utils.batch_channel import (
+    CanalLoteAnthropic, CanalLoteLocal, LOTE_ENCERRADO, LoteNaoEncontradoError, RESULTADO_LOTE_SUCESSO, ResultadoLote,
+    url_lotes
+)
+from backend.utils.config import get_batch_config, get_claude_config
+from backend.utils.llm_metrics import resumir_valores
+from backend.utils.logger import WrapperLogger
+
+# Estados de cada usuário no arquivo de progresso
+ESTADO_SUBMETIDO = "submetido"
+ESTADO_CONCLUIDO = "concluido"
+ESTADO_FALHOU = "falhou"
+
+# A API de lotes aceita até 64 caracteres [a-zA-Z0-9_-] no custom_id
+_CARACTERES_INVALIDOS_ID = re.compile(r"[^a-zA-Z0-9_-]")
+
+
+def ler_usuarios(caminho: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lê os dados dos usuários de um arquivo JSONL (um objeto por linha; linhas vazias são ignoradas).
+
+    Raises:
+        ValueError: Linha que não contém um objeto JSON
+    """
+    with open(caminho, "r", encoding="utf-8") as f:
+        for numero, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            dados = json.loads(linha)
+            if not isinstance(dados, dict):
+                raise ValueError(f"Linha {numero} de {caminho} não é um objeto JSON")
+            yield dados
+
+
+def atribuir_ids(usuarios: Iterable[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Atribui a cada usuário o custom_id do lote: o "id" do usuário normalizado, ou a posição
+    no arquivo quando não houver id; repetições recebem um sufixo. Os IDs são estáveis entre
+    execuções com o mesmo arquivo, o que permite retomar o progresso.
+    """
+    vistos: Dict[str, int] = {}
+    resultado = []
+    for indice, dados in enumerate(usuarios, start=1):
+        base = _CARACTERES_INVALIDOS_ID.sub("_", str(dados.get("id") or f"usuario-{indice}"))[:56]
+        vistos[base] = vistos.get(base, 0) + 1
+        resultado.append((base if vistos[base] == 1 else f"{base}-{vistos[base]}", dados))
+    return resultado
+
+
+class ProgressoLote:
+    """
+    Progresso da geração em lote, gravado em um arquivo JSONL só de acréscimos.
+
+    Cada linha registra a mudança de estado de um usuário (submetido, com o ID do lote;
+    concluido, com o treinamento_id; falhou, com o erro). Ao reabrir o arquivo, o último
+    estado de cada usuário é recuperado: concluídos são pulados e os submetidos voltam a
+    ser acompanhados no lote original enquanto o canal o conhecer.
+    """
+
+    def __init__(self, caminho: Optional[str] = None):
+        """
+        Args:
+            caminho (str, optional): Arquivo de progresso; sem ele o progresso fica só na memória
+        """
+        self.caminho = caminho
+        self.estados: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if caminho and os.path.exists(caminho):
+            with open(caminho, "r", encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except json.JSONDecodeError:
+                        # Última linha cortada por uma interrupção durante a escrita
+                        continue
+                    self.estados[registro["custom_id"]] = registro
+
+    def estado(self, custom_id: str) -> Optional[Dict[str, Any]]:
+        """Último registro do usuário ou None."""
+        with self._lock:
+            return self.estados.get(custom_id)
+
+    def registrar(self, custom_id: str, estado: str, **dados: Any) -> None:
+        """Registra o novo estado do usuário e o acrescenta ao arquivo."""
+        registro = {"custom_id": custom_id, "estado": estado, "instante": time.time(), **dados}
+        with self._lock:
+            self.estados[custom_id] = registro
+            if self.caminho:
+                with open(self.caminho, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+
+class GeradorLote:
+    """
+    Gera os planos de muitos usuários por um canal de lotes e encaminha cada plano
+    concluído às etapas 2 (adaptação) e 3 (banco de dados).
+
+    Os usuários são submetidos em lotes de tamanho_lote; enquanto os lotes seguintes
+    são processados, os planos dos lotes encerrados já seguem para as etapas 2 e 3 em
+    um pool de threads. Planos do cache não passam pelo lote, e requisições que falham
+    no lote são refeitas individualmente por criar_plano_treinamento.
+    """
+
+    def __init__(self, treinador: TreinadorEspecialista, canal: Any, adaptador: Any = None, distribuidor: Any = None,
+                 progresso: Optional[ProgressoLote] = None, tamanho_lote: Optional[int] = None,
+                 intervalo_consulta_s: Optional[float] = None, workers_etapas: Optional[int] = None):
+        """
+        Args:
+            treinador (TreinadorEspecialista): Treinador que prepara as requisições e conclui os planos
+            canal: CanalLoteLocal, CanalLoteAnthropic ou outro objeto com submeter, consultar e resultados
+            adaptador (SistemaAdaptacao, optional): Etapa 2; sem ele o plano segue sem adaptações
+            distribuidor (DistribuidorBD, optional): Etapa 3; sem ele os planos não são gravados
+            progresso (ProgressoLote, optional): Progresso retomável; por padrão fica na memória
+            tamanho_lote (int, optional): Requisições por lote; por padrão BATCH_SIZE
+            intervalo_consulta_s (float, optional): Espera entre as consultas; por padrão BATCH_POLL_INTERVAL
+            workers_etapas (int, optional): Planos processados em paralelo nas etapas 2 e 3
+        """
+        config = get_batch_config()
+        self.logger = WrapperLogger("GeradorLote")
+        self.treinador = treinador
+        self.canal = canal
+        self.adaptador = adaptador
+        self.distribuidor = distribuidor
+        self.progresso = progresso or ProgressoLote()
+        self.tamanho_lote = max(1, tamanho_lote or config["tamanho_lote"])
+        self.intervalo_consulta_s = config["intervalo_consulta_s"] if intervalo_consulta_s is None else intervalo_consulta_s
+        self.workers_etapas = max(1, workers_etapas or config["workers_etapas"])
+
+    def executar(self, usuarios: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Gera os planos de todos os usuários.
+
+        Args:
+            usuarios (Iterable[Dict]): Dados de cada usuário, como em criar_plano_treinamento
+
+        Returns:
+            Dict: Relatório de vazão (contagens, duração, planos por minuto e latências)
+        """
+        inicio = time.perf_counter()
+        contagem = {"usuarios": 0, "pulados": 0, "concluidos": 0, "falhas": 0, "sem_lote": 0,
+                    "individuais": 0, "lotes": 0, "lotes_retomados": 0}
+        latencias_etapas: List[float] = []
+        conclusoes: List[float] = []
+        lock = threading.Lock()
+        pendentes: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        abertos: Dict[str, List[str]] = {}
+        enviados = set()
+        futuros: List[Future] = []
+
+        def encaminhar(custom_id: str, plano: Dict[str, Any]) -> None:
+            inicio_etapas = time.perf_counter()
+            try:
+                resultado = self._etapas_2_e_3(plano)
+            except Exception as e:
+                self.logger.error(f"Etapas 2 e 3 falharam para {custom_id}: {str(e)}")
+                self.progresso.registrar(custom_id, ESTADO_FALHOU, erro=str(e))
+                with lock:
+                    contagem["falhas"] += 1
+                return
+            self.progresso.registrar(custom_id, ESTADO_CONCLUIDO, treinamento_id=plano.get("treinamento_id"),
+                                     resultado_db=(resultado or {}).get("status"))
+            with lock:
+                contagem["concluidos"] += 1
+                latencias_etapas.append(time.perf_counter() - inicio_etapas)
+                conclusoes.append(time.perf_counter() - inicio)
+
+        with ThreadPoolExecutor(max_workers=self.workers_etapas, thread_name_prefix="lote_etapas") as etapas:
+            def concluir(custom_id: str, dados: Dict[str, Any], parametros: Optional[Dict[str, Any]],
+                         resultado: Optional[ResultadoLote]) -> None:
+                try:
+                    if resultado is not None and resultado.tipo == RESULTADO_LOTE_SUCESSO:
+                        plano = self.treinador.finalizar_resposta_lote(dados, parametros, resultado.mensagem)
+                    else:
+                        self.logger.warning(f"Requisição {custom_id} falhou no lote "
+                                            f"({resultado.erro if resultado else 'sem resultado'}), gerando individualmente")
+                        with lock:
+                            contagem["individuais"] += 1
+                        plano = self.treinador.criar_plano_treinamento(dados)
+                except Exception as e:
+                    self.logger.error(f"Plano de {custom_id} não gerado: {str(e)}")
+                    self.progresso.registrar(custom_id, ESTADO_FALHOU, erro=str(e))
+                    with lock:
+                        contagem["falhas"] += 1
+                    return
+                futuros.append(etapas.submit(encaminhar, custom_id, plano))
+
+            def submeter() -> None:
+                lote = [{"custom_id": custom_id, "params": parametros}
+                        for custom_id, (_, parametros) in pendentes.items() if custom_id not in enviados]
+                if not lote:
+                    return
+                lote_id = self.canal.submeter(lote)
+                contagem["lotes"] += 1
+                abertos[lote_id] = [r["custom_id"] for r in lote]
+                for requisicao in lote:
+                    enviados.add(requisicao["custom_id"])
+                    self.progresso.registrar(requisicao["custom_id"], ESTADO_SUBMETIDO, lote_id=lote_id)
+                self.logger.info(f"Lote {lote_id} submetido com {len(lote)} requisições")
+
+            for custom_id, dados in atribuir_ids(usuarios):
+                contagem["usuarios"] += 1
+                anterior = self.progresso.estado(custom_id)
+                if anterior and anterior["estado"] == ESTADO_CONCLUIDO:
+                    contagem["pulados"] += 1
+                    continue
+                plano, parametros = self.treinador.preparar_requisicao_lote(dados)
+                if plano is not None:
+                    contagem["sem_lote"] += 1
+                    futuros.append(etapas.submit(encaminhar, custom_id, plano))
+                    continue
+                pendentes[custom_id] = (dados, parametros)
+                if anterior and anterior["estado"] == ESTADO_SUBMETIDO and self._lote_conhecido(anterior["lote_id"]):
+                    # Retomada: o lote da execução anterior ainda existe no canal
+                    if anterior["lote_id"] not in abertos:
+                        contagem["lotes_retomados"] += 1
+                    abertos.setdefault(anterior["lote_id"], []).append(custom_id)
+                    enviados.add(custom_id)
+                elif len(pendentes) - len(enviados) >= self.tamanho_lote:
+                    submeter()
+            submeter()
+
+            while abertos:
+                encerrados = [lote_id for lote_id in list(abertos)
+                              if self.canal.consultar(lote_id).get("processing_status") == LOTE_ENCERRADO]
+                if not encerrados:
+                    time.sleep(self.intervalo_consulta_s)
+                    continue
+                for lote_id in encerrados:
+                    ids_lote = abertos.pop(lote_id)
+                    recebidos = set()
+                    for resultado in self.canal.resultados(lote_id):
+                        if resultado.custom_id in pendentes:
+                            recebidos.add(resultado.custom_id)
+                            dados, parametros = pendentes[resultado.custom_id]
+                            concluir(resultado.custom_id, dados, parametros, resultado)
+                    for custom_id in ids_lote:
+                        if custom_id not in recebidos:
+                            concluir(custom_id, pendentes[custom_id][0], None, None)
+
+            for futuro in futuros:
+                futuro.result()
+
+        duracao = time.perf_counter() - inicio
+        relatorio = dict(contagem)
+        relatorio["duracao_s"] = round(duracao, 3)
+        relatorio["planos_por_minuto"] = round(contagem["concluidos"] / duracao * 60, 2) if duracao else 0.0
+        for nome, valores in (("etapas_2_e_3_s", latencias_etapas), ("conclusao_s", conclusoes)):
+            resumo = resumir_valores(valores, (1, 10, 60))
+            resumo.pop("histograma")
+            relatorio[nome] = resumo
+        self.logger.info(f"Lote concluído: {contagem['concluidos']} planos, {contagem['falhas']} falhas, "
+                         f"{contagem['pulados']} já concluídos, {relatorio['planos_por_minuto']} planos/min")
+        return relatorio
+
+    def _lote_conhecido(self, lote_id: Optional[str]) -> bool:
+        if not lote_id:
+            return False
+        try:
+            self.canal.consultar(lote_id)
+            return True
+        except LoteNaoEncontradoError:
+            return False
+
+    def _etapas_2_e_3(self, plano: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Adapta o plano (etapa 2) e o distribui no banco de dados (etapa 3)."""
+        plano_adaptado = self.adaptador.processar_plano(plano) if self.adaptador is not None else plano
+        if self.distribuidor is None:
+            return None
+        return self.distribuidor.processar_plano(plano_adaptado)
+
+
+def criar_canal(treinador: TreinadorEspecialista, tipo: Optional[str] = None) -> Any:
+    """
+    Cria o canal de lotes configurado.
+
+    Args:
+        treinador (TreinadorEspecialista): Treinador cujas credenciais e requisições o canal usa
+        tipo (str, optional): "local" ou "anthropic"; por padrão BATCH_CHANNEL
+
+    Returns:
+        CanalLoteLocal ou CanalLoteAnthropic
+    """
+    config = get_batch_config()
+    tipo = (tipo or config["canal"]).lower()
+    if tipo == "anthropic":
+        return CanalLoteAnthropic(treinador.api_key, url_lotes(treinador.api_url))
+    if tipo != "local":
+        raise ValueError(f"Canal de lotes desconhecido: {tipo} (use local ou anthropic)")
+    return CanalLoteLocal(treinador.executar_requisicao_lote, max_workers=config["workers_locais"])
+
+
+def main() -> int:
+    """Função principal para execução via linha de comando."""
+    parser = argparse.ArgumentParser(description="Geração de planos em lote para cadastro em massa")
+    parser.add_argument("usuarios", help="Arquivo JSONL com os dados de um usuário por linha")
+    parser.add_argument("--progresso", help="Arquivo de progresso (padrão: <usuarios>.progresso.jsonl)")
+    parser.add_argument("--relatorio", help="Arquivo para salvar o relatório de vazão em formato JSON")
+    parser.add_argument("--canal", choices=["local", "anthropic"], help="Canal de lotes (padrão: BATCH_CHANNEL)")
+    parser.add_argument("--tamanho-lote", type=int, help="Requisições por lote (padrão: BATCH_SIZE)")
+    parser.add_argument("--simulacao", action="store_true", help="Etapa 3 em modo de simulação, sem gravar no banco")
+    parser.add_argument("--verbose", action="store_true", help="Exibir informações detalhadas durante a execução")
+    args = parser.parse_args()
+
+    # As etapas 2 e 3 só são importadas aqui: o distribuidor depende do cliente do Supabase
+    from backend.wrappers.sistema_adaptacao_treino import SistemaAdaptacao
+    from backend.wrappers.distribuidor_treinos import DistribuidorBD
+
+    config_claude = get_claude_config()
+    treinador = TreinadorEspecialista(config_claude["api_key"], api_url=config_claude["api_url"])
+    if args.verbose:
+        treinador.logger.set_level("DEBUG")
+    canal = criar_canal(treinador, args.canal)
+    gerador = GeradorLote(treinador, canal, adaptador=SistemaAdaptacao(),
+                          distribuidor=DistribuidorBD(modo_simulacao=args.simulacao),
+                          progresso=ProgressoLote(args.progresso or f"{args.usuarios}.progresso.jsonl"),
+                          tamanho_lote=args.tamanho_lote)
+    try:
+        relatorio = gerador.executar(ler_usuarios(args.usuarios))
+    finally:
+        canal.fechar()
+
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    return 0 if relatorio["falhas"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
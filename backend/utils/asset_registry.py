@@ -0,0 +1,295 @@
+# Registro de Recursos (Prompts, Templates JSON e Schemas) #
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .logger import WrapperLogger
+from .config import get_asset_registry_config
+from .path_resolver import get_prompt_path, get_schema_path, get_template_path
+
+# Nome lógico -> (tipo, arquivo)
+RECURSOS_PADRAO: Dict[str, Tuple[str, str]] = {
+    "prompt_treinador": ("prompt", "PROMPT DO TREINADOR ESPECIALISTA.txt"),
+    "prompt_adaptacao": ("prompt", "Prompt Sistema de Adaptação.txt"),
+    "template_wrapper1": ("template", "JSON para Wrapper 1 Treinador.txt"),
+    "template_wrapper2": ("template", "JSON para Wrapper 2 Sistema.txt"),
+    "template_wrapper3": ("template", "JSON para Wrapper 3 Distribuidor.txt"),
+    "schema_wrapper1": ("schema", "schema_wrapper1.json"),
+    "schema_wrapper2": ("schema", "schema_wrapper2.json"),
+    "schema_wrapper3": ("schema", "schema_wrapper3.json"),
+}
+
+_RESOLVEDORES: Dict[str, Callable[[str], str]] = {
+    "prompt": get_prompt_path,
+    "template": get_template_path,
+    "schema": get_schema_path,
+}
+
+
+def _imutavel(*args, **kwargs):
+    raise TypeError("Recursos do AssetRegistry são compartilhados e não podem ser modificados")
+
+
+class DictCongelado(dict):
+    """dict somente leitura; continua sendo um dict para o jsonschema e o json."""
+
+    __setitem__ = __delitem__ = _imutavel
+    clear = pop = popitem = setdefault = update = _imutavel
+    __ior__ = _imutavel
+
+    def __copy__(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> Dict[str, Any]:
+        return descongelar(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class ListaCongelada(list):
+    """list somente leitura; continua sendo uma list para o jsonschema e o json."""
+
+    __setitem__ = __delitem__ = _imutavel
+    append = extend = insert = pop = remove = clear = sort = reverse = _imutavel
+    __iadd__ = __imul__ = _imutavel
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo) -> list:
+        return descongelar(self)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+def congelar(valor: Any) -> Any:
+    """Converte recursivamente dicts e lists em versões somente leitura."""
+    if isinstance(valor, dict):
+        return DictCongelado((chave, congelar(v)) for chave, v in valor.items())
+    if isinstance(valor, list):
+        return ListaCongelada(congelar(v) for v in valor)
+    return valor
+
+
+def descongelar(valor: Any) -> Any:
+    """Retorna uma cópia mutável (dicts e lists comuns) de um recurso congelado."""
+    if isinstance(valor, dict):
+        return {chave: descongelar(v) for chave, v in valor.items()}
+    if isinstance(valor, list):
+        return [descongelar(v) for v in valor]
+    return valor
+
+
+@dataclass(frozen=True)
+class Recurso:
+    """Versão carregada de um recurso."""
+    nome: str
+    caminho: Optional[str]
+    valor: Any
+    hash: str
+    mtime_ns: int
+    tamanho: int
+    verificado_em: float
+
+    @property
+    def encontrado(self) -> bool:
+        return self.caminho is not None
+
+
+class AssetRegistry:
+    """
+    Carrega cada prompt, template e schema uma única vez por processo.
+
+    Os recursos são identificados por nome lógico, resolvidos para um caminho
+    apenas na primeira carga e recarregados quando o mtime/tamanho do arquivo
+    muda (verificado no máximo a cada `intervalo_verificacao` segundos). Se o
+    conteúdo não mudou (mesmo hash), o objeto compartilhado é mantido.
+    """
+
+    def __init__(self, intervalo_verificacao: Optional[float] = 30.0,
+                 recursos: Optional[Dict[str, Tuple[str, str]]] = None):
+        """
+        Inicializa o registro.
+
+        Args:
+            intervalo_verificacao (float, optional): Segundos entre verificações de mtime;
+                None desativa a invalidação automática
+            recursos (Dict, optional): Mapa nome lógico -> (tipo, arquivo)
+        """
+        self.logger = WrapperLogger("AssetRegistry")
+        self.intervalo_verificacao = intervalo_verificacao
+        self._definicoes = dict(RECURSOS_PADRAO if recursos is None else recursos)
+        self._recursos: Dict[str, Recurso] = {}
+        self._lock = threading.Lock()
+        self._leituras = 0
+
+    def registrar(self, nome: str, tipo: str, arquivo: str) -> None:
+        """
+        Registra (ou substitui) um recurso.
+
+        Args:
+            nome (str): Nome lógico
+            tipo (str): "prompt", "template" ou "schema"
+            arquivo (str): Nome do arquivo ou caminho absoluto
+        """
+        if tipo not in _RESOLVEDORES:
+            raise ValueError(f"Tipo de recurso desconhecido: {tipo}")
+        with self._lock:
+            self._definicoes[nome] = (tipo, arquivo)
+            self._recursos.pop(nome, None)
+
+    def obter_texto(self, nome: str, fallback: Optional[str] = None) -> str:
+        """
+        Retorna o conteúdo textual de um recurso.
+
+        Args:
+            nome (str): Nome lógico
+            fallback (str, optional): Conteúdo usado se o arquivo não existir
+
+        Returns:
+            str: Conteúdo do recurso
+        """
+        return self._obter(nome, False, fallback).valor
+
+    def obter_json(self, nome: str, fallback: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Retorna um recurso JSON (schema) como objeto compartilhado somente leitura.
+
+        Args:
+            nome (str): Nome lógico
+            fallback (Dict, optional): Objeto usado se o arquivo não existir ou for inválido
+
+        Returns:
+            Dict: Objeto congelado; use descongelar() para obter uma cópia mutável
+        """
+        return self._obter(nome, True, fallback).valor
+
+    def obter_recurso(self, nome: str) -> Optional[Recurso]:
+        """Retorna a versão atualmente carregada de um recurso, se houver."""
+        return self._recursos.get(nome)
+
+    def versao(self, nome: str) -> str:
+        """Hash do conteúdo carregado de um recurso (vazio se ainda não foi carregado)."""
+        recurso = self._recursos.get(nome)
+        return recurso.hash if recurso else ""
+
+    def recarregar(self, nome: Optional[str] = None) -> None:
+        """
+        Descarta recursos carregados, forçando nova leitura no próximo acesso.
+
+        Args:
+            nome (str, optional): Recurso a descartar; todos se omitido
+        """
+        with self._lock:
+            if nome is None:
+                self._recursos.clear()
+            else:
+                self._recursos.pop(nome, None)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna o número de recursos carregados e de leituras de disco realizadas."""
+        return {
+            "recursos": len(self._recursos),
+            "leituras_disco": self._leituras,
+            "encontrados": sorted(n for n, r in self._recursos.items() if r.encontrado),
+        }
+
+    def _obter(self, nome: str, como_json: bool, fallback: Any) -> Recurso:
+        recurso = self._recursos.get(nome)
+        agora = time.monotonic()
+        if recurso is not None and (
+            self.intervalo_verificacao is None or agora - recurso.verificado_em < self.intervalo_verificacao
+        ):
+            return recurso
+
+        with self._lock:
+            recurso = self._recursos.get(nome)
+            if recurso is None:
+                recurso = self._carregar(nome, como_json, fallback, self._resolver(nome))
+            elif self.intervalo_verificacao is not None and agora - recurso.verificado_em >= self.intervalo_verificacao:
+                recurso = self._revalidar(recurso, como_json, fallback)
+            self._recursos[nome] = recurso
+            return recurso
+
+    def _resolver(self, nome: str) -> Optional[str]:
+        if nome not in self._definicoes:
+            raise KeyError(f"Recurso não registrado: {nome}")
+        tipo, arquivo = self._definicoes[nome]
+        caminho = _RESOLVEDORES[tipo](arquivo)
+        return caminho if os.path.isfile(caminho) else None
+
+    def _revalidar(self, recurso: Recurso, como_json: bool, fallback: Any) -> Recurso:
+        caminho = recurso.caminho or self._resolver(recurso.nome)
+        try:
+            estado = os.stat(caminho) if caminho else None
+        except OSError:
+            estado = None
+
+        if estado is not None and caminho == recurso.caminho and \
+                (estado.st_mtime_ns, estado.st_size) == (recurso.mtime_ns, recurso.tamanho):
+            return _com_verificacao(recurso, time.monotonic())
+        if estado is None and recurso.caminho is None:
+            return _com_verificacao(recurso, time.monotonic())
+
+        novo = self._carregar(recurso.nome, como_json, fallback, caminho if estado else None)
+        if novo.hash == recurso.hash:
+            # Apenas o mtime mudou: manter o objeto já compartilhado
+            return Recurso(recurso.nome, novo.caminho, recurso.valor, recurso.hash,
+                           novo.mtime_ns, novo.tamanho, novo.verificado_em)
+        self.logger.info(f"Recurso '{recurso.nome}' alterado em disco, nova versão {novo.hash[:12]}")
+        return novo
+
+    def _carregar(self, nome: str, como_json: bool, fallback: Any, caminho: Optional[str]) -> Recurso:
+        agora = time.monotonic()
+        if caminho:
+            try:
+                with open(caminho, "rb") as arquivo:
+                    dados = arquivo.read()
+                    estado = os.fstat(arquivo.fileno())
+                self._leituras += 1
+                texto = dados.decode("utf-8")
+                valor = congelar(json.loads(texto)) if como_json else texto
+                self.logger.info(f"Recurso '{nome}' carregado de {caminho} ({len(dados)} bytes)")
+                return Recurso(nome, caminho, valor, hashlib.sha256(dados).hexdigest(),
+                               estado.st_mtime_ns, estado.st_size, agora)
+            except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+                self.logger.error(f"Erro ao carregar recurso '{nome}' de {caminho}: {str(e)}")
+
+        if fallback is None:
+            raise FileNotFoundError(f"Recurso '{nome}' não encontrado e sem conteúdo de fallback")
+        self.logger.warning(f"Recurso '{nome}' não encontrado, usando conteúdo de fallback")
+        serializado = json.dumps(fallback, sort_keys=True) if como_json else fallback
+        valor = congelar(fallback) if como_json else fallback
+        return Recurso(nome, None, valor, hashlib.sha256(serializado.encode("utf-8")).hexdigest(), 0, 0, agora)
+
+
+def _com_verificacao(recurso: Recurso, instante: float) -> Recurso:
+    return Recurso(recurso.nome, recurso.caminho, recurso.valor, recurso.hash,
+                   recurso.mtime_ns, recurso.tamanho, instante)
+
+
+# Instância compartilhada por processo
+_asset_registry: Optional[AssetRegistry] = None
+_asset_registry_lock = threading.Lock()
+
+
+def get_asset_registry() -> AssetRegistry:
+    """
+    Obtém o registro de recursos compartilhado pelo processo.
+
+    Returns:
+        AssetRegistry: Registro configurado a partir das variáveis de ambiente
+    """
+    global _asset_registry
+    with _asset_registry_lock:
+        if _asset_registry is None:
+            config = get_asset_registry_config()
+            _asset_registry = AssetRegistry(intervalo_verificacao=config["intervalo_verificacao"])
+        return _asset_registry
@@ -0,0 +1,214 @@
+# Canais de Lotes para a API Messages (Message Batches e Substituto Local) #
+
+import json
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from .logger import WrapperLogger
+
+# Estados do processamento de um lote e tipos de resultado de cada requisição (mesmos nomes da API)
+LOTE_EM_ANDAMENTO = "in_progress"
+LOTE_ENCERRADO = "ended"
+RESULTADO_LOTE_SUCESSO = "succeeded"
+RESULTADO_LOTE_ERRO = "errored"
+
+URL_LOTES_ANTHROPIC = "https://api.anthropic.com/v1/messages/batches"
+
+
+class LoteNaoEncontradoError(LookupError):
+    """O canal não conhece o lote (expirado, ou criado por um canal local de outro processo)."""
+
+
+@dataclass
+class ResultadoLote:
+    """Resultado de uma requisição do lote."""
+    custom_id: str
+    tipo: str
+    mensagem: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+
+
+def url_lotes(api_url: str) -> str:
+    """URL de lotes correspondente à URL da API Messages (".../v1/messages" -> ".../v1/messages/batches")."""
+    api_url = (api_url or "").rstrip("/")
+    return f"{api_url}/batches" if api_url.endswith("/v1/messages") else URL_LOTES_ANTHROPIC
+
+
+class CanalLoteLocal:
+    """
+    Substituto local da API de lotes.
+
+    Executa as requisições de cada lote em um pool de threads pela função de envio
+    (em geral, a requisição individual do Treinador, com retentativas e limites de
+    concorrência e taxa) e expõe a mesma interface de CanalLoteAnthropic: submeter,
+    consultar e resultados. Os lotes existem só na memória do processo.
+    """
+
+    def __init__(self, enviar: Callable[[Dict[str, Any]], Dict[str, Any]], max_workers: int = 4):
+        """
+        Args:
+            enviar (Callable): Envia o corpo de uma requisição à API Messages e retorna a resposta
+                (uma resposta sem "type": "message" conta como erro)
+            max_workers (int): Requisições executadas em paralelo
+        """
+        self.enviar = enviar
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="lote_local")
+        self._lotes: Dict[str, List[Tuple[str, Future]]] = {}
+        self._lock = threading.Lock()
+
+    def submeter(self, requisicoes: List[Dict[str, Any]]) -> str:
+        """
+        Submete um lote.
+
+        Args:
+            requisicoes (List[Dict]): Requisições com "custom_id" e "params" (corpo da API Messages)
+
+        Returns:
+            str: ID do lote
+        """
+        lote_id = f"lote_local_{uuid.uuid4().hex[:16]}"
+        futuros = [(r["custom_id"], self._executor.submit(self.enviar, r["params"])) for r in requisicoes]
+        with self._lock:
+            self._lotes[lote_id] = futuros
+        return lote_id
+
+    def _futuros(self, lote_id: str) -> List[Tuple[str, Future]]:
+        with self._lock:
+            if lote_id not in self._lotes:
+                raise LoteNaoEncontradoError(f"Lote {lote_id} não encontrado")
+            return self._lotes[lote_id]
+
+    def consultar(self, lote_id: str) -> Dict[str, Any]:
+        """
+        Consulta o andamento do lote.
+
+        Returns:
+            Dict: "id", "processing_status" (in_progress ou ended) e "request_counts"
+
+        Raises:
+            LoteNaoEncontradoError: Lote desconhecido
+        """
+        futuros = self._futuros(lote_id)
+        concluidos = sum(1 for _, futuro in futuros if futuro.done())
+        return {
+            "id": lote_id,
+            "processing_status": LOTE_ENCERRADO if concluidos == len(futuros) else LOTE_EM_ANDAMENTO,
+            "request_counts": {"processing": len(futuros) - concluidos, "ended": concluidos}
+        }
+
+    def resultados(self, lote_id: str) -> Iterator[ResultadoLote]:
+        """
+        Produz os resultados de um lote encerrado e o descarta.
+
+        Raises:
+            LoteNaoEncontradoError: Lote desconhecido
+        """
+        futuros = self._futuros(lote_id)
+        for custom_id, futuro in futuros:
+            try:
+                resposta = futuro.result()
+            except Exception as e:
+                yield ResultadoLote(custom_id, RESULTADO_LOTE_ERRO, erro=str(e))
+                continue
+            if isinstance(resposta, dict) and resposta.get("type") == "message":
+                yield ResultadoLote(custom_id, RESULTADO_LOTE_SUCESSO, mensagem=resposta)
+            else:
+                erro = resposta.get("erro") if isinstance(resposta, dict) else None
+                yield ResultadoLote(custom_id, RESULTADO_LOTE_ERRO, erro=erro or "Resposta sem mensagem")
+        with self._lock:
+            self._lotes.pop(lote_id, None)
+
+    def fechar(self) -> None:
+        """Encerra o pool de threads sem esperar as requisições em andamento."""
+        self._executor.shutdown(wait=False)
+
+
+class CanalLoteAnthropic:
+    """
+    Canal da Message Batches API: as requisições são processadas de forma assíncrona
+    pela API, com custo reduzido, e os resultados ficam disponíveis quando o lote
+    inteiro termina.
+    """
+
+    def __init__(self, api_key: str, url: str = URL_LOTES_ANTHROPIC, timeout: Tuple[float, float] = (5.0, 60.0)):
+        """
+        Args:
+            api_key (str): Chave de API para o serviço Claude
+            url (str): URL de lotes da API
+            timeout (Tuple): (connect, read) de cada chamada
+        """
+        self.logger = WrapperLogger("CanalLoteAnthropic")
+        self.api_key = api_key
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._sessao = requests.Session()
+
+    def _cabecalhos(self) -> Dict[str, str]:
+        return {"anthropic-version": "2023-06-01", "x-api-key": self.api_key.strip(), "content-type": "application/json"}
+
+    def submeter(self, requisicoes: List[Dict[str, Any]]) -> str:
+        """
+        Cria o lote na API.
+
+        Args:
+            requisicoes (List[Dict]): Requisições com "custom_id" e "params" (corpo da API Messages)
+
+        Returns:
+            str: ID do lote
+
+        Raises:
+            requests.exceptions.RequestException: Falha de conexão ou status de erro
+        """
+        resposta = self._sessao.post(self.url, headers=self._cabecalhos(), json={"requests": requisicoes},
+                                     timeout=self.timeout)
+        resposta.raise_for_status()
+        lote_id = resposta.json()["id"]
+        self.logger.info(f"Lote {lote_id} criado com {len(requisicoes)} requisições")
+        return lote_id
+
+    def consultar(self, lote_id: str) -> Dict[str, Any]:
+        """
+        Consulta o andamento do lote.
+
+        Returns:
+            Dict: Lote como retornado pela API ("processing_status", "request_counts", "results_url")
+
+        Raises:
+            LoteNaoEncontradoError: A API não conhece o lote
+            requests.exceptions.RequestException: Falha de conexão ou outro status de erro
+        """
+        resposta = self._sessao.get(f"{self.url}/{lote_id}", headers=self._cabecalhos(), timeout=self.timeout)
+        if resposta.status_code == 404:
+            raise LoteNaoEncontradoError(f"Lote {lote_id} não encontrado")
+        resposta.raise_for_status()
+        return resposta.json()
+
+    def resultados(self, lote_id: str) -> Iterator[ResultadoLote]:
+        """
+        Produz os resultados de um lote encerrado, lidos em streaming do JSONL da API.
+
+        Raises:
+            LoteNaoEncontradoError: A API não conhece o lote
+            requests.exceptions.RequestException: Falha de conexão ou outro status de erro
+        """
+        lote = self.consultar(lote_id)
+        url = lote.get("results_url") or f"{self.url}/{lote_id}/results"
+        with self._sessao.get(url, headers=self._cabecalhos(), timeout=self.timeout, stream=True) as resposta:
+            resposta.raise_for_status()
+            for linha in resposta.iter_lines():
+                if not linha:
+                    continue
+                item = json.loads(linha)
+                resultado = item.get("result") or {}
+                tipo = resultado.get("type", RESULTADO_LOTE_ERRO)
+                erro = None if tipo == RESULTADO_LOTE_SUCESSO else json.dumps(resultado.get("error") or tipo)
+                yield ResultadoLote(item["custom_id"], tipo, mensagem=resultado.get("message"), erro=erro)
+
+    def fechar(self) -> None:
+        """Fecha a sessão HTTP."""
+        self._sessao.close()
@@ -0,0 +1,306 @@
+# Transporte com Gravação e Reprodução das Chamadas à API Claude #
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from .logger import WrapperLogger
+from .http_transport import StreamStatusError
+
+# O adaptador para o SDK anthropic depende do httpx, instalado junto com o SDK
+try:
+    import httpx
+    HTTPX_DISPONIVEL = True
+except ImportError:
+    httpx = None
+    HTTPX_DISPONIVEL = False
+
+MODO_HTTP = "http"
+MODO_GRAVAR = "gravar"
+MODO_REPRODUZIR = "reproduzir"
+MODOS_TRANSPORTE = (MODO_HTTP, MODO_GRAVAR, MODO_REPRODUZIR)
+
+# Datas ISO no corpo (data de início do plano, por exemplo) não entram na chave,
+# para que uma cassete gravada em um dia seja reproduzida em outro
+_DATA_ISO = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Cabeçalhos que descrevem a codificação da resposta original, não a reproduzida
+_CABECALHOS_DESCARTADOS = {"content-length", "content-encoding", "transfer-encoding", "connection"}
+
+
+class CasseteAusenteError(LookupError):
+    """Nenhuma resposta gravada para a requisição no modo reproduzir."""
+
+
+class RespostaGravada:
+    """Resposta HTTP reproduzida de uma cassete, com a interface usada de requests.Response."""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], text: str, elapsed_s: float = 0.0):
+        self.status_code = status_code
+        self.headers = dict(headers)
+        self.text = text
+        self.elapsed = datetime.timedelta(seconds=elapsed_s)
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+def _cabecalhos(headers: Any) -> Dict[str, str]:
+    return {k: v for k, v in dict(headers or {}).items() if k.lower() not in _CABECALHOS_DESCARTADOS}
+
+
+class TransporteCassete:
+    """
+    Transporte que grava pares requisição/resposta em cassetes ou os reproduz sem rede.
+
+    No modo gravar, cada requisição passa pelo transporte real e a resposta (ou a
+    sequência de eventos, no streaming) é acrescentada ao arquivo da cassete. No modo
+    reproduzir, a resposta vem do arquivo, com latência sintética opcional e os textos
+    do streaming refatiados no tamanho pedido. Os cabeçalhos da requisição (incluindo
+    a chave de API) nunca são gravados.
+
+    Cada cassete é um arquivo JSON por requisição distinta, identificado pelo hash do
+    caminho da URL e do corpo. Requisições idênticas repetidas são reproduzidas na
+    ordem em que foram gravadas, recomeçando do início ao fim da lista.
+    """
+
+    def __init__(self, diretorio: str, modo: str = MODO_REPRODUZIR, transporte: Any = None,
+                 latencia: float = 0.0, fator_latencia_gravada: float = 0.0,
+                 atraso_evento: float = 0.0, tamanho_pedaco: int = 0):
+        """
+        Args:
+            diretorio (str): Diretório das cassetes
+            modo (str): "gravar" ou "reproduzir"
+            transporte (HttpTransport, optional): Transporte real, obrigatório no modo gravar
+            latencia (float): Atraso fixo por requisição reproduzida, em segundos
+            fator_latencia_gravada (float): Fração da duração gravada acrescentada ao atraso (1.0 = tempo real)
+            atraso_evento (float): Atraso entre os eventos reproduzidos em streaming, em segundos
+            tamanho_pedaco (int): Caracteres por delta reproduzido em streaming (0 mantém os pedaços gravados)
+        """
+        if modo not in (MODO_GRAVAR, MODO_REPRODUZIR):
+            raise ValueError(f"Modo de cassete inválido: {modo}")
+        if modo == MODO_GRAVAR and transporte is None:
+            raise ValueError("O modo gravar precisa de um transporte real")
+        self.logger = WrapperLogger("TransporteCassete")
+        self.diretorio = diretorio
+        self.modo = modo
+        self.transporte = transporte
+        self.latencia = latencia
+        self.fator_latencia_gravada = fator_latencia_gravada
+        self.atraso_evento = atraso_evento
+        self.tamanho_pedaco = tamanho_pedaco
+        self._cassetes: Dict[str, Dict[str, Any]] = {}
+        self._reproduzidas: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.logger.info(f"Transporte de cassetes no modo {modo} ({diretorio})")
+
+    @staticmethod
+    def chave(url: str, corpo: Dict[str, Any]) -> str:
+        """
+        Identifica uma requisição pelo caminho da URL e pelo corpo, sem as datas.
+
+        Args:
+            url (str): URL de destino
+            corpo (Dict): Corpo da requisição
+
+        Returns:
+            str: Hash hexadecimal da requisição
+        """
+        conteudo = json.dumps({"caminho": urlsplit(url).path, "corpo": corpo}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(_DATA_ISO.sub("AAAA-MM-DD", conteudo).encode("utf-8")).hexdigest()
+
+    def post(self, url: str, headers: Dict[str, str], json_body: Dict[str, Any],
+             timeout: Optional[Tuple[float, float]] = None):
+        """
+        Envia (gravando) ou reproduz uma requisição POST.
+
+        Args:
+            url (str): URL de destino
+            headers (Dict): Cabeçalhos HTTP
+            json_body (Dict): Corpo da requisição
+            timeout (Tuple, optional): (connect, read) repassado ao transporte real
+
+        Returns:
+            Resposta com status_code, headers, text, json() e elapsed
+
+        Raises:
+            CasseteAusenteError: No modo reproduzir, se a requisição não foi gravada
+        """
+        chave = self.chave(url, json_body)
+        if self.modo == MODO_REPRODUZIR:
+            gravada = self._proxima_resposta(chave, "http")
+            atraso = self._dormir(gravada)
+            return RespostaGravada(gravada["status_code"], gravada["headers"], gravada["texto"], atraso)
+
+        inicio = time.perf_counter()
+        resposta = self.transporte.post(url, headers, json_body, timeout)
+        self._gravar(chave, url, json_body, {
+            "tipo": "http",
+            "status_code": resposta.status_code,
+            "headers": _cabecalhos(resposta.headers),
+            "texto": resposta.text,
+            "duracao_s": time.perf_counter() - inicio
+        })
+        return resposta
+
+    def stream_eventos(self, url: str, headers: Dict[str, str], json_body: Dict[str, Any],
+                       timeout: Optional[Tuple[float, float]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Abre (gravando) ou reproduz um stream de eventos da API Messages.
+
+        No modo gravar, o stream só é gravado se for consumido até o fim.
+
+        Args:
+            url (str): URL de destino
+            headers (Dict): Cabeçalhos HTTP
+            json_body (Dict): Corpo da requisição (o campo "stream" é forçado para True)
+            timeout (Tuple, optional): (connect, read) repassado ao transporte real
+
+        Returns:
+            Iterator[Dict]: Eventos da API Messages
+
+        Raises:
+            StreamStatusError: Se a resposta (real ou gravada) não tiver status 200
+            CasseteAusenteError: No modo reproduzir, se a requisição não foi gravada
+        """
+        corpo = dict(json_body, stream=True)
+        chave = self.chave(url, corpo)
+        if self.modo == MODO_REPRODUZIR:
+            gravada = self._proxima_resposta(chave, "stream")
+            self._dormir(gravada)
+            if gravada["status_code"] != 200:
+                raise StreamStatusError(gravada["status_code"], gravada.get("texto", ""), gravada.get("headers"))
+            for indice, evento in enumerate(self._refatiar(gravada["eventos"])):
+                if indice and self.atraso_evento:
+                    time.sleep(self.atraso_evento)
+                yield evento
+            return
+
+        inicio = time.perf_counter()
+        eventos: List[Dict[str, Any]] = []
+        try:
+            for evento in self.transporte.stream_eventos(url, headers, json_body, timeout):
+                eventos.append(evento)
+                yield evento
+        except StreamStatusError as e:
+            self._gravar(chave, url, corpo, {"tipo": "stream", "status_code": e.status_code, "headers": e.headers,
+                                             "texto": e.texto, "duracao_s": time.perf_counter() - inicio})
+            raise
+        self._gravar(chave, url, corpo, {"tipo": "stream", "status_code": 200, "eventos": eventos,
+                                         "duracao_s": time.perf_counter() - inicio})
+
+    def fechar(self) -> None:
+        """Fecha o transporte real, se houver."""
+        if self.transporte is not None:
+            self.transporte.fechar()
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{chave[:32]}.json")
+
+    def _carregar(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Lê a cassete da requisição (chamado com o lock adquirido)."""
+        if chave not in self._cassetes:
+            caminho = self._caminho(chave)
+            if not os.path.exists(caminho):
+                return None
+            with open(caminho, encoding="utf-8") as f:
+                self._cassetes[chave] = json.load(f)
+        return self._cassetes[chave]
+
+    def _gravar(self, chave: str, url: str, corpo: Dict[str, Any], resposta: Dict[str, Any]) -> None:
+        """Acrescenta uma resposta à cassete da requisição."""
+        with self._lock:
+            cassete = self._carregar(chave) or {"chave": chave, "url": urlsplit(url).path,
+                                                "requisicao": corpo, "respostas": []}
+            cassete["respostas"].append(resposta)
+            self._cassetes[chave] = cassete
+            os.makedirs(self.diretorio, exist_ok=True)
+            caminho = self._caminho(chave)
+            temporario = f"{caminho}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(cassete, f, ensure_ascii=False, indent=1)
+            os.replace(temporario, caminho)
+        self.logger.debug(f"Resposta {len(cassete['respostas'])} gravada na cassete {chave[:12]}")
+
+    def _proxima_resposta(self, chave: str, tipo: str) -> Dict[str, Any]:
+        """Retorna a próxima resposta gravada da requisição, na ordem da gravação."""
+        with self._lock:
+            cassete = self._carregar(chave)
+            respostas = [r for r in (cassete or {}).get("respostas", []) if r.get("tipo") == tipo]
+            if not respostas:
+                raise CasseteAusenteError(
+                    f"Nenhuma resposta '{tipo}' gravada para a requisição {chave[:12]} em {self.diretorio}")
+            indice = self._reproduzidas.get(f"{chave}|{tipo}", 0)
+            self._reproduzidas[f"{chave}|{tipo}"] = indice + 1
+        return respostas[indice % len(respostas)]
+
+    def _dormir(self, gravada: Dict[str, Any]) -> float:
+        """Aplica a latência sintética e retorna o atraso em segundos."""
+        atraso = self.latencia + self.fator_latencia_gravada * gravada.get("duracao_s", 0.0)
+        if atraso > 0:
+            time.sleep(atraso)
+        return atraso
+
+    def _refatiar(self, eventos: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Divide os deltas de texto e de JSON parcial no tamanho de pedaço configurado."""
+        for evento in eventos:
+            delta = evento.get("delta", {})
+            campo = {"text_delta": "text", "input_json_delta": "partial_json"}.get(delta.get("type"))
+            if not self.tamanho_pedaco or evento.get("type") != "content_block_delta" or campo is None:
+                yield evento
+                continue
+            texto = delta.get(campo, "")
+            for i in range(0, len(texto), self.tamanho_pedaco):
+                yield dict(evento, delta=dict(delta, **{campo: texto[i:i + self.tamanho_pedaco]}))
+
+
+if HTTPX_DISPONIVEL:
+    class TransporteHttpxCassete(httpx.BaseTransport):
+        """Adapta um TransporteCassete ao httpx, para uso como http_client do SDK anthropic."""
+
+        # Cabeçalhos que o transporte real recalcula a partir do corpo
+        _CABECALHOS_DA_REQUISICAO = {"content-length", "host", "transfer-encoding", "accept-encoding", "connection"}
+
+        def __init__(self, transporte: TransporteCassete):
+            self.transporte = transporte
+
+        def handle_request(self, request: "httpx.Request") -> "httpx.Response":
+            corpo = json.loads(request.read() or b"{}")
+            headers = {k: v for k, v in request.headers.items() if k.lower() not in self._CABECALHOS_DA_REQUISICAO}
+            try:
+                resposta = self.transporte.post(str(request.url), headers, corpo)
+            except requests.exceptions.Timeout as e:
+                raise httpx.TimeoutException(str(e), request=request) from e
+            except requests.exceptions.RequestException as e:
+                raise httpx.ConnectError(str(e), request=request) from e
+            return httpx.Response(resposta.status_code, headers=_cabecalhos(resposta.headers),
+                                  content=resposta.content, request=request)
+
+
+def criar_cliente_httpx(transporte: TransporteCassete) -> "httpx.Client":
+    """
+    Cria um httpx.Client que envia as requisições do SDK anthropic pelo transporte de cassetes.
+
+    Args:
+        transporte (TransporteCassete): Transporte de gravação ou reprodução
+
+    Returns:
+        httpx.Client: Cliente para o parâmetro http_client do SDK
+
+    Raises:
+        RuntimeError: Se o httpx não estiver instalado
+    """
+    if not HTTPX_DISPONIVEL:
+        raise RuntimeError("O transporte de cassetes para o SDK anthropic requer o pacote httpx")
+    return httpx.Client(transport=TransporteHttpxCassete(transporte))
@@ -0,0 +1,170 @@
+# Limitador Adaptativo de Concorrência (AIMD) para a API Claude #
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import requests
+
+from .logger import WrapperLogger
+from .config import get_concurrency_config
+from .llm_metrics import get_llm_metrics
+
+# Status que indicam que o provedor está recebendo mais do que suporta
+STATUS_SOBRECARGA = frozenset({429, 529})
+
+
+class FilaEsgotadaError(requests.exceptions.ConnectionError):
+    """O prazo de espera por uma vaga no limitador de concorrência terminou."""
+
+
+@dataclass
+class Vaga:
+    """Vaga obtida no limitador; lembra a geração do limite em que foi concedida."""
+    geracao: int
+    espera_s: float
+
+
+class LimitadorAIMD:
+    """
+    Limite de requisições simultâneas com aumento aditivo e redução multiplicativa.
+
+    Cada requisição bem-sucedida aumenta o limite em incremento/limite (cerca de
+    "incremento" por janela de requisições, como no controle de congestionamento do
+    TCP); uma resposta 429/529 multiplica o limite por fator_reducao. Várias
+    sobrecargas da mesma rajada contam como uma: só reduzem o limite as requisições
+    iniciadas depois da última redução. Requisições acima do limite esperam na fila
+    até o prazo informado; com max_fila requisições já esperando, as seguintes são
+    recusadas na hora (brownout). Seguro para uso entre threads.
+    """
+
+    def __init__(self, limite_inicial: float = 4, limite_min: float = 1, limite_max: float = 32,
+                 incremento: float = 1.0, fator_reducao: float = 0.5, max_fila: int = 0, nome: str = "claude",
+                 metricas: Any = None):
+        """
+        Args:
+            limite_inicial (float): Limite de requisições simultâneas no início
+            limite_min (float): Menor limite possível
+            limite_max (float): Maior limite possível
+            incremento (float): Aumento do limite a cada janela de requisições bem-sucedidas
+            fator_reducao (float): Fator aplicado ao limite em uma sobrecarga
+            max_fila (int): Requisições que podem esperar por vaga ao mesmo tempo (0 = sem limite)
+            nome (str): Nome do provedor, usado nos logs e nas métricas
+            metricas (MetricasLLM, optional): Registro onde o limite e as esperas são publicados
+        """
+        self.logger = WrapperLogger("LimitadorAIMD")
+        self.limite_min = max(1.0, limite_min)
+        self.limite_max = max(self.limite_min, limite_max)
+        self.limite = min(self.limite_max, max(self.limite_min, limite_inicial))
+        self.incremento = incremento
+        self.fator_reducao = fator_reducao
+        self.max_fila = max(0, max_fila)
+        self.nome = nome
+        self.metricas = metricas
+        self.em_uso = 0
+        self.aguardando = 0
+        self._geracao = 0
+        self._condicao = threading.Condition()
+        self._publicar()
+
+    def adquirir(self, timeout: Optional[float] = None) -> Vaga:
+        """
+        Espera por uma vaga dentro do limite atual.
+
+        Args:
+            timeout (float, optional): Prazo de espera na fila em segundos (None espera sem prazo)
+
+        Returns:
+            Vaga: Vaga a devolver com liberar()
+
+        Raises:
+            FilaEsgotadaError: Se o prazo terminar sem vaga ou se a fila estiver cheia
+        """
+        inicio = time.monotonic()
+        prazo = None if timeout is None else inicio + timeout
+        with self._condicao:
+            if self.em_uso >= int(self.limite) and self.fila_cheia():
+                self._incrementar("fila_cheia")
+                raise FilaEsgotadaError(f"Fila da API {self.nome} cheia ({self.aguardando} requisições esperando)")
+            self.aguardando += 1
+            try:
+                while self.em_uso >= int(self.limite):
+                    restante = None if prazo is None else prazo - time.monotonic()
+                    if restante is not None and restante <= 0:
+                        self._incrementar("fila_esgotada")
+                        raise FilaEsgotadaError(
+                            f"Sem vaga para a API {self.nome} em {timeout:.1f}s (limite {int(self.limite)}, em uso {self.em_uso})")
+                    self._condicao.wait(restante)
+            finally:
+                self.aguardando -= 1
+            self.em_uso += 1
+            vaga = Vaga(self._geracao, time.monotonic() - inicio)
+            self._publicar()
+        if vaga.espera_s > 0.001:
+            self._incrementar("enfileiradas")
+        return vaga
+
+    def fila_cheia(self) -> bool:
+        """Indica se a fila de espera atingiu max_fila; novas requisições seriam recusadas."""
+        return bool(self.max_fila) and self.aguardando >= self.max_fila
+
+    def liberar(self, vaga: Vaga, sobrecarga: Optional[bool] = False) -> None:
+        """
+        Devolve a vaga e ajusta o limite conforme o resultado.
+
+        Args:
+            vaga (Vaga): Vaga obtida em adquirir()
+            sobrecarga (bool, optional): True se o provedor respondeu 429/529 (reduz o limite),
+                False em sucesso (aumenta o limite), None para não alterar o limite
+        """
+        with self._condicao:
+            self.em_uso -= 1
+            if sobrecarga and vaga.geracao == self._geracao:
+                anterior = self.limite
+                self.limite = max(self.limite_min, self.limite * self.fator_reducao)
+                self._geracao += 1
+                self.logger.warning(f"Sobrecarga da API {self.nome}: limite {anterior:.1f} -> {self.limite:.1f}")
+                self._incrementar("reducoes")
+            elif sobrecarga is False:
+                self.limite = min(self.limite_max, self.limite + self.incremento / self.limite)
+            self._publicar()
+            self._condicao.notify_all()
+
+    def _publicar(self) -> None:
+        if self.metricas is not None:
+            self.metricas.definir_estado(f"concorrencia_{self.nome}", {"limite": int(self.limite), "em_uso": self.em_uso})
+
+    def _incrementar(self, contador: str) -> None:
+        if self.metricas is not None:
+            self.metricas.incrementar(f"concorrencia_{self.nome}_{contador}")
+
+
+# Instância compartilhada por processo
+_limitador_claude: Optional[LimitadorAIMD] = None
+_limitador_claude_lock = threading.Lock()
+
+
+def get_limitador_claude() -> Optional[LimitadorAIMD]:
+    """
+    Obtém o limitador de concorrência das chamadas à API Claude compartilhado pelo processo.
+
+    Returns:
+        Optional[LimitadorAIMD]: Limitador configurado ou None se desabilitado
+    """
+    global _limitador_claude
+    config = get_concurrency_config()
+    if not config["enabled"]:
+        return None
+
+    with _limitador_claude_lock:
+        if _limitador_claude is None:
+            _limitador_claude = LimitadorAIMD(
+                limite_inicial=config["limite_inicial"],
+                limite_min=config["limite_min"],
+                limite_max=config["limite_max"],
+                fator_reducao=config["fator_reducao"],
+                max_fila=config["max_fila"],
+                metricas=get_llm_metrics()
+            )
+        return _limitador_claude
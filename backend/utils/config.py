@@ -48,6 +48,78 @@ def get_claude_config() -> Dict[str, str]:
         "model": os.getenv("CLAUDE_MODEL", "claude-3-opus-20240229")
     }
 
+def get_http_transport_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações do transporte HTTP usado nas chamadas à API Claude.
+    
+    Returns:
+        Dict: Timeouts, tamanho do pool de conexões, uso de HTTP/2 e modo do transporte
+              (http, gravar ou reproduzir) com o diretório de cassetes e a latência sintética
+    """
+    cassete_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "cassetes")
+    return {
+        "connect_timeout": float(os.getenv("CLAUDE_HTTP_CONNECT_TIMEOUT", "5")),
+        "read_timeout": float(os.getenv("CLAUDE_HTTP_READ_TIMEOUT", "180")),
+        "pool_size": int(os.getenv("CLAUDE_HTTP_POOL_SIZE", "20")),
+        "http2": os.getenv("CLAUDE_HTTP2", "False").lower() in ("true", "1", "t"),
+        "modo": os.getenv("CLAUDE_TRANSPORT_MODE", "http").lower(),
+        "cassete_dir": os.getenv("CLAUDE_CASSETTE_DIR") or cassete_dir,
+        "replay_latencia": float(os.getenv("CLAUDE_REPLAY_LATENCY", "0")),
+        "replay_fator_latencia_gravada": float(os.getenv("CLAUDE_REPLAY_RECORDED_LATENCY_FACTOR", "0")),
+        "replay_atraso_evento": float(os.getenv("CLAUDE_REPLAY_EVENT_DELAY", "0")),
+        "replay_tamanho_pedaco": int(os.getenv("CLAUDE_REPLAY_CHUNK_SIZE", "0"))
+    }
+
+def get_retry_config() -> Dict[str, Any]:
+    """
+    Obtém a política de retentativas e o disjuntor (circuit breaker) das chamadas à API Claude.
+    
+    Returns:
+        Dict: Tentativas, esperas do backoff exponencial, limite do retry-after e limiares do disjuntor
+    """
+    return {
+        "max_tentativas": int(os.getenv("CLAUDE_RETRY_MAX_ATTEMPTS", "3")),
+        "espera_base_s": float(os.getenv("CLAUDE_RETRY_BASE_DELAY", "1")),
+        "espera_max_s": float(os.getenv("CLAUDE_RETRY_MAX_DELAY", "20")),
+        "retry_after_max_s": float(os.getenv("CLAUDE_RETRY_AFTER_MAX", "30")),
+        "disjuntor_limiar_falhas": int(os.getenv("CLAUDE_BREAKER_FAILURE_THRESHOLD", "5")),
+        "disjuntor_abertura_s": float(os.getenv("CLAUDE_BREAKER_OPEN_SECONDS", "30"))
+    }
+
+def get_concurrency_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações do limitador adaptativo (AIMD) de requisições simultâneas à API Claude.
+    
+    Returns:
+        Dict: Ativação, limites inicial, mínimo e máximo, fator de redução, prazo de espera na fila
+              e tamanho máximo da fila (acima dele, os planos são gerados localmente)
+    """
+    return {
+        "enabled": os.getenv("CLAUDE_CONCURRENCY_LIMIT_ENABLED", "True").lower() in ("true", "1", "t"),
+        "limite_inicial": float(os.getenv("CLAUDE_CONCURRENCY_INITIAL", "4")),
+        "limite_min": float(os.getenv("CLAUDE_CONCURRENCY_MIN", "1")),
+        "limite_max": float(os.getenv("CLAUDE_CONCURRENCY_MAX", "32")),
+        "fator_reducao": float(os.getenv("CLAUDE_CONCURRENCY_DECREASE_FACTOR", "0.5")),
+        "fila_timeout_s": float(os.getenv("CLAUDE_CONCURRENCY_QUEUE_TIMEOUT", "60")),
+        "max_fila": int(os.getenv("CLAUDE_CONCURRENCY_MAX_QUEUE", "32"))
+    }
+
+def get_rate_limit_config() -> Dict[str, Any]:
+    """
+    Obtém o limite de requisições e tokens por minuto da API Claude compartilhado entre processos.
+    
+    Returns:
+        Dict: Ativação, limites por minuto da conta, arquivo SQLite compartilhado e espera máxima
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+    return {
+        "enabled": os.getenv("CLAUDE_RATE_LIMIT_ENABLED", "False").lower() in ("true", "1", "t"),
+        "rpm": int(os.getenv("CLAUDE_RATE_LIMIT_RPM", "50")),
+        "tpm": int(os.getenv("CLAUDE_RATE_LIMIT_TPM", "40000")),
+        "path": os.getenv("CLAUDE_RATE_LIMIT_PATH") or os.path.join(cache_dir, "limite_taxa.sqlite3"),
+        "espera_max_s": float(os.getenv("CLAUDE_RATE_LIMIT_MAX_WAIT", "120"))
+    }
+
 def get_supabase_config() -> Dict[str, str]:
     """
     Obtém as configurações de conexão com a Supabase.
@@ -90,6 +162,145 @@ def get_app_config() -> Dict[str, Any]:
         "environment": os.getenv("ENVIRONMENT", "production")
     }
 
+def get_plan_cache_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações do cache persistente de planos de treinamento.
+    
+    Returns:
+        Dict: Configurações do cache de planos
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+    return {
+        "enabled": os.getenv("PLAN_CACHE_ENABLED", "True").lower() in ("true", "1", "t"),
+        "path": os.getenv("PLAN_CACHE_PATH") or os.path.join(cache_dir, "planos.sqlite3"),
+        "ttl_segundos": int(os.getenv("PLAN_CACHE_TTL", str(7 * 24 * 3600))),
+        "max_entradas": int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "500"))
+    }
+
+def get_plan_similarity_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações do reaproveitamento de planos de perfis semelhantes.
+    
+    Returns:
+        Dict: Ativação e distância máxima entre os perfis
+    """
+    return {
+        "enabled": os.getenv("PLAN_SIMILARITY_ENABLED", "False").lower() in ("true", "1", "t"),
+        "distancia_max": float(os.getenv("PLAN_SIMILARITY_MAX_DISTANCE", "0.1"))
+    }
+
+def get_model_routing_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações do roteamento de modelos pela complexidade do perfil.
+    
+    Returns:
+        Dict: Ativação, modelos das rotas simples e complexa, pontuação mínima da rota
+              complexa e escalonamento dos planos inválidos da rota simples
+    """
+    return {
+        "enabled": os.getenv("MODEL_ROUTING_ENABLED", "False").lower() in ("true", "1", "t"),
+        "modelo_simples": os.getenv("CLAUDE_MODEL_SIMPLE", "claude-3-5-haiku-20241022"),
+        # Vazio usa CLAUDE_MODEL
+        "modelo_complexo": os.getenv("CLAUDE_MODEL_COMPLEX", ""),
+        "limiar": int(os.getenv("MODEL_ROUTING_THRESHOLD", "3")),
+        "escalonar": os.getenv("MODEL_ROUTING_ESCALATION", "True").lower() in ("true", "1", "t")
+    }
+
+def get_llm_metrics_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações da contabilidade de tokens, custo e latência das chamadas ao Claude.
+    
+    Returns:
+        Dict: Ativação, tamanho da janela móvel e arquivo de exportação
+    """
+    metrics_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+    return {
+        "enabled": os.getenv("LLM_METRICS_ENABLED", "True").lower() in ("true", "1", "t"),
+        "max_registros": int(os.getenv("LLM_METRICS_MAX_RECORDS", "5000")),
+        "path": os.getenv("LLM_METRICS_PATH") or os.path.join(metrics_dir, "metricas_llm.json")
+    }
+
+def get_asset_registry_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações do registro de prompts, templates e schemas.
+    
+    Returns:
+        Dict: Intervalo de verificação de alterações em disco (None desativa)
+    """
+    intervalo = float(os.getenv("ASSET_RELOAD_INTERVAL", "30"))
+    return {
+        "intervalo_verificacao": intervalo if intervalo >= 0 else None
+    }
+
+def _parse_orcamentos_tokens(valor: str) -> Dict[int, int]:
+    """
+    Converte uma lista "sessões:max_tokens" separada por vírgulas em um dicionário.
+    
+    Args:
+        valor (str): Ex.: "3:4000,5:6000,7:8000"
+        
+    Returns:
+        Dict[int, int]: Limite de tokens por número máximo de sessões semanais
+    """
+    orcamentos = {}
+    for item in valor.split(","):
+        if ":" in item:
+            sessoes, max_tokens = item.split(":", 1)
+            orcamentos[int(sessoes)] = int(max_tokens)
+    return orcamentos
+
+def get_generation_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações do modo de geração de planos pelo Treinador Especialista.
+    
+    Returns:
+        Dict: Modo de geração, compactação e cache de prompts, saída estruturada, orçamentos de tokens,
+              continuação de respostas truncadas, agrupamento de gerações idênticas simultâneas,
+              limites da geração em paralelo (fan-out), orçamentos do formato compacto e da
+              regeneração de um ciclo ou semana, reparo pelo Claude dos trechos inválidos e
+              guarda estrutural da saída em streaming
+    """
+    return {
+        "max_tokens_por_sessoes": _parse_orcamentos_tokens(
+            os.getenv("PLAN_MAX_TOKENS_BY_SESSIONS", "3:4000,5:6000,7:8000")),
+        "continuacao_max_requisicoes": int(os.getenv("PLAN_CONTINUATION_MAX_REQUESTS", "3")),
+        "continuacao_max_tokens": int(os.getenv("PLAN_CONTINUATION_MAX_TOKENS", "4000")),
+        "modo": os.getenv("PLAN_GENERATION_MODE", "completo").lower(),
+        "compactar_prompt": os.getenv("PROMPT_COMPACTION_ENABLED", "True").lower() in ("true", "1", "t"),
+        "cache_prompt": os.getenv("PROMPT_CACHE_ENABLED", "True").lower() in ("true", "1", "t"),
+        "saida_estruturada": os.getenv("PLAN_STRUCTURED_OUTPUT", "False").lower() in ("true", "1", "t"),
+        "coalescer_planos": os.getenv("PLAN_COALESCING_ENABLED", "True").lower() in ("true", "1", "t"),
+        "fanout_max_workers": int(os.getenv("PLAN_FANOUT_MAX_WORKERS", "4")),
+        "fanout_semanas_por_bloco": int(os.getenv("PLAN_FANOUT_WEEKS_PER_BLOCK", "0")),
+        "fanout_max_tokens_macro": int(os.getenv("PLAN_FANOUT_MAX_TOKENS_MACRO", "1500")),
+        "fanout_max_tokens_bloco": int(os.getenv("PLAN_FANOUT_MAX_TOKENS_BLOCK", "4000")),
+        "compacto_max_tokens": int(os.getenv("PLAN_COMPACT_MAX_TOKENS", "3000")),
+        "regeneracao_max_tokens": int(os.getenv("PLAN_REGENERATION_MAX_TOKENS", "6000")),
+        "reparo_llm": os.getenv("PLAN_LLM_REPAIR_ENABLED", "True").lower() in ("true", "1", "t"),
+        "reparo_max_trechos": int(os.getenv("PLAN_LLM_REPAIR_MAX_FRAGMENTS", "5")),
+        "reparo_max_tokens": int(os.getenv("PLAN_LLM_REPAIR_MAX_TOKENS", "1000")),
+        "guarda_stream": os.getenv("PLAN_STREAM_GUARD_ENABLED", "True").lower() in ("true", "1", "t"),
+        "guarda_max_preambulo": int(os.getenv("PLAN_STREAM_GUARD_MAX_PREAMBLE", "300")),
+        "guarda_retentativas": int(os.getenv("PLAN_STREAM_GUARD_RETRIES", "1")),
+        "stream_requisicao_unica": os.getenv("PLAN_STREAM_SINGLE_REQUEST", "False").lower() in ("true", "1", "t")
+    }
+
+def get_batch_config() -> Dict[str, Any]:
+    """
+    Obtém as configurações da geração de planos em lote (cadastro em massa).
+    
+    Returns:
+        Dict: Canal de lotes (local ou anthropic), requisições por lote, intervalo entre as
+              consultas, threads do canal local e das etapas 2 e 3
+    """
+    return {
+        "canal": os.getenv("BATCH_CHANNEL", "local").lower(),
+        "tamanho_lote": int(os.getenv("BATCH_SIZE", "50")),
+        "intervalo_consulta_s": float(os.getenv("BATCH_POLL_INTERVAL", "5")),
+        "workers_locais": int(os.getenv("BATCH_LOCAL_WORKERS", "4")),
+        "workers_etapas": int(os.getenv("BATCH_STAGE_WORKERS", "4"))
+    }
+
 def init_config() -> Dict[str, Dict[str, Any]]:
     """
     Inicializa todas as configurações.
@@ -99,9 +310,20 @@ def init_config() -> Dict[str, Dict[str, Any]]:
     """
     return {
         "claude": get_claude_config(),
+        "http_transport": get_http_transport_config(),
+        "retry": get_retry_config(),
+        "concurrency": get_concurrency_config(),
+        "rate_limit": get_rate_limit_config(),
         "supabase": get_supabase_config(),
         "database": get_db_config(),
-        "app": get_app_config()
+        "app": get_app_config(),
+        "plan_cache": get_plan_cache_config(),
+        "plan_similarity": get_plan_similarity_config(),
+        "model_routing": get_model_routing_config(),
+        "llm_metrics": get_llm_metrics_config(),
+        "generation": get_generation_config(),
+        "batch": get_batch_config(),
+        "asset_registry": get_asset_registry_config()
     }
 
 # Configuração global
@@ -0,0 +1,250 @@
+# Transporte HTTP com Pool de Conexões para a API Claude #
+
+import json
+import threading
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .logger import WrapperLogger
+from .config import get_http_transport_config
+
+# HTTP/2 é opcional e depende do pacote httpx[http2]
+try:
+    import httpx
+    HTTPX_DISPONIVEL = True
+except ImportError:
+    httpx = None
+    HTTPX_DISPONIVEL = False
+
+
+class StreamStatusError(requests.exceptions.RequestException):
+    """Resposta não-200 ao abrir um stream; mantém status, corpo e cabeçalhos."""
+
+    def __init__(self, status_code: int, texto: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"Status {status_code} ao abrir stream: {texto[:200]}")
+        self.status_code = status_code
+        self.texto = texto
+        self.headers = dict(headers or {})
+
+
+def ler_eventos_sse(linhas: Iterable[Union[str, bytes]]) -> Iterator[Dict[str, Any]]:
+    """
+    Converte as linhas de um stream Server-Sent Events nos eventos JSON da API Messages.
+
+    Args:
+        linhas (Iterable): Linhas recebidas do stream
+
+    Returns:
+        Iterator[Dict]: Eventos decodificados (o tipo vem no campo "type")
+    """
+    dados = []
+    for linha in linhas:
+        if isinstance(linha, bytes):
+            linha = linha.decode("utf-8")
+        linha = linha.rstrip("\r")
+        if not linha:
+            if dados:
+                yield json.loads("\n".join(dados))
+                dados = []
+            continue
+        if linha.startswith("data:"):
+            dados.append(linha[5:].lstrip())
+        # Linhas "event:" são ignoradas: o mesmo tipo está no campo "type" dos dados
+    if dados:
+        yield json.loads("\n".join(dados))
+
+
+class HttpTransport:
+    """
+    Transporte HTTP compartilhado com conexões keep-alive e timeouts configuráveis.
+
+    O pool de conexões (HTTPAdapter/urllib3) é único por transporte e seguro para
+    uso entre threads; cada thread recebe sua própria requests.Session montada
+    sobre esse pool, evitando serializar as requisições dos workers do Flask.
+    """
+
+    def __init__(self,
+                 connect_timeout: float = 5.0,
+                 read_timeout: float = 180.0,
+                 pool_size: int = 20,
+                 http2: bool = False,
+                 verify: bool = True):
+        """
+        Inicializa o transporte.
+
+        Args:
+            connect_timeout (float): Timeout de conexão em segundos
+            read_timeout (float): Timeout de leitura em segundos
+            pool_size (int): Número máximo de conexões mantidas por host
+            http2 (bool): Se True, usa httpx com HTTP/2 (quando disponível)
+            verify (bool): Se False, não valida o certificado TLS (apenas para testes locais)
+        """
+        self.logger = WrapperLogger("HttpTransport")
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.verify = verify
+        self._local = threading.local()
+        self._client = None
+
+        if http2 and not HTTPX_DISPONIVEL:
+            self.logger.warning("HTTP/2 solicitado, mas httpx não está instalado; usando HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+
+        if self.http2:
+            # httpx.Client é seguro para uso entre threads e mantém seu próprio pool
+            self._client = httpx.Client(
+                http2=True,
+                verify=verify,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            )
+        else:
+            self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+
+        self.logger.info(
+            f"Transporte HTTP inicializado (http2={self.http2}, pool={pool_size}, "
+            f"timeout=({connect_timeout}s, {read_timeout}s))"
+        )
+
+    def _obter_sessao(self) -> requests.Session:
+        """Retorna a sessão da thread atual, criando-a sobre o pool compartilhado."""
+        sessao = getattr(self._local, "sessao", None)
+        if sessao is None:
+            sessao = requests.Session()
+            sessao.mount("https://", self._adapter)
+            sessao.mount("http://", self._adapter)
+            self._local.sessao = sessao
+        return sessao
+
+    def post(self, url: str, headers: Dict[str, str], json_body: Dict[str, Any],
+             timeout: Optional[Tuple[float, float]] = None):
+        """
+        Envia uma requisição POST reutilizando conexões do pool.
+
+        Args:
+            url (str): URL de destino
+            headers (Dict): Cabeçalhos HTTP
+            json_body (Dict): Corpo da requisição
+            timeout (Tuple, optional): (connect, read) para sobrescrever o padrão
+
+        Returns:
+            Resposta com status_code, headers, text e json()
+
+        Raises:
+            requests.exceptions.RequestException: Em falhas de conexão ou timeout
+        """
+        timeout = timeout or self.timeout
+
+        if self._client is not None:
+            try:
+                return self._client.post(
+                    url, headers=headers, json=json_body,
+                    timeout=httpx.Timeout(timeout[1], connect=timeout[0])
+                )
+            except httpx.TimeoutException as e:
+                # Normalizar as exceções para a hierarquia do requests
+                raise requests.exceptions.Timeout(str(e)) from e
+            except httpx.HTTPError as e:
+                raise requests.exceptions.ConnectionError(str(e)) from e
+
+        return self._obter_sessao().post(url, headers=headers, json=json_body, timeout=timeout, verify=self.verify)
+
+    def stream_eventos(self, url: str, headers: Dict[str, str], json_body: Dict[str, Any],
+                       timeout: Optional[Tuple[float, float]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Envia uma requisição com "stream": true e produz os eventos SSE à medida que chegam.
+
+        Fechar o gerador (ou abandoná-lo) encerra a resposta e libera a conexão.
+
+        Args:
+            url (str): URL de destino
+            headers (Dict): Cabeçalhos HTTP
+            json_body (Dict): Corpo da requisição (o campo "stream" é forçado para True)
+            timeout (Tuple, optional): (connect, read) para sobrescrever o padrão
+
+        Returns:
+            Iterator[Dict]: Eventos da API Messages
+
+        Raises:
+            StreamStatusError: Se a resposta não tiver status 200
+            requests.exceptions.RequestException: Em falhas de conexão ou timeout
+        """
+        timeout = timeout or self.timeout
+        corpo = dict(json_body, stream=True)
+
+        if self._client is not None:
+            try:
+                with self._client.stream("POST", url, headers=headers, json=corpo,
+                                         timeout=httpx.Timeout(timeout[1], connect=timeout[0])) as resposta:
+                    if resposta.status_code != 200:
+                        resposta.read()
+                        raise StreamStatusError(resposta.status_code, resposta.text, resposta.headers)
+                    yield from ler_eventos_sse(resposta.iter_lines())
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.Timeout(str(e)) from e
+            except httpx.HTTPError as e:
+                raise requests.exceptions.ConnectionError(str(e)) from e
+            return
+
+        resposta = self._obter_sessao().post(url, headers=headers, json=corpo, timeout=timeout,
+                                             verify=self.verify, stream=True)
+        try:
+            if resposta.status_code != 200:
+                raise StreamStatusError(resposta.status_code, resposta.text, resposta.headers)
+            # text/event-stream sem charset seria decodificado como ISO-8859-1
+            resposta.encoding = "utf-8"
+            yield from ler_eventos_sse(resposta.iter_lines(chunk_size=None, decode_unicode=True))
+        finally:
+            resposta.close()
+
+    def fechar(self) -> None:
+        """Fecha as conexões mantidas pelo transporte."""
+        if self._client is not None:
+            self._client.close()
+        else:
+            self._adapter.close()
+        self.logger.info("Transporte HTTP fechado")
+
+
+# Instância compartilhada por processo
+_http_transport: Optional[HttpTransport] = None
+_http_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> HttpTransport:
+    """
+    Obtém o transporte HTTP compartilhado pelo processo.
+
+    Com CLAUDE_TRANSPORT_MODE=gravar ou reproduzir, o transporte é um TransporteCassete
+    com a mesma interface, que grava as respostas ou as reproduz sem acessar a rede.
+
+    Returns:
+        HttpTransport: Transporte configurado a partir das variáveis de ambiente
+    """
+    global _http_transport
+    with _http_transport_lock:
+        if _http_transport is None:
+            config = get_http_transport_config()
+            transporte = None
+            if config["modo"] != "reproduzir":
+                transporte = HttpTransport(
+                    connect_timeout=config["connect_timeout"],
+                    read_timeout=config["read_timeout"],
+                    pool_size=config["pool_size"],
+                    http2=config["http2"]
+                )
+            if config["modo"] != "http":
+                # Importado aqui: o módulo de cassetes depende deste
+                from .cassette_transport import TransporteCassete
+                transporte = TransporteCassete(
+                    config["cassete_dir"], modo=config["modo"], transporte=transporte,
+                    latencia=config["replay_latencia"],
+                    fator_latencia_gravada=config["replay_fator_latencia_gravada"],
+                    atraso_evento=config["replay_atraso_evento"],
+                    tamanho_pedaco=config["replay_tamanho_pedaco"]
+                )
+            _http_transport = transporte
+        return _http_transport
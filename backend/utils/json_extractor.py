@@ -0,0 +1,199 @@
+# Extração de JSON de Respostas de LLM em Tempo Linear #
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Iterable, List, Optional, Tuple
+
+# Fora de objetos só interessam "{" e cercas; dentro, o conteúdo entre chaves
+# (incluindo strings inteiras, com escapes) é consumido de uma vez pelo regex.
+# As alternativas começam por caracteres distintos e os quantificadores são
+# possessivos, então não há backtracking.
+_FORA_DE_OBJETO = re.compile(r"\{|```")
+_DENTRO_DE_OBJETO = re.compile(
+    r'(?:[^{}"`]++|"[^"\\]*+(?:\\.[^"\\]*+)*+"?|`(?!``))*+(\{|\}|```|\Z)', re.DOTALL)
+_LINGUAGEM = re.compile(r"[A-Za-z0-9_+-]*")
+
+
+class JSONNaoEncontradoError(ValueError):
+    """Nenhum objeto JSON foi encontrado no texto."""
+
+
+class JSONTruncadoError(ValueError):
+    """O texto termina com um objeto JSON não fechado (resposta truncada)."""
+
+    def __init__(self, mensagem: str, parcial: str):
+        super().__init__(mensagem)
+        self.parcial = parcial
+
+
+@dataclass
+class VarreduraJSON:
+    """Resultado da varredura de um texto em busca de JSON."""
+    # Trechos candidatos em ordem de preferência: blocos ```json, blocos ``` e objetos de nível superior
+    candidatos: List[Tuple[str, str]] = field(default_factory=list)
+    # Início do objeto de nível superior que ficou aberto no fim do texto
+    inicio_truncado: Optional[int] = None
+    texto: str = ""
+
+    @property
+    def truncado(self) -> bool:
+        return self.inicio_truncado is not None
+
+    @property
+    def parcial(self) -> str:
+        """Trecho do objeto não fechado (vazio se o texto não foi truncado)."""
+        return self.texto[self.inicio_truncado:] if self.truncado else ""
+
+
+def varrer_json(texto: str) -> VarreduraJSON:
+    """
+    Localiza blocos cercados por ``` e objetos de nível superior balanceados em uma passada.
+
+    Chaves e crases dentro de strings JSON são ignoradas (com tratamento de
+    escapes). A varredura é O(n) e não usa backtracking.
+
+    Args:
+        texto (str): Texto completo da resposta
+
+    Returns:
+        VarreduraJSON: Candidatos encontrados e indicação de truncamento
+    """
+    blocos_json: List[Tuple[str, str]] = []
+    blocos_simples: List[Tuple[str, str]] = []
+    objetos: List[str] = []
+
+    profundidade = 0
+    inicio_objeto = -1
+    pos = 0
+    # Bloco cercado aberto: (início do conteúdo, é json)
+    bloco: Optional[Tuple[int, bool]] = None
+
+    while True:
+        if profundidade:
+            marca = _DENTRO_DE_OBJETO.match(texto, pos)
+            token = marca.group(1)
+            inicio_token = marca.start(1)
+        else:
+            marca = _FORA_DE_OBJETO.search(texto, pos)
+            if marca is None:
+                break
+            token = marca.group(0)
+            inicio_token = marca.start()
+        if not token:
+            break
+        pos = marca.end()
+
+        if token == "```":
+            if bloco is None:
+                linguagem = _LINGUAGEM.match(texto, pos).group(0).lower()
+                pos += len(linguagem)
+                bloco = (pos, linguagem == "json")
+            else:
+                conteudo = texto[bloco[0]:inicio_token].strip()
+                if bloco[1]:
+                    blocos_json.append((conteudo, "bloco"))
+                elif conteudo.startswith(("{", "[")):
+                    blocos_simples.append((conteudo, "bloco"))
+                bloco = None
+            # Um objeto aberto não atravessa a fronteira de um bloco
+            profundidade = 0
+        elif token == "{":
+            if profundidade == 0:
+                inicio_objeto = inicio_token
+            profundidade += 1
+        elif token == "}":
+            profundidade -= 1
+            if profundidade == 0:
+                objetos.append(texto[inicio_objeto:pos])
+
+    objetos.sort(key=len, reverse=True)
+    return VarreduraJSON(
+        candidatos=blocos_json + blocos_simples + [(objeto, "objeto") for objeto in objetos],
+        inicio_truncado=inicio_objeto if profundidade > 0 else None,
+        texto=texto,
+    )
+
+
+def _truncado_no_fim(varredura: VarreduraJSON) -> bool:
+    """Indica se o objeto aberto no fim do texto é maior que qualquer candidato completo."""
+    maior = max((len(candidato) for candidato, _ in varredura.candidatos), default=0)
+    return varredura.truncado and len(varredura.parcial) > maior
+
+
+def json_truncado(texto: str) -> bool:
+    """
+    Indica se o texto termina no meio do JSON principal da resposta.
+
+    Usa o mesmo critério de extrair_json: um objeto aberto no fim do texto
+    que seja maior que todos os candidatos completos.
+
+    Args:
+        texto (str): Texto (parcial ou completo) da resposta
+
+    Returns:
+        bool: True se a resposta precisa de continuação
+    """
+    return _truncado_no_fim(varrer_json(texto))
+
+
+def extrair_json(texto: str) -> Any:
+    """
+    Extrai o JSON de uma resposta de LLM.
+
+    Usa o primeiro candidato que decodifica, na ordem: blocos ```json, blocos
+    ``` sem linguagem e o maior objeto de nível superior. Se o texto termina com
+    um objeto aberto maior que qualquer candidato, a resposta é tratada como
+    truncada em vez de se devolver um fragmento.
+
+    Args:
+        texto (str): Texto completo da resposta
+
+    Returns:
+        Any: Objeto JSON decodificado
+
+    Raises:
+        JSONTruncadoError: Se a resposta foi cortada no meio do JSON
+        JSONNaoEncontradoError: Se não há JSON no texto
+        json.JSONDecodeError: Se nenhum candidato é JSON válido
+    """
+    varredura = varrer_json(texto)
+    if _truncado_no_fim(varredura):
+        raise JSONTruncadoError(
+            f"JSON truncado: objeto aberto na posição {varredura.inicio_truncado} não foi fechado "
+            f"({len(varredura.parcial)} caracteres)", varredura.parcial)
+    if not varredura.candidatos:
+        raise JSONNaoEncontradoError("Nenhum JSON encontrado no texto")
+
+    ultimo_erro: Optional[json.JSONDecodeError] = None
+    for candidato, _ in varredura.candidatos:
+        try:
+            return json.loads(candidato)
+        except json.JSONDecodeError as e:
+            ultimo_erro = e
+    raise ultimo_erro
+
+
+def texto_da_resposta(conteudo: Any) -> str:
+    """
+    Concatena o texto dos blocos de conteúdo de uma resposta da API Messages.
+
+    Aceita dicts, strings e objetos com atributo `text` (blocos do SDK anthropic).
+
+    Args:
+        conteudo: Lista de blocos de conteúdo ou texto simples
+
+    Returns:
+        str: Texto concatenado
+    """
+    if isinstance(conteudo, str):
+        return conteudo
+    partes = []
+    for item in conteudo if isinstance(conteudo, Iterable) else []:
+        if isinstance(item, dict):
+            partes.append(item.get("text", "") or "")
+        elif isinstance(item, str):
+            partes.append(item)
+        else:
+            partes.append(getattr(item, "text", "") or "")
+    return "".join(partes)
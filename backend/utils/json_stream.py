@@ -0,0 +1,196 @@
+# Parser JSON Incremental para Respostas em Streaming #
+
+import bisect
+import json
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+Caminho = Tuple[Union[str, int], ...]
+
+# Caminhos emitidos por padrão ao gerar planos: cada ciclo e cada microciclo
+CAMINHOS_PLANO: Tuple[Tuple[str, ...], ...] = (
+    ("plano_principal", "ciclos", "*"),
+    ("plano_principal", "ciclos", "*", "microciclos", "*"),
+)
+
+
+class _Container:
+    """Estado de um objeto ou array ainda aberto durante a leitura."""
+
+    __slots__ = ("tipo", "inicio", "caminho", "indice", "chave", "esperando_chave", "aguardando_valor")
+
+    def __init__(self, tipo: str, inicio: int, caminho: Caminho):
+        self.tipo = tipo
+        self.inicio = inicio
+        self.caminho = caminho
+        self.indice = 0
+        self.chave: Optional[str] = None
+        self.esperando_chave = tipo == "{"
+        self.aguardando_valor = tipo == "["
+
+
+def caminho_corresponde(caminho: Caminho, padrao: Sequence[str]) -> bool:
+    """
+    Verifica se um caminho concreto corresponde a um padrão com curingas "*".
+
+    Args:
+        caminho (Tuple): Caminho concreto, ex.: ("plano_principal", "ciclos", 0)
+        padrao (Sequence): Padrão, ex.: ("plano_principal", "ciclos", "*")
+
+    Returns:
+        bool: True se o caminho corresponde ao padrão
+    """
+    if len(caminho) != len(padrao):
+        return False
+    return all(p == "*" or p == c for c, p in zip(caminho, padrao))
+
+
+class IncrementalJSONParser:
+    """
+    Lê um documento JSON em pedaços e emite subárvores assim que ficam completas.
+
+    O texto é percorrido uma única vez; strings e escapes são respeitados. Texto
+    antes do primeiro "{" (por exemplo a cerca ```json) e após o fechamento do
+    objeto raiz é ignorado.
+
+    Opcionalmente registra o início de cada valor próximo da raiz (caminho e primeiro
+    caractere), para que a estrutura seja conferida antes de o documento terminar.
+    """
+
+    def __init__(self, caminhos: Sequence[Sequence[str]] = CAMINHOS_PLANO, profundidade_inicios: int = 0):
+        """
+        Inicializa o parser.
+
+        Args:
+            caminhos (Sequence): Padrões de caminho cujas subárvores devem ser emitidas
+            profundidade_inicios (int): Registra o início dos valores cujo container tem caminho
+                mais curto que essa profundidade (0 desativa); consultados por novos_inicios()
+        """
+        self.caminhos = [tuple(c) for c in caminhos]
+        self.profundidade_inicios = profundidade_inicios
+        self._inicios: List[Tuple[Caminho, str]] = []
+        self.erro_estrutura: Optional[str] = None
+        self._partes: List[str] = []
+        self._offsets: List[int] = []
+        self._tamanho = 0
+        self._pilha: List[_Container] = []
+        self._em_string = False
+        self._escape = False
+        self._inicio_string = 0
+        self.iniciado = False
+        self.completo = False
+
+    @property
+    def profundidade(self) -> int:
+        """Número de containers abertos no momento."""
+        return len(self._pilha)
+
+    @property
+    def tamanho(self) -> int:
+        """Caracteres recebidos até o momento."""
+        return self._tamanho
+
+    def novos_inicios(self) -> List[Tuple[Caminho, str]]:
+        """Retorna e descarta os inícios de valores registrados desde a última chamada."""
+        inicios, self._inicios = self._inicios, []
+        return inicios
+
+    def texto(self) -> str:
+        """Retorna todo o texto recebido até o momento."""
+        return "".join(self._partes)
+
+    def _trecho(self, inicio: int, fim: int) -> str:
+        """Reconstrói o texto entre dois offsets absolutos sem concatenar o buffer inteiro."""
+        primeira = bisect.bisect_right(self._offsets, inicio) - 1
+        ultima = bisect.bisect_right(self._offsets, fim - 1) - 1
+        if primeira == ultima:
+            base = self._offsets[primeira]
+            return self._partes[primeira][inicio - base:fim - base]
+        partes = [self._partes[primeira][inicio - self._offsets[primeira]:]]
+        partes.extend(self._partes[primeira + 1:ultima])
+        partes.append(self._partes[ultima][:fim - self._offsets[ultima]])
+        return "".join(partes)
+
+    def _caminho_filho(self) -> Caminho:
+        """Caminho do próximo valor dentro do container atual."""
+        if not self._pilha:
+            return ()
+        atual = self._pilha[-1]
+        if atual.tipo == "{":
+            return atual.caminho + (atual.chave,)
+        return atual.caminho + (atual.indice,)
+
+    def alimentar(self, pedaco: str) -> List[Tuple[Caminho, Any]]:
+        """
+        Processa um novo pedaço de texto.
+
+        Args:
+            pedaco (str): Texto recebido do stream
+
+        Returns:
+            List[Tuple]: Subárvores completadas neste pedaço, como (caminho, valor)
+        """
+        emitidos: List[Tuple[Caminho, Any]] = []
+        if not pedaco or self.completo:
+            return emitidos
+
+        base = self._tamanho
+        self._offsets.append(base)
+        self._partes.append(pedaco)
+        self._tamanho += len(pedaco)
+
+        pilha = self._pilha
+        for i, ch in enumerate(pedaco):
+            posicao = base + i
+
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._em_string = False
+                    atual = pilha[-1] if pilha else None
+                    if atual is not None and atual.tipo == "{" and atual.esperando_chave:
+                        atual.chave = json.loads(self._trecho(self._inicio_string, posicao + 1))
+                        atual.esperando_chave = False
+                        atual.aguardando_valor = True
+                continue
+
+            if not self.iniciado:
+                if ch == "{":
+                    self.iniciado = True
+                    pilha.append(_Container("{", posicao, ()))
+                continue
+
+            if pilha and pilha[-1].aguardando_valor and ch not in " \t\r\n:]}":
+                atual = pilha[-1]
+                atual.aguardando_valor = False
+                if len(atual.caminho) < self.profundidade_inicios:
+                    self._inicios.append((self._caminho_filho(), ch))
+
+            if ch == '"':
+                self._em_string = True
+                self._inicio_string = posicao
+            elif ch == "{" or ch == "[":
+                pilha.append(_Container(ch, posicao, self._caminho_filho()))
+            elif ch == "}" or ch == "]":
+                if not pilha:
+                    continue
+                fechado = pilha.pop()
+                if (fechado.tipo == "{") != (ch == "}") and self.erro_estrutura is None:
+                    self.erro_estrutura = f"'{ch}' fecha '{fechado.tipo}' em {list(fechado.caminho)}"
+                if any(caminho_corresponde(fechado.caminho, p) for p in self.caminhos):
+                    valor = json.loads(self._trecho(fechado.inicio, posicao + 1))
+                    emitidos.append((fechado.caminho, valor))
+                if not pilha:
+                    self.completo = True
+                    break
+            elif ch == ",":
+                if pilha:
+                    atual = pilha[-1]
+                    if atual.tipo == "[":
+                        atual.indice += 1
+                        atual.aguardando_valor = True
+                    else:
+                        atual.esperando_chave = True
+        return emitidos
@@ -0,0 +1,326 @@
+# Contabilidade de Tokens, Custo e Latência das Chamadas ao Claude #
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence
+
+from .logger import WrapperLogger
+from .config import get_llm_metrics_config
+
+# Preço em USD por milhão de tokens (entrada, saída), pelo prefixo do nome do modelo
+PRECOS_POR_MILHAO: Dict[str, tuple] = {
+    "claude-3-opus": (15.0, 75.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-sonnet": (3.0, 15.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+
+# Multiplicadores do preço de entrada para a escrita e a leitura do cache de prompts
+FATOR_CACHE_ESCRITA = 1.25
+FATOR_CACHE_LEITURA = 0.1
+
+# Limites superiores dos intervalos dos histogramas
+LIMITES_LATENCIA = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 180)
+LIMITES_TOKENS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# Resultados possíveis de uma chamada
+RESULTADO_SUCESSO = "sucesso"
+RESULTADO_ERRO_API = "erro_api"
+RESULTADO_ERRO_CONEXAO = "erro_conexao"
+RESULTADO_ERRO_JSON = "erro_json"
+RESULTADO_CIRCUITO_ABERTO = "circuito_aberto"
+RESULTADO_FILA_ESGOTADA = "fila_esgotada"
+RESULTADO_TAXA_ESGOTADA = "taxa_esgotada"
+RESULTADO_SAIDA_ABORTADA = "saida_abortada"
+
+
+def calcular_custo(modelo: str, input_tokens: int, output_tokens: int,
+                   cache_escrita_tokens: int = 0, cache_leitura_tokens: int = 0) -> Optional[float]:
+    """
+    Calcula o custo de uma chamada em USD.
+
+    Args:
+        modelo (str): Nome do modelo
+        input_tokens (int): Tokens de entrada fora do cache
+        output_tokens (int): Tokens de saída
+        cache_escrita_tokens (int): Tokens de entrada gravados no cache de prompts
+        cache_leitura_tokens (int): Tokens de entrada lidos do cache de prompts
+
+    Returns:
+        Optional[float]: Custo em USD ou None se o modelo não tiver preço conhecido
+    """
+    for prefixo in sorted(PRECOS_POR_MILHAO, key=len, reverse=True):
+        if (modelo or "").startswith(prefixo):
+            entrada, saida = PRECOS_POR_MILHAO[prefixo]
+            entrada_total = (input_tokens + cache_escrita_tokens * FATOR_CACHE_ESCRITA
+                             + cache_leitura_tokens * FATOR_CACHE_LEITURA)
+            return (entrada_total * entrada + output_tokens * saida) / 1_000_000
+    return None
+
+
+@dataclass
+class RegistroChamada:
+    """Uma chamada à API Claude."""
+    origem: str
+    operacao: str
+    modelo: str
+    resultado: str
+    total_s: float
+    ttfb_s: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_escrita_tokens: int = 0
+    cache_leitura_tokens: int = 0
+    stop_reason: Optional[str] = None
+    tentativas: int = 1
+    status_code: Optional[int] = None
+    versao_prompt: Optional[str] = None
+    streaming: bool = False
+    custo_usd: Optional[float] = None
+    instante: float = field(default_factory=time.time)
+
+
+def _percentil(valores: Sequence[float], fracao: float) -> float:
+    """Percentil por posição mais próxima em uma lista já ordenada."""
+    indice = min(len(valores) - 1, max(0, int(round(fracao * (len(valores) - 1)))))
+    return valores[indice]
+
+
+def resumir_valores(valores: Iterable[Optional[float]], limites: Sequence[float]) -> Dict[str, Any]:
+    """
+    Resume uma série de valores em estatísticas e histograma.
+
+    Args:
+        valores (Iterable): Valores (None é ignorado)
+        limites (Sequence): Limites superiores dos intervalos do histograma
+
+    Returns:
+        Dict: Quantidade, soma, média, p50, p90, p99, máximo e contagem por intervalo
+    """
+    ordenados = sorted(v for v in valores if v is not None)
+    histograma = {f"<={limite}": 0 for limite in limites}
+    histograma[f">{limites[-1]}"] = 0
+    for valor in ordenados:
+        for limite in limites:
+            if valor <= limite:
+                histograma[f"<={limite}"] += 1
+                break
+        else:
+            histograma[f">{limites[-1]}"] += 1
+    if not ordenados:
+        return {"quantidade": 0, "histograma": histograma}
+    return {
+        "quantidade": len(ordenados),
+        "soma": sum(ordenados),
+        "media": sum(ordenados) / len(ordenados),
+        "p50": _percentil(ordenados, 0.50),
+        "p90": _percentil(ordenados, 0.90),
+        "p99": _percentil(ordenados, 0.99),
+        "max": ordenados[-1],
+        "histograma": histograma
+    }
+
+
+class MetricasLLM:
+    """
+    Registro em memória das chamadas ao Claude, com janela móvel e totais acumulados.
+
+    Os registros mais recentes (até max_registros) alimentam os histogramas de
+    tokens e latência; os totais por modelo e resultado nunca são descartados.
+    Contadores e estados nomeados (retentativas, disjuntor) acompanham o que não
+    é uma chamada. Seguro para uso entre threads.
+    """
+
+    def __init__(self, max_registros: int = 5000, caminho: Optional[str] = None):
+        """
+        Args:
+            max_registros (int): Tamanho da janela móvel de registros
+            caminho (str, optional): Arquivo padrão de exportação
+        """
+        self.logger = WrapperLogger("MetricasLLM")
+        self.caminho = caminho
+        self._registros: Deque[RegistroChamada] = deque(maxlen=max_registros)
+        self._totais: Dict[str, Dict[str, Any]] = {}
+        self._contadores: Dict[str, int] = {}
+        self._estados: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, registro: RegistroChamada) -> RegistroChamada:
+        """
+        Registra uma chamada, calculando o custo quando o modelo tem preço conhecido.
+
+        Args:
+            registro (RegistroChamada): Dados da chamada
+
+        Returns:
+            RegistroChamada: O próprio registro, com o custo preenchido
+        """
+        if registro.custo_usd is None:
+            registro.custo_usd = calcular_custo(registro.modelo, registro.input_tokens, registro.output_tokens,
+                                                registro.cache_escrita_tokens, registro.cache_leitura_tokens)
+        chave = f"{registro.modelo}|{registro.resultado}"
+        with self._lock:
+            self._registros.append(registro)
+            total = self._totais.setdefault(chave, {
+                "modelo": registro.modelo, "resultado": registro.resultado, "chamadas": 0,
+                "input_tokens": 0, "output_tokens": 0, "cache_escrita_tokens": 0, "cache_leitura_tokens": 0,
+                "custo_usd": 0.0, "tempo_total_s": 0.0
+            })
+            total["chamadas"] += 1
+            total["input_tokens"] += registro.input_tokens
+            total["output_tokens"] += registro.output_tokens
+            total["cache_escrita_tokens"] += registro.cache_escrita_tokens
+            total["cache_leitura_tokens"] += registro.cache_leitura_tokens
+            total["custo_usd"] += registro.custo_usd or 0.0
+            total["tempo_total_s"] += registro.total_s
+        self.logger.debug(
+            f"Chamada {registro.operacao} ({registro.resultado}): {registro.input_tokens}/{registro.output_tokens} "
+            f"tokens (cache: {registro.cache_escrita_tokens} gravados, {registro.cache_leitura_tokens} lidos), "
+            f"{registro.total_s:.2f}s, stop_reason={registro.stop_reason}"
+        )
+        return registro
+
+    def registros(self, janela_segundos: Optional[float] = None,
+                  filtro: Optional[Callable[[RegistroChamada], bool]] = None) -> List[RegistroChamada]:
+        """
+        Retorna os registros da janela móvel.
+
+        Args:
+            janela_segundos (float, optional): Considera apenas as chamadas mais recentes que isso
+            filtro (Callable, optional): Predicado adicional sobre cada registro
+
+        Returns:
+            List[RegistroChamada]: Registros em ordem cronológica
+        """
+        with self._lock:
+            registros = list(self._registros)
+        if janela_segundos is not None:
+            limite = time.time() - janela_segundos
+            registros = [r for r in registros if r.instante >= limite]
+        if filtro is not None:
+            registros = [r for r in registros if filtro(r)]
+        return registros
+
+    def resumo(self, janela_segundos: Optional[float] = None, modelo: Optional[str] = None,
+               operacao: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resume as chamadas da janela móvel em estatísticas e histogramas.
+
+        Args:
+            janela_segundos (float, optional): Considera apenas as chamadas mais recentes que isso
+            modelo (str, optional): Filtra por modelo
+            operacao (str, optional): Filtra por operação (plano, continuacao, fanout_bloco...)
+
+        Returns:
+            Dict: Contagens por resultado e stop_reason, custo, aproveitamento do cache de prompts
+                  e histogramas de tokens e latência
+        """
+        registros = self.registros(janela_segundos, lambda r: (modelo is None or r.modelo == modelo)
+                                   and (operacao is None or r.operacao == operacao))
+        por_resultado: Dict[str, int] = {}
+        por_stop_reason: Dict[str, int] = {}
+        for registro in registros:
+            por_resultado[registro.resultado] = por_resultado.get(registro.resultado, 0) + 1
+            chave = registro.stop_reason or "-"
+            por_stop_reason[chave] = por_stop_reason.get(chave, 0) + 1
+        duracao = (registros[-1].instante - registros[0].instante) if len(registros) > 1 else 0.0
+        entrada_total = sum(r.input_tokens + r.cache_escrita_tokens + r.cache_leitura_tokens for r in registros)
+        return {
+            "chamadas": len(registros),
+            "por_resultado": por_resultado,
+            "por_stop_reason": por_stop_reason,
+            "custo_usd": sum(r.custo_usd or 0.0 for r in registros),
+            "chamadas_por_minuto": len(registros) * 60 / duracao if duracao else None,
+            "retentativas": sum(r.tentativas - 1 for r in registros),
+            "input_tokens": resumir_valores((r.input_tokens for r in registros), LIMITES_TOKENS),
+            "output_tokens": resumir_valores((r.output_tokens for r in registros), LIMITES_TOKENS),
+            "cache_escrita_tokens": sum(r.cache_escrita_tokens for r in registros),
+            "cache_leitura_tokens": sum(r.cache_leitura_tokens for r in registros),
+            "fracao_entrada_do_cache": (sum(r.cache_leitura_tokens for r in registros) / entrada_total
+                                        if entrada_total else None),
+            "ttfb_s": resumir_valores((r.ttfb_s for r in registros), LIMITES_LATENCIA),
+            "total_s": resumir_valores((r.total_s for r in registros), LIMITES_LATENCIA)
+        }
+
+    def incrementar(self, contador: str, quantidade: int = 1) -> None:
+        """Soma ao contador nomeado (acumulado desde o início do processo)."""
+        with self._lock:
+            self._contadores[contador] = self._contadores.get(contador, 0) + quantidade
+
+    def definir_estado(self, nome: str, valor: Any) -> None:
+        """Registra o valor atual de um estado nomeado (por exemplo, o do disjuntor)."""
+        with self._lock:
+            self._estados[nome] = valor
+
+    def contadores(self) -> Dict[str, Any]:
+        """Retorna os contadores acumulados e os estados atuais."""
+        with self._lock:
+            return {"contadores": dict(self._contadores), "estados": dict(self._estados)}
+
+    def totais(self) -> List[Dict[str, Any]]:
+        """Retorna os totais acumulados por modelo e resultado desde o início do processo."""
+        with self._lock:
+            return [dict(total) for total in self._totais.values()]
+
+    def exportar(self, caminho: Optional[str] = None, incluir_registros: bool = True) -> str:
+        """
+        Grava o resumo, os totais e (opcionalmente) os registros da janela em um arquivo JSON.
+
+        Args:
+            caminho (str, optional): Arquivo de destino; por padrão o configurado em LLM_METRICS_PATH
+            incluir_registros (bool): Se True, inclui cada chamada da janela móvel
+
+        Returns:
+            str: Caminho do arquivo gravado
+        """
+        caminho = caminho or self.caminho
+        if not caminho:
+            raise ValueError("Nenhum caminho de exportação informado")
+        conteudo = {"gerado_em": time.time(), "resumo": self.resumo(), "totais": self.totais(), **self.contadores()}
+        if incluir_registros:
+            conteudo["registros"] = [asdict(r) for r in self.registros()]
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(conteudo, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+        self.logger.info(f"Métricas de {len(conteudo.get('registros', []))} chamadas exportadas para {caminho}")
+        return caminho
+
+    def limpar(self) -> None:
+        """Descarta os registros e os totais."""
+        with self._lock:
+            self._registros.clear()
+            self._totais.clear()
+            self._contadores.clear()
+            self._estados.clear()
+
+
+# Instância compartilhada por processo
+_llm_metrics: Optional[MetricasLLM] = None
+_llm_metrics_lock = threading.Lock()
+
+
+def get_llm_metrics() -> Optional[MetricasLLM]:
+    """
+    Obtém o registro de métricas das chamadas ao Claude compartilhado pelo processo.
+
+    Returns:
+        Optional[MetricasLLM]: Registro configurado ou None se desabilitado
+    """
+    global _llm_metrics
+    config = get_llm_metrics_config()
+    if not config["enabled"]:
+        return None
+
+    with _llm_metrics_lock:
+        if _llm_metrics is None:
+            _llm_metrics = MetricasLLM(max_registros=config["max_registros"], caminho=config["path"])
+        return _llm_metrics
@@ -0,0 +1,378 @@
+# Motor Local de Planos de Treinamento (Modo Degradado) #
+
+import hashlib
+import json
+import unicodedata
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .plan_cache import normalizar_dados_usuario
+
+# Origem registrada nos planos gerados por este motor
+ORIGEM_REGRAS_LOCAIS = "regras_locais"
+
+SEMANAS_PLANO = 12
+SEMANAS_POR_CICLO = 4
+
+# Exercícios por grupo muscular: (nome, equipamento, regiões articulares sobrecarregadas)
+EXERCICIOS_POR_GRUPO: Dict[str, List[Tuple[str, str, Tuple[str, ...]]]] = {
+    "Peito": [
+        ("Supino reto com barra", "Barra", ("ombro", "punho")),
+        ("Supino inclinado com halteres", "Halteres", ("ombro",)),
+        ("Crucifixo na máquina", "Máquina", ()),
+        ("Flexão de braços", "Peso corporal", ("punho",)),
+    ],
+    "Costas": [
+        ("Puxada frontal", "Polia", ("ombro",)),
+        ("Remada baixa na polia", "Polia", ()),
+        ("Remada curvada com barra", "Barra", ("lombar",)),
+        ("Remada unilateral com halter", "Halter", ()),
+    ],
+    "Quadríceps": [
+        ("Agachamento livre", "Barra", ("joelho", "lombar")),
+        ("Leg press 45°", "Máquina", ("joelho",)),
+        ("Afundo com halteres", "Halteres", ("joelho", "tornozelo")),
+        ("Cadeira extensora", "Máquina", ("joelho",)),
+    ],
+    "Posterior": [
+        ("Elevação pélvica", "Barra", ()),
+        ("Levantamento terra romeno", "Barra", ("lombar",)),
+        ("Mesa flexora", "Máquina", ("joelho",)),
+        ("Cadeira abdutora", "Máquina", ("quadril",)),
+    ],
+    "Ombros": [
+        ("Desenvolvimento com halteres", "Halteres", ("ombro",)),
+        ("Elevação lateral", "Halteres", ("ombro",)),
+        ("Face pull", "Polia", ()),
+        ("Crucifixo inverso na máquina", "Máquina", ()),
+    ],
+    "Bíceps": [
+        ("Rosca direta com barra", "Barra", ("punho", "cotovelo")),
+        ("Rosca martelo", "Halteres", ()),
+        ("Rosca na polia", "Polia", ("cotovelo",)),
+    ],
+    "Tríceps": [
+        ("Tríceps na polia", "Polia", ()),
+        ("Tríceps francês com halter", "Halter", ("ombro", "cotovelo")),
+        ("Mergulho no banco", "Peso corporal", ("ombro", "punho")),
+    ],
+    "Panturrilha": [
+        ("Panturrilha em pé", "Máquina", ("tornozelo",)),
+        ("Panturrilha sentado", "Máquina", ()),
+    ],
+    "Core": [
+        ("Prancha", "Peso corporal", ()),
+        ("Dead bug", "Peso corporal", ()),
+        ("Pallof press", "Polia", ()),
+        ("Abdominal supra", "Peso corporal", ("lombar",)),
+    ],
+}
+
+# Divisões por frequência semanal: (nome da sessão, grupos em ordem de prioridade)
+DIVISOES: Dict[int, Tuple[str, List[Tuple[str, Sequence[str]]]]] = {
+    1: ("Corpo inteiro", [
+        ("Corpo inteiro A", ("Quadríceps", "Peito", "Costas", "Posterior", "Ombros", "Core", "Bíceps", "Tríceps")),
+    ]),
+    2: ("Corpo inteiro", [
+        ("Corpo inteiro A", ("Quadríceps", "Peito", "Costas", "Ombros", "Core", "Tríceps", "Panturrilha", "Bíceps")),
+        ("Corpo inteiro B", ("Posterior", "Costas", "Peito", "Quadríceps", "Bíceps", "Core", "Ombros", "Tríceps")),
+    ]),
+    3: ("Corpo inteiro", [
+        ("Corpo inteiro A", ("Quadríceps", "Peito", "Costas", "Ombros", "Core", "Tríceps", "Panturrilha", "Bíceps")),
+        ("Corpo inteiro B", ("Posterior", "Costas", "Peito", "Quadríceps", "Bíceps", "Core", "Ombros", "Tríceps")),
+        ("Corpo inteiro C", ("Quadríceps", "Costas", "Ombros", "Posterior", "Peito", "Core", "Panturrilha", "Bíceps")),
+    ]),
+    4: ("Superior/Inferior", [
+        ("Superior A", ("Peito", "Costas", "Ombros", "Tríceps", "Bíceps", "Core", "Peito", "Costas")),
+        ("Inferior A", ("Quadríceps", "Posterior", "Quadríceps", "Panturrilha", "Core", "Posterior", "Core", "Quadríceps")),
+        ("Superior B", ("Costas", "Peito", "Ombros", "Bíceps", "Tríceps", "Core", "Costas", "Ombros")),
+        ("Inferior B", ("Posterior", "Quadríceps", "Posterior", "Panturrilha", "Core", "Quadríceps", "Core", "Posterior")),
+    ]),
+    5: ("Empurrar/Puxar/Pernas + Superior/Inferior", [
+        ("Empurrar", ("Peito", "Ombros", "Tríceps", "Peito", "Ombros", "Tríceps", "Core", "Peito")),
+        ("Puxar", ("Costas", "Bíceps", "Costas", "Ombros", "Bíceps", "Core", "Costas", "Bíceps")),
+        ("Pernas", ("Quadríceps", "Posterior", "Quadríceps", "Panturrilha", "Posterior", "Core", "Quadríceps", "Core")),
+        ("Superior", ("Peito", "Costas", "Ombros", "Bíceps", "Tríceps", "Core", "Costas", "Peito")),
+        ("Inferior", ("Posterior", "Quadríceps", "Panturrilha", "Posterior", "Core", "Quadríceps", "Core", "Posterior")),
+    ]),
+    6: ("Empurrar/Puxar/Pernas", [
+        ("Empurrar A", ("Peito", "Ombros", "Tríceps", "Peito", "Ombros", "Tríceps", "Core", "Peito")),
+        ("Puxar A", ("Costas", "Bíceps", "Costas", "Ombros", "Bíceps", "Core", "Costas", "Bíceps")),
+        ("Pernas A", ("Quadríceps", "Posterior", "Quadríceps", "Panturrilha", "Posterior", "Core", "Quadríceps", "Core")),
+        ("Empurrar B", ("Ombros", "Peito", "Tríceps", "Peito", "Ombros", "Tríceps", "Core", "Ombros")),
+        ("Puxar B", ("Costas", "Ombros", "Bíceps", "Costas", "Bíceps", "Core", "Costas", "Ombros")),
+        ("Pernas B", ("Posterior", "Quadríceps", "Posterior", "Panturrilha", "Quadríceps", "Core", "Posterior", "Core")),
+    ]),
+}
+
+# Parâmetros por objetivo: palavras-chave, repetições, %1RM inicial, descanso (s), cadência e método
+OBJETIVOS: Dict[str, Dict[str, Any]] = {
+    "Força": {"chaves": ("forca",), "repeticoes": "4-6", "percentual_rm": 78, "tempo_descanso": 150,
+              "cadencia": "2-1-1", "metodo": "tradicional"},
+    "Hipertrofia": {"chaves": ("hipertrof", "massa", "musculo", "ganho"), "repeticoes": "8-12", "percentual_rm": 68,
+                    "tempo_descanso": 90, "cadencia": "2-0-2", "metodo": "tradicional"},
+    "Emagrecimento": {"chaves": ("emagrec", "perda de peso", "perder peso", "gordura", "definicao"),
+                      "repeticoes": "12-15", "percentual_rm": 60, "tempo_descanso": 45, "cadencia": "2-0-1",
+                      "metodo": "bi-set"},
+    "Condicionamento geral": {"chaves": ("resist", "condicion", "saude", "qualidade de vida"), "repeticoes": "12-15",
+                              "percentual_rm": 62, "tempo_descanso": 60, "cadencia": "2-0-2", "metodo": "tradicional"},
+}
+OBJETIVO_PADRAO = "Condicionamento geral"
+
+# Ciclos de 4 semanas com progressão linear; a última semana de cada ciclo é de recuperação
+CICLOS = (
+    ("Adaptação", "Adaptação anatômica e aprendizado técnico"),
+    ("Desenvolvimento", "Aumento progressivo de volume e carga"),
+    ("Intensificação", "Maior intensidade com volume controlado"),
+)
+
+DIAS_SEMANA = {"seg": 1, "ter": 2, "qua": 3, "qui": 4, "sex": 5, "sab": 6, "dom": 7}
+DIAS_PADRAO = {1: [1], 2: [1, 4], 3: [1, 3, 5], 4: [1, 2, 4, 5], 5: [1, 2, 3, 4, 5], 6: [1, 2, 3, 4, 5, 6]}
+
+# Termos das lesões mapeados para as regiões usadas em EXERCICIOS_POR_GRUPO
+REGIOES_LESAO = {
+    "joelho": "joelho", "menisco": "joelho", "patela": "joelho", "ligamento cruzado": "joelho",
+    "ombro": "ombro", "manguito": "ombro",
+    "lombar": "lombar", "coluna": "lombar", "hernia": "lombar",
+    "punho": "punho", "pulso": "punho",
+    "cotovelo": "cotovelo", "epicondil": "cotovelo",
+    "tornozelo": "tornozelo",
+    "quadril": "quadril",
+}
+
+
+def _normalizar_texto(texto: Any) -> str:
+    """Minúsculas e sem acentos, para comparar termos do questionário."""
+    decomposto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def _identificar_objetivo(objetivos: Any) -> str:
+    """Objetivo de maior prioridade (menor número) que corresponda a um dos perfis conhecidos."""
+    itens = [o for o in objetivos or [] if isinstance(o, dict)] if isinstance(objetivos, list) else []
+    if isinstance(objetivos, str):
+        itens = [{"nome": objetivos}]
+    for objetivo in sorted(itens, key=lambda o: o.get("prioridade") if isinstance(o.get("prioridade"), int) else 99):
+        nome = _normalizar_texto(objetivo.get("nome"))
+        for perfil, parametros in OBJETIVOS.items():
+            if any(chave in nome for chave in parametros["chaves"]):
+                return perfil
+    return OBJETIVO_PADRAO
+
+
+def _regioes_lesionadas(lesoes: Any) -> List[str]:
+    """Regiões articulares citadas nas lesões do usuário."""
+    regioes = []
+    for lesao in lesoes or []:
+        texto = _normalizar_texto(" ".join(str(lesao.get(campo, "")) for campo in ("regiao", "nome", "observacoes"))
+                                  if isinstance(lesao, dict) else lesao)
+        for termo, regiao in REGIOES_LESAO.items():
+            if termo in texto and regiao not in regioes:
+                regioes.append(regiao)
+    return regioes
+
+
+def _dias_treino(dados_usuario: Dict[str, Any]) -> List[int]:
+    """Dias da semana (1 = segunda) dos treinos, limitados a 6 por semana."""
+    dias = []
+    for dia in dados_usuario.get("dias_disponiveis") or []:
+        numero = DIAS_SEMANA.get(_normalizar_texto(dia)[:3])
+        if numero and numero not in dias:
+            dias.append(numero)
+    if dias:
+        return sorted(dias)[:6]
+    try:
+        frequencia = int(dados_usuario.get("disponibilidade_semanal") or 3)
+    except (TypeError, ValueError):
+        frequencia = 3
+    return DIAS_PADRAO[min(6, max(1, frequencia))]
+
+
+def _nivel(dados_usuario: Dict[str, Any]) -> str:
+    nivel = _normalizar_texto(dados_usuario.get("nivel") or "iniciante")
+    if nivel.startswith("avanc"):
+        return "avançado"
+    if nivel.startswith("inter"):
+        return "intermediário"
+    return "iniciante"
+
+
+def _exercicios_por_sessao(tempo_treino: Any, nivel: str) -> int:
+    """Exercícios que cabem no tempo de treino (cerca de 10 minutos cada, fora o aquecimento)."""
+    try:
+        minutos = int(float(tempo_treino or 60))
+    except (TypeError, ValueError):
+        minutos = 60
+    quantidade = (minutos - 10) // 10 + {"iniciante": -1, "intermediário": 0, "avançado": 1}[nivel]
+    return min(8, max(3, quantidade))
+
+
+def gerar_plano_local(dados_usuario: Dict[str, Any], motivo: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Gera por regras, sem chamar o Claude, um plano completo de 12 semanas.
+
+    Usado quando a API está indisponível (sem chave, disjuntor aberto, fila cheia ou erro),
+    para que a latência continue limitada. O plano usa nível, objetivos, dias disponíveis,
+    tempo de treino e lesões do questionário: divisão conforme a frequência, faixa de
+    repetições e %1RM conforme o objetivo, três ciclos de progressão linear com semana
+    de recuperação e exclusão dos exercícios que sobrecarregam as regiões lesionadas.
+    O resultado é determinístico: o mesmo questionário gera o mesmo plano, com os mesmos IDs.
+
+    Args:
+        dados_usuario (Dict): Dados do usuário recebidos do questionário
+        motivo (str, optional): Motivo do modo degradado, registrado no plano
+
+    Returns:
+        Dict: Plano no formato retornado pelo Claude (sem treinamento_id, versão e data)
+    """
+    semente = hashlib.sha256(json.dumps(normalizar_dados_usuario(dados_usuario), sort_keys=True,
+                                        ensure_ascii=False).encode("utf-8")).hexdigest()
+    novo_id = lambda *caminho: str(uuid.uuid5(uuid.NAMESPACE_URL, f"forca-plano-local:{semente}:{caminho}"))
+
+    nivel = _nivel(dados_usuario)
+    objetivo = _identificar_objetivo(dados_usuario.get("objetivos"))
+    parametros = OBJETIVOS[objetivo]
+    dias = _dias_treino(dados_usuario)
+    nome_divisao, sessoes_divisao = DIVISOES[len(dias)]
+    n_exercicios = _exercicios_por_sessao(dados_usuario.get("tempo_treino"), nivel)
+    regioes = _regioes_lesionadas(dados_usuario.get("lesoes"))
+    cardio = _normalizar_texto(dados_usuario.get("cardio")).startswith("s")
+    alongamento = _normalizar_texto(dados_usuario.get("alongamento")).startswith("s")
+    try:
+        duracao_sessao = int(float(dados_usuario.get("tempo_treino") or 60))
+    except (TypeError, ValueError):
+        duracao_sessao = 60
+
+    # Exercícios permitidos por grupo, sem os que sobrecarregam regiões lesionadas
+    permitidos = {
+        grupo: [e for e in exercicios if not set(e[2]) & set(regioes)]
+        for grupo, exercicios in EXERCICIOS_POR_GRUPO.items()
+    }
+    obs_lesoes = f"Exercícios que sobrecarregam {', '.join(regioes)} foram excluídos" if regioes else ""
+
+    ciclos = []
+    for indice_ciclo, (nome_ciclo, objetivo_ciclo) in enumerate(CICLOS):
+        microciclos = []
+        for indice_semana in range(SEMANAS_POR_CICLO):
+            semana = indice_ciclo * SEMANAS_POR_CICLO + indice_semana + 1
+            recuperacao = indice_semana == SEMANAS_POR_CICLO - 1
+            if recuperacao:
+                percentual = parametros["percentual_rm"] + 5 * indice_ciclo - 5
+                series = 2
+                volume, intensidade, foco = "baixo", "baixa", "Recuperação"
+            else:
+                percentual = parametros["percentual_rm"] + 5 * indice_ciclo + 2.5 * indice_semana
+                series = {"iniciante": 3, "intermediário": 3 + (indice_ciclo > 0), "avançado": 4}[nivel]
+                volume = ("moderado", "alto", "moderado")[indice_ciclo]
+                intensidade = ("baixa", "média", "alta")[indice_ciclo]
+                foco = f"{nome_ciclo} - semana {indice_semana + 1}"
+            percentual = int(min(90, percentual))
+            nivel_intensidade = min(10, 4 + 2 * indice_ciclo + (0 if recuperacao else indice_semana))
+
+            sessoes = []
+            for indice_sessao, (dia, (nome_sessao, grupos)) in enumerate(zip(dias, sessoes_divisao)):
+                exercicios = []
+                usados = set()
+                for grupo in grupos:
+                    if len(exercicios) >= n_exercicios:
+                        break
+                    opcoes = [e for e in permitidos[grupo] if e[0] not in usados]
+                    if not opcoes:
+                        continue
+                    # Variação entre ciclos e entre sessões da mesma divisão
+                    nome, equipamento, _ = opcoes[(indice_ciclo + indice_sessao) % len(opcoes)]
+                    usados.add(nome)
+                    ordem = len(exercicios) + 1
+                    observacoes = obs_lesoes
+                    if semana == 1 and indice_sessao == 0:
+                        observacoes = "Primeiro treino: teste de carga para estimar 1RM. " + observacoes
+                    exercicios.append({
+                        "exercicio_id": novo_id(semana, indice_sessao, ordem),
+                        "nome": nome,
+                        "ordem": ordem,
+                        "equipamento": equipamento,
+                        "series": series if grupo != "Core" else min(series, 3),
+                        "repeticoes": parametros["repeticoes"] if grupo != "Core" else "30-45s",
+                        "percentual_rm": percentual,
+                        "tempo_descanso": parametros["tempo_descanso"],
+                        "cadencia": parametros["cadencia"],
+                        "metodo": parametros["metodo"] if not recuperacao else "tradicional",
+                        "progressao": [{"semana": semana, "ajuste": "Redução de volume (recuperação)" if recuperacao
+                                        else f"{percentual}% de 1RM"}],
+                        "observacoes": observacoes.strip()
+                    })
+                if cardio:
+                    exercicios.append({
+                        "exercicio_id": novo_id(semana, indice_sessao, "cardio"),
+                        "nome": "Cardio moderado (bicicleta ou esteira)",
+                        "ordem": len(exercicios) + 1,
+                        "equipamento": "Bicicleta ergométrica" if "joelho" in regioes else "Esteira",
+                        "series": 1,
+                        "repeticoes": "15 min",
+                        "percentual_rm": 0,
+                        "tempo_descanso": 0,
+                        "cadencia": "",
+                        "metodo": "contínuo",
+                        "progressao": [],
+                        "observacoes": "Frequência cardíaca entre 60% e 70% da máxima"
+                    })
+                grupos_sessao = list(dict.fromkeys(g for g in grupos if permitidos[g]))
+                sessoes.append({
+                    "sessao_id": novo_id(semana, indice_sessao),
+                    "nome": nome_sessao,
+                    "tipo": "resistência",
+                    "duracao_minutos": duracao_sessao,
+                    "nivel_intensidade": nivel_intensidade,
+                    "dia_semana": dia,
+                    "grupos_musculares": [
+                        {"grupo_id": novo_id(semana, indice_sessao, "grupo", g), "nome": g, "prioridade": p}
+                        for p, g in enumerate(grupos_sessao[:4], start=1)
+                    ],
+                    "exercicios": exercicios,
+                    "aquecimento": {"duracao_minutos": 5 if duracao_sessao < 45 else 10,
+                                    "exercicios": ["Mobilidade articular", "Série leve do primeiro exercício"]},
+                    "desaquecimento": {"duracao_minutos": 5 if alongamento else 0,
+                                       "exercicios": ["Alongamento dos grupos trabalhados"] if alongamento else []}
+                })
+            microciclos.append({"semana": semana, "volume": volume, "intensidade": intensidade,
+                                "foco": foco, "sessoes": sessoes})
+        ciclos.append({
+            "ciclo_id": novo_id("ciclo", indice_ciclo),
+            "nome": f"Ciclo {indice_ciclo + 1} - {nome_ciclo}",
+            "ordem": indice_ciclo + 1,
+            "duracao_semanas": SEMANAS_POR_CICLO,
+            "objetivo": objetivo_ciclo,
+            "microciclos": microciclos
+        })
+
+    objetivos_usuario = [
+        {"objetivo_id": novo_id("objetivo", i), "nome": o.get("nome", ""), "prioridade": o.get("prioridade", i + 1)}
+        for i, o in enumerate(dados_usuario.get("objetivos") or []) if isinstance(o, dict)
+    ] or [{"objetivo_id": novo_id("objetivo", 0), "nome": objetivo, "prioridade": 1}]
+    restricoes = [
+        {"restricao_id": novo_id("restricao", i), "nome": item.get("regiao") or item.get("nome", ""),
+         "gravidade": item.get("gravidade", "")}
+        for i, item in enumerate(list(dados_usuario.get("lesoes") or []) + list(dados_usuario.get("restricoes") or []))
+        if isinstance(item, dict)
+    ]
+
+    return {
+        "usuario": {
+            "id": dados_usuario.get("id", ""),
+            "nome": dados_usuario.get("nome", ""),
+            "nivel": nivel,
+            "objetivos": objetivos_usuario,
+            "restricoes": restricoes
+        },
+        "plano_principal": {
+            "nome": f"Plano de {objetivo} - {nome_divisao} ({len(dias)}x por semana)",
+            "descricao": "Plano montado automaticamente a partir do questionário, com progressão linear "
+                         "de carga e semanas de recuperação.",
+            "periodizacao": {"tipo": "linear",
+                             "descricao": "Três ciclos de 4 semanas com aumento de carga e recuperação na 4ª semana"},
+            "duracao_semanas": SEMANAS_PLANO,
+            "frequencia_semanal": len(dias),
+            "ciclos": ciclos
+        },
+        "geracao": {"origem": ORIGEM_REGRAS_LOCAIS, "motivo": motivo}
+    }
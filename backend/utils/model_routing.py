@@ -0,0 +1,229 @@
+# Roteamento de Modelos pela Complexidade do Perfil #
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .config import get_claude_config, get_model_routing_config
+from .llm_metrics import LIMITES_LATENCIA, MetricasLLM, get_llm_metrics, resumir_valores
+from .local_plan_engine import _nivel, _normalizar_texto
+
+ROTA_SIMPLES = "simples"
+ROTA_COMPLEXA = "complexa"
+
+# Pontos de cada característica do perfil na pontuação de complexidade
+PONTOS_LESAO = 3
+PONTOS_RESTRICAO = 1
+PONTOS_OBJETIVO_ADICIONAL = 1
+PONTOS_NIVEL_AVANCADO = 1
+PONTOS_IDADE = 1
+# Tamanho da conversa (caracteres) a partir do qual ela pesa na pontuação, e os pontos de cada faixa
+FAIXAS_CONVERSA = ((3000, 3), (1000, 2))
+IDADE_MIN_SEM_PONTOS = 16
+IDADE_MAX_SEM_PONTOS = 60
+
+# Durações mantidas por rota para o resumo de latência
+MAX_LATENCIAS_POR_ROTA = 1000
+
+
+def _lista(valor: Any) -> List[Any]:
+    if isinstance(valor, list):
+        return [item for item in valor if item]
+    return [valor] if valor and _normalizar_texto(valor) not in ("nenhuma", "nenhum", "nao", "não") else []
+
+
+def pontuar_complexidade(dados_usuario: Dict[str, Any]) -> Tuple[int, List[str]]:
+    """
+    Pontua a complexidade do perfil para escolher o modelo.
+
+    Lesões pesam mais (cada uma já basta para a rota complexa com o limite padrão);
+    restrições, objetivos além do primeiro, nível avançado, idade fora da faixa de
+    16 a 60 anos e uma conversa longa com o usuário somam pontos menores.
+
+    Args:
+        dados_usuario (Dict): Dados do usuário recebidos do questionário
+
+    Returns:
+        Tuple[int, List[str]]: Pontuação e os motivos que a compõem
+    """
+    pontos = 0
+    motivos: List[str] = []
+
+    lesoes = _lista(dados_usuario.get("lesoes"))
+    if lesoes:
+        pontos += PONTOS_LESAO * len(lesoes)
+        motivos.append(f"{len(lesoes)} lesão(ões)")
+    restricoes = _lista(dados_usuario.get("restricoes"))
+    if restricoes:
+        pontos += PONTOS_RESTRICAO * len(restricoes)
+        motivos.append(f"{len(restricoes)} restrição(ões)")
+    objetivos = _lista(dados_usuario.get("objetivos"))
+    if len(objetivos) > 1:
+        pontos += PONTOS_OBJETIVO_ADICIONAL * (len(objetivos) - 1)
+        motivos.append(f"{len(objetivos)} objetivos")
+    if _nivel(dados_usuario) == "avançado":
+        pontos += PONTOS_NIVEL_AVANCADO
+        motivos.append("nível avançado")
+    try:
+        idade = float(dados_usuario.get("idade"))
+    except (TypeError, ValueError):
+        idade = None
+    if idade and not IDADE_MIN_SEM_PONTOS <= idade <= IDADE_MAX_SEM_PONTOS:
+        pontos += PONTOS_IDADE
+        motivos.append(f"idade {idade:.0f}")
+    conversa = len(str(dados_usuario.get("conversa_chat") or ""))
+    for tamanho, pontos_faixa in FAIXAS_CONVERSA:
+        if conversa >= tamanho:
+            pontos += pontos_faixa
+            motivos.append(f"conversa com {conversa} caracteres")
+            break
+    return pontos, motivos
+
+
+@dataclass(frozen=True)
+class Rota:
+    """Modelo escolhido para um perfil."""
+    nome: str
+    modelo: str
+    pontuacao: int = 0
+    motivos: Tuple[str, ...] = ()
+    escalonada: bool = False
+
+
+@dataclass
+class _EstatisticasRota:
+    planos: int = 0
+    validos: int = 0
+    escalonados: int = 0
+    latencias: Deque[float] = field(default_factory=lambda: deque(maxlen=MAX_LATENCIAS_POR_ROTA))
+
+
+class RoteadorModelos:
+    """
+    Escolhe o modelo de cada geração pela complexidade do perfil.
+
+    Perfis simples vão para o modelo mais rápido e barato; os complexos, para o mais
+    capaz. Mantém por rota a latência das gerações e a taxa de planos válidos, e
+    indica quando um plano inválido da rota simples deve ser gerado de novo na complexa.
+    """
+
+    def __init__(self, modelo_simples: str, modelo_complexo: str, limiar: int = 3, escalonar: bool = True,
+                 metricas: Optional[MetricasLLM] = None):
+        """
+        Args:
+            modelo_simples (str): Modelo dos perfis com pontuação abaixo do limiar
+            modelo_complexo (str): Modelo dos demais perfis e das gerações escalonadas
+            limiar (int): Pontuação a partir da qual o perfil vai para a rota complexa
+            escalonar (bool): Se True, um plano inválido da rota simples é gerado de novo na complexa
+            metricas (MetricasLLM, optional): Métricas onde as estatísticas por rota são publicadas
+        """
+        self.modelo_simples = modelo_simples
+        self.modelo_complexo = modelo_complexo
+        self.limiar = limiar
+        self.escalonar = escalonar
+        self.metricas = metricas
+        self._lock = threading.Lock()
+        self._estatisticas: Dict[str, _EstatisticasRota] = {ROTA_SIMPLES: _EstatisticasRota(),
+                                                             ROTA_COMPLEXA: _EstatisticasRota()}
+
+    def rotear(self, dados_usuario: Dict[str, Any]) -> Rota:
+        """
+        Escolhe a rota do perfil.
+
+        Args:
+            dados_usuario (Dict): Dados do usuário
+
+        Returns:
+            Rota: Nome da rota, modelo e pontuação
+        """
+        pontuacao, motivos = pontuar_complexidade(dados_usuario)
+        nome = ROTA_COMPLEXA if pontuacao >= self.limiar else ROTA_SIMPLES
+        modelo = self.modelo_complexo if nome == ROTA_COMPLEXA else self.modelo_simples
+        return Rota(nome, modelo, pontuacao, tuple(motivos))
+
+    def rota_escalonada(self, rota: Rota) -> Optional[Rota]:
+        """
+        Rota para gerar de novo um plano que falhou na validação.
+
+        Returns:
+            Optional[Rota]: Rota complexa marcada como escalonada, ou None se o escalonamento
+                            estiver desativado ou a rota já usar o modelo mais capaz
+        """
+        if not self.escalonar or rota.nome != ROTA_SIMPLES or rota.modelo == self.modelo_complexo:
+            return None
+        return Rota(ROTA_COMPLEXA, self.modelo_complexo, rota.pontuacao, rota.motivos, escalonada=True)
+
+    def registrar(self, rota: Rota, duracao_s: float, valido: bool) -> None:
+        """
+        Registra o resultado de uma geração na rota.
+
+        Args:
+            rota (Rota): Rota usada
+            duracao_s (float): Duração da geração, incluindo continuações e reparos
+            valido (bool): Se o plano passou na validação
+        """
+        with self._lock:
+            estatisticas = self._estatisticas[rota.nome]
+            estatisticas.planos += 1
+            estatisticas.validos += int(valido)
+            estatisticas.escalonados += int(rota.escalonada)
+            estatisticas.latencias.append(duracao_s)
+        if self.metricas is not None:
+            self.metricas.incrementar(f"rota_{rota.nome}_{'validos' if valido else 'invalidos'}")
+            if rota.escalonada:
+                self.metricas.incrementar("rota_escalonamentos")
+            self.metricas.definir_estado("roteamento_modelos", self.estatisticas())
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna as estatísticas de cada rota.
+
+        Returns:
+            Dict: Por rota, o modelo, os planos gerados, a taxa de planos válidos, os
+                  planos escalonados e o resumo da latência (média, p50, p90, p99)
+        """
+        with self._lock:
+            copias = {nome: (e.planos, e.validos, e.escalonados, list(e.latencias))
+                      for nome, e in self._estatisticas.items()}
+        resultado = {}
+        for nome, (planos, validos, escalonados, latencias) in copias.items():
+            latencia = resumir_valores(latencias, LIMITES_LATENCIA)
+            latencia.pop("histograma")
+            resultado[nome] = {
+                "modelo": self.modelo_complexo if nome == ROTA_COMPLEXA else self.modelo_simples,
+                "planos": planos,
+                "taxa_validos": validos / planos if planos else 0.0,
+                "escalonados": escalonados,
+                "latencia_s": latencia
+            }
+        return resultado
+
+
+# Instância compartilhada por processo
+_roteador_modelos: Optional[RoteadorModelos] = None
+_roteador_modelos_lock = threading.Lock()
+
+
+def get_roteador_modelos() -> Optional[RoteadorModelos]:
+    """
+    Obtém o roteador de modelos compartilhado pelo processo.
+
+    Returns:
+        Optional[RoteadorModelos]: Roteador configurado ou None se desabilitado
+    """
+    global _roteador_modelos
+    config = get_model_routing_config()
+    if not config["enabled"]:
+        return None
+
+    with _roteador_modelos_lock:
+        if _roteador_modelos is None:
+            _roteador_modelos = RoteadorModelos(
+                modelo_simples=config["modelo_simples"],
+                modelo_complexo=config["modelo_complexo"] or get_claude_config()["model"],
+                limiar=config["limiar"],
+                escalonar=config["escalonar"],
+                metricas=get_llm_metrics()
+            )
+        return _roteador_modelos
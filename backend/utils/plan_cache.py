@@ -0,0 +1,287 @@
+# Cache Persistente de Planos de Treinamento #
+
+import copy
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+from .logger import WrapperLogger
+from .config import get_plan_cache_config
+
+# Campos que identificam o usuário, mas não influenciam o conteúdo do plano
+CAMPOS_IDENTIDADE = ("id", "nome")
+
+# Campos de identificação internos do plano que são regenerados a cada reutilização
+CAMPOS_ID_PLANO = ("ciclo_id", "microciclo_id", "sessao_id", "exercicio_id")
+
+
+def _normalizar_valor(valor: Any) -> Any:
+    """
+    Normaliza recursivamente um valor do questionário para gerar uma forma canônica.
+
+    Args:
+        valor (Any): Valor a ser normalizado
+
+    Returns:
+        Any: Valor normalizado
+    """
+    if isinstance(valor, dict):
+        return {str(k).strip().lower(): _normalizar_valor(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        itens = [_normalizar_valor(v) for v in valor]
+        # A ordem das listas do questionário (dias, objetivos, lesões) não altera o plano
+        return sorted(itens, key=lambda v: json.dumps(v, sort_keys=True, ensure_ascii=False))
+    if isinstance(valor, bool) or valor is None:
+        return valor
+    if isinstance(valor, (int, float)):
+        return int(valor) if float(valor).is_integer() else round(float(valor), 4)
+    if isinstance(valor, str):
+        texto = " ".join(valor.split()).lower()
+        try:
+            numero = float(texto.replace(",", "."))
+            return int(numero) if numero.is_integer() else round(numero, 4)
+        except ValueError:
+            return texto
+    return str(valor)
+
+
+def normalizar_dados_usuario(dados_usuario: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Remove campos de identidade e normaliza o payload do questionário.
+
+    Args:
+        dados_usuario (Dict): Dados do usuário recebidos do questionário
+
+    Returns:
+        Dict: Payload normalizado
+    """
+    dados = {k: v for k, v in dados_usuario.items() if k not in CAMPOS_IDENTIDADE}
+    return _normalizar_valor(dados)
+
+
+def gerar_chave_plano(dados_usuario: Dict[str, Any], versao_prompt: str) -> str:
+    """
+    Gera a chave de conteúdo (SHA-256) para um payload de usuário e versão de prompt.
+
+    Args:
+        dados_usuario (Dict): Dados do usuário
+        versao_prompt (str): Identificador da versão do prompt/template
+
+    Returns:
+        str: Chave hexadecimal
+    """
+    canonico = json.dumps(
+        {"dados": normalizar_dados_usuario(dados_usuario), "versao_prompt": versao_prompt},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def reidentificar_plano(plano: Dict[str, Any], dados_usuario: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cria uma cópia do plano com nova identidade (IDs, data de criação e usuário).
+
+    O corpo do plano é preservado; apenas os identificadores usados como chave
+    no banco de dados são regenerados.
+
+    Args:
+        plano (Dict): Plano de origem
+        dados_usuario (Dict): Dados do usuário que receberá o plano
+
+    Returns:
+        Dict: Plano reidentificado
+    """
+    novo_plano = copy.deepcopy(plano)
+    novo_plano["treinamento_id"] = str(uuid.uuid4())
+    novo_plano["data_criacao"] = datetime.datetime.now().isoformat()
+
+    usuario = novo_plano.setdefault("usuario", {})
+    usuario["id"] = dados_usuario.get("id", str(uuid.uuid4()))
+    if dados_usuario.get("nome"):
+        usuario["nome"] = dados_usuario["nome"]
+
+    def renovar_ids(obj: Any) -> None:
+        if isinstance(obj, dict):
+            for chave, valor in obj.items():
+                if chave in CAMPOS_ID_PLANO and valor:
+                    obj[chave] = str(uuid.uuid4())
+                else:
+                    renovar_ids(valor)
+        elif isinstance(obj, list):
+            for item in obj:
+                renovar_ids(item)
+
+    renovar_ids(novo_plano.get("plano_principal", {}))
+    return novo_plano
+
+
+class PlanCache:
+    """
+    Cache persistente (SQLite) de planos gerados, com TTL e remoção LRU.
+
+    A chave é o hash canônico do questionário normalizado mais a versão do
+    prompt/template, de modo que planos idênticos não paguem uma nova chamada ao Claude.
+    """
+
+    def __init__(self, path: str, ttl_segundos: int = 7 * 24 * 3600, max_entradas: int = 500):
+        """
+        Inicializa o cache de planos.
+
+        Args:
+            path (str): Caminho do arquivo SQLite
+            ttl_segundos (int): Tempo de vida de cada entrada em segundos
+            max_entradas (int): Número máximo de entradas antes da remoção LRU
+        """
+        self.logger = WrapperLogger("PlanCache")
+        self.path = path
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self.metricas = {
+            "hits": 0,
+            "misses": 0,
+            "expirados": 0,
+            "gravacoes": 0,
+            "remocoes_lru": 0
+        }
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS planos (
+                chave TEXT PRIMARY KEY,
+                versao_prompt TEXT NOT NULL,
+                plano TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_planos_acesso ON planos (ultimo_acesso)")
+        self._conn.commit()
+        self.logger.info(f"Cache de planos inicializado em {path} (ttl={ttl_segundos}s, max={max_entradas})")
+
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém um plano do cache, respeitando o TTL.
+
+        Args:
+            chave (str): Chave do plano
+
+        Returns:
+            Optional[Dict]: Plano armazenado ou None se ausente/expirado
+        """
+        agora = time.time()
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT plano, criado_em FROM planos WHERE chave = ?", (chave,)
+            ).fetchone()
+
+            if linha is None:
+                self.metricas["misses"] += 1
+                return None
+
+            plano_json, criado_em = linha
+            if self.ttl_segundos and agora - criado_em > self.ttl_segundos:
+                self._conn.execute("DELETE FROM planos WHERE chave = ?", (chave,))
+                self._conn.commit()
+                self.metricas["expirados"] += 1
+                self.metricas["misses"] += 1
+                self.logger.debug(f"Entrada expirada removida do cache: {chave[:12]}")
+                return None
+
+            self._conn.execute("UPDATE planos SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+            self._conn.commit()
+            self.metricas["hits"] += 1
+
+        self.logger.debug(f"Hit no cache de planos: {chave[:12]}")
+        return json.loads(plano_json)
+
+    def armazenar(self, chave: str, plano: Dict[str, Any], versao_prompt: str) -> None:
+        """
+        Armazena um plano no cache e aplica a remoção LRU se necessário.
+
+        Args:
+            chave (str): Chave do plano
+            plano (Dict): Plano validado
+            versao_prompt (str): Versão do prompt/template usada na geração
+        """
+        agora = time.time()
+        plano_json = json.dumps(plano, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO planos (chave, versao_prompt, plano, criado_em, ultimo_acesso) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (chave, versao_prompt, plano_json, agora, agora)
+            )
+            self.metricas["gravacoes"] += 1
+
+            total = self._conn.execute("SELECT COUNT(*) FROM planos").fetchone()[0]
+            excedente = total - self.max_entradas
+            if excedente > 0:
+                self._conn.execute(
+                    "DELETE FROM planos WHERE chave IN "
+                    "(SELECT chave FROM planos ORDER BY ultimo_acesso ASC LIMIT ?)",
+                    (excedente,)
+                )
+                self.metricas["remocoes_lru"] += excedente
+                self.logger.debug(f"Removidas {excedente} entradas LRU do cache")
+            self._conn.commit()
+
+    def limpar(self) -> None:
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM planos")
+            self._conn.commit()
+        self.logger.info("Cache de planos limpo")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do cache.
+
+        Returns:
+            Dict: Hits, misses, taxa de acerto e número de entradas
+        """
+        with self._lock:
+            entradas = self._conn.execute("SELECT COUNT(*) FROM planos").fetchone()[0]
+            metricas = dict(self.metricas)
+        consultas = metricas["hits"] + metricas["misses"]
+        metricas["entradas"] = entradas
+        metricas["taxa_acerto"] = metricas["hits"] / consultas if consultas else 0.0
+        return metricas
+
+
+# Instância compartilhada por processo
+_plan_cache: Optional[PlanCache] = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """
+    Obtém o cache de planos compartilhado pelo processo.
+
+    Returns:
+        Optional[PlanCache]: Cache configurado ou None se desabilitado
+    """
+    global _plan_cache
+    config = get_plan_cache_config()
+    if not config["enabled"]:
+        return None
+
+    with _plan_cache_lock:
+        if _plan_cache is None:
+            _plan_cache = PlanCache(
+                path=config["path"],
+                ttl_segundos=config["ttl_segundos"],
+                max_entradas=config["max_entradas"]
+            )
+        return _plan_cache
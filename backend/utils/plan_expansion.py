@@ -0,0 +1,122 @@
+# Expansão do Formato Compacto de Planos (Modelo por Ciclo + Regras de Progressão) #
+
+import copy
+import uuid
+from typing import Any, Dict, List
+
+# Limites aplicados às cargas e séries depois dos ajustes semanais
+PERCENTUAL_RM_MIN = 30
+PERCENTUAL_RM_MAX = 100
+SERIES_MAX = 10
+
+
+class PlanoCompactoInvalidoError(ValueError):
+    """O plano compacto não tem a estrutura mínima para ser expandido."""
+
+
+def _inteiro(valor: Any, padrao: int = 0) -> int:
+    try:
+        return int(round(float(valor)))
+    except (TypeError, ValueError):
+        return padrao
+
+
+def _descrever_ajuste(ajuste_rm: int, ajuste_series: int) -> str:
+    partes = []
+    if ajuste_rm:
+        partes.append(f"{ajuste_rm:+d}% 1RM")
+    if ajuste_series:
+        partes.append(f"{ajuste_series:+d} série(s)")
+    return ", ".join(partes) or "carga do modelo"
+
+
+def _expandir_sessao(modelo: Dict[str, Any], semana: Dict[str, Any], numero_semana: int) -> Dict[str, Any]:
+    """Sessão de uma semana: o modelo do ciclo com os ajustes da semana aplicados."""
+    sessao = copy.deepcopy(modelo)
+    ajuste_rm = _inteiro(semana.get("ajuste_percentual_rm"))
+    ajuste_series = _inteiro(semana.get("ajuste_series"))
+
+    sessao["sessao_id"] = str(uuid.uuid4())
+    if semana.get("nivel_intensidade") is not None:
+        sessao["nivel_intensidade"] = _inteiro(semana["nivel_intensidade"], sessao.get("nivel_intensidade", 7))
+    sessao["grupos_musculares"] = [
+        grupo if isinstance(grupo, dict) else {"nome": str(grupo), "prioridade": indice + 1}
+        for indice, grupo in enumerate(sessao.get("grupos_musculares") or [])
+    ]
+    for grupo in sessao["grupos_musculares"]:
+        grupo["grupo_id"] = str(uuid.uuid4())
+
+    exercicios = []
+    for ordem, exercicio in enumerate(sessao.get("exercicios") or [], start=1):
+        exercicio["exercicio_id"] = str(uuid.uuid4())
+        exercicio["ordem"] = ordem
+        if "percentual_rm" in exercicio:
+            base = _inteiro(exercicio["percentual_rm"], 70)
+            exercicio["percentual_rm"] = min(PERCENTUAL_RM_MAX, max(PERCENTUAL_RM_MIN, base + ajuste_rm))
+        if "series" in exercicio:
+            exercicio["series"] = min(SERIES_MAX, max(1, _inteiro(exercicio["series"], 3) + ajuste_series))
+        if semana.get("repeticoes"):
+            exercicio["repeticoes"] = str(semana["repeticoes"])
+        exercicio["progressao"] = [{"semana": numero_semana, "ajuste": _descrever_ajuste(ajuste_rm, ajuste_series)}]
+        exercicio.setdefault("observacoes", "")
+        exercicios.append(exercicio)
+    sessao["exercicios"] = exercicios
+    return sessao
+
+
+def expandir_plano_compacto(compacto: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Materializa o plano completo a partir do formato compacto.
+
+    No formato compacto cada ciclo traz as sessões de uma semana-modelo ("sessoes") e a
+    lista "semanas", com volume, intensidade e foco de cada semana e os ajustes em relação
+    ao modelo: "ajuste_percentual_rm" (pontos de %1RM), "ajuste_series", e opcionalmente
+    "repeticoes" e "nivel_intensidade". Cada semana vira um microciclo com as sessões do
+    modelo ajustadas e IDs próprios; os grupos musculares podem vir só pelo nome.
+
+    Args:
+        compacto (Dict): Plano no formato compacto
+
+    Returns:
+        Dict: Plano no formato do Wrapper 1 (sem treinamento_id, versão e data)
+
+    Raises:
+        PlanoCompactoInvalidoError: Sem ciclos, ou ciclo sem sessões-modelo ou semanas
+    """
+    principal = compacto.get("plano_principal") if isinstance(compacto, dict) else None
+    ciclos_compactos = (principal or {}).get("ciclos")
+    if not isinstance(ciclos_compactos, list) or not ciclos_compactos:
+        raise PlanoCompactoInvalidoError("Plano compacto sem ciclos")
+
+    ciclos: List[Dict[str, Any]] = []
+    numero_semana = 0
+    for ordem, ciclo_compacto in enumerate(ciclos_compactos, start=1):
+        modelos = ciclo_compacto.get("sessoes") if isinstance(ciclo_compacto, dict) else None
+        semanas = ciclo_compacto.get("semanas") if isinstance(ciclo_compacto, dict) else None
+        if not isinstance(modelos, list) or not modelos or not isinstance(semanas, list) or not semanas:
+            raise PlanoCompactoInvalidoError(f"Ciclo {ordem} sem sessões-modelo ou semanas")
+
+        microciclos = []
+        for semana in semanas:
+            semana = semana if isinstance(semana, dict) else {}
+            numero_semana += 1
+            microciclos.append({
+                "semana": numero_semana,
+                "volume": semana.get("volume", ""),
+                "intensidade": semana.get("intensidade", ""),
+                "foco": semana.get("foco", ""),
+                "sessoes": [_expandir_sessao(modelo, semana, numero_semana) for modelo in modelos if isinstance(modelo, dict)]
+            })
+
+        ciclo = {chave: valor for chave, valor in ciclo_compacto.items() if chave not in ("sessoes", "semanas")}
+        ciclo["ciclo_id"] = str(uuid.uuid4())
+        ciclo["ordem"] = ordem
+        ciclo["duracao_semanas"] = len(microciclos)
+        ciclo["microciclos"] = microciclos
+        ciclos.append(ciclo)
+
+    plano = copy.deepcopy({chave: valor for chave, valor in compacto.items() if chave != "plano_principal"})
+    plano.setdefault("usuario", {})
+    plano["plano_principal"] = dict({chave: valor for chave, valor in principal.items() if chave != "ciclos"},
+                                    duracao_semanas=numero_semana, ciclos=ciclos)
+    return plano
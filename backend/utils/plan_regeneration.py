@@ -0,0 +1,191 @@
+# Regeneração Parcial de Planos (Um Ciclo ou Uma Semana) #
+
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+_CAMINHO = re.compile(r"^(?:plano_principal\.)?ciclos\[(\d+)\](?:\.microciclos\[(\d+)\])?$")
+
+# Campos de identificação preenchidos no trecho regenerado quando vierem vazios
+CAMPOS_ID_TRECHO = ("sessao_id", "exercicio_id", "grupo_id")
+
+# Campos das semanas vizinhas enviados como contexto
+CAMPOS_RESUMO_SEMANA = ("semana", "volume", "intensidade", "foco")
+CAMPOS_RESUMO_EXERCICIO = ("nome", "series", "repeticoes", "percentual_rm")
+
+
+@dataclass(frozen=True)
+class CaminhoTrecho:
+    """Posição do trecho a regenerar: um ciclo inteiro ou uma semana (microciclo) de um ciclo."""
+    ciclo: int
+    microciclo: Optional[int] = None
+
+    @property
+    def tipo(self) -> str:
+        return "ciclo" if self.microciclo is None else "microciclo"
+
+    def __str__(self) -> str:
+        caminho = f"plano_principal.ciclos[{self.ciclo}]"
+        return caminho if self.microciclo is None else f"{caminho}.microciclos[{self.microciclo}]"
+
+
+def interpretar_caminho(caminho: str) -> CaminhoTrecho:
+    """
+    Interpreta um caminho como "plano_principal.ciclos[1]" ou "plano_principal.ciclos[1].microciclos[2]".
+
+    Args:
+        caminho (str): Caminho no formato de formatar_caminho (o prefixo plano_principal é opcional)
+
+    Returns:
+        CaminhoTrecho: Índices do ciclo e, se for o caso, do microciclo
+
+    Raises:
+        ValueError: Caminho que não aponta para um ciclo ou microciclo
+    """
+    correspondencia = _CAMINHO.match(str(caminho).replace(" ", ""))
+    if not correspondencia:
+        raise ValueError(f"Caminho de regeneração inválido: {caminho} (use ciclos[i] ou ciclos[i].microciclos[j])")
+    ciclo, microciclo = correspondencia.groups()
+    return CaminhoTrecho(int(ciclo), int(microciclo) if microciclo is not None else None)
+
+
+def obter_trecho(plano: Dict[str, Any], caminho: CaminhoTrecho) -> Dict[str, Any]:
+    """
+    Retorna o ciclo ou microciclo indicado pelo caminho.
+
+    Raises:
+        ValueError: O plano não tem o ciclo ou microciclo indicado
+    """
+    try:
+        ciclo = plano["plano_principal"]["ciclos"][caminho.ciclo]
+        return ciclo if caminho.microciclo is None else ciclo["microciclos"][caminho.microciclo]
+    except (KeyError, IndexError, TypeError):
+        raise ValueError(f"O plano não tem o trecho {caminho}")
+
+
+def substituir_trecho(plano: Dict[str, Any], caminho: CaminhoTrecho, trecho: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cria o plano com o trecho substituído, reaproveitando sem cópia as partes não alteradas.
+
+    Só os objetos no caminho até o trecho (plano, plano principal, lista de ciclos e,
+    para uma semana, o ciclo e sua lista de microciclos) são copiados; os demais ciclos
+    e semanas são os mesmos objetos do plano original, que não é alterado.
+
+    Args:
+        plano (Dict): Plano original
+        caminho (CaminhoTrecho): Posição do trecho
+        trecho (Dict): Novo ciclo ou microciclo
+
+    Returns:
+        Dict: Novo plano
+    """
+    obter_trecho(plano, caminho)
+    ciclos = list(plano["plano_principal"]["ciclos"])
+    if caminho.microciclo is None:
+        ciclos[caminho.ciclo] = trecho
+    else:
+        microciclos = list(ciclos[caminho.ciclo]["microciclos"])
+        microciclos[caminho.microciclo] = trecho
+        ciclos[caminho.ciclo] = dict(ciclos[caminho.ciclo], microciclos=microciclos)
+    return dict(plano, plano_principal=dict(plano["plano_principal"], ciclos=ciclos))
+
+
+def _resumir_semana(microciclo: Dict[str, Any]) -> Dict[str, Any]:
+    """Semana sem IDs, com os exercícios de cada sessão reduzidos a nome, séries, repetições e %1RM."""
+    resumo = {campo: microciclo[campo] for campo in CAMPOS_RESUMO_SEMANA if campo in microciclo}
+    resumo["sessoes"] = [
+        {"nome": sessao.get("nome", ""), "dia_semana": sessao.get("dia_semana"),
+         "exercicios": [{campo: e[campo] for campo in CAMPOS_RESUMO_EXERCICIO if campo in e}
+                        for e in sessao.get("exercicios") or [] if isinstance(e, dict)]}
+        for sessao in microciclo.get("sessoes") or [] if isinstance(sessao, dict)
+    ]
+    return resumo
+
+
+def resumir_contexto(plano: Dict[str, Any], caminho: CaminhoTrecho) -> Dict[str, Any]:
+    """
+    Contexto mínimo enviado junto com o trecho a regenerar.
+
+    Inclui os dados gerais do plano e a macroestrutura (ciclos e foco de cada semana);
+    para uma semana, também as semanas anterior e seguinte resumidas, para manter a
+    progressão de cargas contínua. Para um ciclo, a última semana do ciclo anterior e a
+    primeira do seguinte.
+
+    Args:
+        plano (Dict): Plano original
+        caminho (CaminhoTrecho): Posição do trecho
+
+    Returns:
+        Dict: Contexto sem IDs
+    """
+    principal = plano["plano_principal"]
+    ciclos = principal.get("ciclos") or []
+    contexto: Dict[str, Any] = {
+        campo: principal[campo]
+        for campo in ("nome", "descricao", "periodizacao", "duracao_semanas", "frequencia_semanal") if campo in principal
+    }
+    contexto["ciclos"] = [
+        {"ordem": indice + 1, "nome": ciclo.get("nome", ""), "objetivo": ciclo.get("objetivo", ""),
+         "semanas": [{campo: m[campo] for campo in CAMPOS_RESUMO_SEMANA if campo in m}
+                     for m in ciclo.get("microciclos") or []]}
+        for indice, ciclo in enumerate(ciclos)
+    ]
+
+    semanas = [(i, j, m) for i, ciclo in enumerate(ciclos) for j, m in enumerate(ciclo.get("microciclos") or [])]
+    posicoes = [k for k, (i, j, _) in enumerate(semanas)
+                if i == caminho.ciclo and (caminho.microciclo is None or j == caminho.microciclo)]
+    vizinhas: List[Dict[str, Any]] = []
+    if posicoes and posicoes[0] > 0:
+        vizinhas.append(dict(_resumir_semana(semanas[posicoes[0] - 1][2]), posicao="anterior"))
+    if posicoes and posicoes[-1] < len(semanas) - 1:
+        vizinhas.append(dict(_resumir_semana(semanas[posicoes[-1] + 1][2]), posicao="seguinte"))
+    contexto["semanas_vizinhas"] = vizinhas
+    return contexto
+
+
+def preparar_trecho(novo: Dict[str, Any], original: Dict[str, Any], caminho: CaminhoTrecho) -> Dict[str, Any]:
+    """
+    Ajusta o trecho regenerado à posição do original.
+
+    Mantém o ID, a ordem e a numeração das semanas do original e preenche os IDs vazios
+    das sessões, exercícios e grupos musculares.
+
+    Args:
+        novo (Dict): Ciclo ou microciclo retornado pelo modelo
+        original (Dict): Trecho substituído
+        caminho (CaminhoTrecho): Posição do trecho
+
+    Returns:
+        Dict: Trecho pronto para substituir o original
+
+    Raises:
+        ValueError: Um ciclo regenerado com número de semanas diferente do original
+    """
+    if caminho.microciclo is None:
+        originais = original.get("microciclos") or []
+        microciclos = novo.get("microciclos")
+        if not isinstance(microciclos, list) or len(microciclos) != len(originais):
+            raise ValueError(f"O ciclo regenerado deve ter {len(originais)} semanas")
+        for campo in ("ciclo_id", "ordem", "duracao_semanas"):
+            if campo in original:
+                novo[campo] = original[campo]
+        for microciclo, anterior in zip(microciclos, originais):
+            if "semana" in anterior:
+                microciclo["semana"] = anterior["semana"]
+    elif "semana" in original:
+        novo["semana"] = original["semana"]
+
+    def preencher_ids(obj: Any) -> None:
+        if isinstance(obj, dict):
+            for chave, valor in obj.items():
+                if chave in CAMPOS_ID_TRECHO and not valor:
+                    obj[chave] = str(uuid.uuid4())
+                else:
+                    preencher_ids(valor)
+        elif isinstance(obj, list):
+            for item in obj:
+                preencher_ids(item)
+
+    preencher_ids(novo)
+    return novo
@@ -0,0 +1,284 @@
+# Reaproveitamento de Planos de Perfis Semelhantes (Vizinho Mais Próximo) #
+
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import get_plan_similarity_config
+from .local_plan_engine import OBJETIVOS, _dias_treino, _identificar_objetivo, _nivel, _normalizar_texto
+from .logger import WrapperLogger
+from .plan_cache import PlanCache, _normalizar_valor, reidentificar_plano
+
+# Origem registrada nos planos adaptados de um vizinho
+ORIGEM_PLANO_VIZINHO = "plano_vizinho"
+
+# Campos de texto livre repassados ao prompt: só há reaproveitamento quando coincidem exatamente
+CAMPOS_TEXTO_LIVRE = ("lesoes", "restricoes", "historico_treino", "conversa_chat", "genero")
+
+# Campos de "usuario" no plano que vêm do questionário e são trocados pelos do novo usuário
+CAMPOS_USUARIO_QUESTIONARIO = ("idade", "genero", "nivel")
+
+
+def _numero(valor: Any) -> Optional[float]:
+    try:
+        return float(str(valor).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def _escala(valor: Any, maximo: float) -> float:
+    """Valor numérico em [0, 1]; ausente vira -1 para só se aproximar de outro ausente."""
+    numero = _numero(valor)
+    if numero is None or numero <= 0:
+        return -1.0
+    return min(numero, maximo) / maximo
+
+
+def _sim(valor: Any) -> float:
+    return 1.0 if _normalizar_texto(valor).startswith("s") else 0.0
+
+
+def assinatura_perfil(dados_usuario: Dict[str, Any], versao_prompt: str = "") -> str:
+    """
+    Chave dos campos que precisam coincidir para que um plano seja reaproveitado.
+
+    Nível, objetivo principal, dias de treino por semana e os campos de texto livre
+    (lesões, restrições, histórico, conversa e gênero) mudam a estrutura ou a segurança
+    do plano, então não entram na distância: formam uma partição exata do índice,
+    junto com a versão do prompt.
+
+    Args:
+        dados_usuario (Dict): Dados do usuário recebidos do questionário
+        versao_prompt (str): Identificador da versão do prompt/template
+
+    Returns:
+        str: Hash hexadecimal da partição
+    """
+    rigidos = {
+        "nivel": _nivel(dados_usuario),
+        "objetivo": _identificar_objetivo(dados_usuario.get("objetivos")),
+        "frequencia": len(_dias_treino(dados_usuario)),
+        "texto": _normalizar_valor({campo: dados_usuario.get(campo) or None for campo in CAMPOS_TEXTO_LIVRE}),
+        "versao_prompt": versao_prompt,
+    }
+    canonico = json.dumps(rigidos, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def vetorizar_perfil(dados_usuario: Dict[str, Any]) -> List[float]:
+    """
+    Codifica os campos ajustáveis do questionário em um vetor numérico em [0, 1].
+
+    Componentes: tempo de treino (até 120 min), idade (até 80), IMC (até 40), cardio,
+    alongamento e o peso de cada perfil de objetivo (1/prioridade), que captura os
+    objetivos secundários.
+
+    Args:
+        dados_usuario (Dict): Dados do usuário recebidos do questionário
+
+    Returns:
+        List[float]: Vetor do perfil
+    """
+    peso, altura = _numero(dados_usuario.get("peso")), _numero(dados_usuario.get("altura"))
+    imc = peso / (altura / 100) ** 2 if peso and altura else None
+
+    pesos_objetivos = dict.fromkeys(OBJETIVOS, 0.0)
+    objetivos = dados_usuario.get("objetivos")
+    for indice, objetivo in enumerate(objetivos if isinstance(objetivos, list) else []):
+        if not isinstance(objetivo, dict):
+            continue
+        perfil = _identificar_objetivo([{"nome": objetivo.get("nome")}])
+        prioridade = objetivo.get("prioridade") if isinstance(objetivo.get("prioridade"), int) else indice + 1
+        pesos_objetivos[perfil] = max(pesos_objetivos[perfil], 1 / max(1, prioridade))
+
+    return [
+        _escala(dados_usuario.get("tempo_treino") or 60, 120),
+        _escala(dados_usuario.get("idade"), 80),
+        _escala(imc, 40),
+        _sim(dados_usuario.get("cardio")),
+        _sim(dados_usuario.get("alongamento")),
+        *pesos_objetivos.values(),
+    ]
+
+
+def distancia(a: Sequence[float], b: Sequence[float]) -> float:
+    """Distância euclidiana entre dois vetores de perfil."""
+    return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+
+
+def adaptar_plano(plano: Dict[str, Any], dados_usuario: Dict[str, Any], dias_origem: Sequence[int],
+                  distancia_vizinho: float) -> Dict[str, Any]:
+    """
+    Cria a cópia do plano de um vizinho para outro usuário.
+
+    Além da nova identidade (ver reidentificar_plano), as sessões passam para os dias
+    da semana do novo usuário, na mesma ordem, e os campos de "usuario" vindos do
+    questionário (idade, gênero, nível) passam a ser os do novo usuário; os que ele
+    não informou são removidos em vez de herdados do vizinho.
+
+    Args:
+        plano (Dict): Plano do vizinho
+        dados_usuario (Dict): Dados do usuário que receberá o plano
+        dias_origem (Sequence[int]): Dias de treino (1 = segunda) do vizinho
+        distancia_vizinho (float): Distância entre os perfis, registrada no plano
+
+    Returns:
+        Dict: Plano adaptado
+    """
+    novo_plano = reidentificar_plano(plano, dados_usuario)
+    dias = dict(zip(dias_origem, _dias_treino(dados_usuario)))
+    for ciclo in novo_plano.get("plano_principal", {}).get("ciclos", []):
+        for microciclo in ciclo.get("microciclos", []):
+            for sessao in microciclo.get("sessoes", []):
+                if sessao.get("dia_semana") in dias:
+                    sessao["dia_semana"] = dias[sessao["dia_semana"]]
+
+    usuario = novo_plano["usuario"]
+    for campo in CAMPOS_USUARIO_QUESTIONARIO:
+        if dados_usuario.get(campo) not in (None, ""):
+            usuario[campo] = dados_usuario[campo]
+        else:
+            usuario.pop(campo, None)
+    novo_plano["geracao"] = {"origem": ORIGEM_PLANO_VIZINHO, "distancia": round(distancia_vizinho, 4)}
+    return novo_plano
+
+
+class IndicePerfis:
+    """
+    Índice dos perfis dos planos armazenados no cache, para reaproveitar o plano de um vizinho.
+
+    Cada plano gravado no cache de planos tem o perfil do questionário registrado aqui
+    (partição exata e vetor). Uma consulta percorre os perfis da mesma partição (busca
+    exaustiva; o cache é limitado a algumas centenas de entradas) e, se o mais próximo
+    estiver dentro da distância máxima, devolve a cópia adaptada do plano dele.
+    O índice fica no mesmo arquivo SQLite do cache e é compartilhado entre processos.
+    """
+
+    def __init__(self, plan_cache: PlanCache, distancia_max: float = 0.1):
+        """
+        Args:
+            plan_cache (PlanCache): Cache de onde os planos dos vizinhos são lidos
+            distancia_max (float): Distância máxima entre perfis para reaproveitar um plano
+        """
+        self.logger = WrapperLogger("IndicePerfis")
+        self.plan_cache = plan_cache
+        self.distancia_max = distancia_max
+        self._lock = threading.Lock()
+        self.metricas = {"consultas": 0, "reaproveitados": 0, "removidos": 0}
+
+        self._conn = sqlite3.connect(plan_cache.path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS perfis (
+                chave TEXT PRIMARY KEY,
+                assinatura TEXT NOT NULL,
+                vetor TEXT NOT NULL,
+                dias TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_perfis_assinatura ON perfis (assinatura)")
+        self._conn.commit()
+
+    def registrar(self, chave: str, dados_usuario: Dict[str, Any], versao_prompt: str) -> None:
+        """
+        Registra o perfil do plano armazenado no cache com a chave informada.
+
+        Args:
+            chave (str): Chave do plano no cache
+            dados_usuario (Dict): Dados do usuário para quem o plano foi gerado
+            versao_prompt (str): Versão do prompt/template usada na geração
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO perfis (chave, assinatura, vetor, dias) VALUES (?, ?, ?, ?)",
+                (chave, assinatura_perfil(dados_usuario, versao_prompt), json.dumps(vetorizar_perfil(dados_usuario)),
+                 json.dumps(_dias_treino(dados_usuario)))
+            )
+            self._conn.commit()
+
+    def buscar(self, dados_usuario: Dict[str, Any], versao_prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        Procura o plano de um perfil semelhante e o adapta ao usuário.
+
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            versao_prompt (str): Versão atual do prompt/template
+
+        Returns:
+            Optional[Dict]: Plano adaptado do vizinho mais próximo ou None
+        """
+        vetor = vetorizar_perfil(dados_usuario)
+        with self._lock:
+            self.metricas["consultas"] += 1
+            linhas = self._conn.execute(
+                "SELECT chave, vetor, dias FROM perfis WHERE assinatura = ?", (assinatura_perfil(dados_usuario, versao_prompt),)
+            ).fetchall()
+
+        candidatos: List[Tuple[float, str, List[int]]] = sorted(
+            (distancia(vetor, json.loads(vetor_json)), chave, json.loads(dias_json))
+            for chave, vetor_json, dias_json in linhas
+        )
+        for dist, chave, dias in candidatos:
+            if dist > self.distancia_max:
+                break
+            plano = self.plan_cache.obter(chave)
+            if plano is None:
+                # O plano saiu do cache (TTL ou LRU): o perfil deixa de valer
+                self._remover(chave)
+                continue
+            with self._lock:
+                self.metricas["reaproveitados"] += 1
+            self.logger.info(f"Reaproveitando o plano de um perfil semelhante (distância {dist:.3f}, chave {chave[:12]})")
+            return adaptar_plano(plano, dados_usuario, dias, dist)
+        return None
+
+    def _remover(self, chave: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM perfis WHERE chave = ?", (chave,))
+            self._conn.commit()
+            self.metricas["removidos"] += 1
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do índice.
+
+        Returns:
+            Dict: Consultas, planos reaproveitados, taxa de reaproveitamento e perfis indexados
+        """
+        with self._lock:
+            perfis = self._conn.execute("SELECT COUNT(*) FROM perfis").fetchone()[0]
+            metricas = dict(self.metricas)
+        metricas["perfis"] = perfis
+        metricas["taxa_reaproveitamento"] = metricas["reaproveitados"] / metricas["consultas"] if metricas["consultas"] else 0.0
+        return metricas
+
+
+# Instância compartilhada por processo
+_indice_perfis: Optional[IndicePerfis] = None
+_indice_perfis_lock = threading.Lock()
+
+
+def get_indice_perfis(plan_cache: Optional[PlanCache]) -> Optional[IndicePerfis]:
+    """
+    Obtém o índice de perfis compartilhado pelo processo.
+
+    Args:
+        plan_cache (PlanCache, optional): Cache de planos do processo
+
+    Returns:
+        Optional[IndicePerfis]: Índice configurado ou None se desabilitado ou sem cache
+    """
+    global _indice_perfis
+    config = get_plan_similarity_config()
+    if not config["enabled"] or plan_cache is None:
+        return None
+
+    with _indice_perfis_lock:
+        if _indice_perfis is None or _indice_perfis.plan_cache is not plan_cache:
+            _indice_perfis = IndicePerfis(plan_cache, distancia_max=config["distancia_max"])
+        return _indice_perfis
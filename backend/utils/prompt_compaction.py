@@ -0,0 +1,152 @@
+# Compactação de Prompts e Estimativa Local de Tokens #
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+# Blocos cercados por ``` (com linguagem opcional); o conteúdo é tratado à parte
+_BLOCO_CERCADO = re.compile(r"```([A-Za-z0-9_+-]*)[ \t]*\n(.*?)```", re.DOTALL)
+# Palavras, espaços e demais caracteres, para a estimativa de tokens
+_PEDACOS = re.compile(r"\w+|\s+|[^\w\s]")
+_ESPACOS_INTERNOS = re.compile(r"[ \t]{2,}")
+
+# Linhas repetidas só são removidas a partir deste tamanho; linhas curtas
+# ("Objetivos:", "- Nenhuma") podem se repetir legitimamente
+TAMANHO_MINIMO_DUPLICADA = 40
+
+# Início do bloco com os dados do usuário e a conversa do chat: daí em diante o texto
+# é do usuário e nenhuma linha é descartada, mesmo repetida
+MARCADOR_DADOS_USUARIO = "Dados do Usuário:"
+
+
+@dataclass
+class ResultadoCompactacao:
+    """Prompt compactado e tokens estimados antes e depois."""
+    texto: str
+    tokens_antes: int
+    tokens_depois: int
+    linhas_duplicadas: int = 0
+
+    @property
+    def reducao(self) -> float:
+        """Fração de tokens economizada."""
+        return 1 - self.tokens_depois / self.tokens_antes if self.tokens_antes else 0.0
+
+
+def estimar_tokens(texto: str) -> int:
+    """
+    Estima o número de tokens de um texto sem depender do tokenizador do modelo.
+
+    Palavras contam um token a cada 4 caracteres, pontuação conta um token por
+    caractere e espaços em branco contam um token a cada 4 caracteres, exceto o
+    espaço simples entre palavras, que o tokenizador absorve na palavra seguinte.
+
+    Args:
+        texto (str): Texto a estimar
+
+    Returns:
+        int: Número estimado de tokens
+    """
+    tokens = 0
+    for pedaco in _PEDACOS.findall(texto):
+        if pedaco == " ":
+            continue
+        if pedaco[0].isspace() or pedaco[0].isalnum() or pedaco[0] == "_":
+            tokens += math.ceil(len(pedaco) / 4)
+        else:
+            tokens += 1
+    return tokens
+
+
+def minificar_json_embutido(conteudo: str) -> str:
+    """
+    Minifica o JSON de um bloco cercado, preservando um título em prosa antes dele.
+
+    Args:
+        conteudo (str): Conteúdo do bloco
+
+    Returns:
+        str: Conteúdo com o JSON em uma linha, ou o original sem espaços de layout se não for JSON
+    """
+    inicio = min((i for i in (conteudo.find("{"), conteudo.find("[")) if i >= 0), default=-1)
+    if inicio >= 0:
+        try:
+            objeto = json.loads(conteudo[inicio:])
+        except ValueError:
+            pass
+        else:
+            titulo = " ".join(conteudo[:inicio].split())
+            compacto = json.dumps(objeto, ensure_ascii=False, separators=(",", ":"))
+            return f"{titulo}\n{compacto}" if titulo else compacto
+    return "\n".join(linha.strip() for linha in conteudo.strip().splitlines() if linha.strip())
+
+
+def _compactar_prosa(texto: str, vistas: Optional[Set[str]]) -> Tuple[str, int]:
+    """Remove indentação e espaços de layout e descarta instruções longas repetidas (vistas None: nenhuma)."""
+    linhas: List[str] = []
+    duplicadas = 0
+    for linha in texto.splitlines():
+        linha = _ESPACOS_INTERNOS.sub(" ", linha.strip())
+        if not linha:
+            # Uma única linha em branco separa parágrafos
+            if linhas and linhas[-1]:
+                linhas.append("")
+            continue
+        if vistas is not None and len(linha) >= TAMANHO_MINIMO_DUPLICADA:
+            chave = linha.casefold()
+            if chave in vistas:
+                duplicadas += 1
+                continue
+            vistas.add(chave)
+        linhas.append(linha)
+    return "\n".join(linhas), duplicadas
+
+
+def _compactar_trecho(texto: str, vistas: Optional[Set[str]]) -> Tuple[List[str], int]:
+    """Compacta a prosa e minifica os blocos cercados de um trecho do prompt."""
+    partes: List[str] = []
+    duplicadas = 0
+    posicao = 0
+    for bloco in _BLOCO_CERCADO.finditer(texto):
+        prosa, removidas = _compactar_prosa(texto[posicao:bloco.start()], vistas)
+        duplicadas += removidas
+        partes.append(prosa)
+        partes.append(f"```{bloco.group(1)}\n{minificar_json_embutido(bloco.group(2))}\n```")
+        posicao = bloco.end()
+    prosa, removidas = _compactar_prosa(texto[posicao:], vistas)
+    partes.append(prosa)
+    return partes, duplicadas + removidas
+
+
+def compactar_prompt(texto: str) -> ResultadoCompactacao:
+    """
+    Compacta um prompt sem alterar seu conteúdo semântico.
+
+    Remove a indentação e os espaços de layout de cada linha, reduz sequências de
+    linhas em branco a uma, minifica o JSON dos blocos cercados e descarta
+    instruções longas que aparecem mais de uma vez (mantendo a primeira). O descarte
+    vale só para as instruções antes de MARCADOR_DADOS_USUARIO: os dados do usuário e
+    a conversa do chat chegam ao modelo com todas as linhas.
+
+    Args:
+        texto (str): Prompt original
+
+    Returns:
+        ResultadoCompactacao: Prompt compactado e tokens estimados antes e depois
+    """
+    inicio_dados = texto.find(MARCADOR_DADOS_USUARIO)
+    if inicio_dados < 0:
+        inicio_dados = len(texto)
+    partes, duplicadas = _compactar_trecho(texto[:inicio_dados], set())
+    partes_dados, _ = _compactar_trecho(texto[inicio_dados:], None)
+    partes.extend(partes_dados)
+
+    compacto = "\n".join(parte.strip("\n") for parte in partes if parte.strip()).strip()
+    return ResultadoCompactacao(
+        texto=compacto,
+        tokens_antes=estimar_tokens(texto),
+        tokens_depois=estimar_tokens(compacto),
+        linhas_duplicadas=duplicadas
+    )
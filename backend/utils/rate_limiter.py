@@ -0,0 +1,270 @@
+# Limite de Taxa Compartilhado entre Processos para a API Claude #
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+
+from .logger import WrapperLogger
+from .config import get_rate_limit_config
+from .llm_metrics import get_llm_metrics
+from .prompt_compaction import estimar_tokens
+
+
+class LimiteTaxaEsgotadoError(requests.exceptions.ConnectionError):
+    """O prazo de espera pelo limite de requisições/tokens por minuto terminou."""
+
+
+@dataclass
+class Reserva:
+    """Reserva feita no balde; guarda os tokens cobrados para a reconciliação."""
+    tokens_cobrados: int
+    espera_s: float
+
+
+def _texto_do_conteudo(conteudo: Any) -> str:
+    if isinstance(conteudo, str):
+        return conteudo
+    if isinstance(conteudo, list):
+        return "\n".join(bloco.get("text", "") if isinstance(bloco, dict) else str(bloco) for bloco in conteudo)
+    return ""
+
+
+def estimar_tokens_requisicao(corpo: Dict[str, Any]) -> int:
+    """
+    Estima os tokens que uma requisição à API Messages vai consumir antes do envio.
+
+    A entrada (sistema, mensagens e ferramentas) é estimada pelo texto e a saída
+    pelo max_tokens, como faz a própria API; a diferença é devolvida em reconciliar().
+
+    Args:
+        corpo (Dict): Corpo da requisição
+
+    Returns:
+        int: Tokens estimados (entrada + max_tokens)
+    """
+    partes = [_texto_do_conteudo(corpo.get("system"))]
+    partes.extend(_texto_do_conteudo(m.get("content")) for m in corpo.get("messages", []))
+    if corpo.get("tools"):
+        partes.append(json.dumps(corpo["tools"], ensure_ascii=False, separators=(",", ":")))
+    return sum(estimar_tokens(p) for p in partes if p) + int(corpo.get("max_tokens") or 0)
+
+
+def tokens_consumidos(uso: Optional[Dict[str, Any]]) -> int:
+    """
+    Tokens de uma resposta que contam para o limite por minuto.
+
+    Leituras do cache de prompts não contam para o limite de entrada da API.
+
+    Args:
+        uso (Dict, optional): Campo usage da resposta
+
+    Returns:
+        int: Entrada + escrita no cache + saída
+    """
+    uso = uso or {}
+    return sum(int(uso.get(campo) or 0) for campo in ("input_tokens", "cache_creation_input_tokens", "output_tokens"))
+
+
+class LimitadorTaxaCompartilhado:
+    """
+    Baldes de requisições e de tokens por minuto compartilhados por todos os processos.
+
+    O estado fica em um arquivo SQLite, atualizado dentro de transações exclusivas
+    (BEGIN IMMEDIATE), de modo que os workers da API e os jobs em lote que apontam
+    para o mesmo arquivo dividem o mesmo limite da conta. Cada balde tem capacidade
+    igual ao limite por minuto e é reabastecido continuamente. Os tokens são cobrados
+    pela estimativa antes da chamada e reconciliados com o uso real depois; o saldo
+    pode ficar negativo quando a estimativa for baixa, atrasando as chamadas seguintes.
+    """
+
+    def __init__(self, path: str, rpm: int = 0, tpm: int = 0, nome: str = "claude", metricas: Any = None,
+                 relogio: Callable[[], float] = time.time, dormir: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            path (str): Caminho do arquivo SQLite compartilhado
+            rpm (int): Requisições por minuto (0 = sem limite)
+            tpm (int): Tokens por minuto (0 = sem limite)
+            nome (str): Nome do provedor, usado nos logs, nas métricas e como chave dos baldes
+            metricas (MetricasLLM, optional): Registro onde as esperas e os saldos são publicados
+            relogio (Callable): Fonte de tempo comum aos processos (substituível nos testes)
+            dormir (Callable): Função de espera (substituível nos testes)
+        """
+        self.logger = WrapperLogger("LimitadorTaxa")
+        self.path = path
+        self.rpm = max(0, rpm)
+        self.tpm = max(0, tpm)
+        self.nome = nome
+        self.metricas = metricas
+        self.relogio = relogio
+        self.dormir = dormir
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS baldes (
+                nome TEXT PRIMARY KEY,
+                disponivel REAL NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+            """
+        )
+        self.logger.info(f"Limite de taxa compartilhado em {path} (rpm={self.rpm}, tpm={self.tpm})")
+
+    def reservar(self, tokens_estimados: int, timeout: Optional[float] = None) -> Reserva:
+        """
+        Espera até haver uma requisição e os tokens estimados disponíveis e os reserva.
+
+        Args:
+            tokens_estimados (int): Tokens estimados da chamada (ver estimar_tokens_requisicao)
+            timeout (float, optional): Prazo de espera em segundos (None espera sem prazo)
+
+        Returns:
+            Reserva: Reserva a reconciliar com o uso real
+
+        Raises:
+            LimiteTaxaEsgotadoError: Se o prazo terminar antes de haver capacidade
+        """
+        # Uma chamada maior que o limite inteiro espera o balde encher, em vez de esperar para sempre
+        cobrados = min(max(0, int(tokens_estimados)), self.tpm) if self.tpm else 0
+        inicio = self.relogio()
+        prazo = None if timeout is None else inicio + timeout
+        while True:
+            espera, saldos = self._tentar_reservar(cobrados)
+            if espera <= 0:
+                break
+            restante = None if prazo is None else prazo - self.relogio()
+            if restante is not None and restante <= 0:
+                self._incrementar("esgotadas")
+                raise LimiteTaxaEsgotadoError(
+                    f"Limite de taxa da API {self.nome} sem capacidade em {timeout:.1f}s "
+                    f"(requisições {saldos[0]:.1f}, tokens {saldos[1]:.0f})")
+            self.dormir(espera if restante is None else min(espera, restante))
+
+        total_espera = self.relogio() - inicio
+        if total_espera > 0:
+            self._incrementar("esperas")
+            self.logger.debug(f"Chamada à API {self.nome} aguardou {total_espera:.2f}s pelo limite de taxa")
+        self._publicar(saldos)
+        return Reserva(cobrados, total_espera)
+
+    def reconciliar(self, reserva: Reserva, tokens_reais: Optional[int]) -> None:
+        """
+        Ajusta o balde de tokens pela diferença entre a estimativa e o uso real.
+
+        Args:
+            reserva (Reserva): Reserva feita em reservar()
+            tokens_reais (int, optional): Tokens efetivamente consumidos (None mantém a estimativa,
+                por exemplo quando a conexão caiu sem resposta)
+        """
+        if not self.tpm or tokens_reais is None or tokens_reais == reserva.tokens_cobrados:
+            return
+        with self._transacao() as (baldes, agora):
+            disponivel = baldes["tpm"] + reserva.tokens_cobrados - tokens_reais
+            self._gravar("tpm", min(float(self.tpm), disponivel), agora)
+
+    def saldos(self) -> Dict[str, float]:
+        """
+        Lê o saldo atual dos baldes.
+
+        Returns:
+            Dict: Requisições (rpm) e tokens (tpm) disponíveis agora
+        """
+        with self._transacao() as (baldes, _):
+            return baldes
+
+    def _tentar_reservar(self, tokens: int) -> Tuple[float, Tuple[float, float]]:
+        """Reserva se houver capacidade; senão, retorna a espera estimada até haver."""
+        with self._transacao() as (baldes, agora):
+            requisicoes, disponiveis = baldes["rpm"], baldes["tpm"]
+            espera = 0.0
+            if self.rpm and requisicoes < 1:
+                espera = max(espera, (1 - requisicoes) * 60.0 / self.rpm)
+            if self.tpm and disponiveis < tokens:
+                espera = max(espera, (tokens - disponiveis) * 60.0 / self.tpm)
+            if espera <= 0:
+                requisicoes -= 1 if self.rpm else 0
+                disponiveis -= tokens
+                self._gravar("rpm", requisicoes, agora)
+                self._gravar("tpm", disponiveis, agora)
+        return espera, (requisicoes, disponiveis)
+
+    @contextmanager
+    def _transacao(self) -> Iterator[Tuple[Dict[str, float], float]]:
+        """Transação exclusiva entre processos (BEGIN IMMEDIATE) com os baldes reabastecidos até agora."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                agora = self.relogio()
+                yield self._ler_baldes(agora), agora
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _ler_baldes(self, agora: float) -> Dict[str, float]:
+        linhas = {
+            nome.rsplit(":", 1)[1]: (disponivel, atualizado_em)
+            for nome, disponivel, atualizado_em in self._conn.execute(
+                "SELECT nome, disponivel, atualizado_em FROM baldes WHERE nome IN (?, ?)",
+                (f"{self.nome}:rpm", f"{self.nome}:tpm"))
+        }
+        baldes = {}
+        for tipo, limite in (("rpm", self.rpm), ("tpm", self.tpm)):
+            disponivel, atualizado_em = linhas.get(tipo, (float(limite), agora))
+            decorrido = max(0.0, agora - atualizado_em)
+            baldes[tipo] = min(float(limite), disponivel + decorrido * limite / 60.0)
+        return baldes
+
+    def _gravar(self, tipo: str, disponivel: float, agora: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO baldes (nome, disponivel, atualizado_em) VALUES (?, ?, ?)",
+            (f"{self.nome}:{tipo}", disponivel, agora)
+        )
+
+    def _publicar(self, saldos: Tuple[float, float]) -> None:
+        if self.metricas is not None:
+            self.metricas.definir_estado(f"taxa_{self.nome}", {"requisicoes": round(saldos[0], 1),
+                                                               "tokens": round(saldos[1])})
+
+    def _incrementar(self, contador: str) -> None:
+        if self.metricas is not None:
+            self.metricas.incrementar(f"taxa_{self.nome}_{contador}")
+
+
+# Instância compartilhada por processo (o estado é compartilhado entre processos pelo arquivo)
+_limitador_taxa_claude: Optional[LimitadorTaxaCompartilhado] = None
+_limitador_taxa_claude_lock = threading.Lock()
+
+
+def get_limitador_taxa_claude() -> Optional[LimitadorTaxaCompartilhado]:
+    """
+    Obtém o limite de taxa das chamadas à API Claude compartilhado entre os processos.
+
+    Returns:
+        Optional[LimitadorTaxaCompartilhado]: Limitador configurado ou None se desabilitado
+    """
+    global _limitador_taxa_claude
+    config = get_rate_limit_config()
+    if not config["enabled"]:
+        return None
+
+    with _limitador_taxa_claude_lock:
+        if _limitador_taxa_claude is None:
+            _limitador_taxa_claude = LimitadorTaxaCompartilhado(
+                path=config["path"],
+                rpm=config["rpm"],
+                tpm=config["tpm"],
+                metricas=get_llm_metrics()
+            )
+        return _limitador_taxa_claude
@@ -0,0 +1,247 @@
+# Retentativas com Backoff Exponencial e Disjuntor para a API Claude #
+
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from .logger import WrapperLogger
+from .config import get_retry_config
+from .llm_metrics import get_llm_metrics
+
+# Status que indicam falha transitória do provedor (529 = API sobrecarregada)
+STATUS_RETENTAVEIS = frozenset({408, 429, 500, 502, 503, 504, 529})
+
+# Estados do disjuntor
+DISJUNTOR_FECHADO = "fechado"
+DISJUNTOR_ABERTO = "aberto"
+DISJUNTOR_MEIO_ABERTO = "meio_aberto"
+
+
+class CircuitoAbertoError(requests.exceptions.ConnectionError):
+    """Chamada recusada sem acessar a rede porque o disjuntor está aberto."""
+
+
+def ler_retry_after(headers: Any, agora: Optional[float] = None) -> Optional[float]:
+    """
+    Lê o cabeçalho retry-after em segundos ou como data HTTP.
+
+    Args:
+        headers: Cabeçalhos da resposta (mapeamento, de preferência sem distinção de maiúsculas)
+        agora (float, optional): Instante de referência para datas HTTP (padrão: time.time())
+
+    Returns:
+        Optional[float]: Segundos de espera pedidos pelo servidor ou None se ausente/inválido
+    """
+    valor = None
+    for nome, conteudo in dict(headers or {}).items():
+        if nome.lower() == "retry-after":
+            valor = str(conteudo).strip()
+            break
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = email.utils.parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, data.timestamp() - (time.time() if agora is None else agora))
+
+
+class PoliticaRetentativa:
+    """
+    Backoff exponencial limitado com jitter completo, respeitando retry-after.
+
+    A espera antes da tentativa n+1 é sorteada entre 0 e min(espera_max_s,
+    espera_base_s * 2^n), o que espalha as retentativas de vários workers. Se o
+    servidor informar retry-after, ele é usado no lugar do sorteio; se pedir mais
+    do que retry_after_max_s, as retentativas são encerradas.
+    """
+
+    def __init__(self, max_tentativas: int = 3, espera_base_s: float = 1.0, espera_max_s: float = 20.0,
+                 retry_after_max_s: float = 30.0, aleatorio: Optional[random.Random] = None,
+                 dormir: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            max_tentativas (int): Total de tentativas, incluindo a primeira
+            espera_base_s (float): Espera base do backoff em segundos
+            espera_max_s (float): Limite da espera sorteada em segundos
+            retry_after_max_s (float): Maior retry-after aceito em segundos
+            aleatorio (random.Random, optional): Gerador do jitter
+            dormir (Callable): Função de espera (substituível nos testes)
+        """
+        self.max_tentativas = max(1, max_tentativas)
+        self.espera_base_s = espera_base_s
+        self.espera_max_s = espera_max_s
+        self.retry_after_max_s = retry_after_max_s
+        self.aleatorio = aleatorio or random.Random()
+        self.dormir = dormir
+
+    def espera(self, tentativa: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Calcula a espera antes da próxima tentativa.
+
+        Args:
+            tentativa (int): Número da tentativa que acabou de falhar (1 = primeira)
+            retry_after (float, optional): Espera pedida pelo servidor em segundos
+
+        Returns:
+            Optional[float]: Segundos de espera ou None se não deve haver nova tentativa
+        """
+        if tentativa >= self.max_tentativas:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.retry_after_max_s else None
+        limite = min(self.espera_max_s, self.espera_base_s * (2 ** (tentativa - 1)))
+        return self.aleatorio.uniform(0, limite)
+
+
+class Disjuntor:
+    """
+    Disjuntor (circuit breaker) compartilhado pelas chamadas a um provedor.
+
+    Depois de limiar_falhas falhas consecutivas o disjuntor abre e as chamadas são
+    recusadas imediatamente durante abertura_s segundos. Passado esse tempo, uma
+    única chamada de teste é liberada (meio aberto): se ela tiver sucesso o disjuntor
+    fecha; se falhar, ele volta a abrir. Uma chamada de teste sem resultado (stream
+    abandonado, por exemplo) libera outra depois de abertura_s. Seguro para uso entre threads.
+    """
+
+    def __init__(self, nome: str = "claude", limiar_falhas: int = 5, abertura_s: float = 30.0,
+                 metricas: Any = None, relogio: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            nome (str): Nome do provedor, usado nos logs e nas métricas
+            limiar_falhas (int): Falhas consecutivas que abrem o disjuntor
+            abertura_s (float): Segundos em que o disjuntor fica aberto antes da chamada de teste
+            metricas (MetricasLLM, optional): Registro onde o estado e as transições são publicados
+            relogio (Callable): Fonte de tempo monotônica (substituível nos testes)
+        """
+        self.logger = WrapperLogger("Disjuntor")
+        self.nome = nome
+        self.limiar_falhas = max(1, limiar_falhas)
+        self.abertura_s = abertura_s
+        self.metricas = metricas
+        self.relogio = relogio
+        self._estado = DISJUNTOR_FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._teste_iniciado_em = 0.0
+        self._lock = threading.Lock()
+        self._publicar(DISJUNTOR_FECHADO, transicao=False)
+
+    @property
+    def estado(self) -> str:
+        """Estado atual: fechado, aberto ou meio_aberto."""
+        with self._lock:
+            if self._estado == DISJUNTOR_ABERTO and self.relogio() - self._aberto_em >= self.abertura_s:
+                return DISJUNTOR_MEIO_ABERTO
+            return self._estado
+
+    def permitir(self) -> bool:
+        """
+        Indica se uma chamada pode ser feita agora.
+
+        Returns:
+            bool: False se o disjuntor estiver aberto ou se a chamada de teste já estiver em andamento
+        """
+        with self._lock:
+            if self._estado == DISJUNTOR_FECHADO:
+                return True
+            if self._estado == DISJUNTOR_ABERTO:
+                if self.relogio() - self._aberto_em < self.abertura_s:
+                    recusar = True
+                else:
+                    self._mudar(DISJUNTOR_MEIO_ABERTO)
+                    recusar = False
+            else:
+                recusar = self._teste_em_andamento and self.relogio() - self._teste_iniciado_em < self.abertura_s
+            if not recusar:
+                self._teste_em_andamento = True
+                self._teste_iniciado_em = self.relogio()
+        if recusar and self.metricas is not None:
+            self.metricas.incrementar(f"disjuntor_{self.nome}_recusadas")
+        return not recusar
+
+    def registrar_sucesso(self) -> None:
+        """Registra uma chamada bem-sucedida, fechando o disjuntor."""
+        with self._lock:
+            self._falhas = 0
+            self._teste_em_andamento = False
+            if self._estado != DISJUNTOR_FECHADO:
+                self._mudar(DISJUNTOR_FECHADO)
+
+    def registrar_falha(self) -> None:
+        """Registra uma falha do provedor, abrindo o disjuntor no limiar ou após falha da chamada de teste."""
+        with self._lock:
+            self._falhas += 1
+            self._teste_em_andamento = False
+            if self._estado == DISJUNTOR_MEIO_ABERTO or (
+                    self._estado == DISJUNTOR_FECHADO and self._falhas >= self.limiar_falhas):
+                self._aberto_em = self.relogio()
+                self._mudar(DISJUNTOR_ABERTO)
+
+    def _mudar(self, estado: str) -> None:
+        """Troca o estado (chamado com o lock adquirido)."""
+        anterior, self._estado = self._estado, estado
+        log = self.logger.warning if estado == DISJUNTOR_ABERTO else self.logger.info
+        log(f"Disjuntor {self.nome}: {anterior} -> {estado} ({self._falhas} falha(s) consecutiva(s))")
+        self._publicar(estado)
+
+    def _publicar(self, estado: str, transicao: bool = True) -> None:
+        if self.metricas is None:
+            return
+        self.metricas.definir_estado(f"disjuntor_{self.nome}", estado)
+        if transicao:
+            self.metricas.incrementar(f"disjuntor_{self.nome}_{estado}")
+
+
+def criar_politica_retentativa(config: Optional[Dict[str, Any]] = None) -> PoliticaRetentativa:
+    """
+    Cria a política de retentativas a partir da configuração.
+
+    Args:
+        config (Dict, optional): Configuração de get_retry_config()
+
+    Returns:
+        PoliticaRetentativa: Política configurada
+    """
+    config = config or get_retry_config()
+    return PoliticaRetentativa(
+        max_tentativas=config["max_tentativas"],
+        espera_base_s=config["espera_base_s"],
+        espera_max_s=config["espera_max_s"],
+        retry_after_max_s=config["retry_after_max_s"]
+    )
+
+
+# Instância compartilhada por processo
+_disjuntor_claude: Optional[Disjuntor] = None
+_disjuntor_claude_lock = threading.Lock()
+
+
+def get_disjuntor_claude() -> Disjuntor:
+    """
+    Obtém o disjuntor das chamadas à API Claude compartilhado pelo processo.
+
+    Returns:
+        Disjuntor: Disjuntor configurado a partir das variáveis de ambiente
+    """
+    global _disjuntor_claude
+    with _disjuntor_claude_lock:
+        if _disjuntor_claude is None:
+            config = get_retry_config()
+            _disjuntor_claude = Disjuntor(
+                "claude",
+                limiar_falhas=config["disjuntor_limiar_falhas"],
+                abertura_s=config["disjuntor_abertura_s"],
+                metricas=get_llm_metrics()
+            )
+        return _disjuntor_claude
@@ -0,0 +1,285 @@
+# Validação de Schema Compilada e Reparo Direcionado #
+
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import jsonschema
+from jsonschema.exceptions import ValidationError
+from jsonschema.validators import validator_for
+
+# Valores usados quando um campo obrigatório ou numérico vem ausente/nulo
+VALORES_PADRAO: Dict[str, Any] = {
+    "duracao_semanas": 12,
+    "frequencia_semanal": 3,
+    "duracao_minutos": 60,
+    "series": 3,
+    "repeticoes": "10-12",
+    "percentual_rm": 70,
+    "tempo_descanso": 60,
+    "nivel_intensidade": 7,
+    "ordem": 1,
+}
+
+_PADRAO_POR_TIPO = {"string": "", "array": list, "object": dict}
+_INTEIRO = re.compile(r"[+-]?\d+")
+_SEM_REPARO = object()
+
+
+class ValidadorCompilado:
+    """
+    Validador construído uma única vez por schema.
+
+    O metaschema é verificado na construção; depois cada validação percorre a
+    instância uma única vez e devolve todos os erros de uma só vez.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        """
+        Args:
+            schema (Dict): Schema JSON
+        """
+        classe = validator_for(schema)
+        classe.check_schema(schema)
+        self.schema = schema
+        self._validador = classe(schema)
+
+    def erros(self, instancia: Any) -> List[ValidationError]:
+        """
+        Coleta todos os erros de validação em uma única passada.
+
+        Args:
+            instancia: Documento a validar
+
+        Returns:
+            List[ValidationError]: Erros ordenados pelo caminho
+        """
+        return sorted(self._validador.iter_errors(instancia), key=lambda e: [str(p) for p in e.absolute_path])
+
+    def e_valido(self, instancia: Any) -> bool:
+        """Retorna True se a instância é válida (interrompe no primeiro erro)."""
+        return self._validador.is_valid(instancia)
+
+    def validar(self, instancia: Any) -> None:
+        """
+        Valida a instância, levantando o erro mais relevante.
+
+        Raises:
+            ValidationError: Se a instância não for válida
+        """
+        erro = jsonschema.exceptions.best_match(self._validador.iter_errors(instancia))
+        if erro is not None:
+            raise erro
+
+
+# Validadores compilados por schema (os schemas do AssetRegistry são objetos compartilhados)
+_validadores: "OrderedDict[int, Tuple[Dict[str, Any], ValidadorCompilado]]" = OrderedDict()
+_validadores_lock = threading.Lock()
+_MAX_VALIDADORES = 32
+
+
+def obter_validador(schema: Dict[str, Any]) -> ValidadorCompilado:
+    """
+    Obtém o validador compilado para um schema, construindo-o na primeira vez.
+
+    Args:
+        schema (Dict): Schema JSON (a identidade do objeto é a chave do cache)
+
+    Returns:
+        ValidadorCompilado: Validador reutilizável
+    """
+    chave = id(schema)
+    with _validadores_lock:
+        entrada = _validadores.get(chave)
+        # A referência ao schema mantida na entrada impede a reutilização do id
+        if entrada is not None and entrada[0] is schema:
+            _validadores.move_to_end(chave)
+            return entrada[1]
+
+    validador = ValidadorCompilado(schema)
+    with _validadores_lock:
+        _validadores[chave] = (schema, validador)
+        while len(_validadores) > _MAX_VALIDADORES:
+            _validadores.popitem(last=False)
+    return validador
+
+
+def formatar_caminho(caminho: Sequence[Any]) -> str:
+    """Formata o caminho de um erro como "plano_principal.ciclos[0].nome"."""
+    partes = []
+    for parte in caminho:
+        if isinstance(parte, int):
+            partes.append(f"[{parte}]")
+        else:
+            partes.append(f".{parte}" if partes else str(parte))
+    return "".join(partes) or "<raiz>"
+
+
+def _converter(valor: Any, tipos: Sequence[str], campo: Any) -> Any:
+    """Tenta converter um valor para um dos tipos esperados; _SEM_REPARO se não houver conversão segura."""
+    if valor == "null" and "null" in tipos:
+        return None
+    if valor is None or valor == "null":
+        if campo in VALORES_PADRAO:
+            return VALORES_PADRAO[campo]
+        return _SEM_REPARO
+    if isinstance(valor, bool):
+        return _SEM_REPARO
+    if isinstance(valor, str):
+        texto = valor.strip()
+        if "integer" in tipos and _INTEIRO.fullmatch(texto):
+            return int(texto)
+        if "number" in tipos:
+            try:
+                return float(texto.replace(",", "."))
+            except ValueError:
+                pass
+        return _SEM_REPARO
+    if isinstance(valor, float) and "integer" in tipos and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, (int, float)) and "string" in tipos:
+        return str(valor)
+    return _SEM_REPARO
+
+
+def _padrao_para(campo: str, subschema: Any) -> Any:
+    """Valor padrão para um campo obrigatório ausente; _SEM_REPARO se não houver."""
+    if campo in VALORES_PADRAO:
+        return VALORES_PADRAO[campo]
+    if campo == "id" or campo.endswith("_id"):
+        return str(uuid.uuid4())
+    tipo = subschema.get("type") if isinstance(subschema, dict) else None
+    padrao = _PADRAO_POR_TIPO.get(tipo, _SEM_REPARO)
+    return padrao() if callable(padrao) else padrao
+
+
+def _localizar(documento: Any, caminho: Sequence[Any]) -> Any:
+    alvo = documento
+    for parte in caminho:
+        alvo = alvo[parte]
+    return alvo
+
+
+def subschema_do_caminho(schema: Dict[str, Any], caminho: Sequence[Any]) -> Optional[Dict[str, Any]]:
+    """
+    Retorna o trecho do schema que descreve o valor no caminho informado.
+
+    Segue "properties" para chaves e "items" para índices; referências locais
+    ("#/definitions/...") são resolvidas a partir da raiz do schema, cujas definições
+    são copiadas para o subschema para que ele possa validar o trecho sozinho.
+
+    Args:
+        schema (Dict): Schema JSON completo
+        caminho (Sequence): Caminho no documento, como em ValidationError.absolute_path
+
+    Returns:
+        Optional[Dict]: Subschema, ou None se o schema não descrever o caminho
+    """
+    atual: Any = schema
+    for parte in list(caminho) + [None]:
+        while isinstance(atual, Mapping) and isinstance(atual.get("$ref"), str) and atual["$ref"].startswith("#/"):
+            try:
+                atual = _localizar(schema, atual["$ref"][2:].split("/"))
+            except (KeyError, IndexError, TypeError):
+                return None
+        if parte is None:
+            break
+        if not isinstance(atual, Mapping):
+            return None
+        if isinstance(parte, int):
+            itens = atual.get("items")
+            atual = itens[parte] if isinstance(itens, Sequence) and parte < len(itens) else itens
+        else:
+            atual = (atual.get("properties") or {}).get(parte)
+    if not isinstance(atual, Mapping):
+        return None
+    definicoes = {chave: schema[chave] for chave in ("definitions", "$defs") if chave in schema and chave not in atual}
+    return dict(atual, **definicoes) if definicoes and atual is not schema else atual
+
+
+def trecho_do_erro(erro: ValidationError) -> Optional[List[Any]]:
+    """
+    Caminho do menor trecho que contém o erro e pode ser corrigido isoladamente.
+
+    É o elemento de lista mais profundo do caminho (um exercício, uma sessão, uma
+    semana); fora de listas, o objeto que contém o campo com erro (ou o próprio
+    objeto, em um erro de campo obrigatório).
+
+    Args:
+        erro (ValidationError): Erro de validação
+
+    Returns:
+        Optional[List]: Caminho do trecho, ou None se o trecho for o documento inteiro
+    """
+    caminho = list(erro.absolute_path)
+    indices = [i for i, parte in enumerate(caminho) if isinstance(parte, int)]
+    if indices:
+        return caminho[:indices[-1] + 1]
+    if erro.validator != "required" or not isinstance(erro.instance, dict):
+        caminho = caminho[:-1]
+    return caminho or None
+
+
+def reparar_erros(documento: Any, erros: List[ValidationError]) -> List[str]:
+    """
+    Aplica reparos direcionados no local de cada erro, alterando o documento.
+
+    São tratados erros de tipo (strings numéricas, "null", nulos com valor
+    padrão conhecido) e campos obrigatórios ausentes. Outros erros são mantidos.
+
+    Args:
+        documento: Documento validado
+        erros (List[ValidationError]): Erros coletados em uma única passada
+
+    Returns:
+        List[str]: Descrição das correções aplicadas
+    """
+    correcoes = []
+    for erro in erros:
+        caminho = list(erro.absolute_path)
+        try:
+            if erro.validator == "type" and caminho:
+                tipos = erro.validator_value if isinstance(erro.validator_value, list) else [erro.validator_value]
+                novo = _converter(erro.instance, tipos, caminho[-1])
+                if novo is _SEM_REPARO:
+                    continue
+                _localizar(documento, caminho[:-1])[caminho[-1]] = novo
+                correcoes.append(f"{formatar_caminho(caminho)}: {erro.instance!r} -> {novo!r}")
+
+            elif erro.validator == "required" and isinstance(erro.instance, dict):
+                objeto = _localizar(documento, caminho)
+                propriedades = erro.schema.get("properties", {})
+                for campo in erro.validator_value:
+                    if campo in objeto:
+                        continue
+                    novo = _padrao_para(campo, propriedades.get(campo))
+                    if novo is _SEM_REPARO:
+                        continue
+                    objeto[campo] = novo
+                    correcoes.append(f"{formatar_caminho(caminho + [campo])}: ausente -> {novo!r}")
+        except (KeyError, IndexError, TypeError):
+            # O caminho deixou de existir após um reparo anterior
+            continue
+    return correcoes
+
+
+def validar_e_reparar(documento: Any, schema: Dict[str, Any]) -> Tuple[List[ValidationError], List[str], List[ValidationError]]:
+    """
+    Valida o documento, repara os erros tratáveis e revalida apenas se algo mudou.
+
+    Args:
+        documento: Documento a validar (alterado no próprio objeto)
+        schema (Dict): Schema JSON
+
+    Returns:
+        Tuple: (erros iniciais, correções aplicadas, erros restantes)
+    """
+    validador = obter_validador(schema)
+    erros = validador.erros(documento)
+    if not erros:
+        return [], [], []
+    correcoes = reparar_erros(documento, erros)
+    restantes = validador.erros(documento) if correcoes else erros
+    return erros, correcoes, restantes
@@ -0,0 +1,105 @@
+# Execução Única (Single-Flight) de Gerações Idênticas Concorrentes #
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .logger import WrapperLogger
+
+
+@dataclass
+class _Voo:
+    """Execução em andamento de uma chave."""
+    concluido: threading.Event = field(default_factory=threading.Event)
+    resultado: Any = None
+    erro: Optional[BaseException] = None
+    seguidores: int = 0
+
+
+class GrupoVoo:
+    """
+    Agrupa chamadas concorrentes com a mesma chave em uma única execução.
+
+    A primeira chamada de uma chave (líder) executa a função; as que chegam enquanto
+    ela está em andamento esperam e recebem o mesmo resultado, ou a mesma exceção.
+    Terminada a execução, a chave é liberada: chamadas posteriores executam de novo
+    (o reaproveitamento entre chamadas não simultâneas fica a cargo do cache de planos).
+    Seguro para uso entre threads.
+    """
+
+    def __init__(self, nome: str = "planos"):
+        """
+        Args:
+            nome (str): Nome do grupo, usado nos logs
+        """
+        self.logger = WrapperLogger("GrupoVoo")
+        self.nome = nome
+        self._voos: Dict[str, _Voo] = {}
+        self._lock = threading.Lock()
+
+    def executar(self, chave: str, funcao: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa a função uma única vez para as chamadas simultâneas com a mesma chave.
+
+        Args:
+            chave (str): Chave que identifica chamadas equivalentes
+            funcao (Callable): Função executada pelo líder
+
+        Returns:
+            Tuple: (resultado, compartilhado), com compartilhado True para as chamadas que
+                   receberam o resultado de outra execução
+
+        Raises:
+            Exception: A exceção levantada pela função do líder
+        """
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+            else:
+                voo.seguidores += 1
+
+        if not lider:
+            self.logger.info(f"Aguardando execução idêntica em andamento ({self.nome}, chave {chave[:12]})")
+            voo.concluido.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado, True
+
+        try:
+            voo.resultado = funcao()
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._voos[chave]
+            voo.concluido.set()
+            if voo.seguidores:
+                self.logger.info(f"Execução compartilhada com {voo.seguidores} chamada(s) idêntica(s) ({self.nome})")
+        return voo.resultado, False
+
+    def em_andamento(self) -> int:
+        """Número de chaves com execução em andamento."""
+        with self._lock:
+            return len(self._voos)
+
+
+# Instância compartilhada por processo
+_grupo_planos: Optional[GrupoVoo] = None
+_grupo_planos_lock = threading.Lock()
+
+
+def get_grupo_planos() -> GrupoVoo:
+    """
+    Obtém o grupo de execução única das gerações de planos compartilhado pelo processo.
+
+    Returns:
+        GrupoVoo: Grupo das gerações de planos
+    """
+    global _grupo_planos
+    with _grupo_planos_lock:
+        if _grupo_planos is None:
+            _grupo_planos = GrupoVoo("planos")
+        return _grupo_planos
@@ -0,0 +1,87 @@
+# Guarda Estrutural da Saída em Streaming (Cancelamento Antecipado) #
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .json_stream import Caminho, IncrementalJSONParser
+from .schema_validation import subschema_do_caminho
+
+# Profundidade conferida: chaves da raiz, de usuario e plano_principal, dos ciclos e o início de cada semana
+PROFUNDIDADE_GUARDA = 5
+
+# Caractere que abre cada tipo estrutural do schema
+ABERTURA_POR_TIPO = {"object": "{", "array": "["}
+
+
+class SaidaIrrecuperavelError(ValueError):
+    """A saída recebida até aqui não pode mais formar um plano válido."""
+
+
+class GuardaEstrutural:
+    """
+    Confere o prefixo estrutural de um plano enquanto ele chega em streaming.
+
+    A saída é considerada irrecuperável quando:
+    - há mais texto que max_preambulo antes do objeto JSON (o modelo respondeu em prosa);
+    - a raiz tem uma chave fora das esperadas;
+    - uma chave exclusiva da raiz (usuario, plano_principal) aparece aninhada em outro objeto;
+    - um valor que o schema declara como objeto ou lista começa com outro caractere;
+    - um "}" fecha uma lista ou um "]" fecha um objeto.
+
+    Tipos primitivos trocados não contam: a validação com reparo corrige esses casos.
+    """
+
+    def __init__(self, schema: Dict[str, Any], chaves_raiz: Optional[Iterable[str]] = None,
+                 max_preambulo: int = 300):
+        """
+        Args:
+            schema (Dict): Schema JSON do plano
+            chaves_raiz (Iterable, optional): Chaves aceitas na raiz; por padrão as propriedades do schema
+            max_preambulo (int): Caracteres aceitos antes do "{" inicial (cerca ```json, uma frase curta)
+        """
+        self.schema = schema
+        propriedades = list((schema.get("properties") or {}).keys())
+        self.chaves_raiz = set(chaves_raiz) if chaves_raiz is not None else set(propriedades)
+        self.chaves_exclusivas_raiz = {chave for chave in propriedades
+                                       if ABERTURA_POR_TIPO.get((schema["properties"][chave] or {}).get("type"))}
+        self.max_preambulo = max_preambulo
+        self._aberturas: Dict[Tuple[Any, ...], Optional[str]] = {}
+
+    def criar_parser(self) -> IncrementalJSONParser:
+        """Parser incremental do plano que registra os inícios de valores conferidos pela guarda."""
+        return IncrementalJSONParser(profundidade_inicios=PROFUNDIDADE_GUARDA)
+
+    def _abertura_esperada(self, caminho: Caminho) -> Optional[str]:
+        """Caractere que deve abrir o valor no caminho, pelo tipo declarado no schema (memorizado por padrão)."""
+        padrao = tuple(0 if isinstance(parte, int) else parte for parte in caminho)
+        if padrao not in self._aberturas:
+            subschema = subschema_do_caminho(self.schema, padrao)
+            tipo = subschema.get("type") if subschema else None
+            self._aberturas[padrao] = ABERTURA_POR_TIPO.get(tipo) if isinstance(tipo, str) else None
+        return self._aberturas[padrao]
+
+    def verificar(self, parser: IncrementalJSONParser) -> None:
+        """
+        Confere o que o parser recebeu desde a última verificação.
+
+        Args:
+            parser (IncrementalJSONParser): Parser criado por criar_parser e já alimentado
+
+        Raises:
+            SaidaIrrecuperavelError: Saída que não pode mais formar um plano válido
+        """
+        if not parser.iniciado:
+            if parser.tamanho > self.max_preambulo and len(parser.texto().strip()) > self.max_preambulo:
+                raise SaidaIrrecuperavelError(f"{parser.tamanho} caracteres sem objeto JSON (resposta em prosa)")
+            return
+        if parser.erro_estrutura:
+            raise SaidaIrrecuperavelError(f"Estrutura quebrada: {parser.erro_estrutura}")
+
+        for caminho, abertura in parser.novos_inicios():
+            chave = caminho[-1]
+            if len(caminho) == 1 and chave not in self.chaves_raiz:
+                raise SaidaIrrecuperavelError(f"Chave inesperada na raiz: {chave}")
+            if len(caminho) > 1 and chave in self.chaves_exclusivas_raiz:
+                raise SaidaIrrecuperavelError(f"{chave} aninhado em {list(caminho[:-1])}")
+            esperada = self._abertura_esperada(caminho)
+            if esperada and abertura != esperada:
+                raise SaidaIrrecuperavelError(f"{list(caminho)} deveria começar com '{esperada}', começou com '{abertura}'")
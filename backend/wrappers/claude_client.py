@@ -1,6 +1,7 @@
 # Wrapper para API Claude #
 
 import json
+import time
 import requests
 import traceback
 from typing import Dict, Any, List, Optional, Union
@@ -9,15 +10,27 @@ from anthropic import Anthropic
 
 # Importar logger
 from ..utils.logger import WrapperLogger
-from ..utils.config import get_claude_config
+from ..utils.config import get_claude_config, get_rate_limit_config
+from ..utils.http_transport import get_http_transport
+from ..utils.cassette_transport import TransporteCassete, criar_cliente_httpx
+from ..utils.json_extractor import extrair_json, texto_da_resposta, JSONTruncadoError, JSONNaoEncontradoError
+from ..utils.llm_metrics import (
+    get_llm_metrics, RegistroChamada, RESULTADO_SUCESSO, RESULTADO_ERRO_API, RESULTADO_ERRO_CONEXAO,
+    RESULTADO_TAXA_ESGOTADA
+)
+from ..utils.rate_limiter import (
+    LimiteTaxaEsgotadoError, estimar_tokens_requisicao, get_limitador_taxa_claude, tokens_consumidos
+)
 
 class ClaudeWrapper:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, transport: Any = None):
         """
         Inicializa o wrapper da API Claude.
         
         Args:
             api_key (str, optional): Chave de API para o serviço Claude. Se não fornecida, será obtida da configuração.
+            transport (optional): Transporte das chamadas; por padrão o do processo. Um TransporteCassete
+                (CLAUDE_TRANSPORT_MODE=gravar ou reproduzir) é usado como cliente HTTP do SDK anthropic
         """
         # Configurar logger
         self.logger = WrapperLogger("ClaudeWrapper")
@@ -34,9 +47,17 @@ class ClaudeWrapper:
             raise ValueError("API key da Claude é obrigatória")
         
         self.logger.debug(f"Usando modelo padrão: {self.default_model}")
+        self.metricas = get_llm_metrics()
+        self.limitador_taxa = get_limitador_taxa_claude()
+        self.espera_taxa_max_s = get_rate_limit_config()["espera_max_s"]
         try:
             # Inicializar cliente da biblioteca anthropic
-            self.client = Anthropic(api_key=self.api_key)
+            transporte = transport or get_http_transport()
+            if isinstance(transporte, TransporteCassete):
+                self.logger.info(f"Chamadas ao Claude pelo transporte de cassetes (modo {transporte.modo})")
+                self.client = Anthropic(api_key=self.api_key, http_client=criar_cliente_httpx(transporte))
+            else:
+                self.client = Anthropic(api_key=self.api_key)
             self.logger.info("Cliente Claude inicializado com sucesso")
         except Exception as e:
             self.logger.error(f"Erro ao inicializar cliente Claude: {str(e)}")
@@ -65,10 +86,18 @@ class ClaudeWrapper:
         self.logger.info(f"Enviando requisição ao Claude usando modelo: {model}")
         self.logger.debug(f"Parâmetros - max_tokens: {max_tokens}, temperature: {temperature}")
         
+        inicio = time.perf_counter()
+        reserva = None
+        tokens_reais = None
         try:
             # Preparar mensagens
             messages = [{"role": "user", "content": prompt}]
             
+            # Respeitar o limite de requisições/tokens por minuto compartilhado entre os processos
+            if self.limitador_taxa is not None:
+                corpo = {"system": system_prompt, "messages": messages, "max_tokens": max_tokens}
+                reserva = self.limitador_taxa.reservar(estimar_tokens_requisicao(corpo), self.espera_taxa_max_s)
+            
             # Criar a mensagem
             response = self.client.messages.create(
                 model=model,
@@ -77,9 +106,15 @@ class ClaudeWrapper:
                 system=system_prompt,
                 messages=messages
             )
+            tokens_reais = tokens_consumidos({
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+                "cache_creation_input_tokens": getattr(response.usage, "cache_creation_input_tokens", 0)
+            })
             
             self.logger.info("Resposta obtida com sucesso do Claude")
             self.logger.debug(f"Tokens usados: {response.usage.input_tokens} (entrada), {response.usage.output_tokens} (saída)")
+            self._registrar_chamada(model, inicio, RESULTADO_SUCESSO, response)
             
             result = {
                 "status": "success",
@@ -94,15 +129,17 @@ class ClaudeWrapper:
             
             return result
             
-        except anthropic.APIError as e:
-            self.logger.error(f"Erro de API Claude: {str(e)}")
+        except LimiteTaxaEsgotadoError as e:
+            self.logger.error(f"Limite de taxa compartilhado sem capacidade: {str(e)}")
+            self._registrar_chamada(model, inicio, RESULTADO_TAXA_ESGOTADA)
             return {
                 "status": "error",
-                "message": f"Erro de API: {str(e)}",
-                "error_type": "api_error"
+                "message": "Limite de taxa excedido. Tente novamente mais tarde.",
+                "error_type": "rate_limit"
             }
         except anthropic.RateLimitError as e:
             self.logger.error(f"Erro de limite de taxa: {str(e)}")
+            self._registrar_chamada(model, inicio, RESULTADO_ERRO_API)
             return {
                 "status": "error",
                 "message": "Limite de taxa excedido. Tente novamente mais tarde.",
@@ -110,6 +147,7 @@ class ClaudeWrapper:
             }
         except anthropic.APIConnectionError as e:
             self.logger.error(f"Erro de conexão: {str(e)}")
+            self._registrar_chamada(model, inicio, RESULTADO_ERRO_CONEXAO)
             return {
                 "status": "error",
                 "message": "Erro de conexão com a API Claude.",
@@ -117,19 +155,59 @@ class ClaudeWrapper:
             }
         except anthropic.AuthenticationError as e:
             self.logger.error(f"Erro de autenticação: {str(e)}")
+            self._registrar_chamada(model, inicio, RESULTADO_ERRO_API)
             return {
                 "status": "error",
                 "message": "Falha na autenticação com a API Claude.",
                 "error_type": "authentication_error"
             }
+        except anthropic.APIError as e:
+            self.logger.error(f"Erro de API Claude: {str(e)}")
+            self._registrar_chamada(model, inicio, RESULTADO_ERRO_API)
+            return {
+                "status": "error",
+                "message": f"Erro de API: {str(e)}",
+                "error_type": "api_error"
+            }
         except Exception as e:
             self.logger.error(f"Erro inesperado: {str(e)}")
             self.logger.error(traceback.format_exc())
+            self._registrar_chamada(model, inicio, RESULTADO_ERRO_API)
             return {
                 "status": "error",
                 "message": f"Erro inesperado: {str(e)}",
                 "error_type": "unexpected_error"
             }
+        finally:
+            # Sem resposta, o consumo é desconhecido e a estimativa reservada é mantida
+            if reserva is not None:
+                self.limitador_taxa.reconciliar(reserva, tokens_reais)
+    
+    def _registrar_chamada(self, model: str, inicio: float, resultado: str, response: Any = None) -> None:
+        """
+        Registra tokens, latência e resultado da chamada nas métricas do processo.
+        
+        Args:
+            model (str): Modelo solicitado
+            inicio (float): time.perf_counter() no envio da requisição
+            resultado (str): Resultado da chamada (RESULTADO_*)
+            response (optional): Mensagem retornada pelo SDK anthropic
+        """
+        if self.metricas is None:
+            return
+        usage = getattr(response, "usage", None)
+        self.metricas.registrar(RegistroChamada(
+            origem="ClaudeWrapper",
+            operacao="generate_response",
+            modelo=getattr(response, "model", None) or model,
+            resultado=resultado,
+            total_s=time.perf_counter() - inicio,
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+            cache_escrita_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            cache_leitura_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+            stop_reason=getattr(response, "stop_reason", None)
+        ))
     
     def extract_json_from_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -152,35 +230,20 @@ class ClaudeWrapper:
             }
         
         try:
-            # Extrair o conteúdo
-            content = []
-            if isinstance(response.get("content"), list):
-                content = response.get("content", [])
-            else:
-                content = [{"text": response.get("content", "")}]
+            # Extrair o conteúdo (dicts, strings ou blocos do SDK anthropic)
+            text = texto_da_resposta(response.get("content", ""))
             
-            # Procurar blocos de código JSON
-            json_text = ""
-            
-            for item in content:
-                text = item.get("text", "")
-                
-                # Procurar por blocos ```json ... ```
-                import re
-                json_blocks = re.findall(r'```json(.*?)```', text, re.DOTALL)
-                
-                if json_blocks:
-                    self.logger.debug(f"Encontrado bloco JSON marcado")
-                    json_text = json_blocks[0].strip()
-                    break
-                
-                # Se não encontrar, verificar se o texto completo é JSON
-                if text.strip().startswith("{") and text.strip().endswith("}"):
-                    self.logger.debug("Encontrado JSON direto no texto")
-                    json_text = text.strip()
-                    break
-            
-            if not json_text:
+            try:
+                json_obj = extrair_json(text)
+            except JSONTruncadoError as e:
+                self.logger.error(f"Resposta truncada: {str(e)}")
+                return {
+                    "status": "error",
+                    "message": f"JSON truncado na resposta: {str(e)}",
+                    "error_type": "truncated",
+                    "json_text": e.parcial[:200] + "..." if len(e.parcial) > 200 else e.parcial
+                }
+            except JSONNaoEncontradoError:
                 self.logger.error("Nenhum JSON encontrado na resposta")
                 return {
                     "status": "error",
@@ -188,9 +251,6 @@ class ClaudeWrapper:
                     "content": response.get("content", "")
                 }
             
-            # Converter para objeto Python
-            json_obj = json.loads(json_text)
-            
             return {
                 "status": "success",
                 "data": json_obj
@@ -198,6 +258,7 @@ class ClaudeWrapper:
             
         except json.JSONDecodeError as e:
             self.logger.error(f"Erro ao decodificar JSON: {str(e)}")
+            json_text = e.doc or ""
             return {
                 "status": "error",
                 "message": f"Erro ao decodificar JSON: {str(e)}",
@@ -4,19 +4,16 @@ import json
 import copy
 import uuid
 import datetime
-import jsonschema
 import os
 import traceback
 import time
 from typing import Dict, Any, List, Tuple, Optional, Union
 from dataclasses import dataclass, field
 
-# Importar o WrapperLogger e PathResolver
+# Importar o WrapperLogger e o registro de recursos
 from ..utils.logger import WrapperLogger
-from ..utils.path_resolver import (
-    get_schema_path,
-    load_file_with_fallback
-)
+from ..utils.asset_registry import get_asset_registry
+from ..utils.schema_validation import validar_e_reparar, obter_validador, formatar_caminho
 from ..utils.config import get_supabase_config, get_db_config
 from ..wrappers.supabase_client import SupabaseWrapper
 
@@ -151,27 +148,8 @@ class DistribuidorBD:
     
     @WrapperLogger.log_function()
     def _carregar_schema_json(self) -> Dict:
-        """Carrega o schema JSON para validação."""
-        self.logger.info("Tentando carregar schema_wrapper3.json")
-        
-        # Resolver caminho do arquivo de schema
-        schema_path = get_schema_path("schema_wrapper3.json")
-        self.logger.debug(f"Caminho resolvido para o schema: {schema_path}")
-        
-        try:
-            with open(schema_path, 'r', encoding='utf-8') as file:
-                schema = json.load(file)
-                self.logger.debug(f"Schema carregado com sucesso: {len(json.dumps(schema))} caracteres")
-                return schema
-        except FileNotFoundError:
-            self.logger.warning(f"Arquivo schema {schema_path} não encontrado, será criado um schema básico")
-            return self._criar_schema_padrao()
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Erro ao decodificar JSON do schema: {str(e)}")
-            return self._criar_schema_padrao()
-        except Exception as e:
-            self.logger.error(f"Erro ao carregar schema: {str(e)}")
-            return self._criar_schema_padrao()
+        """Obtém o schema JSON para validação do registro de recursos."""
+        return get_asset_registry().obter_json("schema_wrapper3", fallback=self._criar_schema_padrao())
     
     @WrapperLogger.log_function()
     def _criar_mapeamento_tabelas(self) -> Dict[str, TabelaMapping]:
@@ -510,19 +488,57 @@ class DistribuidorBD:
             Dict: Plano validado
         """
         self.logger.info("Validando plano contra schema JSON")
-        mensagens_erro = []
         
-        # Validar schema
-        try:
-            jsonschema.validate(instance=plano, schema=self.schema)
+        # Validar schema: todos os erros em uma passada, com reparo direcionado
+        erros_schema, correcoes, restantes = validar_e_reparar(plano, self.schema)
+        if not erros_schema:
             self.logger.info("Plano validado com sucesso contra o schema")
-        except jsonschema.exceptions.ValidationError as e:
-            erro_msg = f"Erro de validação: {str(e)}"
-            self.logger.error(erro_msg)
-            mensagens_erro.append(erro_msg)
+        elif correcoes:
+            self.logger.info(f"Correções de schema aplicadas: {'; '.join(correcoes)}")
         
         # Validar regras de negócio
+        falhas_regras = self._validar_regras_negocio(plano)
+        
+        # Se houver erros, tentar corrigir automaticamente quando possível
+        if falhas_regras:
+            self.logger.warning(f"Encontrados {len(falhas_regras)} erros de validação")
+            self.logger.info("Tentando corrigir erros automaticamente")
+            
+            if self._tentar_corrigir_erros(plano, falhas_regras):
+                self.logger.info("Correções aplicadas, validando novamente")
+                # Revalidar apenas o que pode ter mudado
+                falhas_regras = self._validar_regras_negocio(plano)
+                if restantes:
+                    restantes = obter_validador(self.schema).erros(plano)
+            else:
+                self.logger.warning("Não foi possível corrigir todos os erros")
+        
+        mensagens_erro = [
+            f"Erro de validação em {formatar_caminho(erro.absolute_path)}: {erro.message}" for erro in restantes
+        ] + falhas_regras
+        for erro_msg in mensagens_erro:
+            self.logger.error(erro_msg)
+        
+        # Atualizar mensagens de erro
+        plano["validacao"]["mensagens_erro"] = mensagens_erro
+        
+        if not mensagens_erro:
+            self.logger.info("Plano validado com sucesso, sem erros encontrados")
+        
+        return plano
+    
+    def _validar_regras_negocio(self, plano: Dict[str, Any]) -> List[str]:
+        """
+        Valida as regras de negócio declaradas em plano["validacao"]["regras"].
+        
+        Args:
+            plano (Dict): Plano para o banco de dados
+            
+        Returns:
+            List[str]: Mensagens das regras que falharam
+        """
         self.logger.info("Validando regras de negócio")
+        falhas = []
         for regra in plano["validacao"]["regras"]:
             campo = regra["campo"]
             validacao = regra["validacao"]
@@ -532,30 +548,10 @@ class DistribuidorBD:
             
             # Validar campo conforme regra
             if not self._validar_regra(valor, validacao):
-                erro_msg = f"Campo '{campo}' falhou na validação: {validacao}"
-                self.logger.error(erro_msg)
-                mensagens_erro.append(erro_msg)
+                falhas.append(f"Campo '{campo}' falhou na validação: {validacao}")
             else:
                 self.logger.debug(f"Campo '{campo}' passou na validação: {validacao}")
-        
-        # Atualizar mensagens de erro
-        plano["validacao"]["mensagens_erro"] = mensagens_erro
-        
-        # Se houver erros, tentar corrigir automaticamente quando possível
-        if mensagens_erro:
-            self.logger.warning(f"Encontrados {len(mensagens_erro)} erros de validação")
-            self.logger.info("Tentando corrigir erros automaticamente")
-            
-            if self._tentar_corrigir_erros(plano, mensagens_erro):
-                self.logger.info("Correções aplicadas, validando novamente")
-                # Validar novamente após correções
-                return self._validar_plano(plano)
-            else:
-                self.logger.warning("Não foi possível corrigir todos os erros")
-        else:
-            self.logger.info("Plano validado com sucesso, sem erros encontrados")
-        
-        return plano
+        return falhas
     
     @WrapperLogger.log_function()
     def _obter_valor_campo(self, obj: Dict[str, Any], campo_path: str) -> Any:
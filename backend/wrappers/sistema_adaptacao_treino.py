@@ -1,20 +1,46 @@
 # Wrapper 2: Sistema de Adaptação do Treinamento #
 
-import json
 import copy
 import uuid
 import datetime
-import jsonschema
 import os
 import traceback
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional
 
-# Importar o WrapperLogger e PathResolver
+# Importar o WrapperLogger e o registro de recursos
 from ..utils.logger import WrapperLogger
-from ..utils.path_resolver import (
-    get_prompt_path, get_schema_path,
-    load_file_with_fallback
-)
+from ..utils.asset_registry import get_asset_registry
+from ..utils.schema_validation import validar_e_reparar, obter_validador, formatar_caminho
+
+# Conteúdo usado quando os arquivos de prompt ou schema não são encontrados
+PROMPT_PADRAO = """
+# PROMPT DE ADAPTAÇÃO DO SISTEMA (TEMPLATE PADRÃO)
+
+O Sistema de Adaptação ajusta o plano de treinamento original de acordo com:
+- Nível de humor/energia do usuário
+- Tempo disponível para treino no momento
+
+Para cada sessão do plano original, crie variações para diferentes situações:
+- Quando o usuário está mais cansado ou com pouca energia
+- Quando o usuário está com disposição acima do normal
+- Quando o usuário tem menos tempo que o previsto
+- Quando o usuário tem mais tempo que o previsto
+
+Use as diretrizes a seguir para cada tipo de adaptação.
+"""
+
+SCHEMA_BASICO = {
+    "type": "object",
+    "required": ["treinamento_id", "versao", "data_criacao", "usuario", "plano_principal", "adaptacoes"],
+    "properties": {
+        "treinamento_id": {"type": "string"},
+        "versao": {"type": "string"},
+        "data_criacao": {"type": "string"},
+        "usuario": {"type": "object"},
+        "plano_principal": {"type": "object"},
+        "adaptacoes": {"type": "object"}
+    }
+}
 
 class SistemaAdaptacao:
     def __init__(self):
@@ -25,45 +51,9 @@ class SistemaAdaptacao:
         self.logger = WrapperLogger("Wrapper2_Adaptacao")
         self.logger.info("Inicializando Sistema de Adaptação")
         
-        # Tentar carregar o prompt de vários caminhos possíveis
-        prompt_paths = [
-            "/prompt/Prompt Sistema de Adaptação.txt",
-            "prompt/Prompt Sistema de Adaptação.txt",
-            "../prompt/Prompt Sistema de Adaptação.txt",
-            "Prompt Sistema de Adaptação.txt"
-        ]
-        
-        prompt_carregado = False
-        for path in prompt_paths:
-            try:
-                self.prompt_adaptacao = self._carregar_prompt(path)
-                self.logger.info(f"Prompt de adaptação carregado com sucesso de: {path}")
-                prompt_carregado = True
-                break
-            except FileNotFoundError:
-                self.logger.debug(f"Prompt não encontrado em: {path}")
-            except Exception as e:
-                self.logger.debug(f"Erro ao carregar prompt de {path}: {str(e)}")
-        
-        if not prompt_carregado:
-            self.logger.warning("Não foi possível carregar o prompt de adaptação, usando prompt padrão")
-            # Usar um prompt padrão
-            self.prompt_adaptacao = """
-            # PROMPT DE ADAPTAÇÃO DO SISTEMA (TEMPLATE PADRÃO)
-            
-            O Sistema de Adaptação ajusta o plano de treinamento original de acordo com:
-            - Nível de humor/energia do usuário
-            - Tempo disponível para treino no momento
-            
-            Para cada sessão do plano original, crie variações para diferentes situações:
-            - Quando o usuário está mais cansado ou com pouca energia
-            - Quando o usuário está com disposição acima do normal
-            - Quando o usuário tem menos tempo que o previsto
-            - Quando o usuário tem mais tempo que o previsto
-            
-            Use as diretrizes a seguir para cada tipo de adaptação.
-            """
-            self.logger.info("Prompt padrão configurado com sucesso")
+        # Prompts e schemas compartilhados pelo processo
+        self.assets = get_asset_registry()
+        self.prompt_adaptacao = self._carregar_prompt("prompt_adaptacao")
         
         try:
             self.schema = self._carregar_schema_json()
@@ -81,80 +71,25 @@ class SistemaAdaptacao:
         self.logger.debug(f"Tempos disponíveis configurados: {', '.join(self.tempos_disponiveis)}")
         
     @WrapperLogger.log_function()
-    def _carregar_prompt(self, arquivo_prompt: str) -> str:
-        """Carrega o prompt do sistema de adaptação de um arquivo."""
-        self.logger.info(f"Tentando carregar prompt do arquivo: {arquivo_prompt}")
-        
-        # Resolver caminho do arquivo de prompt
-        prompt_path = get_prompt_path(arquivo_prompt)
-        self.logger.debug(f"Caminho resolvido para o prompt: {prompt_path}")
-        
-        # Definir conteúdo de fallback
-        fallback_content = (
-            "# PROMPT DE ADAPTAÇÃO DO SISTEMA\n\n"
-            "Este é um prompt de fallback para quando o arquivo original "
-            "não puder ser carregado. Ele contém instruções básicas para "
-            "adaptação do treinamento."
-        )
-        
-        # Carregar arquivo com fallback
-        success, content = load_file_with_fallback(
-            prompt_path,
-            fallback_content=fallback_content
-        )
-        
-        if success:
-            self.logger.info(f"Prompt carregado com sucesso, {len(content)} caracteres")
-        else:
-            self.logger.warning(f"Usando conteúdo de fallback para o prompt {arquivo_prompt}")
-            
-        return content
+    def _carregar_prompt(self, nome_recurso: str) -> str:
+        """Obtém o prompt do sistema de adaptação do registro de recursos."""
+        return self.assets.obter_texto(nome_recurso, fallback=PROMPT_PADRAO)
     
     @WrapperLogger.log_function()
     def _carregar_schema_json(self) -> Dict:
-        """Carrega o schema JSON para validação."""
-        self.logger.info("Tentando carregar schema_wrapper2.json")
-        
-        # Resolver caminho do arquivo de schema
-        schema_path = get_schema_path("schema_wrapper2.json")
-        self.logger.debug(f"Caminho resolvido para o schema: {schema_path}")
-        
-        # Schema básico como fallback
-        schema_basico = {
-            "type": "object",
-            "required": ["treinamento_id", "versao", "data_criacao", "usuario", "plano_principal", "adaptacoes"],
-            "properties": {
-                "treinamento_id": {"type": "string"},
-                "versao": {"type": "string"},
-                "data_criacao": {"type": "string"},
-                "usuario": {"type": "object"},
-                "plano_principal": {"type": "object"},
-                "adaptacoes": {"type": "object"}
-            }
-        }
-        
-        try:
-            with open(schema_path, 'r', encoding='utf-8') as file:
-                schema = json.load(file)
-                self.logger.debug(f"Schema carregado com sucesso: {len(json.dumps(schema))} caracteres")
-                return schema
-        except FileNotFoundError:
-            self.logger.warning(f"Arquivo schema {schema_path} não encontrado, usando schema básico")
-            return schema_basico
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Erro ao decodificar JSON do schema: {str(e)}")
-            return schema_basico
-        except Exception as e:
-            self.logger.error(f"Erro ao carregar schema: {str(e)}")
-            return schema_basico
+        """Obtém o schema JSON para validação do registro de recursos."""
+        return self.assets.obter_json("schema_wrapper2", fallback=SCHEMA_BASICO)
     
     @WrapperLogger.log_function()
-    def processar_plano(self, plano_principal: Dict[str, Any]) -> Dict[str, Any]:
+    def processar_plano(self, plano_principal: Dict[str, Any],
+                        adaptacoes_previas: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Processa o plano principal e cria adaptações.
         
         Args:
             plano_principal (Dict): Plano principal do treinador
+            adaptacoes_previas (Dict, optional): Adaptações já calculadas semana a semana
+                durante o streaming; quando informadas, não são recalculadas
             
         Returns:
             Dict: Plano completo com adaptações
@@ -178,7 +113,11 @@ class SistemaAdaptacao:
         # Criar adaptações
         self.logger.info("Iniciando criação de adaptações")
         try:
-            plano_adaptado["adaptacoes"] = self._criar_adaptacoes(plano_principal)
+            if adaptacoes_previas is not None:
+                self.logger.info("Reutilizando adaptações calculadas durante o streaming")
+                plano_adaptado["adaptacoes"] = adaptacoes_previas
+            else:
+                plano_adaptado["adaptacoes"] = self._criar_adaptacoes(plano_principal)
             self.logger.info("Adaptações criadas com sucesso")
             self._log_resumo_adaptacoes(plano_adaptado["adaptacoes"])
         except Exception as e:
@@ -198,6 +137,81 @@ class SistemaAdaptacao:
         
         return plano_validado
     
+    def adaptar_microciclo(self, microciclo: Dict[str, Any], ciclo_id: str = "") -> Dict[str, Any]:
+        """
+        Cria as adaptações de uma única semana do plano.
+        
+        Args:
+            microciclo (Dict): Microciclo completo
+            ciclo_id (str): ID do ciclo ao qual o microciclo pertence
+            
+        Returns:
+            Dict: Adaptações da semana, no mesmo formato de _criar_adaptacoes
+        """
+        plano_parcial = {"plano_principal": {"ciclos": [{"ciclo_id": ciclo_id, "microciclos": [microciclo]}]}}
+        return self._criar_adaptacoes(plano_parcial)
+    
+    def processar_plano_stream(self, eventos: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Processa os eventos de TreinadorEspecialista.criar_plano_treinamento_stream,
+        adaptando cada semana enquanto as seguintes ainda estão sendo geradas.
+        
+        Args:
+            eventos (Iterable): Eventos de geração do plano
+            
+        Returns:
+            Dict: Plano completo com adaptações
+        """
+        adaptacoes = self._adaptacoes_vazias()
+        plano = None
+        semanas = 0
+        
+        for evento in eventos:
+            tipo = evento.get("tipo")
+            if tipo == "microciclo":
+                self._mesclar_adaptacoes(adaptacoes, self.adaptar_microciclo(evento["dados"]))
+                semanas += 1
+                self.logger.debug(f"Semana {semanas} adaptada durante o streaming")
+            elif tipo == "reinicio":
+                self.logger.warning("Stream reiniciado, descartando adaptações parciais")
+                adaptacoes = self._adaptacoes_vazias()
+                semanas = 0
+            elif tipo == "plano":
+                plano = evento["dados"]
+        
+        if plano is None:
+            raise ValueError("Stream encerrado sem o plano completo")
+        
+        # A validação do treinador pode ter corrigido o plano depois do streaming
+        microciclos = [
+            microciclo
+            for ciclo in plano.get("plano_principal", {}).get("ciclos", [])
+            for microciclo in ciclo.get("microciclos", [])
+        ]
+        sessoes_finais = {sessao.get("sessao_id", "") for m in microciclos for sessao in m.get("sessoes", [])}
+        sessoes_adaptadas = {
+            adaptacao.get("sessao_original_id", "")
+            for niveis in adaptacoes.values() for lista in niveis.values() for adaptacao in lista
+        }
+        if semanas != len(microciclos) or not sessoes_adaptadas <= sessoes_finais:
+            self.logger.warning(f"{semanas} semanas adaptadas no streaming não correspondem ao plano final; recalculando")
+            return self.processar_plano(plano)
+        
+        return self.processar_plano(plano, adaptacoes_previas=adaptacoes)
+    
+    def _adaptacoes_vazias(self) -> Dict[str, Any]:
+        """Estrutura de adaptações sem nenhuma sessão."""
+        return {
+            "humor": {nivel: [] for nivel in self.niveis_humor},
+            "tempo_disponivel": {tempo: [] for tempo in self.tempos_disponiveis}
+        }
+    
+    def _mesclar_adaptacoes(self, destino: Dict[str, Any], origem: Dict[str, Any]) -> None:
+        """Acrescenta as adaptações de origem às listas de destino."""
+        for categoria, niveis in origem.items():
+            for nivel, lista in niveis.items():
+                destino.setdefault(categoria, {}).setdefault(nivel, []).extend(lista)
+    
     def _log_info_basica_plano(self, plano: Dict[str, Any]) -> None:
         """Registra informações básicas do plano para depuração"""
         try:
@@ -818,26 +832,31 @@ class SistemaAdaptacao:
             Dict: Plano validado
         """
         self.logger.info("Validando plano adaptado contra o schema")
-        try:
-            jsonschema.validate(instance=plano, schema=self.schema)
+        erros, correcoes, restantes = validar_e_reparar(plano, self.schema)
+        if not erros:
             self.logger.info("Plano adaptado validado com sucesso")
             return plano
-        except jsonschema.exceptions.ValidationError as e:
-            self.logger.error(f"Erro de validação: {e}")
-            self.logger.warning("Tentando corrigir o plano para validação")
-            
-            # Tentar corrigir o plano para corresponder ao schema
-            plano_corrigido = self._corrigir_plano_para_validacao(plano, str(e))
-            
-            try:
-                jsonschema.validate(instance=plano_corrigido, schema=self.schema)
-                self.logger.info("Plano corrigido validado com sucesso")
-                return plano_corrigido
-            except jsonschema.exceptions.ValidationError as e2:
-                self.logger.error(f"Falha na correção do plano: {e2}")
-                self.logger.warning("Retornando plano não validado (pode causar problemas)")
-                # Em um ambiente de produção, implementaríamos correções ou logging adequado
-                return plano  # Retorna sem validação em caso de erro
+        
+        for erro in erros:
+            self.logger.error(f"Erro de validação em {formatar_caminho(erro.absolute_path)}: {erro.message}")
+        if correcoes:
+            self.logger.info(f"Correções aplicadas: {'; '.join(correcoes)}")
+        if not restantes:
+            self.logger.info("Plano corrigido validado com sucesso")
+            return plano
+        
+        # Correções específicas das adaptações para os erros restantes
+        self.logger.warning("Tentando corrigir o plano para validação")
+        plano_corrigido = self._corrigir_plano_para_validacao(plano, "; ".join(e.message for e in restantes))
+        restantes = obter_validador(self.schema).erros(plano_corrigido)
+        if not restantes:
+            self.logger.info("Plano corrigido validado com sucesso")
+            return plano_corrigido
+        
+        self.logger.error(f"Falha na correção do plano: {restantes[0].message}")
+        self.logger.warning("Retornando plano não validado (pode causar problemas)")
+        # Em um ambiente de produção, implementaríamos correções ou logging adequado
+        return plano  # Retorna sem validação em caso de erro
     
     def _corrigir_plano_para_validacao(self, plano: Dict[str, Any], erro_msg: str) -> Dict[str, Any]:
         """
@@ -1,30 +1,196 @@
 # Wrapper 1: Treinador Especialista #
 
+import copy
 import json
+import hashlib
 import requests
 import uuid
 import datetime
-import jsonschema
-from typing import Dict, Any, Optional
-import os
+from typing import Dict, Any, Generator, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import time
 import traceback
 import logging
 
-# Importar o WrapperLogger e PathResolver
+# Importar o WrapperLogger
 from backend.utils.logger import WrapperLogger
-from backend.utils.path_resolver import (
-    get_prompt_path, get_schema_path, get_template_path,
-    load_file_with_fallback
+from backend.utils.config import get_claude_config, get_generation_config, get_concurrency_config, get_rate_limit_config
+from backend.utils.asset_registry import get_asset_registry, descongelar
+from backend.utils.plan_cache import get_plan_cache, gerar_chave_plano, reidentificar_plano
+from backend.utils.plan_similarity import get_indice_perfis
+from backend.utils.plan_expansion import PlanoCompactoInvalidoError, expandir_plano_compacto
+from backend.utils.plan_regeneration import (
+    interpretar_caminho, obter_trecho, preparar_trecho, resumir_contexto, substituir_trecho
 )
+from backend.utils.http_transport import HttpTransport, StreamStatusError, get_http_transport
+from backend.utils.json_stream import IncrementalJSONParser
+from backend.utils.stream_guard import GuardaEstrutural, SaidaIrrecuperavelError
+from backend.utils.json_extractor import (
+    extrair_json, json_truncado, texto_da_resposta, JSONTruncadoError, JSONNaoEncontradoError
+)
+from backend.utils.schema_validation import validar_e_reparar, formatar_caminho, subschema_do_caminho, trecho_do_erro
+from backend.utils.prompt_compaction import MARCADOR_DADOS_USUARIO, compactar_prompt
+from backend.utils.llm_metrics import (
+    get_llm_metrics, RegistroChamada, RESULTADO_SUCESSO, RESULTADO_ERRO_API, RESULTADO_ERRO_CONEXAO, RESULTADO_ERRO_JSON,
+    RESULTADO_CIRCUITO_ABERTO, RESULTADO_FILA_ESGOTADA, RESULTADO_TAXA_ESGOTADA, RESULTADO_SAIDA_ABORTADA
+)
+from backend.utils.concurrency_limiter import FilaEsgotadaError, STATUS_SOBRECARGA, get_limitador_claude
+from backend.utils.rate_limiter import (
+    LimiteTaxaEsgotadoError, Reserva, estimar_tokens_requisicao, get_limitador_taxa_claude, tokens_consumidos
+)
+from backend.utils.single_flight import get_grupo_planos
+from backend.utils.local_plan_engine import ORIGEM_REGRAS_LOCAIS, gerar_plano_local
+from backend.utils.model_routing import Rota, get_roteador_modelos
+from backend.utils.retry_policy import (
+    CircuitoAbertoError, DISJUNTOR_ABERTO, STATUS_RETENTAVEIS, criar_politica_retentativa, get_disjuntor_claude,
+    ler_retry_after
+)
+
+# Conteúdo usado quando os arquivos de prompt, template ou schema não são encontrados
+PROMPT_PADRAO = """
+# PROMPT DO TREINADOR ESPECIALISTA (TEMPLATE PADRÃO)
+
+Você é um treinador fitness especialista com anos de experiência na criação de planos de treinamento personalizados.
+
+Por favor, analise os dados do usuário fornecidos e crie um plano de treinamento detalhado que atenda às suas necessidades específicas. Considere o nível de experiência, objetivos, restrições e lesões.
+
+Crie um plano de treinamento estruturado que inclua:
+- Periodização adequada
+- Ciclos de treinamento
+- Exercícios específicos
+- Séries, repetições e intensidade
+- Progressão ao longo do tempo
+
+Forneça o plano no formato JSON solicitado.
+"""
+
+TEMPLATE_SIMPLIFICADO = """
+{
+  "treinamento_id": "",
+  "versao": "",
+  "data_criacao": "",
+  "usuario": {
+    "id": "",
+    "nome": "",
+    "nivel": "",
+    "objetivos": [
+      {
+        "objetivo_id": "",
+        "nome": "",
+        "prioridade": 1
+      }
+    ],
+    "restricoes": []
+  },
+  "plano_principal": {
+    "nome": "",
+    "descricao": "",
+    "periodizacao": {
+      "tipo": "",
+      "descricao": ""
+    },
+    "duracao_semanas": 12,
+    "frequencia_semanal": 3,
+    "ciclos": [
+      {
+        "ciclo_id": "",
+        "nome": "",
+        "ordem": 1,
+        "duracao_semanas": 4,
+        "objetivo": "",
+        "microciclos": [
+          {
+            "semana": 1,
+            "volume": "",
+            "intensidade": "",
+            "foco": "",
+            "sessoes": [
+              {
+                "sessao_id": "",
+                "nome": "",
+                "tipo": "",
+                "duracao_minutos": 60,
+                "nivel_intensidade": 7,
+                "dia_semana": 1,
+                "grupos_musculares": [],
+                "exercicios": [
+                  {
+                    "exercicio_id": "",
+                    "nome": "",
+                    "ordem": 1,
+                    "equipamento": "",
+                    "series": 3,
+                    "repeticoes": "10-12",
+                    "percentual_rm": 70,
+                    "tempo_descanso": 60,
+                    "cadencia": "",
+                    "metodo": "",
+                    "progressao": [],
+                    "observacoes": ""
+                  }
+                ]
+              }
+            ]
+          }
+        ]
+      }
+    ]
+  }
+}
+"""
+
+SCHEMA_BASICO = {
+    "type": "object",
+    "required": ["treinamento_id", "versao", "data_criacao", "usuario", "plano_principal"],
+    "properties": {
+        "treinamento_id": {"type": "string"},
+        "versao": {"type": "string"},
+        "data_criacao": {"type": "string"},
+        "usuario": {
+            "type": "object",
+            "required": ["id", "nome", "nivel", "objetivos", "restricoes"],
+            "properties": {
+                "id": {"type": "string"},
+                "nome": {"type": "string"},
+                "nivel": {"type": "string"},
+                "objetivos": {"type": "array"},
+                "restricoes": {"type": "array"}
+            }
+        },
+        "plano_principal": {"type": "object"}
+    }
+}
+
+# Ferramenta usada no modo de saída estruturada; o plano chega como entrada da chamada
+NOME_FERRAMENTA_PLANO = "registrar_plano_treinamento"
+
+# Campos preenchidos localmente em _finalizar_plano, fora do schema enviado ao modelo
+CAMPOS_METADADOS = ("treinamento_id", "versao", "data_criacao")
+
+# Tipo da resposta de _fazer_requisicao_claude quando a API não produziu um plano
+RESPOSTA_INDISPONIVEL = "indisponivel"
+
+# Origem registrada nos planos montados com a estrutura básica porque a resposta não trouxe um plano
+ORIGEM_ESTRUTURA_BASICA = "estrutura_basica"
 
 class TreinadorEspecialista:
-    def __init__(self, api_key: str, api_url: str = "https://api.anthropic.com/v1/messages"):
+    def __init__(self, api_key: str, api_url: str = "https://api.anthropic.com/v1/messages", usar_cache: bool = True,
+                 transport: Optional[HttpTransport] = None, modo_geracao: Optional[str] = None,
+                 saida_estruturada: Optional[bool] = None):
         """
         Inicializa o wrapper do Treinador Especialista.
         
         Args:
             api_key (str): Chave de API para o serviço Claude
             api_url (str): URL da API Claude
+            usar_cache (bool): Se True, reutiliza planos já gerados para questionários idênticos
+            transport (HttpTransport, optional): Transporte HTTP; por padrão usa o do processo (pool compartilhado,
+                ou cassetes gravadas/reproduzidas conforme CLAUDE_TRANSPORT_MODE)
+            modo_geracao (str, optional): "completo" (requisição única), "fanout" (macroestrutura
+                e blocos de semanas em paralelo) ou "compacto" (semana-modelo por ciclo e ajustes
+                semanais, expandidos localmente); por padrão usa PLAN_GENERATION_MODE
+            saida_estruturada (bool, optional): Se True, pede o plano como chamada de ferramenta com o
+                schema do plano em vez de um bloco JSON; por padrão usa PLAN_STRUCTURED_OUTPUT
         """
         # Configurar logger
         self.logger = WrapperLogger("Wrapper1_Treinador")
@@ -32,124 +198,112 @@ class TreinadorEspecialista:
         
         self.api_key = api_key
         self.api_url = api_url
+        self.transport = transport or get_http_transport()
+        self.metricas = get_llm_metrics()
+        self.politica_retentativa = criar_politica_retentativa()
+        self.disjuntor = get_disjuntor_claude()
+        self.limitador = get_limitador_claude()
+        self.fila_timeout_s = get_concurrency_config()["fila_timeout_s"]
+        self.limitador_taxa = get_limitador_taxa_claude()
+        self.espera_taxa_max_s = get_rate_limit_config()["espera_max_s"]
+        self.modelo = get_claude_config()["model"]
+        # Modelo de cada geração pela complexidade do perfil (None: sempre self.modelo)
+        self.roteador = get_roteador_modelos()
+        self.versao_plano = "1.0"
+        self.config_geracao = get_generation_config()
+        self.modo_geracao = (modo_geracao or self.config_geracao["modo"]).lower()
+        self.saida_estruturada = self.config_geracao["saida_estruturada"] if saida_estruturada is None else saida_estruturada
+        
+        # Prompts, templates e schemas compartilhados pelo processo
+        self.assets = get_asset_registry()
+        
+        self.prompt_template = self._carregar_prompt("prompt_treinador")
         
-        try:
-            # Tentar diferentes caminhos possíveis
-            prompt_paths = [
-                "/prompt/PROMPT DO TREINADOR ESPECIALISTA.txt",
-                "prompt/PROMPT DO TREINADOR ESPECIALISTA.txt",
-                "../prompt/PROMPT DO TREINADOR ESPECIALISTA.txt",
-                "PROMPT DO TREINADOR ESPECIALISTA.txt"
-            ]
-            
-            success = False
-            for path in prompt_paths:
-                try:
-                    self.prompt_template = self._carregar_prompt(path)
-                    self.logger.info(f"Prompt do treinador carregado com sucesso do caminho: {path}")
-                    success = True
-                    break
-                except FileNotFoundError:
-                    self.logger.debug(f"Prompt não encontrado no caminho: {path}")
-            
-            if not success:
-                self.logger.warning("Não foi possível carregar o prompt de nenhum caminho, usando template padrão")
-                self.prompt_template = """
-                # PROMPT DO TREINADOR ESPECIALISTA (TEMPLATE PADRÃO)
-                
-                Você é um treinador fitness especialista com anos de experiência na criação de planos de treinamento personalizados.
-                
-                Por favor, analise os dados do usuário fornecidos e crie um plano de treinamento detalhado que atenda às suas necessidades específicas. Considere o nível de experiência, objetivos, restrições e lesões.
-                
-                Crie um plano de treinamento estruturado que inclua:
-                - Periodização adequada
-                - Ciclos de treinamento
-                - Exercícios específicos
-                - Séries, repetições e intensidade
-                - Progressão ao longo do tempo
-                
-                Forneça o plano no formato JSON solicitado.
-                """
-                self.logger.info("Template padrão configurado com sucesso")
-        except Exception as e:
-            self.logger.error(f"Erro ao carregar prompt do treinador: {str(e)}")
-            self.logger.error(traceback.format_exc())
-            
         try:
             self.schema = self._carregar_schema_json()
             self.logger.info("Schema JSON carregado com sucesso")
         except Exception as e:
             self.logger.error(f"Erro ao carregar schema JSON: {str(e)}")
             raise
+        self.ferramenta_plano = self._definir_ferramenta_plano(self.schema)
+        
+        # Cache de planos compartilhado pelo processo
+        self.plan_cache = get_plan_cache() if usar_cache else None
+        self.versao_prompt = self._calcular_versao_prompt()
+        self.logger.debug(f"Versão do prompt: {self.versao_prompt}, cache {'ativo' if self.plan_cache else 'inativo'}")
+        # Perfis dos planos em cache, para reaproveitar o plano de um usuário semelhante
+        self.indice_perfis = get_indice_perfis(self.plan_cache)
+        
+        # Gerações idênticas simultâneas (duplo envio, retentativas do frontend) viram uma só
+        self.grupo_planos = get_grupo_planos() if self.config_geracao["coalescer_planos"] else None
     
-    @WrapperLogger.log_function(logging.INFO)
-    def _carregar_prompt(self, arquivo_prompt: str) -> str:
-        """Carrega o prompt do treinador especialista de um arquivo."""
-        self.logger.info(f"Tentando carregar prompt do arquivo: {arquivo_prompt}")
-        
-        # Resolver caminho do arquivo de prompt
-        prompt_path = get_prompt_path(arquivo_prompt)
-        self.logger.debug(f"Caminho resolvido para o prompt: {prompt_path}")
-        
-        # Carregar arquivo com fallback
-        success, content = load_file_with_fallback(
-            prompt_path,
-            fallback_content=f"TEMPLATE BÁSICO DO PROMPT (fallback para '{arquivo_prompt}')\n\nPor favor, forneça detalhes para criar um plano de treinamento personalizado."
-        )
+    def _calcular_versao_prompt(self) -> str:
+        """
+        Calcula um identificador da versão do prompt, template e modelo em uso.
         
-        if success:
-            self.logger.info(f"Prompt carregado com sucesso, {len(content)} caracteres")
-        else:
-            self.logger.warning(f"Usando conteúdo de fallback para o prompt {arquivo_prompt}")
-            
-        return content
+        Returns:
+            str: Hash curto que compõe a chave do cache de planos
+        """
+        conteudo = "\n".join([
+            self._preparar_prefixo(),
+            self.modelo,
+            f"rotas={self.roteador.modelo_simples}/{self.roteador.modelo_complexo}/{self.roteador.limiar}"
+            if self.roteador else "",
+            self.versao_plano,
+            f"compactado={bool(self.config_geracao['compactar_prompt'])}"
+        ])
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:16]
+    
+    def estatisticas_cache(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores de hit/miss do cache de planos.
+        
+        Returns:
+            Dict: Estatísticas do cache ou indicação de cache desabilitado
+        """
+        if not self.plan_cache:
+            return {"enabled": False}
+        estatisticas = {"enabled": True, **self.plan_cache.estatisticas()}
+        if self.indice_perfis is not None:
+            estatisticas["vizinhos"] = self.indice_perfis.estatisticas()
+        return estatisticas
+    
+    def _carregar_prompt(self, nome_recurso: str) -> str:
+        """Obtém o prompt do treinador especialista do registro de recursos."""
+        return self.assets.obter_texto(nome_recurso, fallback=PROMPT_PADRAO)
     
     @WrapperLogger.log_function(logging.INFO)
     def _carregar_schema_json(self) -> Dict:
-        """Carrega o schema JSON para validação."""
-        self.logger.info("Tentando carregar schema_wrapper1.json")
+        """Obtém o schema JSON para validação do registro de recursos."""
+        return self.assets.obter_json("schema_wrapper1", fallback=SCHEMA_BASICO)
+    
+    def _definir_ferramenta_plano(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Monta a definição da ferramenta de saída estruturada a partir do schema do plano.
         
-        # Resolver caminho do arquivo de schema
-        schema_path = get_schema_path("schema_wrapper1.json")
-        self.logger.debug(f"Caminho resolvido para o schema: {schema_path}")
+        Os metadados gerados localmente (IDs, versão, data e usuario.id) são removidos
+        do schema para que o modelo não gaste tokens com eles.
         
-        # Schema básico como fallback
-        schema_basico = {
-            "type": "object",
-            "required": ["treinamento_id", "versao", "data_criacao", "usuario", "plano_principal"],
-            "properties": {
-                "treinamento_id": {"type": "string"},
-                "versao": {"type": "string"},
-                "data_criacao": {"type": "string"},
-                "usuario": {
-                    "type": "object",
-                    "required": ["id", "nome", "nivel", "objetivos", "restricoes"],
-                    "properties": {
-                        "id": {"type": "string"},
-                        "nome": {"type": "string"},
-                        "nivel": {"type": "string"},
-                        "objetivos": {"type": "array"},
-                        "restricoes": {"type": "array"}
-                    }
-                },
-                "plano_principal": {"type": "object"}
-            }
+        Args:
+            schema (Dict): Schema JSON do plano
+            
+        Returns:
+            Dict: Ferramenta no formato da API Messages
+        """
+        entrada = descongelar(schema)
+        entrada.pop("$schema", None)
+        for campo in CAMPOS_METADADOS:
+            entrada.get("properties", {}).pop(campo, None)
+        entrada["required"] = [campo for campo in entrada.get("required", []) if campo not in CAMPOS_METADADOS]
+        usuario = entrada.get("properties", {}).get("usuario", {})
+        usuario.get("properties", {}).pop("id", None)
+        if "required" in usuario:
+            usuario["required"] = [campo for campo in usuario["required"] if campo != "id"]
+        return {
+            "name": NOME_FERRAMENTA_PLANO,
+            "description": "Registra o plano de treinamento de 12 semanas completo do usuário.",
+            "input_schema": entrada
         }
-        
-        try:
-            with open(schema_path, 'r', encoding='utf-8') as file:
-                schema = json.load(file)
-                self.logger.debug(f"Schema carregado com sucesso: {len(schema.keys() if isinstance(schema, dict) else schema)} elementos")
-                return schema
-        except FileNotFoundError:
-            self.logger.warning(f"Arquivo schema {schema_path} não encontrado, usando schema básico")
-            return schema_basico
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Erro ao decodificar JSON do schema: {str(e)}")
-            return schema_basico
-        except Exception as e:
-            self.logger.error(f"Erro ao carregar schema: {str(e)}")
-            return schema_basico
     
     @WrapperLogger.log_function(logging.INFO)
     def criar_plano_treinamento(self, dados_usuario: Dict[str, Any]) -> Dict[str, Any]:
@@ -164,30 +318,1040 @@ class TreinadorEspecialista:
         """
         self.logger.info(f"Iniciando criação de plano para usuário: {dados_usuario.get('nome', 'Não especificado')}")
         
-        # Gerar ID de treinamento e versão
-        treinamento_id = str(uuid.uuid4())
-        versao = "1.0"
-        data_criacao = datetime.datetime.now().isoformat()
-        self.logger.debug(f"Gerado treinamento_id: {treinamento_id}, versão: {versao}")
+        # Consultar o cache de planos antes de chamar o Claude
+        chave_cache, plano_em_cache = self._consultar_cache(dados_usuario)
+        if plano_em_cache is not None:
+            return plano_em_cache
+        
+        if self.grupo_planos is None:
+            return self._gerar_plano(dados_usuario, chave_cache)
+        
+        def gerar() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+            plano = self._gerar_plano(dados_usuario, chave_cache)
+            # Cópia intacta para as chamadas agrupadas, já que o chamador pode alterar o plano retornado
+            return plano, copy.deepcopy(plano)
+        
+        chave = chave_cache or gerar_chave_plano(dados_usuario, self.versao_prompt)
+        (plano, modelo), compartilhado = self.grupo_planos.executar(chave, gerar)
+        if not compartilhado:
+            return plano
+        self.logger.info("Plano recebido de uma geração idêntica em andamento, reidentificando")
+        if self.metricas is not None:
+            self.metricas.incrementar("planos_coalescidos")
+        return reidentificar_plano(modelo, dados_usuario)
+    
+    @WrapperLogger.log_function(logging.INFO)
+    def regenerar_trecho(self, plano: Dict[str, Any], caminho: str, dados_usuario: Dict[str, Any],
+                         instrucoes: str = "") -> Dict[str, Any]:
+        """
+        Regenera um único ciclo ou semana de um plano existente, mantendo o restante.
+        
+        Só o trecho atual, a macroestrutura e as semanas vizinhas resumidas são enviados
+        ao Claude; o trecho gerado é encaixado no lugar do original (mesmo ID, ordem e
+        numeração das semanas) e o plano resultante é validado. As partes não alteradas
+        são reaproveitadas sem cópia e o plano original não é modificado.
+        
+        Args:
+            plano (Dict): Plano de treinamento validado
+            caminho (str): "plano_principal.ciclos[i]" ou "plano_principal.ciclos[i].microciclos[j]"
+            dados_usuario (Dict): Dados do usuário
+            instrucoes (str): Alterações pedidas pelo treinador ou usuário
+            
+        Returns:
+            Dict: Novo plano com o trecho regenerado
+            
+        Raises:
+            ValueError: Caminho inválido, Claude indisponível ou trecho regenerado inválido
+        """
+        alvo = interpretar_caminho(caminho)
+        original = obter_trecho(plano, alvo)
+        motivo = self._motivo_modo_degradado()
+        if motivo:
+            raise ValueError(f"Não é possível regenerar {alvo}: Claude indisponível ({motivo})")
+        
+        inicio = time.perf_counter()
+        dados_str, dias_str, _ = self._descrever_usuario(dados_usuario)
+        prompt = self._preparar_prompt_regeneracao(dados_str, dias_str, resumir_contexto(plano, alvo),
+                                                   original, alvo.tipo, instrucoes)
+        resposta = self._requisitar_plano(prompt, self.config_geracao["regeneracao_max_tokens"], operacao="regeneracao")
+        objeto = self._extrair_json_parcial(resposta)
+        if objeto is None:
+            raise ValueError(f"Resposta inválida na regeneração de {alvo}")
+        novo = objeto.get(alvo.tipo, objeto)
+        if not isinstance(novo, dict):
+            raise ValueError(f"Resposta sem o {alvo.tipo} regenerado")
+        
+        novo_plano = substituir_trecho(plano, alvo, preparar_trecho(novo, original, alvo))
+        novo_plano = self._validar_plano(novo_plano)
+        self.logger.info(f"Trecho {alvo} regenerado em {time.perf_counter() - inicio:.2f} segundos "
+                         f"({resposta.get('usage', {}).get('output_tokens', 0)} tokens de saída)")
+        return novo_plano
+    
+    def _preparar_prompt_regeneracao(self, dados_str: str, dias_str: str, contexto: Dict[str, Any],
+                                     original: Dict[str, Any], tipo: str, instrucoes: str) -> str:
+        """
+        Prepara o prompt de regeneração de um ciclo ou semana.
+        
+        Args:
+            dados_str (str): Dados do usuário formatados
+            dias_str (str): Dias disponíveis formatados
+            contexto (Dict): Macroestrutura e semanas vizinhas (ver resumir_contexto)
+            original (Dict): Trecho atual
+            tipo (str): "ciclo" ou "microciclo"
+            instrucoes (str): Alterações pedidas
+            
+        Returns:
+            str: Prompt formatado
+        """
+        microciclo = self._obter_template_microciclo()
+        if tipo == "ciclo":
+            descricao = f"o ciclo de ordem {original.get('ordem', '')} ({len(original.get('microciclos') or [])} semanas)"
+            formato = f'{{"ciclo": {{"nome": "", "objetivo": "", "microciclos": [{microciclo}]}}}}'
+        else:
+            descricao = f"a semana {original.get('semana', '')}"
+            formato = f'{{"microciclo": {microciclo}}}'
+        prompt = f"""{self.prompt_template}
+        
+        {dados_str}
+        
+        Plano atual (macroestrutura e semanas vizinhas):
+        {json.dumps(contexto, ensure_ascii=False, separators=(",", ":"))}
+        
+        REGENERE SOMENTE {descricao}, mantendo a mesma quantidade de semanas e a continuidade da
+        progressão com as semanas vizinhas. Organize as sessões nos dias: {dias_str}.
+        Alterações pedidas: {instrucoes or "nenhuma específica; revise o trecho mantendo o objetivo do ciclo"}
+        
+        Trecho atual:
+        {json.dumps(original, ensure_ascii=False, separators=(",", ":"))}
+        
+        Retorne apenas o JSON válido no formato abaixo:
+        
+        ```json
+        {formato}
+        ```
+        """
+        return self._compactar_prompt(prompt)
+    
+    def preparar_requisicao_lote(self, dados_usuario: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]],
+                                                                            Optional[Dict[str, Any]]]:
+        """
+        Prepara a geração do plano por um canal de lotes.
+        
+        Planos do cache (ou de um perfil semelhante) e, no modo degradado, os das regras
+        locais são devolvidos prontos; para os demais, retorna o corpo da requisição única
+        à API Messages, com o modelo da rota do perfil, a enviar no lote.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            
+        Returns:
+            Tuple: (plano pronto ou None, corpo da requisição ou None)
+        """
+        chave_cache, plano_em_cache = self._consultar_cache(dados_usuario)
+        if plano_em_cache is not None:
+            return plano_em_cache, None
+        motivo = self._motivo_modo_degradado()
+        if motivo:
+            resposta_local = self._resposta_indisponivel(motivo, "Modo degradado")
+            return self._finalizar_plano(dados_usuario, resposta_local, chave_cache), None
+        
+        sistema, prompt_completo = self._prompt_para_envio(dados_usuario)
+        modelo = self.roteador.rotear(dados_usuario).modelo if self.roteador is not None else None
+        return None, self._montar_requisicao(prompt_completo, self._orcamento_tokens(dados_usuario),
+                                             sistema=sistema, modelo=modelo)[2]
+    
+    def executar_requisicao_lote(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Envia uma requisição preparada para lote diretamente à API Messages (canal local de lotes).
+        
+        Args:
+            parametros (Dict): Corpo retornado por preparar_requisicao_lote
+            
+        Returns:
+            Dict: Resposta da API ou resposta do tipo RESPOSTA_INDISPONIVEL
+        """
+        api_url, headers = self._destino_requisicao()
+        return self._enviar_requisicao(api_url, headers, parametros, "lote")
+    
+    def finalizar_resposta_lote(self, dados_usuario: Dict[str, Any], parametros: Dict[str, Any],
+                                resposta: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Conclui o plano a partir da resposta de uma requisição do lote.
+        
+        A resposta truncada é continuada por requisições individuais, com o mesmo modelo;
+        depois o plano é extraído, validado e armazenado no cache como em criar_plano_treinamento.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            parametros (Dict): Corpo enviado no lote
+            resposta (Dict): Mensagem retornada pelo lote
+            
+        Returns:
+            Dict: Plano de treinamento validado
+        """
+        prompt = parametros["messages"][0]["content"]
+        sistema = (parametros.get("system") or [{}])[0].get("text")
+        chave_cache = gerar_chave_plano(dados_usuario, self.versao_prompt) if self.plan_cache else None
+        modelo = parametros.get("model")
+        resposta = self._completar_resposta_truncada(prompt, resposta, sistema, modelo=modelo)
+        return self._finalizar_plano(dados_usuario, resposta, chave_cache, modelo=modelo)
+    
+    def _gerar_plano(self, dados_usuario: Dict[str, Any], chave_cache: Optional[str]) -> Dict[str, Any]:
+        """
+        Gera o plano no modelo da rota do perfil, escalonando para o modelo mais capaz
+        quando o plano da rota simples não passa na validação.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            chave_cache (str, optional): Chave do cache de planos
+            
+        Returns:
+            Dict: Plano de treinamento validado
+        """
+        motivo = self._motivo_modo_degradado()
+        if motivo:
+            return self._finalizar_plano(dados_usuario, self._resposta_indisponivel(motivo, "Modo degradado"), chave_cache)
+        if self.roteador is None:
+            return self._gerar_plano_no_modelo(dados_usuario, chave_cache)
+        
+        rota = self.roteador.rotear(dados_usuario)
+        self.logger.info(f"Rota {rota.nome} (pontuação {rota.pontuacao}"
+                         f"{': ' + ', '.join(rota.motivos) if rota.motivos else ''}), modelo {rota.modelo}")
+        try:
+            plano, valido = self._gerar_plano_na_rota(rota, dados_usuario, chave_cache)
+        except ValueError as e:
+            escalonada = self.roteador.rota_escalonada(rota)
+            if escalonada is None:
+                raise
+            self.logger.warning(f"Plano inválido no modelo {rota.modelo} ({str(e)}), gerando de novo com {escalonada.modelo}")
+            return self._gerar_plano_na_rota(escalonada, dados_usuario, chave_cache)[0]
+        
+        escalonada = None if valido else self.roteador.rota_escalonada(rota)
+        if escalonada is None:
+            return plano
+        self.logger.warning(f"Resposta do modelo {rota.modelo} sem plano aproveitável, gerando de novo com {escalonada.modelo}")
+        return self._gerar_plano_na_rota(escalonada, dados_usuario, chave_cache)[0]
+    
+    def _gerar_plano_na_rota(self, rota: Rota, dados_usuario: Dict[str, Any],
+                             chave_cache: Optional[str]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Gera o plano com o modelo da rota e registra a latência e o resultado na rota.
+        
+        Planos gerados pelas regras locais por indisponibilidade da API não entram nas
+        estatísticas; os gerados porque a guarda estrutural cancelou a saída contam como inválidos.
+        
+        Returns:
+            Tuple[Dict, bool]: Plano e se ele veio do modelo (False quando a extração usou a
+                               estrutura de fallback ou a saída foi cancelada)
+            
+        Raises:
+            ValueError: Plano que não passou na validação, registrado como inválido na rota
+        """
+        inicio = time.perf_counter()
+        try:
+            plano = self._gerar_plano_no_modelo(dados_usuario, chave_cache, modelo=rota.modelo)
+        except ValueError:
+            self.roteador.registrar(rota, time.perf_counter() - inicio, valido=False)
+            raise
+        return plano, self._registrar_plano_na_rota(rota, plano, inicio)
+    
+    def _registrar_plano_na_rota(self, rota: Rota, plano: Dict[str, Any], inicio: float) -> bool:
+        """
+        Registra a latência e o resultado do plano gerado na rota.
+        
+        Args:
+            rota (Rota): Rota usada na geração
+            plano (Dict): Plano validado
+            inicio (float): time.perf_counter() no início da geração
+            
+        Returns:
+            bool: Se o plano veio do modelo (False para a estrutura básica e a saída cancelada)
+        """
+        geracao = plano.get("geracao") or {}
+        if geracao.get("origem") == ORIGEM_REGRAS_LOCAIS and geracao.get("motivo") != RESULTADO_SAIDA_ABORTADA:
+            return True
+        # Saída cancelada pela guarda estrutural conta como plano inválido da rota
+        valido = geracao.get("origem") not in (ORIGEM_ESTRUTURA_BASICA, ORIGEM_REGRAS_LOCAIS)
+        self.roteador.registrar(rota, time.perf_counter() - inicio, valido=valido)
+        return valido
+    
+    def _gerar_plano_no_modelo(self, dados_usuario: Dict[str, Any], chave_cache: Optional[str],
+                               modelo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Gera o plano pelo modo configurado (fan-out, compacto, saída estruturada ou
+        requisição única).
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            chave_cache (str, optional): Chave do cache de planos
+            modelo (str, optional): Modelo de todas as requisições da geração; por padrão self.modelo
+            
+        Returns:
+            Dict: Plano de treinamento validado
+        """
+        if self.modo_geracao == "fanout":
+            resposta_json = self._gerar_plano_fanout(dados_usuario, modelo)
+            if resposta_json is not None:
+                return self._finalizar_plano(dados_usuario, resposta_json, chave_cache, modelo=modelo)
+            self.logger.warning("Geração em paralelo falhou, usando requisição única")
+        
+        if self.modo_geracao == "compacto":
+            resposta_json = self._gerar_plano_compacto(dados_usuario, modelo)
+            if resposta_json is not None:
+                return self._finalizar_plano(dados_usuario, resposta_json, chave_cache, modelo=modelo)
+            self.logger.warning("Geração no formato compacto falhou, usando requisição única")
+        
+        if self.saida_estruturada:
+            resposta_json = self._gerar_plano_ferramenta(dados_usuario, modelo)
+            if resposta_json is not None:
+                return self._finalizar_plano(dados_usuario, resposta_json, chave_cache, modelo=modelo)
+            self.logger.warning("Saída estruturada falhou, usando resposta em texto")
         
         # Preparar prompt para o Claude
         self.logger.info("Preparando prompt para o Claude")
-        prompt_completo = self._preparar_prompt(dados_usuario)
-        self.logger.debug(f"Prompt completo gerado com {len(prompt_completo)} caracteres")
+        sistema, prompt_completo = self._prompt_para_envio(dados_usuario)
+        self.logger.debug(f"Prompt gerado com {len(prompt_completo)} caracteres "
+                          f"(prefixo em cache: {len(sistema) if sistema else 0} caracteres)")
         
-        # Fazer requisição para o Claude
+        # Fazer requisição para o Claude, continuando a resposta se ela vier truncada
         self.logger.info("Enviando requisição para a API Claude")
         try:
-            resposta_json = self._fazer_requisicao_claude(prompt_completo)
+            if self.config_geracao["stream_requisicao_unica"]:
+                resposta_json = self._requisitar_plano_em_stream(prompt_completo, self._orcamento_tokens(dados_usuario),
+                                                                 sistema=sistema, modelo=modelo)
+            else:
+                resposta_json = self._requisitar_plano(prompt_completo, self._orcamento_tokens(dados_usuario),
+                                                       sistema=sistema, modelo=modelo)
             self.logger.info("Resposta recebida da API Claude com sucesso")
         except Exception as e:
             self.logger.error(f"Erro na requisição para a API Claude: {str(e)}")
             raise
         
+        return self._finalizar_plano(dados_usuario, resposta_json, chave_cache, modelo=modelo)
+    
+    def _gerar_plano_ferramenta(self, dados_usuario: Dict[str, Any],
+                                modelo: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Gera o plano forçando a chamada da ferramenta cujo input_schema é o schema do plano.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            modelo (str, optional): Modelo da requisição; por padrão self.modelo
+            
+        Returns:
+            Dict: Resposta da API com o bloco tool_use, ou None se a resposta não trouxer
+                  a chamada completa (erro, ausência da ferramenta ou corte por max_tokens)
+        """
+        if not self.api_key or not self.api_key.strip():
+            return None
+        
+        sistema, prompt = self._prompt_para_envio(dados_usuario, saida_estruturada=True)
+        resposta = self._fazer_requisicao_claude(prompt, self._orcamento_tokens(dados_usuario),
+                                                 ferramenta=self.ferramenta_plano, operacao="ferramenta",
+                                                 sistema=sistema, modelo=modelo)
+        if resposta.get("type") != "message":
+            return None
+        if resposta.get("stop_reason") == "max_tokens":
+            # A entrada de uma ferramenta cortada não pode ser continuada
+            self.logger.error("Chamada da ferramenta cortada por max_tokens")
+            return None
+        if self._entrada_da_ferramenta(resposta) is None:
+            self.logger.error("Resposta sem a chamada da ferramenta do plano")
+            return None
+        return resposta
+    
+    def _entrada_da_ferramenta(self, resposta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Retorna a entrada da chamada da ferramenta do plano, se a resposta tiver uma."""
+        for bloco in resposta.get("content") or []:
+            if isinstance(bloco, dict) and bloco.get("type") == "tool_use" \
+                    and bloco.get("name") == NOME_FERRAMENTA_PLANO and isinstance(bloco.get("input"), dict):
+                return bloco["input"]
+        return None
+    
+    def _gerar_plano_fanout(self, dados_usuario: Dict[str, Any], modelo: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Gera o plano em duas fases: uma macroestrutura compacta (ciclos e foco semanal)
+        e, em paralelo, as sessões de cada ciclo ou bloco de semanas.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            modelo (str, optional): Modelo das requisições das duas fases; por padrão self.modelo
+            
+        Returns:
+            Dict: Resposta no formato da API Messages com o plano montado,
+                  ou None se alguma fase falhar
+        """
+        if not self.api_key or not self.api_key.strip():
+            return None
+        
+        inicio = time.perf_counter()
+        dados_str, dias_str, data_inicio = self._descrever_usuario(dados_usuario)
+        
+        # Fase 1: macroestrutura
+        self.logger.info("Fan-out: solicitando macroestrutura do plano")
+        resposta_macro = self._fazer_requisicao_claude(
+            self._preparar_prompt_macro(dados_str, dias_str, data_inicio),
+            self.config_geracao["fanout_max_tokens_macro"],
+            operacao="fanout_macro",
+            modelo=modelo
+        )
+        macro = self._extrair_json_parcial(resposta_macro)
+        ciclos_macro = (macro or {}).get("plano_principal", {}).get("ciclos") or []
+        if not ciclos_macro:
+            self.logger.error("Fan-out: macroestrutura inválida ou sem ciclos")
+            return None
+        
+        blocos = self._dividir_blocos(ciclos_macro)
+        self.logger.info(f"Fan-out: macroestrutura com {len(ciclos_macro)} ciclos recebida em "
+                         f"{time.perf_counter() - inicio:.2f} segundos, gerando {len(blocos)} blocos")
+        
+        # Fase 2: blocos de semanas em paralelo, com concorrência limitada
+        macro_compacta = json.dumps(macro["plano_principal"], ensure_ascii=False, separators=(",", ":"))
+        max_workers = max(1, min(self.config_geracao["fanout_max_workers"], len(blocos)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fanout") as executor:
+            futuros = [
+                executor.submit(self._gerar_bloco_fanout, dados_str, dias_str, macro_compacta, ciclo_indice, semanas,
+                                modelo)
+                for ciclo_indice, semanas in blocos
+            ]
+            resultados = [futuro.result() for futuro in futuros]
+        
+        if any(resultado is None for resultado, _ in resultados):
+            self.logger.error("Fan-out: um ou mais blocos falharam")
+            return None
+        
+        # Montar o plano principal na ordem dos ciclos e semanas
+        plano = {"usuario": macro.get("usuario", {}), "plano_principal": dict(macro["plano_principal"])}
+        ciclos = []
+        for ciclo_macro in ciclos_macro:
+            ciclo = {chave: valor for chave, valor in ciclo_macro.items() if chave != "semanas"}
+            ciclo["microciclos"] = []
+            ciclos.append(ciclo)
+        for (ciclo_indice, _), (microciclos, _) in zip(blocos, resultados):
+            ciclos[ciclo_indice]["microciclos"].extend(microciclos)
+        plano["plano_principal"]["ciclos"] = ciclos
+        
+        uso = {"input_tokens": 0, "output_tokens": 0}
+        for resposta in [resposta_macro] + [resposta for _, resposta in resultados]:
+            for chave in uso:
+                uso[chave] += resposta.get("usage", {}).get(chave, 0)
+        
+        self.logger.info(f"Fan-out concluído em {time.perf_counter() - inicio:.2f} segundos "
+                         f"({uso['output_tokens']} tokens de saída)")
+        return {
+            "type": "message",
+            "content": [{"type": "text", "text": "```json\n" + json.dumps(plano, ensure_ascii=False) + "\n```"}],
+            "stop_reason": "end_turn",
+            "usage": uso
+        }
+    
+    def _dividir_blocos(self, ciclos_macro: List[Dict[str, Any]]) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Divide as semanas da macroestrutura nos blocos gerados por cada sub-requisição.
+        
+        Args:
+            ciclos_macro (List): Ciclos da macroestrutura, cada um com a lista "semanas"
+            
+        Returns:
+            List[Tuple]: (índice do ciclo, semanas do bloco)
+        """
+        tamanho = self.config_geracao["fanout_semanas_por_bloco"]
+        blocos = []
+        for indice, ciclo in enumerate(ciclos_macro):
+            semanas = ciclo.get("semanas") or [
+                {"semana": n + 1} for n in range(int(ciclo.get("duracao_semanas") or 4))
+            ]
+            if tamanho <= 0:
+                blocos.append((indice, semanas))
+            else:
+                blocos.extend((indice, semanas[i:i + tamanho]) for i in range(0, len(semanas), tamanho))
+        return blocos
+    
+    def _gerar_bloco_fanout(self, dados_str: str, dias_str: str, macro_compacta: str, ciclo_indice: int,
+                            semanas: List[Dict[str, Any]],
+                            modelo: Optional[str] = None) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+        """
+        Gera os microciclos de um bloco de semanas.
+        
+        Args:
+            dados_str (str): Dados do usuário formatados
+            dias_str (str): Dias disponíveis formatados
+            macro_compacta (str): Macroestrutura do plano em JSON compacto
+            ciclo_indice (int): Índice do ciclo ao qual o bloco pertence
+            semanas (List): Semanas do bloco, com foco, volume e intensidade
+            modelo (str, optional): Modelo da requisição; por padrão self.modelo
+            
+        Returns:
+            Tuple: (microciclos ou None em caso de falha, resposta da API)
+        """
+        numeros = [semana.get("semana") for semana in semanas]
+        prompt = f"""{self.prompt_template}
+        
+        {dados_str}
+        
+        Macroestrutura do plano de 12 semanas (já definida):
+        {macro_compacta}
+        
+        Gere SOMENTE as semanas {numeros} do ciclo de ordem {ciclo_indice + 1}, seguindo o foco, volume
+        e intensidade definidos na macroestrutura para cada semana:
+        {json.dumps(semanas, ensure_ascii=False)}
+        
+        Organize as sessões nos dias: {dias_str}. Cada sessão deve incluir exercícios específicos,
+        séries, repetições e % de 1RM.
+        
+        Retorne apenas o JSON válido no formato abaixo, com um microciclo por semana solicitada:
+        
+        ```json
+        {{"microciclos": [{self._obter_template_microciclo()}]}}
+        ```
+        """
+        prompt = self._compactar_prompt(prompt)
+        resposta = self._requisitar_plano(prompt, self.config_geracao["fanout_max_tokens_bloco"], operacao="fanout_bloco",
+                                          modelo=modelo)
+        bloco = self._extrair_json_parcial(resposta)
+        microciclos = (bloco or {}).get("microciclos")
+        if not isinstance(microciclos, list) or len(microciclos) != len(semanas):
+            self.logger.error(f"Fan-out: bloco {numeros} do ciclo {ciclo_indice + 1} inválido")
+            return None, resposta
+        
+        # A numeração das semanas é sempre a da macroestrutura
+        for microciclo, semana in zip(microciclos, semanas):
+            microciclo["semana"] = semana.get("semana", microciclo.get("semana"))
+        self.logger.debug(f"Fan-out: bloco {numeros} do ciclo {ciclo_indice + 1} gerado")
+        return microciclos, resposta
+    
+    def _preparar_prompt_macro(self, dados_str: str, dias_str: str, data_inicio: str) -> str:
+        """
+        Prepara o prompt da macroestrutura do plano (sem sessões).
+        
+        Args:
+            dados_str (str): Dados do usuário formatados
+            dias_str (str): Dias disponíveis formatados
+            data_inicio (str): Data de início do plano
+            
+        Returns:
+            str: Prompt formatado
+        """
+        prompt = f"""{self.prompt_template}
+        
+        {dados_str}
+        
+        INSTRUÇÕES ESPECÍFICAS:
+        1. Defina APENAS a macroestrutura de um plano de EXATAMENTE 12 semanas, sem sessões nem exercícios.
+        2. Divida as 12 semanas em ciclos; para cada semana informe volume, intensidade e foco.
+        3. Os treinos serão organizados nos dias: {dias_str}. O plano começa em {data_inicio}.
+        
+        Retorne apenas o JSON válido no formato abaixo:
+        
+        ```json
+        {{"usuario": {{"nome": "", "nivel": "", "objetivos": [{{"objetivo_id": "", "nome": "", "prioridade": 1}}], "restricoes": []}},
+         "plano_principal": {{"nome": "", "descricao": "", "periodizacao": {{"tipo": "", "descricao": ""}},
+          "duracao_semanas": 12, "frequencia_semanal": 3,
+          "ciclos": [{{"ciclo_id": "", "nome": "", "ordem": 1, "duracao_semanas": 4, "objetivo": "",
+            "semanas": [{{"semana": 1, "volume": "", "intensidade": "", "foco": ""}}]}}]}}}}
+        ```
+        """
+        return self._compactar_prompt(prompt)
+    
+    def _gerar_plano_compacto(self, dados_usuario: Dict[str, Any], modelo: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Gera o plano no formato compacto (semana-modelo por ciclo e ajustes de cada semana)
+        e o expande localmente no plano completo de 12 semanas.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            modelo (str, optional): Modelo da requisição; por padrão self.modelo
+            
+        Returns:
+            Dict: Resposta no formato da API Messages com o plano expandido,
+                  ou None se a resposta não trouxer um plano compacto válido
+        """
+        if not self.api_key or not self.api_key.strip():
+            return None
+        
+        inicio = time.perf_counter()
+        dados_str, dias_str, data_inicio = self._descrever_usuario(dados_usuario)
+        resposta = self._requisitar_plano(self._preparar_prompt_compacto(dados_str, dias_str, data_inicio),
+                                          self.config_geracao["compacto_max_tokens"], operacao="compacto", modelo=modelo)
+        compacto = self._extrair_json_parcial(resposta)
+        if compacto is None:
+            return None
+        try:
+            plano = expandir_plano_compacto(compacto)
+        except PlanoCompactoInvalidoError as e:
+            self.logger.error(f"Plano compacto inválido: {str(e)}")
+            return None
+        
+        uso = resposta.get("usage", {})
+        self.logger.info(f"Plano compacto expandido para {plano['plano_principal']['duracao_semanas']} semanas em "
+                         f"{time.perf_counter() - inicio:.2f} segundos ({uso.get('output_tokens', 0)} tokens de saída)")
+        return {
+            "type": "message",
+            "content": [{"type": "text", "text": "```json\n" + json.dumps(plano, ensure_ascii=False) + "\n```"}],
+            "stop_reason": "end_turn",
+            "usage": uso
+        }
+    
+    def _preparar_prompt_compacto(self, dados_str: str, dias_str: str, data_inicio: str) -> str:
+        """
+        Prepara o prompt do plano no formato compacto.
+        
+        Args:
+            dados_str (str): Dados do usuário formatados
+            dias_str (str): Dias disponíveis formatados
+            data_inicio (str): Data de início do plano
+            
+        Returns:
+            str: Prompt formatado
+        """
+        prompt = f"""{self.prompt_template}
+        
+        {dados_str}
+        
+        INSTRUÇÕES ESPECÍFICAS (FORMATO COMPACTO):
+        1. Crie um plano de EXATAMENTE 12 semanas dividido em ciclos, organizando os treinos nos dias: {dias_str}.
+           O plano começa em {data_inicio}.
+        2. Para cada ciclo, descreva UMA semana-modelo em "sessoes", com exercícios, séries, repetições e % de 1RM.
+        3. Em "semanas", liste todas as semanas do ciclo com volume, intensidade, foco e os ajustes em relação
+           à semana-modelo: "ajuste_percentual_rm" (pontos de %1RM), "ajuste_series" e, se mudar, "repeticoes".
+           Use ajustes negativos nas semanas de recuperação.
+        4. Não repita as sessões de cada semana nem inclua IDs: o plano completo é montado a partir do modelo.
+        
+        Retorne apenas o JSON válido no formato abaixo:
+        
+        ```json
+        {{"usuario": {{"nome": "", "nivel": "", "objetivos": [{{"objetivo_id": "", "nome": "", "prioridade": 1}}], "restricoes": []}},
+         "plano_principal": {{"nome": "", "descricao": "", "periodizacao": {{"tipo": "", "descricao": ""}}, "frequencia_semanal": 3,
+          "ciclos": [{{"nome": "", "objetivo": "",
+            "sessoes": [{{"nome": "", "tipo": "", "duracao_minutos": 60, "nivel_intensidade": 7, "dia_semana": 1,
+              "grupos_musculares": ["Peito"], "exercicios": [{{"nome": "", "equipamento": "", "series": 3,
+                "repeticoes": "10-12", "percentual_rm": 70, "tempo_descanso": 60, "cadencia": "", "metodo": "", "observacoes": ""}}]}}],
+            "semanas": [{{"volume": "", "intensidade": "", "foco": "", "ajuste_percentual_rm": 0, "ajuste_series": 0}}]}}]}}}}
+        ```
+        """
+        return self._compactar_prompt(prompt)
+    
+    def _obter_template_microciclo(self) -> str:
+        """Retorna o trecho do template JSON correspondente a um microciclo."""
+        template = self._obter_template_json()
+        try:
+            estrutura = json.loads(template[template.index("{"):])
+            microciclo = estrutura["plano_principal"]["ciclos"][0]["microciclos"][0]
+            return json.dumps(microciclo, ensure_ascii=False)
+        except (ValueError, KeyError, IndexError, TypeError):
+            return ('{"semana": 1, "volume": "", "intensidade": "", "foco": "", "sessoes": [{"sessao_id": "", '
+                    '"nome": "", "tipo": "", "duracao_minutos": 60, "nivel_intensidade": 7, "dia_semana": 1, '
+                    '"grupos_musculares": [], "exercicios": [{"exercicio_id": "", "nome": "", "ordem": 1, '
+                    '"equipamento": "", "series": 3, "repeticoes": "10-12", "percentual_rm": 70, '
+                    '"tempo_descanso": 60, "cadencia": "", "metodo": "", "progressao": [], "observacoes": ""}]}]}')
+    
+    def _extrair_json_parcial(self, resposta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Extrai o objeto JSON de uma resposta parcial (macroestrutura ou bloco), sem fallbacks.
+        
+        Args:
+            resposta (Dict): Resposta da API Claude
+            
+        Returns:
+            Dict: Objeto extraído, ou None se a resposta não for uma mensagem válida
+        """
+        if resposta.get("type") != "message":
+            return None
+        try:
+            objeto = extrair_json(texto_da_resposta(resposta.get("content", [])))
+        except ValueError as e:
+            self.logger.error(f"JSON parcial inválido: {str(e)}")
+            return None
+        if not isinstance(objeto, dict):
+            self.logger.error(f"JSON parcial não é um objeto ({type(objeto).__name__})")
+            return None
+        return objeto
+    
+    def criar_plano_treinamento_stream(self, dados_usuario: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Cria um plano de treinamento em modo streaming, emitindo cada semana assim que fica pronta.
+        
+        Os eventos produzidos são:
+            {"tipo": "microciclo", "ciclo_indice", "microciclo_indice", "dados"}
+            {"tipo": "ciclo", "ciclo_indice", "dados"}
+            {"tipo": "reinicio"}  - o stream falhou; descartar os eventos parciais
+            {"tipo": "plano", "dados"}  - plano completo, extraído e validado
+        
+        Com o roteamento de modelos ativo, o stream usa o modelo da rota do perfil; se o plano
+        da rota não for aproveitável, o da rota escalonada é gerado sem streaming e emitido
+        inteiro depois de um evento de reinício.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário para personalizar o treino
+            
+        Returns:
+            Iterator[Dict]: Eventos de geração do plano
+        """
+        self.logger.info(f"Iniciando criação de plano (streaming) para usuário: {dados_usuario.get('nome', 'Não especificado')}")
+        
+        chave_cache, plano_em_cache = self._consultar_cache(dados_usuario)
+        if plano_em_cache is not None:
+            yield from self._eventos_do_plano(plano_em_cache)
+            return
+        
+        motivo = self._motivo_modo_degradado()
+        if motivo:
+            resposta_local = self._resposta_indisponivel(motivo, "Modo degradado")
+            yield from self._eventos_do_plano(self._finalizar_plano(dados_usuario, resposta_local, chave_cache))
+            return
+        
+        rota = self.roteador.rotear(dados_usuario) if self.roteador is not None else None
+        if rota is None:
+            plano, semanas_emitidas = yield from self._gerar_plano_em_stream(dados_usuario, chave_cache, {"emitidos": 0})
+            yield from self._eventos_finais(plano, semanas_emitidas)
+            return
+        
+        self.logger.info(f"Rota {rota.nome} (pontuação {rota.pontuacao}"
+                         f"{': ' + ', '.join(rota.motivos) if rota.motivos else ''}), modelo {rota.modelo} (streaming)")
+        estado = {"emitidos": 0}
+        inicio = time.perf_counter()
+        try:
+            plano, semanas_emitidas = yield from self._gerar_plano_em_stream(dados_usuario, chave_cache, estado,
+                                                                             rota.modelo)
+        except ValueError as e:
+            self.roteador.registrar(rota, time.perf_counter() - inicio, valido=False)
+            escalonada = self.roteador.rota_escalonada(rota)
+            if escalonada is None:
+                raise
+            self.logger.warning(f"Plano inválido no modelo {rota.modelo} ({str(e)}), gerando de novo com {escalonada.modelo}")
+        else:
+            escalonada = None if self._registrar_plano_na_rota(rota, plano, inicio) else self.roteador.rota_escalonada(rota)
+            if escalonada is None:
+                yield from self._eventos_finais(plano, semanas_emitidas)
+                return
+            self.logger.warning(f"Resposta do modelo {rota.modelo} sem plano aproveitável, "
+                                f"gerando de novo com {escalonada.modelo}")
+        
+        # A rota escalonada gera o plano sem streaming; as semanas já emitidas são descartadas
+        if estado["emitidos"]:
+            yield {"tipo": "reinicio"}
+        yield from self._eventos_do_plano(self._gerar_plano_na_rota(escalonada, dados_usuario, chave_cache)[0])
+    
+    def _gerar_plano_em_stream(self, dados_usuario: Dict[str, Any], chave_cache: Optional[str], estado: Dict[str, int],
+                               modelo: Optional[str] = None) -> Generator[Dict[str, Any], None, Tuple[Dict[str, Any], bool]]:
+        """
+        Gera o plano em streaming, emitindo as semanas; se o stream não for utilizável,
+        segue pela requisição completa (incluindo os fallbacks).
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            chave_cache (str, optional): Chave do cache de planos
+            estado (Dict): Contador de eventos emitidos, atualizado durante o consumo
+            modelo (str, optional): Modelo de todas as requisições da geração; por padrão self.modelo
+            
+        Returns:
+            Tuple[Dict, bool]: Plano validado e se as semanas dele já foram emitidas
+        """
+        sistema, prompt_completo = self._prompt_para_envio(dados_usuario)
+        max_tokens = self._orcamento_tokens(dados_usuario)
+        
+        resposta_json = None
+        if self.api_key and self.api_key.strip():
+            try:
+                resposta_json = yield from self._consumir_stream_com_guarda(prompt_completo, estado, max_tokens, sistema,
+                                                                            modelo)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.logger.error(f"Erro no streaming da API Claude: {str(e)}")
+        
+        if resposta_json is not None and resposta_json.get("type") == RESPOSTA_INDISPONIVEL:
+            # Saída cancelada pela guarda em todas as tentativas: plano pelas regras locais
+            return self._finalizar_plano(dados_usuario, resposta_json, chave_cache, modelo=modelo), False
+        
+        if resposta_json is None:
+            # Sem stream utilizável: seguir pelo caminho não-streaming (inclui os fallbacks)
+            self.logger.warning("Streaming indisponível, usando requisição completa")
+            if estado["emitidos"]:
+                yield {"tipo": "reinicio"}
+                estado["emitidos"] = 0
+            resposta_json = self._requisitar_plano(prompt_completo, max_tokens, sistema=sistema, modelo=modelo)
+            return self._finalizar_plano(dados_usuario, resposta_json, chave_cache, modelo=modelo), False
+        
+        resposta_json = self._completar_resposta_truncada(prompt_completo, resposta_json, sistema, modelo=modelo)
+        return self._finalizar_plano(dados_usuario, resposta_json, chave_cache, modelo=modelo), True
+    
+    def _eventos_finais(self, plano: Dict[str, Any], semanas_emitidas: bool) -> Iterator[Dict[str, Any]]:
+        """Evento do plano completo, precedido das semanas se elas ainda não foram emitidas."""
+        if semanas_emitidas:
+            yield {"tipo": "plano", "dados": plano}
+        else:
+            yield from self._eventos_do_plano(plano)
+    
+    def _consumir_stream_com_guarda(self, prompt: str, estado: Dict[str, int], max_tokens: int = 4000,
+                                    sistema: Optional[str] = None,
+                                    modelo: Optional[str] = None) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
+        """
+        Consome o stream repetindo-o quando a guarda estrutural cancela a saída.
+        
+        Eventos já emitidos de uma tentativa cancelada são descartados com um evento
+        {"tipo": "reinicio"}.
+        
+        Args:
+            prompt (str): Prompt para o Claude
+            estado (Dict): Contador de eventos emitidos, atualizado durante o consumo
+            max_tokens (int): Limite de tokens da resposta
+            sistema (str, optional): Prefixo estático enviado como prompt de sistema cacheável
+            modelo (str, optional): Modelo da requisição; por padrão self.modelo
+            
+        Returns:
+            Dict: Resposta reconstituída, ou resposta do tipo RESPOSTA_INDISPONIVEL (saida_abortada)
+                  quando todas as tentativas são canceladas
+        """
+        for tentativa in range(self.config_geracao["guarda_retentativas"] + 1):
+            try:
+                return (yield from self._consumir_stream_claude(prompt, estado, max_tokens, sistema, modelo))
+            except SaidaIrrecuperavelError as e:
+                self.logger.warning(f"Stream cancelado pela guarda estrutural na tentativa {tentativa + 1}: {str(e)}")
+                if self.metricas is not None:
+                    self.metricas.incrementar("streams_cancelados_guarda")
+                if estado["emitidos"]:
+                    yield {"tipo": "reinicio"}
+                    estado["emitidos"] = 0
+        return self._resposta_indisponivel(RESULTADO_SAIDA_ABORTADA, "Saída do modelo sem a estrutura do plano")
+    
+    def _requisitar_plano_em_stream(self, prompt: str, max_tokens: int, sistema: Optional[str] = None,
+                                    modelo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Requisição única feita em streaming para que a guarda estrutural cancele cedo uma
+        saída irrecuperável; os eventos de semana são descartados.
+        
+        Args:
+            prompt (str): Prompt para o Claude
+            max_tokens (int): Limite de tokens da primeira requisição
+            sistema (str, optional): Prefixo estático enviado como prompt de sistema cacheável
+            modelo (str, optional): Modelo da requisição e das continuações; por padrão self.modelo
+            
+        Returns:
+            Dict: Resposta da API com o texto de todas as partes concatenado, ou do tipo
+                  RESPOSTA_INDISPONIVEL se a guarda cancelar todas as tentativas
+        """
+        eventos = self._consumir_stream_com_guarda(prompt, {"emitidos": 0}, max_tokens, sistema, modelo)
+        try:
+            while True:
+                next(eventos)
+        except StopIteration as fim:
+            resposta = fim.value
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.logger.error(f"Erro no streaming da API Claude, usando requisição completa: {str(e)}")
+            return self._requisitar_plano(prompt, max_tokens, sistema=sistema, modelo=modelo)
+        return self._completar_resposta_truncada(prompt, resposta, sistema, modelo=modelo)
+    
+    def _criar_guarda(self) -> Optional[GuardaEstrutural]:
+        """Guarda estrutural do schema atual, ou None se desativada."""
+        if not self.config_geracao["guarda_stream"]:
+            return None
+        chaves_raiz = set((self.schema.get("properties") or {}).keys()) | set(CAMPOS_METADADOS)
+        return GuardaEstrutural(self.schema, chaves_raiz, self.config_geracao["guarda_max_preambulo"])
+    
+    def _consumir_stream_claude(self, prompt: str, estado: Dict[str, int], max_tokens: int = 4000,
+                                sistema: Optional[str] = None,
+                                modelo: Optional[str] = None) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
+        """
+        Consome o stream de eventos da API Messages alimentando o parser JSON incremental.
+        
+        Args:
+            prompt (str): Prompt para o Claude
+            estado (Dict): Contador de eventos emitidos, atualizado durante o consumo
+            max_tokens (int): Limite de tokens da resposta
+            sistema (str, optional): Prefixo estático enviado como prompt de sistema cacheável
+            modelo (str, optional): Modelo da requisição; por padrão self.modelo
+            
+        Returns:
+            Dict: Resposta reconstituída no mesmo formato da requisição não-streaming
+            
+        Raises:
+            SaidaIrrecuperavelError: A guarda estrutural cancelou o stream
+        """
+        api_url, headers, data = self._montar_requisicao(prompt, max_tokens, sistema=sistema, modelo=modelo)
+        guarda = self._criar_guarda()
+        parser = guarda.criar_parser() if guarda is not None else IncrementalJSONParser()
+        resposta = {"type": "message", "content": [], "stop_reason": None, "usage": {}}
+        inicio = time.perf_counter()
+        ttfb = None
+        
+        if not self.disjuntor.permitir():
+            self._registrar_chamada("plano", inicio, RESULTADO_CIRCUITO_ABERTO, streaming=True, modelo=data["model"])
+            raise CircuitoAbertoError("Disjuntor da API Claude aberto, stream não iniciado")
+        try:
+            reserva = self._reservar_taxa(data)
+        except LimiteTaxaEsgotadoError:
+            self._registrar_chamada("plano", inicio, RESULTADO_TAXA_ESGOTADA, streaming=True, modelo=data["model"])
+            raise
+        try:
+            vaga = self.limitador.adquirir(self.fila_timeout_s) if self.limitador else None
+        except FilaEsgotadaError:
+            self._reconciliar_taxa(reserva, {})
+            self._registrar_chamada("plano", inicio, RESULTADO_FILA_ESGOTADA, streaming=True, modelo=data["model"])
+            raise
+        
+        self.logger.info(f"Abrindo stream para {api_url}")
+        sobrecarga = None
+        uso = None
+        eventos = self.transport.stream_eventos(api_url, headers, data)
+        try:
+            for evento in eventos:
+                if ttfb is None:
+                    ttfb = time.perf_counter() - inicio
+                tipo = evento.get("type")
+                
+                if tipo == "message_start":
+                    mensagem = evento.get("message", {})
+                    resposta["id"] = mensagem.get("id")
+                    resposta["model"] = mensagem.get("model")
+                    resposta["usage"].update(mensagem.get("usage", {}))
+                elif tipo == "content_block_delta" and evento.get("delta", {}).get("type") == "text_delta":
+                    completos = parser.alimentar(evento["delta"].get("text", ""))
+                    if guarda is not None:
+                        guarda.verificar(parser)
+                    for caminho, valor in completos:
+                        if estado["emitidos"] == 0:
+                            self.logger.info(f"Primeira semana disponível em {time.perf_counter() - inicio:.2f} segundos")
+                        estado["emitidos"] += 1
+                        if len(caminho) == 5:
+                            yield {"tipo": "microciclo", "ciclo_indice": caminho[2],
+                                   "microciclo_indice": caminho[4], "dados": valor}
+                        else:
+                            yield {"tipo": "ciclo", "ciclo_indice": caminho[2], "dados": valor}
+                elif tipo == "message_delta":
+                    resposta["stop_reason"] = evento.get("delta", {}).get("stop_reason")
+                    resposta["usage"].update(evento.get("usage", {}))
+                elif tipo == "error":
+                    sobrecarga = evento.get("error", {}).get("type") in ("overloaded_error", "rate_limit_error")
+                    raise ValueError(f"Erro no stream: {evento.get('error', {}).get('message', evento)}")
+            sobrecarga = False
+            uso = resposta["usage"]
+        except StreamStatusError as e:
+            sobrecarga = e.status_code in STATUS_SOBRECARGA or None
+            uso = {}
+            if e.status_code in STATUS_RETENTAVEIS:
+                self.disjuntor.registrar_falha()
+            else:
+                self.disjuntor.registrar_sucesso()
+            self._registrar_chamada("plano", inicio, RESULTADO_ERRO_API, ttfb=ttfb, status_code=e.status_code, streaming=True,
+                                    modelo=data["model"])
+            raise
+        except requests.exceptions.RequestException:
+            self.disjuntor.registrar_falha()
+            self._registrar_chamada("plano", inicio, RESULTADO_ERRO_CONEXAO, resposta, ttfb=ttfb, streaming=True,
+                                    modelo=data["model"])
+            raise
+        except SaidaIrrecuperavelError:
+            # A API respondeu normalmente; o stream é fechado sem esperar o restante da saída
+            sobrecarga = False
+            uso = resposta["usage"]
+            self.disjuntor.registrar_sucesso()
+            self._registrar_chamada("plano", inicio, RESULTADO_SAIDA_ABORTADA, resposta, ttfb=ttfb, status_code=200,
+                                    streaming=True, modelo=data["model"])
+            raise
+        except ValueError:
+            self.disjuntor.registrar_falha()
+            self._registrar_chamada("plano", inicio, RESULTADO_ERRO_API, resposta, ttfb=ttfb, streaming=True,
+                                    modelo=data["model"])
+            raise
+        finally:
+            eventos.close()
+            if vaga is not None:
+                self.limitador.liberar(vaga, sobrecarga)
+            self._reconciliar_taxa(reserva, uso)
+        
+        self.disjuntor.registrar_sucesso()
+        resposta["content"] = [{"type": "text", "text": parser.texto()}]
+        self.logger.info(f"Stream concluído em {time.perf_counter() - inicio:.2f} segundos (stop_reason: {resposta['stop_reason']})")
+        self._registrar_chamada("plano", inicio, RESULTADO_SUCESSO, resposta, ttfb=ttfb, status_code=200, streaming=True,
+                                modelo=data["model"])
+        return resposta
+    
+    def _eventos_do_plano(self, plano: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Emite os eventos de streaming a partir de um plano já completo."""
+        for i, ciclo in enumerate(plano.get("plano_principal", {}).get("ciclos", [])):
+            for j, microciclo in enumerate(ciclo.get("microciclos", [])):
+                yield {"tipo": "microciclo", "ciclo_indice": i, "microciclo_indice": j, "dados": microciclo}
+            yield {"tipo": "ciclo", "ciclo_indice": i, "dados": ciclo}
+        yield {"tipo": "plano", "dados": plano}
+    
+    def _motivo_modo_degradado(self) -> Optional[str]:
+        """
+        Indica se o plano deve ser gerado pelas regras locais sem tentar a API.
+        
+        Returns:
+            Optional[str]: sem_api_key, circuito_aberto (disjuntor aberto) ou fila_esgotada
+                           (fila do limitador de concorrência cheia); None se a API pode ser usada
+        """
+        if not self.api_key or not self.api_key.strip():
+            return "sem_api_key"
+        if self.disjuntor.estado == DISJUNTOR_ABERTO:
+            return RESULTADO_CIRCUITO_ABERTO
+        if self.limitador is not None and self.limitador.fila_cheia():
+            return RESULTADO_FILA_ESGOTADA
+        return None
+    
+    def _consultar_cache(self, dados_usuario: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Consulta o cache de planos e, sem entrada exata, o plano de um perfil semelhante.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            
+        Returns:
+            Tuple: (chave do cache ou None, plano reidentificado/adaptado ou None)
+        """
+        if not self.plan_cache:
+            return None, None
+        
+        chave_cache = gerar_chave_plano(dados_usuario, self.versao_prompt)
+        plano_em_cache = self.plan_cache.obter(chave_cache)
+        if plano_em_cache is not None:
+            self.logger.info("Plano encontrado no cache, reutilizando sem chamar a API Claude")
+            return chave_cache, reidentificar_plano(plano_em_cache, dados_usuario)
+        
+        self.logger.debug(f"Plano não encontrado no cache (chave {chave_cache[:12]})")
+        if self.indice_perfis is not None:
+            try:
+                plano_vizinho = self.indice_perfis.buscar(dados_usuario, self.versao_prompt)
+            except Exception as e:
+                self.logger.warning(f"Não foi possível consultar o índice de perfis: {str(e)}")
+                plano_vizinho = None
+            if plano_vizinho is not None:
+                if self.metricas is not None:
+                    self.metricas.incrementar("planos_vizinhos")
+                return chave_cache, plano_vizinho
+        return chave_cache, None
+    
+    def _finalizar_plano(self, dados_usuario: Dict[str, Any], resposta_json: Dict[str, Any],
+                         chave_cache: Optional[str], modelo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extrai o plano da resposta, adiciona metadados, valida e armazena no cache.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            resposta_json (Dict): Resposta da API Claude
+            chave_cache (str, optional): Chave do cache de planos
+            modelo (str, optional): Modelo dos reparos de trechos pelo Claude; por padrão self.modelo
+            
+        Returns:
+            Dict: Plano de treinamento validado
+        """
+        # Gerar ID de treinamento e versão
+        treinamento_id = str(uuid.uuid4())
+        versao = self.versao_plano
+        data_criacao = datetime.datetime.now().isoformat()
+        self.logger.debug(f"Gerado treinamento_id: {treinamento_id}, versão: {versao}")
+        
         # Extrair e validar o plano de treinamento
         self.logger.info("Extraindo JSON da resposta")
         try:
-            plano_treinamento = self._extrair_json_da_resposta(resposta_json)
+            if resposta_json.get("type") == RESPOSTA_INDISPONIVEL:
+                motivo = resposta_json.get("motivo")
+                self.logger.warning(f"Claude indisponível ({motivo}), gerando o plano pelas regras locais")
+                if self.metricas is not None:
+                    self.metricas.incrementar(f"planos_locais_{motivo}")
+                plano_treinamento = gerar_plano_local(dados_usuario, motivo)
+            else:
+                plano_treinamento = self._extrair_json_da_resposta(resposta_json)
             self.logger.debug(f"JSON extraído com sucesso: {len(json.dumps(plano_treinamento))} caracteres")
         except Exception as e:
             self.logger.error(f"Erro ao extrair JSON da resposta: {str(e)}")
@@ -209,7 +1373,7 @@ class TreinadorEspecialista:
         # Validar plano final
         self.logger.info("Validando plano final")
         try:
-            plano_validado = self._validar_plano(plano_treinamento)
+            plano_validado = self._validar_plano(plano_treinamento, modelo)
             self.logger.info("Plano validado com sucesso")
             # Log resumido do plano para depuração
             self.logger.debug("Resumo do plano validado:")
@@ -218,6 +1382,17 @@ class TreinadorEspecialista:
             self.logger.error(f"Erro na validação do plano: {str(e)}")
             raise
         
+        # Armazenar no cache apenas planos realmente gerados pelo Claude
+        if chave_cache and resposta_json.get("type") == "message" and \
+                (plano_validado.get("geracao") or {}).get("origem") != ORIGEM_ESTRUTURA_BASICA:
+            try:
+                self.plan_cache.armazenar(chave_cache, plano_validado, self.versao_prompt)
+                if self.indice_perfis is not None:
+                    self.indice_perfis.registrar(chave_cache, dados_usuario, self.versao_prompt)
+                self.logger.debug("Plano armazenado no cache")
+            except Exception as e:
+                self.logger.warning(f"Não foi possível armazenar o plano no cache: {str(e)}")
+        
         return plano_validado
     
     def _log_resumo_plano(self, plano: Dict[str, Any]) -> None:
@@ -230,26 +1405,149 @@ class TreinadorEspecialista:
             total_exercicios = 0
             total_sessoes = 0
             
-            for ciclo in ciclos:
-                for microciclo in ciclo.get("microciclos", []):
-                    total_sessoes += len(microciclo.get("sessoes", []))
-                    for sessao in microciclo.get("sessoes", []):
-                        total_exercicios += len(sessao.get("exercicios", []))
+            for ciclo in ciclos:
+                for microciclo in ciclo.get("microciclos", []):
+                    total_sessoes += len(microciclo.get("sessoes", []))
+                    for sessao in microciclo.get("sessoes", []):
+                        total_exercicios += len(sessao.get("exercicios", []))
+            
+            self.logger.debug(f"Resumo do plano: {num_ciclos} ciclos, {total_sessoes} sessões, {total_exercicios} exercícios")
+        except Exception as e:
+            self.logger.warning(f"Erro ao criar resumo do plano: {str(e)}")
+    
+    @WrapperLogger.log_function(logging.INFO)
+    def _preparar_prompt(self, dados_usuario: Dict[str, Any], saida_estruturada: bool = False) -> str:
+        """
+        Prepara o prompt para enviar ao Claude com base nos dados do usuário.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            saida_estruturada (bool): Se True, pede a chamada da ferramenta do plano no lugar
+                do template JSON (o formato vai no input_schema da ferramenta)
+            
+        Returns:
+            str: Prompt formatado
+        """
+        return "\n\n".join(self._preparar_prompt_dividido(dados_usuario, saida_estruturada))
+    
+    def _preparar_prompt_dividido(self, dados_usuario: Dict[str, Any],
+                                  saida_estruturada: bool = False) -> Tuple[str, str]:
+        """
+        Prepara o prompt separado em prefixo estático e sufixo com os dados do usuário.
+        
+        O prefixo (prompt do treinador, instruções gerais e formato da resposta) é
+        idêntico para todos os usuários e pode ser enviado como prompt de sistema
+        cacheável; só o sufixo muda de uma requisição para outra.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            saida_estruturada (bool): Se True, pede a chamada da ferramenta do plano no lugar
+                do template JSON
+            
+        Returns:
+            Tuple: (prefixo estático, sufixo com os dados do usuário), ambos compactados
+        """
+        dados_str, dias_str, data_inicio = self._descrever_usuario(dados_usuario)
+        cardio = dados_usuario.get("cardio", "não")
+        alongamento = dados_usuario.get("alongamento", "não")
+        
+        if saida_estruturada:
+            fechamento = f"Registre-o chamando a ferramenta {NOME_FERRAMENTA_PLANO}, preenchendo todos os campos do schema."
+        else:
+            fechamento = "Preencha todos os campos necessários e retorne apenas o JSON válido."
+        
+        sufixo = f"""
+        {dados_str}
+        
+        INSTRUÇÕES ESPECÍFICAS:
+        1. Organize os treinos nos dias da semana que o usuário selecionou: {dias_str}.
+        2. Se o usuário solicitou cardio ({cardio}) ou alongamento ({alongamento}), inclua-os no plano de 12 semanas.
+        3. O plano deve começar em {data_inicio}.
+        
+        Agora, crie um plano de treinamento completo para este usuário. {fechamento}
+        """
+        
+        self.logger.debug(f"Contexto do usuário gerado com {len(sufixo)} caracteres")
+        return self._preparar_prefixo(saida_estruturada), self._compactar_prompt(sufixo)
+    
+    def _preparar_prefixo(self, saida_estruturada: bool = False) -> str:
+        """
+        Monta a parte do prompt que não depende do usuário.
+        
+        Args:
+            saida_estruturada (bool): Se True, o formato é o da ferramenta do plano
+            
+        Returns:
+            str: Prompt do treinador, instruções gerais e formato da resposta, compactados
+        """
+        if saida_estruturada:
+            formato = f"""O plano deve ser registrado chamando a ferramenta {NOME_FERRAMENTA_PLANO}."""
+        else:
+            formato = f"""O plano deve seguir exatamente o formato JSON abaixo:
+        
+        ```json
+        {self._obter_template_json()}
+        ```"""
+        
+        prefixo = f"""{self.prompt_template}
+        
+        INSTRUÇÕES GERAIS:
+        1. Crie um plano de treinamento detalhado para EXATAMENTE 12 semanas.
+        2. Cada treino deve incluir exercícios específicos, número de séries e repetições.
+        3. Especifique a % de 1RM para cada exercício, exceto para o primeiro treino onde será testada a força máxima.
+        4. Os dados do usuário e as instruções específicas para ele vêm ao final.
+        
+        {formato}
+        """
+        return self._compactar_prompt(prefixo)
+    
+    def _prompt_para_envio(self, dados_usuario: Dict[str, Any],
+                           saida_estruturada: bool = False) -> Tuple[Optional[str], str]:
+        """
+        Prepara o prompt no formato da requisição.
+        
+        Com o cache de prompts ativo (PROMPT_CACHE_ENABLED), o prefixo estático segue como
+        prompt de sistema com cache_control e a mensagem do usuário leva só os dados dele.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            saida_estruturada (bool): Se True, prepara o prompt da saída estruturada
+            
+        Returns:
+            Tuple: (prompt de sistema cacheável ou None, mensagem do usuário)
+        """
+        prefixo, sufixo = self._preparar_prompt_dividido(dados_usuario, saida_estruturada)
+        if not self.config_geracao["cache_prompt"]:
+            return None, f"{prefixo}\n\n{sufixo}"
+        return prefixo, sufixo
+    
+    def _compactar_prompt(self, prompt: str) -> str:
+        """
+        Remove indentação e espaços de layout, minifica o JSON embutido e descarta
+        instruções repetidas, se a compactação estiver ativa (PROMPT_COMPACTION_ENABLED).
+        
+        Args:
+            prompt (str): Prompt montado
             
-            self.logger.debug(f"Resumo do plano: {num_ciclos} ciclos, {total_sessoes} sessões, {total_exercicios} exercícios")
-        except Exception as e:
-            self.logger.warning(f"Erro ao criar resumo do plano: {str(e)}")
+        Returns:
+            str: Prompt compactado (ou o original, com a compactação desativada)
+        """
+        if not self.config_geracao["compactar_prompt"]:
+            return prompt
+        resultado = compactar_prompt(prompt)
+        self.logger.debug(f"Prompt compactado: {resultado.tokens_antes} -> {resultado.tokens_depois} tokens estimados "
+                          f"(-{resultado.reducao:.0%}, {resultado.linhas_duplicadas} instruções repetidas removidas)")
+        return resultado.texto
     
-    @WrapperLogger.log_function(logging.INFO)
-    def _preparar_prompt(self, dados_usuario: Dict[str, Any]) -> str:
+    def _descrever_usuario(self, dados_usuario: Dict[str, Any]) -> Tuple[str, str, str]:
         """
-        Prepara o prompt para enviar ao Claude com base nos dados do usuário.
+        Formata os dados do usuário usados em todos os prompts de geração.
         
         Args:
             dados_usuario (Dict): Dados do usuário
             
         Returns:
-            str: Prompt formatado
+            Tuple: (bloco "Dados do Usuário", dias disponíveis formatados, data de início)
         """
         self.logger.info("Extraindo informações do usuário para o prompt")
         
@@ -285,9 +1583,7 @@ class TreinadorEspecialista:
         
         self.logger.debug(f"Objetivos formatados: {objetivos_str[:100]}...")
         
-        # Adicionar contexto ao prompt
-        contexto = f"""
-        Dados do Usuário:
+        dados_str = f"""{MARCADOR_DADOS_USUARIO}
         Nome: {nome}
         Idade: {idade}
         Data de Nascimento: {data_nascimento}
@@ -313,179 +1609,89 @@ class TreinadorEspecialista:
         {lesoes_str}
         
         Informações adicionais do chat:
-        {conversa_chat}
-        
-        INSTRUÇÕES ESPECÍFICAS:
-        1. Crie um plano de treinamento detalhado para EXATAMENTE 12 semanas.
-        2. Organize os treinos nos dias da semana que o usuário selecionou: {dias_str}.
-        3. Cada treino deve incluir exercícios específicos, número de séries e repetições.
-        4. Especifique a % de 1RM para cada exercício, exceto para o primeiro treino onde será testada a força máxima.
-        5. Se o usuário solicitou cardio ({cardio}) ou alongamento ({alongamento}), inclua-os no plano de 12 semanas.
-        6. O plano deve começar em {data_inicio}.
-        
-        Agora, crie um plano de treinamento completo para este usuário seguindo exatamente o formato JSON abaixo:
-        
-        ```json
-        {self._obter_template_json()}
-        ```
-        
-        Preencha todos os campos necessários e retorne apenas o JSON válido.
-        """
-        
-        self.logger.debug(f"Contexto gerado com {len(contexto)} caracteres")
-        
-        prompt_final = f"{self.prompt_template}\n\n{contexto}"
-        return prompt_final
+        {conversa_chat}"""
+        return dados_str, dias_str, data_inicio
     
-    @WrapperLogger.log_function(logging.INFO)
     def _obter_template_json(self) -> str:
         """Retorna um template do JSON esperado."""
-        self.logger.info("Obtendo template JSON")
-        
-        # Tentar diferentes caminhos possíveis para o template
-        template_paths = [
-            "JSON para Wrapper 1 Treinador.txt",
-            "../json/JSON para Wrapper 1 Treinador.txt",
-            "/json/JSON para Wrapper 1 Treinador.txt",
-            "backend/json/JSON para Wrapper 1 Treinador.txt"
-        ]
+        return self.assets.obter_texto("template_wrapper1", fallback=TEMPLATE_SIMPLIFICADO)
+    
+    def _montar_requisicao(self, prompt: str, max_tokens: int = 4000, continuacao: Optional[str] = None,
+                           ferramenta: Optional[Dict[str, Any]] = None, sistema: Optional[str] = None,
+                           modelo: Optional[str] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """
+        Monta URL, cabeçalhos e corpo da requisição para a API Messages.
         
-        # Template simplificado como fallback final
-        template_simplificado = """
-        {
-          "treinamento_id": "",
-          "versao": "",
-          "data_criacao": "",
-          "usuario": {
-            "id": "",
-            "nome": "",
-            "nivel": "",
-            "objetivos": [
-              {
-                "objetivo_id": "",
-                "nome": "",
-                "prioridade": 1
-              }
-            ],
-            "restricoes": []
-          },
-          "plano_principal": {
-            "nome": "",
-            "descricao": "",
-            "periodizacao": {
-              "tipo": "",
-              "descricao": ""
-            },
-            "duracao_semanas": 12,
-            "frequencia_semanal": 3,
-            "ciclos": [
-              {
-                "ciclo_id": "",
-                "nome": "",
-                "ordem": 1,
-                "duracao_semanas": 4,
-                "objetivo": "",
-                "microciclos": [
-                  {
-                    "semana": 1,
-                    "volume": "",
-                    "intensidade": "",
-                    "foco": "",
-                    "sessoes": [
-                      {
-                        "sessao_id": "",
-                        "nome": "",
-                        "tipo": "",
-                        "duracao_minutos": 60,
-                        "nivel_intensidade": 7,
-                        "dia_semana": 1,
-                        "grupos_musculares": [],
-                        "exercicios": [
-                          {
-                            "exercicio_id": "",
-                            "nome": "",
-                            "ordem": 1,
-                            "equipamento": "",
-                            "series": 3,
-                            "repeticoes": "10-12",
-                            "percentual_rm": 70,
-                            "tempo_descanso": 60,
-                            "cadencia": "",
-                            "metodo": "",
-                            "progressao": [],
-                            "observacoes": ""
-                          }
-                        ]
-                      }
-                    ]
-                  }
-                ]
-              }
+        Args:
+            prompt (str): Prompt para o Claude
+            max_tokens (int): Limite de tokens da resposta
+            continuacao (str, optional): Texto já gerado, enviado como início da resposta do assistente
+            ferramenta (Dict, optional): Ferramenta cuja chamada é forçada (saída estruturada)
+            sistema (str, optional): Prefixo estático enviado como prompt de sistema cacheável
+            modelo (str, optional): Modelo da requisição (rota do perfil); por padrão self.modelo
+            
+        Returns:
+            Tuple: (url, cabeçalhos, corpo)
+        """
+        api_url, headers = self._destino_requisicao()
+        data = {
+            "model": modelo or self.modelo,
+            "max_tokens": max_tokens,
+            "messages": [
+                {"role": "user", "content": prompt}
             ]
-          }
         }
-        """
+        if sistema:
+            # O marcador cobre ferramentas e sistema: as requisições seguintes leem esse prefixo do cache
+            data["system"] = [{"type": "text", "text": sistema, "cache_control": {"type": "ephemeral"}}]
+        if continuacao:
+            data["messages"].append({"role": "assistant", "content": continuacao})
+        if ferramenta:
+            data["tools"] = [ferramenta]
+            data["tool_choice"] = {"type": "tool", "name": ferramenta["name"]}
         
-        # Tentar carregar de cada caminho
-        for path in template_paths:
-            try:
-                template_path = get_template_path(path)
-                self.logger.debug(f"Tentando carregar template do caminho: {template_path}")
-                
-                # Tentar abrir o arquivo diretamente primeiro
-                try:
-                    with open(template_path, 'r', encoding='utf-8') as file:
-                        content = file.read()
-                        self.logger.info(f"Template JSON carregado com sucesso do caminho: {template_path}")
-                        return content
-                except FileNotFoundError:
-                    # Se não encontrou, tentar o fallback
-                    self.logger.debug(f"Arquivo não encontrado em: {template_path}")
-                    
-                # Usar o load_file_with_fallback como alternativa
-                success, content = load_file_with_fallback(
-                    template_path,
-                    fallback_content=""  # Vazio para detectar falha
-                )
-                
-                if success and content:
-                    self.logger.info(f"Template JSON carregado com sucesso via fallback, {len(content)} caracteres")
-                    return content
-                
-            except Exception as e:
-                self.logger.debug(f"Erro ao tentar caminho {path}: {str(e)}")
+        self.logger.debug(f"Usando modelo: {data['model']}, max_tokens: {data['max_tokens']}")
+        return api_url, headers, data
+    
+    def _destino_requisicao(self) -> Tuple[str, Dict[str, str]]:
+        """
+        Retorna a URL da API Messages e os cabeçalhos das requisições.
         
-        # Última tentativa: acessar diretamente o arquivo do backend/json
-        try:
-            import os
-            direct_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                "json", 
-                "JSON para Wrapper 1 Treinador.txt"
-            )
-            self.logger.debug(f"Tentando acesso direto ao arquivo: {direct_path}")
-            
-            with open(direct_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                self.logger.info(f"Template JSON carregado diretamente de: {direct_path}")
-                return content
-        except Exception as e:
-            self.logger.debug(f"Falha no acesso direto: {str(e)}")
+        Returns:
+            Tuple: (url, cabeçalhos)
+        """
+        headers = {
+            "anthropic-version": "2023-06-01",
+            "x-api-key": self.api_key.strip(),
+            "content-type": "application/json"
+        }
         
-        # Se chegou até aqui, usar o template simplificado
-        self.logger.warning("Usando template JSON simplificado como último recurso")
-        return template_simplificado
+        # Verificar se estamos usando a URL antiga (Text Completions) da API
+        api_url = self.api_url
+        if not api_url or api_url.rstrip("/").endswith("/v1/complete"):
+            api_url = "https://api.anthropic.com/v1/messages"
+            self.logger.info(f"URL API atualizada para: {api_url}")
+        return api_url, headers
     
     @WrapperLogger.log_function(logging.INFO)
-    def _fazer_requisicao_claude(self, prompt: str) -> Dict[str, Any]:
+    def _fazer_requisicao_claude(self, prompt: str, max_tokens: int = 4000, continuacao: Optional[str] = None,
+                                 ferramenta: Optional[Dict[str, Any]] = None, operacao: str = "plano",
+                                 sistema: Optional[str] = None, modelo: Optional[str] = None) -> Dict[str, Any]:
         """
         Faz uma requisição para a API Claude.
         
         Args:
             prompt (str): Prompt para o Claude
+            max_tokens (int): Limite de tokens da resposta
+            continuacao (str, optional): Texto já gerado que a resposta deve continuar
+            ferramenta (Dict, optional): Ferramenta cuja chamada é forçada (saída estruturada)
+            operacao (str): Nome da operação registrado nas métricas
+            sistema (str, optional): Prefixo estático enviado como prompt de sistema cacheável
+            modelo (str, optional): Modelo da requisição; por padrão self.modelo
             
         Returns:
-            Dict: Resposta da API em formato JSON
+            Dict: Resposta da API em formato JSON, ou resposta do tipo RESPOSTA_INDISPONIVEL
+                  (com motivo e erro) se a chamada não puder ser feita ou falhar
         """
         self.logger.info("Preparando requisição para a API Claude")
         
@@ -494,112 +1700,37 @@ class TreinadorEspecialista:
             erro_msg = "API key não fornecida ou vazia"
             self.logger.error(erro_msg)
             
-            # Retornar uma resposta fictícia com uma mensagem de erro
-            return {
-                "content": [
-                    {
-                        "text": f"""```json
-                        {{
-                          "erro": "{erro_msg}",
-                          "usuario": {{
-                            "id": "",
-                            "nome": "Usuário Fallback (Erro API)",
-                            "nivel": "intermediário",
-                            "objetivos": [
-                              {{
-                                "objetivo_id": "{str(uuid.uuid4())}",
-                                "nome": "Condicionamento geral",
-                                "prioridade": 1
-                              }}
-                            ],
-                            "restricoes": []
-                          }},
-                          "plano_principal": {{
-                            "nome": "Plano de Treinamento (Simulado - Erro API)",
-                            "descricao": "Este plano foi gerado automaticamente devido a erro na API.",
-                            "periodizacao": {{
-                              "tipo": "linear",
-                              "descricao": "Progressão linear de carga"
-                            }},
-                            "duracao_semanas": 12,
-                            "frequencia_semanal": 3,
-                            "ciclos": [
-                              {{
-                                "ciclo_id": "{str(uuid.uuid4())}",
-                                "nome": "Ciclo Inicial",
-                                "ordem": 1,
-                                "duracao_semanas": 12,
-                                "objetivo": "Condicionamento geral",
-                                "microciclos": [
-                                  {{
-                                    "semana": 1,
-                                    "volume": "médio",
-                                    "intensidade": "média",
-                                    "foco": "Adaptação",
-                                    "sessoes": [
-                                      {{
-                                        "sessao_id": "{str(uuid.uuid4())}",
-                                        "nome": "Treino A",
-                                        "tipo": "resistência",
-                                        "duracao_minutos": 60,
-                                        "nivel_intensidade": 5,
-                                        "dia_semana": 1,
-                                        "grupos_musculares": [],
-                                        "exercicios": [
-                                          {{
-                                            "exercicio_id": "{str(uuid.uuid4())}",
-                                            "nome": "Agachamento",
-                                            "ordem": 1,
-                                            "equipamento": "Peso corporal",
-                                            "series": 3,
-                                            "repeticoes": "12-15",
-                                            "percentual_rm": 70,
-                                            "tempo_descanso": 60,
-                                            "cadencia": "2-0-2",
-                                            "metodo": "normal",
-                                            "progressao": [],
-                                            "observacoes": "Simulado devido a erro de API"
-                                          }}
-                                        ]
-                                      }}
-                                    ]
-                                  }}
-                                ]
-                              }}
-                            ]
-                          }}
-                        }}
-                        ```"""
-                    }
-                ]
-            }
+            return self._resposta_indisponivel("sem_api_key", erro_msg)
         
         # Se temos uma API key, continuar com a requisição
-        headers = {
-            "anthropic-version": "2023-06-01",
-            "x-api-key": self.api_key.strip(),
-            "content-type": "application/json"
-        }
-        
-        # Verificar se estamos usando a URL antiga ou nova da API
-        api_url = self.api_url
-        if "api.anthropic.com/v1/messages" not in api_url:
-            api_url = "https://api.anthropic.com/v1/messages"
-            self.logger.info(f"URL API atualizada para: {api_url}")
-        
-        data = {
-            "model": "claude-3-opus-20240229",
-            "max_tokens": 4000,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        }
-        
-        self.logger.debug(f"Usando modelo: {data['model']}, max_tokens: {data['max_tokens']}")
+        api_url, headers, data = self._montar_requisicao(prompt, max_tokens, continuacao, ferramenta, sistema, modelo)
+        return self._enviar_requisicao(api_url, headers, data, operacao)
+    
+    def _enviar_requisicao(self, api_url: str, headers: Dict[str, str], data: Dict[str, Any],
+                           operacao: str) -> Dict[str, Any]:
+        """
+        Envia a requisição montada, com retentativas, e registra a chamada nas métricas.
         
+        Args:
+            api_url (str): URL da API
+            headers (Dict): Cabeçalhos HTTP
+            data (Dict): Corpo da requisição
+            operacao (str): Nome da operação registrado nas métricas
+            
+        Returns:
+            Dict: Resposta da API em formato JSON, ou resposta do tipo RESPOSTA_INDISPONIVEL
+                  (com motivo e erro) se a chamada falhar
+        """
+        inicio = time.perf_counter()
+        response = None
+        ttfb = None
+        tentativas = {"tentativas": 0}
         try:
             self.logger.info(f"Enviando requisição POST para {api_url}")
-            response = requests.post(api_url, headers=headers, json=data)
+            response = self._post_com_retentativas(api_url, headers, data, tentativas)
+            # requests mede até a chegada dos cabeçalhos, ou seja, o tempo até o primeiro byte
+            elapsed = getattr(response, "elapsed", None)
+            ttfb = elapsed.total_seconds() if elapsed is not None else None
             
             self.logger.debug(f"Status da resposta: {response.status_code}")
             
@@ -614,257 +1745,299 @@ class TreinadorEspecialista:
                 except:
                     pass
                 self.logger.error(f"Erro API: {error_msg[:500]}...")
+                self._registrar_chamada(operacao, inicio, RESULTADO_ERRO_API, ttfb=ttfb,
+                                        status_code=response.status_code, tentativas=tentativas["tentativas"],
+                                        modelo=data["model"])
                 
-                # Em caso de erro, retornar uma resposta simulada
-                return {
-                    "content": [
-                        {
-                            "text": f"""```json
-                            {{
-                              "erro": "Erro na API Claude: {error_msg[:100].replace('"', '\\"')}...",
-                              "usuario": {{
-                                "id": "",
-                                "nome": "Usuário Fallback (Erro API)",
-                                "nivel": "intermediário",
-                                "objetivos": [
-                                  {{
-                                    "objetivo_id": "{str(uuid.uuid4())}",
-                                    "nome": "Condicionamento geral",
-                                    "prioridade": 1
-                                  }}
-                                ],
-                                "restricoes": []
-                              }},
-                              "plano_principal": {{
-                                "nome": "Plano de Treinamento (Simulado - Erro API)",
-                                "descricao": "Este plano foi gerado automaticamente devido a erro na API.",
-                                "periodizacao": {{
-                                  "tipo": "linear",
-                                  "descricao": "Progressão linear de carga"
-                                }},
-                                "duracao_semanas": 12,
-                                "frequencia_semanal": 3,
-                                "ciclos": [
-                                  {{
-                                    "ciclo_id": "{str(uuid.uuid4())}",
-                                    "nome": "Ciclo Inicial",
-                                    "ordem": 1,
-                                    "duracao_semanas": 12,
-                                    "objetivo": "Condicionamento geral",
-                                    "microciclos": [
-                                      {{
-                                        "semana": 1,
-                                        "volume": "médio",
-                                        "intensidade": "média",
-                                        "foco": "Adaptação",
-                                        "sessoes": [
-                                          {{
-                                            "sessao_id": "{str(uuid.uuid4())}",
-                                            "nome": "Treino A",
-                                            "tipo": "resistência",
-                                            "duracao_minutos": 60,
-                                            "nivel_intensidade": 5,
-                                            "dia_semana": 1,
-                                            "grupos_musculares": [],
-                                            "exercicios": [
-                                              {{
-                                                "exercicio_id": "{str(uuid.uuid4())}",
-                                                "nome": "Agachamento",
-                                                "ordem": 1,
-                                                "equipamento": "Peso corporal",
-                                                "series": 3,
-                                                "repeticoes": "12-15",
-                                                "percentual_rm": 70,
-                                                "tempo_descanso": 60,
-                                                "cadencia": "2-0-2",
-                                                "metodo": "normal",
-                                                "progressao": [],
-                                                "observacoes": "Simulado devido a erro de API"
-                                              }}
-                                            ]
-                                          }}
-                                        ]
-                                      }}
-                                    ]
-                                  }}
-                                ]
-                              }}
-                            }}
-                            ```"""
-                        }
-                    ]
-                }
+                return self._resposta_indisponivel(RESULTADO_ERRO_API, f"Erro na API Claude: {error_msg[:100]}")
             
             # Se chegou aqui, a resposta foi bem-sucedida
             resposta_json = response.json()
             self.logger.info("Resposta obtida e convertida para JSON com sucesso")
+            self._registrar_chamada(operacao, inicio, RESULTADO_SUCESSO, resposta_json, ttfb=ttfb, status_code=200,
+                                    tentativas=tentativas["tentativas"], modelo=data["model"])
             return resposta_json
             
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Erro na requisição HTTP: {str(e)}")
+            resultado = RESULTADO_ERRO_CONEXAO
+            if isinstance(e, CircuitoAbertoError):
+                resultado = RESULTADO_CIRCUITO_ABERTO
+            elif isinstance(e, FilaEsgotadaError):
+                resultado = RESULTADO_FILA_ESGOTADA
+            elif isinstance(e, LimiteTaxaEsgotadoError):
+                resultado = RESULTADO_TAXA_ESGOTADA
+            self._registrar_chamada(operacao, inicio, resultado, ttfb=ttfb, tentativas=tentativas["tentativas"],
+                                    modelo=data["model"])
             
-            # Retornar um fallback em caso de erro de conexão
-            return {
-                "content": [
-                    {
-                        "text": f"""```json
-                        {{
-                          "erro": "Erro de conexão: {str(e)[:100].replace('"', '\\"')}...",
-                          "usuario": {{
-                            "id": "",
-                            "nome": "Usuário Fallback (Erro conexão)",
-                            "nivel": "intermediário",
-                            "objetivos": [
-                              {{
-                                "objetivo_id": "{str(uuid.uuid4())}",
-                                "nome": "Condicionamento geral",
-                                "prioridade": 1
-                              }}
-                            ],
-                            "restricoes": []
-                          }},
-                          "plano_principal": {{
-                            "nome": "Plano de Treinamento (Simulado - Erro conexão)",
-                            "descricao": "Este plano foi gerado automaticamente devido a erro de conexão.",
-                            "periodizacao": {{
-                              "tipo": "linear",
-                              "descricao": "Progressão linear de carga"
-                            }},
-                            "duracao_semanas": 12,
-                            "frequencia_semanal": 3,
-                            "ciclos": [
-                              {{
-                                "ciclo_id": "{str(uuid.uuid4())}",
-                                "nome": "Ciclo Inicial",
-                                "ordem": 1,
-                                "duracao_semanas": 12,
-                                "objetivo": "Condicionamento geral",
-                                "microciclos": [
-                                  {{
-                                    "semana": 1,
-                                    "volume": "médio",
-                                    "intensidade": "média",
-                                    "foco": "Adaptação",
-                                    "sessoes": [
-                                      {{
-                                        "sessao_id": "{str(uuid.uuid4())}",
-                                        "nome": "Treino A",
-                                        "tipo": "resistência",
-                                        "duracao_minutos": 60,
-                                        "nivel_intensidade": 5,
-                                        "dia_semana": 1,
-                                        "grupos_musculares": [],
-                                        "exercicios": [
-                                          {{
-                                            "exercicio_id": "{str(uuid.uuid4())}",
-                                            "nome": "Agachamento",
-                                            "ordem": 1,
-                                            "equipamento": "Peso corporal",
-                                            "series": 3,
-                                            "repeticoes": "12-15",
-                                            "percentual_rm": 70,
-                                            "tempo_descanso": 60,
-                                            "cadencia": "2-0-2",
-                                            "metodo": "normal",
-                                            "progressao": [],
-                                            "observacoes": "Simulado devido a erro de conexão"
-                                          }}
-                                        ]
-                                      }}
-                                    ]
-                                  }}
-                                ]
-                              }}
-                            ]
-                          }}
-                        }}
-                        ```"""
-                    }
-                ]
-            }
+            return self._resposta_indisponivel(resultado, f"Erro de conexão: {str(e)[:100]}")
             
         except json.JSONDecodeError as e:
             self.logger.error(f"Erro ao decodificar JSON da resposta: {str(e)}")
+            self._registrar_chamada(operacao, inicio, RESULTADO_ERRO_JSON, ttfb=ttfb,
+                                    status_code=response.status_code if response is not None else None,
+                                    tentativas=tentativas["tentativas"], modelo=data["model"])
             
-            # Retornar um fallback em caso de erro de JSON
-            return {
-                "content": [
-                    {
-                        "text": f"""```json
-                        {{
-                          "erro": "Erro ao decodificar resposta: {str(e)[:100].replace('"', '\\"')}...",
-                          "usuario": {{
-                            "id": "",
-                            "nome": "Usuário Fallback (Erro JSON)",
-                            "nivel": "intermediário",
-                            "objetivos": [
-                              {{
-                                "objetivo_id": "{str(uuid.uuid4())}",
-                                "nome": "Condicionamento geral",
-                                "prioridade": 1
-                              }}
-                            ],
-                            "restricoes": []
-                          }},
-                          "plano_principal": {{
-                            "nome": "Plano de Treinamento (Simulado - Erro JSON)",
-                            "descricao": "Este plano foi gerado automaticamente devido a erro de processamento JSON.",
-                            "periodizacao": {{
-                              "tipo": "linear",
-                              "descricao": "Progressão linear de carga"
-                            }},
-                            "duracao_semanas": 12,
-                            "frequencia_semanal": 3,
-                            "ciclos": [
-                              {{
-                                "ciclo_id": "{str(uuid.uuid4())}",
-                                "nome": "Ciclo Inicial",
-                                "ordem": 1,
-                                "duracao_semanas": 12,
-                                "objetivo": "Condicionamento geral",
-                                "microciclos": [
-                                  {{
-                                    "semana": 1,
-                                    "volume": "médio",
-                                    "intensidade": "média",
-                                    "foco": "Adaptação",
-                                    "sessoes": [
-                                      {{
-                                        "sessao_id": "{str(uuid.uuid4())}",
-                                        "nome": "Treino A",
-                                        "tipo": "resistência",
-                                        "duracao_minutos": 60,
-                                        "nivel_intensidade": 5,
-                                        "dia_semana": 1,
-                                        "grupos_musculares": [],
-                                        "exercicios": [
-                                          {{
-                                            "exercicio_id": "{str(uuid.uuid4())}",
-                                            "nome": "Agachamento",
-                                            "ordem": 1,
-                                            "equipamento": "Peso corporal",
-                                            "series": 3,
-                                            "repeticoes": "12-15",
-                                            "percentual_rm": 70,
-                                            "tempo_descanso": 60,
-                                            "cadencia": "2-0-2",
-                                            "metodo": "normal",
-                                            "progressao": [],
-                                            "observacoes": "Simulado devido a erro JSON"
-                                          }}
-                                        ]
-                                      }}
-                                    ]
-                                  }}
-                                ]
-                              }}
-                            ]
-                          }}
-                        }}
-                        ```"""
-                    }
-                ]
-            }
+            return self._resposta_indisponivel(RESULTADO_ERRO_JSON, f"Erro ao decodificar resposta: {str(e)[:100]}")
+    
+    def _resposta_indisponivel(self, motivo: str, erro: str) -> Dict[str, Any]:
+        """
+        Resposta usada quando a API não produziu um plano; _finalizar_plano gera o plano
+        pelas regras locais a partir dela.
+        
+        Args:
+            motivo (str): sem_api_key ou o resultado da chamada (RESULTADO_*)
+            erro (str): Descrição do erro
+            
+        Returns:
+            Dict: Resposta do tipo RESPOSTA_INDISPONIVEL
+        """
+        return {"type": RESPOSTA_INDISPONIVEL, "motivo": motivo, "erro": erro}
+    
+    def _post_com_retentativas(self, api_url: str, headers: Dict[str, str], data: Dict[str, Any],
+                               tentativas: Dict[str, int]) -> Any:
+        """
+        Envia a requisição repetindo-a em falhas transitórias, com backoff exponencial e jitter.
+        
+        Erros de conexão e os status de STATUS_RETENTAVEIS (429, 529, 5xx...) são repetidos
+        conforme a política de retentativas, respeitando retry-after. Cada resultado alimenta
+        o disjuntor compartilhado; com ele aberto, a requisição é recusada sem acessar a rede.
+        Cada tentativa ocupa uma vaga do limitador de concorrência, devolvida antes da espera
+        do backoff; 429/529 reduzem o limite e os sucessos o aumentam. Antes disso, a tentativa
+        reserva uma requisição e os tokens estimados no limite de taxa compartilhado entre os
+        processos, reconciliado com o uso real quando a resposta chega.
+        
+        Args:
+            api_url (str): URL da API
+            headers (Dict): Cabeçalhos HTTP
+            data (Dict): Corpo da requisição
+            tentativas (Dict): Contador de requisições feitas, atualizado a cada tentativa
+            
+        Returns:
+            Resposta da última tentativa (pode ter status de erro se as retentativas se esgotarem)
+            
+        Raises:
+            CircuitoAbertoError: Se o disjuntor estiver aberto
+            FilaEsgotadaError: Se não houver vaga no limitador dentro do prazo da fila
+            LimiteTaxaEsgotadoError: Se o limite de taxa não liberar a chamada dentro do prazo
+            requests.exceptions.RequestException: Se a última tentativa falhar na conexão
+        """
+        while True:
+            if not self.disjuntor.permitir():
+                raise CircuitoAbertoError("Disjuntor da API Claude aberto, requisição não enviada")
+            reserva = self._reservar_taxa(data)
+            try:
+                vaga = self.limitador.adquirir(self.fila_timeout_s) if self.limitador else None
+            except FilaEsgotadaError:
+                self._reconciliar_taxa(reserva, {})
+                raise
+            tentativas["tentativas"] += 1
+            sobrecarga = None
+            uso = None
+            try:
+                response = self.transport.post(api_url, headers=headers, json_body=data)
+                if response.status_code in STATUS_SOBRECARGA:
+                    sobrecarga = True
+                elif response.status_code == 200:
+                    sobrecarga = False
+                uso = self._uso_da_resposta(response)
+            except requests.exceptions.RequestException as e:
+                self.disjuntor.registrar_falha()
+                espera = self.politica_retentativa.espera(tentativas["tentativas"])
+                if espera is None:
+                    raise
+                motivo = f"{type(e).__name__}: {str(e)[:100]}"
+            else:
+                if response.status_code not in STATUS_RETENTAVEIS:
+                    self.disjuntor.registrar_sucesso()
+                    return response
+                self.disjuntor.registrar_falha()
+                espera = self.politica_retentativa.espera(tentativas["tentativas"], ler_retry_after(response.headers))
+                if espera is None:
+                    return response
+                motivo = f"status {response.status_code}"
+            finally:
+                if vaga is not None:
+                    self.limitador.liberar(vaga, sobrecarga)
+                self._reconciliar_taxa(reserva, uso)
+            
+            self.logger.warning(f"Tentativa {tentativas['tentativas']} falhou ({motivo}), "
+                                f"repetindo em {espera:.2f} segundos")
+            if self.metricas is not None:
+                self.metricas.incrementar("retentativas")
+            self.politica_retentativa.dormir(espera)
+    
+    def _reservar_taxa(self, data: Dict[str, Any]) -> Optional[Reserva]:
+        """
+        Reserva uma requisição e os tokens estimados no limite de taxa compartilhado.
+        
+        Args:
+            data (Dict): Corpo da requisição
+            
+        Returns:
+            Optional[Reserva]: Reserva a reconciliar ou None se o limite estiver desabilitado
+        """
+        if self.limitador_taxa is None:
+            return None
+        return self.limitador_taxa.reservar(estimar_tokens_requisicao(data), self.espera_taxa_max_s)
+    
+    def _reconciliar_taxa(self, reserva: Optional[Reserva], uso: Optional[Dict[str, Any]]) -> None:
+        """
+        Ajusta a reserva pelos tokens realmente consumidos.
+        
+        Args:
+            reserva (Reserva, optional): Reserva feita em _reservar_taxa
+            uso (Dict, optional): Campo usage da resposta ({} se a API recusou a chamada,
+                None se o consumo é desconhecido e a estimativa deve ser mantida)
+        """
+        if reserva is not None:
+            self.limitador_taxa.reconciliar(reserva, None if uso is None else tokens_consumidos(uso))
+    
+    def _uso_da_resposta(self, response: Any) -> Optional[Dict[str, Any]]:
+        """Uso de tokens de uma resposta HTTP ({} em respostas de erro), para a reconciliação do limite de taxa."""
+        if self.limitador_taxa is None:
+            return None
+        if response.status_code != 200:
+            return {}
+        try:
+            return response.json().get("usage") or {}
+        except ValueError:
+            return None
+    
+    def _registrar_chamada(self, operacao: str, inicio: float, resultado: str,
+                           resposta: Optional[Dict[str, Any]] = None, ttfb: Optional[float] = None,
+                           status_code: Optional[int] = None, streaming: bool = False, tentativas: int = 1,
+                           modelo: Optional[str] = None) -> None:
+        """
+        Registra tokens, latência e resultado de uma chamada nas métricas do processo.
+        
+        Args:
+            operacao (str): plano, continuacao, ferramenta, fanout_macro ou fanout_bloco
+            inicio (float): time.perf_counter() no envio da requisição
+            resultado (str): Resultado da chamada (RESULTADO_*)
+            resposta (Dict, optional): Resposta da API, de onde vêm uso e stop_reason
+            ttfb (float, optional): Segundos até o primeiro byte
+            status_code (int, optional): Status HTTP
+            streaming (bool): Se a chamada foi feita em streaming
+            tentativas (int): Requisições HTTP feitas, incluindo as retentativas
+            modelo (str, optional): Modelo da requisição, usado quando a resposta não o informa
+        """
+        if self.metricas is None:
+            return
+        resposta = resposta or {}
+        uso = resposta.get("usage") or {}
+        self.metricas.registrar(RegistroChamada(
+            origem="TreinadorEspecialista",
+            operacao=operacao,
+            modelo=resposta.get("model") or modelo or self.modelo,
+            resultado=resultado,
+            total_s=time.perf_counter() - inicio,
+            ttfb_s=ttfb,
+            input_tokens=uso.get("input_tokens", 0),
+            output_tokens=uso.get("output_tokens", 0),
+            cache_escrita_tokens=uso.get("cache_creation_input_tokens") or 0,
+            cache_leitura_tokens=uso.get("cache_read_input_tokens") or 0,
+            stop_reason=resposta.get("stop_reason"),
+            status_code=status_code,
+            versao_prompt=self.versao_prompt,
+            streaming=streaming,
+            tentativas=tentativas
+        ))
+    
+    def _orcamento_tokens(self, dados_usuario: Dict[str, Any]) -> int:
+        """
+        Escolhe o limite de tokens da primeira requisição conforme o tamanho do plano.
+        
+        Args:
+            dados_usuario (Dict): Dados do usuário
+            
+        Returns:
+            int: max_tokens da faixa de sessões semanais do usuário (a maior faixa se exceder todas)
+        """
+        orcamentos = self.config_geracao["max_tokens_por_sessoes"]
+        if not orcamentos:
+            return 4000
+        try:
+            sessoes = int(dados_usuario.get("disponibilidade_semanal") or len(dados_usuario.get("dias_disponiveis") or []) or 3)
+        except (TypeError, ValueError):
+            sessoes = 3
+        for limite in sorted(orcamentos):
+            if sessoes <= limite:
+                return orcamentos[limite]
+        return orcamentos[max(orcamentos)]
+    
+    def _requisitar_plano(self, prompt: str, max_tokens: int, operacao: str = "plano",
+                          sistema: Optional[str] = None, modelo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Faz a requisição ao Claude e continua a resposta enquanto ela vier truncada.
+        
+        Args:
+            prompt (str): Prompt para o Claude
+            max_tokens (int): Limite de tokens da primeira requisição
+            operacao (str): Nome da operação registrado nas métricas
+            sistema (str, optional): Prefixo estático enviado como prompt de sistema cacheável
+            modelo (str, optional): Modelo da requisição e das continuações; por padrão self.modelo
+            
+        Returns:
+            Dict: Resposta da API com o texto de todas as partes concatenado
+        """
+        resposta = self._fazer_requisicao_claude(prompt, max_tokens, operacao=operacao, sistema=sistema, modelo=modelo)
+        return self._completar_resposta_truncada(prompt, resposta, sistema, modelo=modelo)
+    
+    def _completar_resposta_truncada(self, prompt: str, resposta: Dict[str, Any], sistema: Optional[str] = None,
+                                     modelo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Emite requisições de continuação para uma resposta cortada por max_tokens ou com JSON aberto.
+        
+        Cada continuação envia o texto acumulado como início da resposta do assistente,
+        de modo que o modelo retoma exatamente do ponto de corte. O documento costurado
+        é extraído uma única vez depois, em _finalizar_plano.
+        
+        Args:
+            prompt (str): Prompt original
+            resposta (Dict): Primeira resposta da API
+            sistema (str, optional): Prefixo estático do prompt original, lido do cache nas continuações
+            modelo (str, optional): Modelo da resposta original, usado nas continuações; por padrão self.modelo
+            
+        Returns:
+            Dict: Resposta com o texto concatenado, stop_reason da última parte e uso somado
+        """
+        if resposta.get("type") != "message":
+            return resposta
+        
+        texto = texto_da_resposta(resposta.get("content", []))
+        stop_reason = resposta.get("stop_reason")
+        uso = dict(resposta.get("usage", {}))
+        continuacoes = 0
+        
+        while (stop_reason == "max_tokens" or json_truncado(texto)) \
+                and continuacoes < self.config_geracao["continuacao_max_requisicoes"]:
+            continuacoes += 1
+            # A API rejeita mensagens do assistente terminadas em espaço em branco
+            texto = texto.rstrip()
+            self.logger.warning(f"Resposta truncada (stop_reason: {stop_reason}, {len(texto)} caracteres), "
+                                f"solicitando continuação {continuacoes}")
+            parte = self._fazer_requisicao_claude(prompt, self.config_geracao["continuacao_max_tokens"], continuacao=texto,
+                                                  operacao="continuacao", sistema=sistema, modelo=modelo)
+            if parte.get("type") != "message":
+                self.logger.error("Continuação falhou, mantendo o texto parcial")
+                break
+            
+            texto_parte = texto_da_resposta(parte.get("content", []))
+            stop_reason = parte.get("stop_reason")
+            for chave, valor in parte.get("usage", {}).items():
+                if isinstance(valor, int):
+                    uso[chave] = uso.get(chave, 0) + valor
+            if not texto_parte:
+                break
+            texto += texto_parte
+        
+        if not continuacoes:
+            return resposta
+        
+        self.logger.info(f"Resposta completada com {continuacoes} continuação(ões): {len(texto)} caracteres "
+                         f"(stop_reason: {stop_reason})")
+        return dict(resposta, content=[{"type": "text", "text": texto}], stop_reason=stop_reason, usage=uso)
     
     @WrapperLogger.log_function(logging.INFO)
     def _extrair_json_da_resposta(self, resposta: Dict[str, Any]) -> Dict[str, Any]:
@@ -875,52 +2048,37 @@ class TreinadorEspecialista:
             resposta (Dict): Resposta da API Claude
             
         Returns:
-            Dict: JSON extraído da resposta
+            Dict: JSON extraído da resposta; a estrutura básica usada quando a resposta não traz
+                  um plano leva "geracao" com a origem ORIGEM_ESTRUTURA_BASICA
         """
         self.logger.info("Extraindo conteúdo JSON da resposta")
+        
+        # Saída estruturada: o plano já chega como objeto na entrada da ferramenta
+        entrada = self._entrada_da_ferramenta(resposta)
+        if entrada is not None:
+            self.logger.info("Plano recebido como chamada de ferramenta, sem extração de texto")
+            return entrada
+        
         try:
-            conteudo = resposta.get("content", [])
-            
-            # Encontrar blocos de código JSON na resposta
             json_text = ""
             
-            self.logger.debug(f"Analisando blocos de conteúdo")
-            
             # Extrair todo o texto da resposta
-            texto_completo = ""
-            for item in conteudo:
-                if isinstance(item, dict):
-                    texto_completo += item.get("text", "")
-                elif isinstance(item, str):
-                    texto_completo += item
-            
+            texto_completo = texto_da_resposta(resposta.get("content", []))
             self.logger.debug(f"Texto extraído com {len(texto_completo)} caracteres")
             
-            # Procurar por blocos de código JSON
-            import re
-            json_blocks = re.findall(r'```json(.*?)```', texto_completo, re.DOTALL)
-            
-            if json_blocks:
-                self.logger.debug(f"Encontrados {len(json_blocks)} blocos JSON no texto")
-                json_text = json_blocks[0].strip()
-                self.logger.debug(f"Extraído bloco JSON com {len(json_text)} caracteres")
-            else:
-                # Tentar encontrar JSON diretamente no texto (entre chaves)
-                json_pattern = re.compile(r'\{(?:[^{}]|(?:\{[^{}]*\}))*\}')
-                matches = json_pattern.findall(texto_completo)
-                
-                if matches:
-                    # Pegar o maior match, que provavelmente é o JSON completo
-                    json_text = max(matches, key=len)
-                    self.logger.debug(f"Extraído JSON direto do texto com {len(json_text)} caracteres")
-                else:
-                    self.logger.error("Nenhum JSON encontrado na resposta")
-                    self.logger.debug(f"Conteúdo da resposta: {texto_completo[:200]}...")
-                    raise ValueError("Nenhum JSON encontrado na resposta")
-            
-            # Limpar o texto e converter para JSON
+            # Varredura linear: blocos ```json primeiro, depois o maior objeto de nível superior
             self.logger.info("Convertendo texto para JSON")
-            json_obj = json.loads(json_text)
+            try:
+                json_obj = extrair_json(texto_completo)
+            except JSONTruncadoError as e:
+                json_text = e.parcial
+                self.logger.error(f"Resposta truncada (stop_reason: {resposta.get('stop_reason')}): {str(e)}")
+                raise
+            except JSONNaoEncontradoError:
+                self.logger.debug(f"Conteúdo da resposta: {texto_completo[:200]}...")
+                raise
+            if not isinstance(json_obj, dict):
+                raise ValueError(f"JSON extraído não é um objeto ({type(json_obj).__name__})")
             self.logger.info("JSON extraído com sucesso")
             
             # Verificar se o JSON contém a estrutura completa esperada ou apenas um fragmento
@@ -935,11 +2093,11 @@ class TreinadorEspecialista:
                     self.logger.info("Detectado fragmento de exercício, incorporando na estrutura completa")
                     # Criar estrutura básica completa com o exercício incorporado
                     exercicio = json_obj
-                    return self._criar_estrutura_completa_com_exercicio(exercicio)
+                    return self._marcar_estrutura_basica(self._criar_estrutura_completa_com_exercicio(exercicio))
                 else:
                     # Algum outro tipo de fragmento, criar estrutura básica
                     self.logger.info("Criando estrutura básica completa")
-                    return self._criar_estrutura_completa_basica()
+                    return self._marcar_estrutura_basica(self._criar_estrutura_completa_basica())
             
             return json_obj
             
@@ -951,7 +2109,12 @@ class TreinadorEspecialista:
                 self.logger.debug("Não foi possível mostrar o texto JSON problemático")
             # Como fallback, retornar um JSON básico
             self.logger.warning("Retornando JSON básico como fallback devido a erro na extração")
-            return self._criar_estrutura_completa_basica()
+            return self._marcar_estrutura_basica(self._criar_estrutura_completa_basica())
+    
+    def _marcar_estrutura_basica(self, plano: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra no plano que ele é a estrutura básica, e não um plano do modelo (fora do cache e das rotas)."""
+        plano["geracao"] = {"origem": ORIGEM_ESTRUTURA_BASICA}
+        return plano
     
     def _criar_estrutura_completa_com_exercicio(self, exercicio: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -1094,149 +2257,155 @@ class TreinadorEspecialista:
         }
     
     @WrapperLogger.log_function(logging.INFO)
-    def _validar_plano(self, plano: Dict[str, Any]) -> Dict[str, Any]:
+    def _validar_plano(self, plano: Dict[str, Any], modelo: Optional[str] = None) -> Dict[str, Any]:
         """
         Valida o plano de treinamento contra o schema esperado.
         
+        Todos os erros são coletados em uma única passada do validador compilado;
+        os tratáveis são corrigidos no próprio local e o plano só é revalidado
+        se alguma correção foi aplicada.
+        
         Args:
             plano (Dict): Plano de treinamento
+            modelo (str, optional): Modelo dos reparos de trechos pelo Claude; por padrão self.modelo
             
         Returns:
             Dict: Plano validado
         """
         self.logger.info("Iniciando validação do plano de treinamento")
-        try:
-            self.logger.debug("Validando contra schema JSON")
-            jsonschema.validate(instance=plano, schema=self.schema)
+        erros, correcoes, restantes = validar_e_reparar(plano, self.schema)
+        if not erros:
             self.logger.info("Plano validado com sucesso contra o schema")
             return plano
+        
+        # Log detalhado dos erros para diagnóstico
+        for erro in erros:
+            self.logger.error(f"Erro de validação em {formatar_caminho(erro.absolute_path)}: {erro.message}")
+        if correcoes:
+            self.logger.info(f"Correções aplicadas: {'; '.join(correcoes)}")
+        
+        if restantes and self.config_geracao["reparo_llm"] and self._motivo_modo_degradado() is None:
+            restantes = self._reparar_trechos_com_claude(plano, restantes, modelo)
+        
+        if restantes:
+            self.logger.critical(f"Não foi possível corrigir automaticamente {len(restantes)} erro(s)")
+            raise ValueError(f"Falha na validação do plano de treinamento: {restantes[0].message}")
+        
+        self.logger.info("Plano corrigido validado com sucesso")
+        return plano
+    
+    def _reparar_trechos_com_claude(self, plano: Dict[str, Any], erros: List[Any],
+                                    modelo: Optional[str] = None) -> List[Any]:
+        """
+        Pede ao Claude a correção apenas dos trechos com erros que o reparo local não resolveu.
+        
+        Os erros são agrupados pelo menor trecho que os contém (um exercício, uma sessão,
+        uma semana); cada trecho é enviado com os seus erros e o trecho correspondente do
+        schema, validado isoladamente e encaixado de volta no plano, que é revalidado ao final.
+        
+        Args:
+            plano (Dict): Plano em validação (alterado no próprio objeto)
+            erros (List[ValidationError]): Erros restantes após o reparo local
+            modelo (str, optional): Modelo das requisições de reparo; por padrão self.modelo
             
-        except jsonschema.exceptions.ValidationError as e:
-            # Log detalhado do erro para diagnóstico
-            erro_path = ".".join([str(p) for p in e.path])
-            self.logger.error(f"Erro de validação em: {erro_path}")
-            self.logger.error(f"Detalhe: {e.message}")
-            
-            # Tentativa de correção automática para erros comuns
-            self.logger.info("Tentando corrigir erros automaticamente")
-            plano_corrigido = self._tentar_corrigir_erros(plano, e)
-            
-            # Tentar validar novamente
-            try:
-                self.logger.debug("Validando plano corrigido")
-                jsonschema.validate(instance=plano_corrigido, schema=self.schema)
-                self.logger.info("Plano corrigido validado com sucesso")
-                return plano_corrigido
-                
-            except jsonschema.exceptions.ValidationError as e2:
-                self.logger.error(f"Falha ao validar o plano corrigido: {str(e2)}")
-                self.logger.critical("Não foi possível corrigir automaticamente todos os erros")
-                raise ValueError(f"Falha na validação do plano de treinamento: {str(e)}")
+        Returns:
+            List[ValidationError]: Erros que continuam no plano
+        """
+        trechos: Dict[Tuple[Any, ...], List[Any]] = {}
+        for erro in erros:
+            caminho = trecho_do_erro(erro)
+            if caminho is None:
+                self.logger.warning(f"Erro em {formatar_caminho(erro.absolute_path)} não pertence a um trecho reparável")
+                return erros
+            trechos.setdefault(tuple(caminho), []).append(erro)
+        if len(trechos) > self.config_geracao["reparo_max_trechos"]:
+            self.logger.warning(f"{len(trechos)} trechos com erro, acima do limite de reparo pelo Claude")
+            return erros
+        
+        # Trechos mais profundos primeiro: o trecho de uma sessão não inclui os exercícios dela
+        for caminho in sorted(trechos, key=len, reverse=True):
+            reparado = self._reparar_trecho_com_claude(plano, list(caminho), trechos[caminho], modelo)
+            if self.metricas is not None:
+                self.metricas.incrementar("reparos_llm" if reparado else "reparos_llm_falhos")
+        
+        _, correcoes, restantes = validar_e_reparar(plano, self.schema)
+        if correcoes:
+            self.logger.info(f"Correções aplicadas após o reparo: {'; '.join(correcoes)}")
+        return restantes
     
-    @WrapperLogger.log_function(logging.INFO)
-    def _tentar_corrigir_erros(self, plano: Dict[str, Any], erro: jsonschema.exceptions.ValidationError) -> Dict[str, Any]:
+    def _reparar_trecho_com_claude(self, plano: Dict[str, Any], caminho: List[Any], erros: List[Any],
+                                   modelo: Optional[str] = None) -> bool:
         """
-        Tenta corrigir erros comuns de validação.
+        Corrige um trecho do plano com uma requisição pequena ao Claude.
+        
+        Listas de objetos dentro do trecho (por exemplo, os exercícios de uma sessão) não
+        são enviadas e são restauradas na resposta, para que a requisição fique restrita
+        ao objeto com erro.
         
         Args:
-            plano (Dict): Plano com erros
-            erro (ValidationError): Erro de validação
+            plano (Dict): Plano em validação
+            caminho (List): Caminho do trecho
+            erros (List[ValidationError]): Erros dentro do trecho
+            modelo (str, optional): Modelo da requisição; por padrão self.modelo
             
         Returns:
-            Dict: Plano com tentativa de correção
-        """
-        plano_corrigido = plano.copy()
-        self.logger.info("Iniciando correções automáticas do plano")
-        correcoes_aplicadas = []
-        
-        # Exemplo de correção: converter valores null para None ou valores numéricos
-        if "null" in str(erro):
-            # Converter strings "null" para None
-            self.logger.info("Detectados valores 'null' como strings, corrigindo")
-            
-            def corrigir_nulls(obj):
-                if isinstance(obj, dict):
-                    return {k: corrigir_nulls(v) for k, v in obj.items()}
-                elif isinstance(obj, list):
-                    return [corrigir_nulls(i) for i in obj]
-                elif obj == "null":
-                    return None
-                else:
-                    return obj
-                    
-            plano_corrigido = corrigir_nulls(plano_corrigido)
-            correcoes_aplicadas.append("Strings 'null' convertidas para None")
-        
-        # Correção: garantir que campos numéricos tenham valores numéricos
-        erro_str = str(erro)
-        if "is not of type 'number'" in erro_str or "is not of type 'integer'" in erro_str:
-            self.logger.info("Detectados campos numéricos com valores não numéricos, corrigindo")
-            
-            def corrigir_numeros(obj, path=""):
-                if isinstance(obj, dict):
-                    for k, v in obj.items():
-                        new_path = f"{path}.{k}" if path else k
-                        if k in ["duracao_semanas", "frequencia_semanal", "duracao_minutos", 
-                                "series", "repeticoes", "percentual_rm", "tempo_descanso", 
-                                "nivel_intensidade", "ordem"]:
-                            if v is None:
-                                self.logger.debug(f"Corrigindo {new_path}: None -> valor padrão")
-                                if k == "duracao_semanas":
-                                    obj[k] = 12
-                                elif k == "frequencia_semanal":
-                                    obj[k] = 3
-                                elif k == "duracao_minutos":
-                                    obj[k] = 60
-                                elif k == "series":
-                                    obj[k] = 3
-                                elif k == "repeticoes":
-                                    obj[k] = "10-12"  # este é string
-                                elif k == "percentual_rm":
-                                    obj[k] = 70
-                                elif k == "tempo_descanso":
-                                    obj[k] = 60
-                                elif k == "nivel_intensidade":
-                                    obj[k] = 7
-                                elif k == "ordem":
-                                    obj[k] = 1
-                            elif isinstance(v, str) and v.isdigit():
-                                self.logger.debug(f"Corrigindo {new_path}: string -> int")
-                                obj[k] = int(v)
-                        else:
-                            obj[k] = corrigir_numeros(v, new_path)
-                    return obj
-                elif isinstance(obj, list):
-                    return [corrigir_numeros(item, f"{path}[{i}]") for i, item in enumerate(obj)]
-                else:
-                    return obj
-            
-            plano_corrigido = corrigir_numeros(plano_corrigido)
-            correcoes_aplicadas.append("Campos numéricos corrigidos")
-        
-        # Verificar se há arrays vazios nos objetivos ou restrições
-        usuario = plano_corrigido.get("usuario", {})
-        if "objetivos" in usuario and not usuario["objetivos"]:
-            self.logger.info("Lista de objetivos vazia, adicionando objetivo padrão")
-            usuario["objetivos"] = [{
-                "objetivo_id": str(uuid.uuid4()),
-                "nome": "Condicionamento geral",
-                "prioridade": 1
-            }]
-            correcoes_aplicadas.append("Objetivo padrão adicionado")
-            
-        if "restricoes" in usuario and not usuario["restricoes"]:
-            self.logger.info("Lista de restrições vazia, adicionando estrutura mínima")
-            usuario["restricoes"] = []
-            correcoes_aplicadas.append("Lista de restrições inicializada")
-        
-        # Veriifcar ciclos e estrutura do plano
-        plano_principal = plano_corrigido.get("plano_principal", {})
-        if "ciclos" in plano_principal and not plano_principal["ciclos"]:
-            self.logger.warning("Nenhum ciclo encontrado no plano, este é um erro grave")
-            # Aqui a correção seria muito complexa pois exigiria criar todo um plano
-        
-        self.logger.info(f"Correções aplicadas: {', '.join(correcoes_aplicadas)}")
-        return plano_corrigido
+            bool: True se o trecho corrigido foi validado e encaixado no plano
+        """
+        pai = plano
+        for parte in caminho[:-1]:
+            pai = pai[parte]
+        original = pai[caminho[-1]]
+        if not isinstance(original, dict):
+            return False
+        
+        omitidos = {
+            chave: valor for chave, valor in original.items()
+            if isinstance(valor, list) and valor and all(isinstance(item, dict) for item in valor)
+        }
+        fragmento = {chave: valor for chave, valor in original.items() if chave not in omitidos}
+        subschema = subschema_do_caminho(self.schema, caminho)
+        schema_fragmento = descongelar(subschema) if subschema is not None else {}
+        for chave in omitidos:
+            schema_fragmento.get("properties", {}).pop(chave, None)
+            if "required" in schema_fragmento:
+                schema_fragmento["required"] = [campo for campo in schema_fragmento["required"] if campo != chave]
+        
+        descricao_erros = "\n".join(
+            f"- {formatar_caminho(list(erro.absolute_path)[len(caminho):])}: {erro.message}" for erro in erros
+        )
+        prompt = f"""Corrija SOMENTE o trecho {formatar_caminho(caminho)} de um plano de treinamento,
+        que não passou na validação do schema. Mantenha os valores válidos e altere apenas o necessário.
+        
+        Erros (caminhos relativos ao trecho):
+        {descricao_erros}
+        
+        Schema do trecho:
+        {json.dumps(schema_fragmento, ensure_ascii=False, separators=(",", ":"))}
+        
+        Trecho:
+        {json.dumps(fragmento, ensure_ascii=False, separators=(",", ":"))}
+        
+        Retorne apenas o objeto JSON corrigido, em um bloco ```json.
+        """
+        resposta = self._fazer_requisicao_claude(self._compactar_prompt(prompt), self.config_geracao["reparo_max_tokens"],
+                                                 operacao="reparo", modelo=modelo)
+        corrigido = self._extrair_json_parcial(resposta)
+        if corrigido is None:
+            self.logger.error(f"Reparo de {formatar_caminho(caminho)} sem JSON válido")
+            return False
+        corrigido.update(omitidos)
+        
+        # Validação incremental: só o trecho, contra o seu subschema
+        if subschema is not None:
+            _, _, restantes = validar_e_reparar(corrigido, subschema)
+            if restantes:
+                self.logger.error(f"Trecho {formatar_caminho(caminho)} continua inválido após o reparo: "
+                                  f"{restantes[0].message}")
+                return False
+        pai[caminho[-1]] = corrigido
+        self.logger.info(f"Trecho {formatar_caminho(caminho)} reparado pelo Claude "
+                         f"({resposta.get('usage', {}).get('output_tokens', 0)} tokens de saída)")
+        return True
     
     @WrapperLogger.log_function(logging.INFO)
     def enviar_para_wrapper2(self, plano: Dict[str, Any], wrapper2) -> Dict[str, Any]: